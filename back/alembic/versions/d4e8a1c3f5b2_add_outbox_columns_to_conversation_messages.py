@@ -0,0 +1,63 @@
+# pylint: disable=no-member,invalid-name,line-too-long
+"""Add transactional outbox columns to conversation_messages
+
+Revision ID: d4e8a1c3f5b2
+Revises: 439174cb8c5e
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "d4e8a1c3f5b2"
+down_revision: str | Sequence[str] | None = "439174cb8c5e"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+deliverystatus = postgresql.ENUM(
+    "PENDING", "SENDING", "SCHEDULED", "SENT", "FAILED", name="deliverystatus", create_type=False
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    deliverystatus.create(op.get_bind(), checkfirst=True)
+
+    op.add_column("conversation_messages", sa.Column("chat_id", sa.String(length=64), nullable=True))
+    op.add_column("conversation_messages", sa.Column("session_name", sa.String(length=64), nullable=True))
+    op.add_column("conversation_messages", sa.Column("delivery_status", deliverystatus, nullable=True))
+    op.add_column(
+        "conversation_messages",
+        sa.Column("delivery_attempts", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column("conversation_messages", sa.Column("delivery_claimed_at", sa.DateTime(), nullable=True))
+    op.add_column("conversation_messages", sa.Column("delivery_error", sa.Text(), nullable=True))
+    op.add_column("conversation_messages", sa.Column("sent_at", sa.DateTime(), nullable=True))
+
+    # Replies stored before the outbox were sent inline
+    op.execute("UPDATE conversation_messages SET delivery_status = 'SENT' WHERE direction = 'OUTBOUND'")
+
+    op.create_index(
+        "ix_conversation_messages_outbox",
+        "conversation_messages",
+        ["delivery_status", "created_at"],
+        postgresql_where=sa.text("delivery_status IN ('PENDING', 'SENDING')"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_conversation_messages_outbox", table_name="conversation_messages")
+    op.drop_column("conversation_messages", "sent_at")
+    op.drop_column("conversation_messages", "delivery_error")
+    op.drop_column("conversation_messages", "delivery_claimed_at")
+    op.drop_column("conversation_messages", "delivery_attempts")
+    op.drop_column("conversation_messages", "delivery_status")
+    op.drop_column("conversation_messages", "session_name")
+    op.drop_column("conversation_messages", "chat_id")
+    deliverystatus.drop(op.get_bind(), checkfirst=True)
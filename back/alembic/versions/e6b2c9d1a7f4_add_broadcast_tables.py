@@ -0,0 +1,101 @@
+# pylint: disable=no-member,invalid-name,line-too-long
+"""Add broadcasts and broadcast_recipients tables
+
+Revision ID: e6b2c9d1a7f4
+Revises: d4e8a1c3f5b2
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = "e6b2c9d1a7f4"
+down_revision: str | Sequence[str] | None = "d4e8a1c3f5b2"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+broadcaststatus = postgresql.ENUM(
+    "SCHEDULED", "RUNNING", "PAUSED", "COMPLETED", "CANCELLED", name="broadcaststatus", create_type=False
+)
+broadcastrecipientstatus = postgresql.ENUM(
+    "PENDING", "SENDING", "SENT", "FAILED", "SKIPPED", name="broadcastrecipientstatus", create_type=False
+)
+conversationstatus = postgresql.ENUM(name="conversationstatus", create_type=False)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    broadcaststatus.create(op.get_bind(), checkfirst=True)
+    broadcastrecipientstatus.create(op.get_bind(), checkfirst=True)
+
+    op.create_table(
+        "broadcasts",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("name", sa.String(length=255), nullable=False),
+        sa.Column(
+            "templates",
+            sa.JSON(),
+            nullable=False,
+            comment="Message templates ({name}/{first_name} placeholders), one picked per recipient",
+        ),
+        sa.Column("audience", sa.JSON(), nullable=False, comment="Audience query (filters)"),
+        sa.Column("session_name", sa.String(length=100), nullable=False),
+        sa.Column("status", broadcaststatus, nullable=False),
+        sa.Column(
+            "conversation_status_after",
+            conversationstatus,
+            nullable=True,
+            comment="Conversation status set after a successful send",
+        ),
+        sa.Column("scheduled_at", sa.DateTime(), nullable=False),
+        sa.Column("started_at", sa.DateTime(), nullable=True),
+        sa.Column("completed_at", sa.DateTime(), nullable=True),
+        sa.Column("total_recipients", sa.Integer(), nullable=True, comment="Set once the audience is materialized"),
+        sa.Column("created_by_user_id", sa.Integer(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["created_by_user_id"], ["users.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_broadcasts_status"), "broadcasts", ["status"], unique=False)
+
+    op.create_table(
+        "broadcast_recipients",
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("broadcast_id", sa.String(length=36), nullable=False),
+        sa.Column("conversation_id", sa.String(length=36), nullable=True),
+        sa.Column("lead_id", sa.String(length=36), nullable=True),
+        sa.Column("chat_id", sa.String(length=100), nullable=False),
+        sa.Column("phone_number", sa.String(length=50), nullable=True),
+        sa.Column("name", sa.String(length=255), nullable=True),
+        sa.Column("text", sa.Text(), nullable=False, comment="Rendered message"),
+        sa.Column("status", broadcastrecipientstatus, nullable=False),
+        sa.Column("attempts", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("claimed_at", sa.DateTime(), nullable=True),
+        sa.Column("waha_message_id", sa.String(length=255), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["broadcast_id"], ["broadcasts.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["conversation_id"], ["conversations.id"], ondelete="SET NULL"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("broadcast_id", "chat_id", name="uq_broadcast_recipients_chat"),
+    )
+    op.create_index(
+        "ix_broadcast_recipients_status", "broadcast_recipients", ["broadcast_id", "status"], unique=False
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_broadcast_recipients_status", table_name="broadcast_recipients")
+    op.drop_table("broadcast_recipients")
+    op.drop_index(op.f("ix_broadcasts_status"), table_name="broadcasts")
+    op.drop_table("broadcasts")
+    broadcastrecipientstatus.drop(op.get_bind(), checkfirst=True)
+    broadcaststatus.drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,38 @@
+# pylint: disable=no-member,invalid-name,line-too-long
+"""Add send_epoch to broadcasts
+
+Revision ID: f3a9c1e7b5d2
+Revises: e6b2c9d1a7f4
+Create Date: 2026-10-16 21:00:00.000000
+
+"""
+
+from collections.abc import Sequence
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "f3a9c1e7b5d2"
+down_revision: str | Sequence[str] | None = "e6b2c9d1a7f4"
+branch_labels: str | Sequence[str] | None = None
+depends_on: str | Sequence[str] | None = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        "broadcasts",
+        sa.Column(
+            "send_epoch",
+            sa.Integer(),
+            server_default="0",
+            nullable=False,
+            comment="Bumped on resume; send jobs enqueued under an older epoch stop",
+        ),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("broadcasts", "send_epoch")
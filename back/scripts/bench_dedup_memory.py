@@ -0,0 +1,110 @@
+"""
+Benchmark de memória do índice de deduplicação de mensagens.
+
+Compara o `used_memory` do Redis para N IDs de mensagem (padrão 1M) em:
+- esquema antigo: uma chave string "waha:processed:{id}" com TTL de 24h por mensagem
+- esquema novo:   MessageDedupIndex (buckets horários de inteiros de 64 bits)
+
+Os IDs imitam o formato do WAHA (false_5511...@c.us_3EB0...) e, no esquema novo,
+são distribuídos uniformemente pelas últimas 24 horas (como em produção).
+
+Uso:
+    python scripts/bench_dedup_memory.py --redis-url redis://localhost:6379/15 --ids 1000000
+
+ATENÇÃO: `used_memory` é global do servidor, então use um Redis sem tráfego.
+O banco escolhido precisa estar vazio e é limpo (FLUSHDB) ao final.
+"""
+
+import argparse
+import sys
+import time
+import uuid
+
+from redis import Redis
+
+from robbot.config.settings import settings
+from robbot.infra.redis.dedup import MessageDedupIndex
+
+CHUNK = 10_000
+
+
+def message_ids(count: int):
+    for i in range(count):
+        yield f"false_55{11_900_000_000 + i % 50_000}@c.us_3EB0{uuid.uuid4().hex[:20].upper()}"
+
+
+def used_memory(redis_conn: Redis) -> int:
+    return int(redis_conn.info("memory")["used_memory"])
+
+
+def fill_legacy(redis_conn: Redis, count: int) -> None:
+    pipe = redis_conn.pipeline(transaction=False)
+    for i, message_id in enumerate(message_ids(count), 1):
+        pipe.set(f"{MessageDedupIndex.LEGACY_PREFIX}{message_id}", "1", ex=86400)
+        if i % CHUNK == 0:
+            pipe.execute()
+    pipe.execute()
+
+
+def fill_buckets(redis_conn: Redis, count: int) -> None:
+    index = MessageDedupIndex(redis_conn, legacy_fallback=False)
+    now = time.time()
+    batch: list[str] = []
+    for i, message_id in enumerate(message_ids(count)):
+        batch.append(message_id)
+        if len(batch) == 100:
+            # Espalhar os lotes pela janela de 24h
+            index.claim(batch, now=now - (i * index.window_hours * 3600) / count)
+            batch = []
+    if batch:
+        index.claim(batch, now=now)
+
+
+def measure(redis_conn: Redis, name: str, fill, count: int) -> dict:
+    redis_conn.flushdb()
+    baseline = used_memory(redis_conn)
+    started = time.perf_counter()
+    fill(redis_conn, count)
+    elapsed = time.perf_counter() - started
+    used = used_memory(redis_conn) - baseline
+    result = {
+        "scheme": name,
+        "keys": redis_conn.dbsize(),
+        "bytes": used,
+        "bytes_per_id": used / count,
+        "seconds": elapsed,
+    }
+    redis_conn.flushdb()
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de memória: dedup por chave vs buckets horários")
+    parser.add_argument("--redis-url", default=settings.REDIS_URL)
+    parser.add_argument("--ids", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    redis_conn = Redis.from_url(args.redis_url)
+    if redis_conn.dbsize():
+        print(f"❌ O banco de {args.redis_url} não está vazio; use um banco dedicado (ex.: /15)")
+        sys.exit(1)
+
+    results = [
+        measure(redis_conn, "por chave", fill_legacy, args.ids),
+        measure(redis_conn, "buckets", fill_buckets, args.ids),
+    ]
+
+    print("=" * 72)
+    print(f"BENCHMARK MEMÓRIA DEDUP - {args.ids} IDs")
+    print("=" * 72)
+    print(f"{'esquema':12} {'chaves':>10} {'used_memory':>14} {'bytes/ID':>10} {'tempo (s)':>10}")
+    for r in results:
+        print(
+            f"{r['scheme']:12} {r['keys']:>10} {r['bytes'] / 1024 / 1024:>11.1f} MB "
+            f"{r['bytes_per_id']:>10.1f} {r['seconds']:>10.1f}"
+        )
+    print(f"\nRedução: {results[0]['bytes'] / max(results[1]['bytes'], 1):.1f}x")
+
+
+if __name__ == "__main__":
+    main()
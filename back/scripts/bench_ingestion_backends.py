@@ -0,0 +1,181 @@
+"""
+Benchmark de throughput: fila RQ "messages" vs Redis Streams particionado.
+
+Enfileira N mensagens distribuídas entre C chats e processa com W processos
+worker usando um handler sintético (--work-ms simula o custo do job). Para
+cada backend mede:
+- taxa de enfileiramento (msgs/s)
+- throughput fim-a-fim (msgs/s até a fila esvaziar)
+- violações de ordem por chat (mensagem iniciada antes da anterior do mesmo chat)
+- sobreposições (duas mensagens do mesmo chat em processamento ao mesmo tempo)
+
+Uso:
+    python scripts/bench_ingestion_backends.py --messages 5000 --chats 200 --workers 4 --work-ms 5
+
+Requer Redis acessível (REDIS_URL ou --redis-url). Usa apenas chaves "bench:*"
+e a fila RQ "bench-messages", removidas ao final.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+from redis import Redis
+from rq import Queue, SimpleWorker
+
+from robbot.config.settings import settings
+from robbot.infra.redis.streams import PartitionConsumer, PartitionedStreamQueue
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+MODULE_NAME = os.path.splitext(os.path.basename(__file__))[0]
+
+RQ_QUEUE = "bench-messages"
+STREAM_PREFIX = "bench:ingest"
+LOG_KEY = "bench:ingest:log"
+BUSY_PREFIX = "bench:ingest:busy:"
+OVERLAP_KEY = "bench:ingest:overlaps"
+
+
+def bench_handler(chat: str, seq: int, work_ms: float, redis_url: str) -> None:
+    """Handler sintético: registra início, detecta sobreposição e simula trabalho."""
+    redis_conn = Redis.from_url(redis_url)
+    redis_conn.rpush(LOG_KEY, f"{chat}|{seq}")
+    if not redis_conn.set(f"{BUSY_PREFIX}{chat}", "1", nx=True, ex=60):
+        redis_conn.incr(OVERLAP_KEY)
+    time.sleep(work_ms / 1000)
+    redis_conn.delete(f"{BUSY_PREFIX}{chat}")
+
+
+def cleanup(redis_conn: Redis) -> None:
+    for key in redis_conn.scan_iter("bench:*"):
+        redis_conn.delete(key)
+    Queue(RQ_QUEUE, connection=redis_conn).empty()
+
+
+def order_violations(redis_conn: Redis) -> int:
+    last_seq: dict[str, int] = {}
+    violations = 0
+    for raw in redis_conn.lrange(LOG_KEY, 0, -1):
+        chat, seq = raw.decode().split("|")
+        if int(seq) < last_seq.get(chat, -1):
+            violations += 1
+        last_seq[chat] = max(int(seq), last_seq.get(chat, -1))
+    return violations
+
+
+def run_rq_worker(redis_url: str) -> None:
+    SimpleWorker([Queue(RQ_QUEUE, connection=Redis.from_url(redis_url))], connection=Redis.from_url(redis_url)).work(
+        burst=True, logging_level="WARNING"
+    )
+
+
+def run_stream_worker(redis_url: str, index: int, partitions: int, total: int, work_ms: float) -> None:
+    redis_conn = Redis.from_url(redis_url)
+    queue = PartitionedStreamQueue(redis_client=redis_conn, partitions=partitions, prefix=STREAM_PREFIX)
+
+    def handler(payload: dict) -> None:
+        bench_handler(payload["chat"], payload["seq"], work_ms, redis_url)
+
+    consumer = PartitionConsumer(queue, f"bench-{index}-{os.getpid()}", handler, lease_seconds=5, reclaim_idle_ms=0)
+    # Dar tempo para todos os workers se registrarem antes de dividir as partições
+    consumer.heartbeat()
+    time.sleep(0.5)
+    while redis_conn.llen(LOG_KEY) < total:
+        consumer.process_once(block_ms=100)
+    consumer.release_all()
+
+
+def bench_rq(redis_url: str, messages: int, chats: int, workers: int, work_ms: float) -> dict:
+    redis_conn = Redis.from_url(redis_url)
+    queue = Queue(RQ_QUEUE, connection=redis_conn)
+
+    started = time.perf_counter()
+    for seq in range(messages // chats):
+        for chat in range(chats):
+            # Workers RQ não executam funções de __main__: referenciar pelo nome do módulo
+            queue.enqueue(f"{MODULE_NAME}.bench_handler", f"chat-{chat}", seq, work_ms, redis_url)
+    enqueue_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    procs = [multiprocessing.Process(target=run_rq_worker, args=(redis_url,)) for _ in range(workers)]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    return _result("rq", redis_conn, messages, enqueue_elapsed, time.perf_counter() - started)
+
+
+def bench_streams(redis_url: str, messages: int, chats: int, workers: int, work_ms: float, partitions: int) -> dict:
+    redis_conn = Redis.from_url(redis_url)
+    queue = PartitionedStreamQueue(redis_client=redis_conn, partitions=partitions, prefix=STREAM_PREFIX)
+    queue.ensure_groups()
+
+    started = time.perf_counter()
+    for seq in range(messages // chats):
+        for chat in range(chats):
+            queue.enqueue(f"chat-{chat}", {"chat": f"chat-{chat}", "seq": seq})
+    enqueue_elapsed = time.perf_counter() - started
+
+    total = (messages // chats) * chats
+    started = time.perf_counter()
+    procs = [
+        multiprocessing.Process(target=run_stream_worker, args=(redis_url, i, partitions, total, work_ms))
+        for i in range(workers)
+    ]
+    for proc in procs:
+        proc.start()
+    for proc in procs:
+        proc.join()
+    return _result("streams", redis_conn, messages, enqueue_elapsed, time.perf_counter() - started)
+
+
+def _result(name: str, redis_conn: Redis, messages: int, enqueue_elapsed: float, process_elapsed: float) -> dict:
+    processed = redis_conn.llen(LOG_KEY)
+    return {
+        "backend": name,
+        "processed": processed,
+        "enqueue_rate": round(messages / enqueue_elapsed, 1),
+        "throughput": round(processed / process_elapsed, 1),
+        "order_violations": order_violations(redis_conn),
+        "overlaps": int(redis_conn.get(OVERLAP_KEY) or 0),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark RQ vs Redis Streams")
+    parser.add_argument("--redis-url", default=settings.REDIS_URL)
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--chats", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--work-ms", type=float, default=5.0, help="Custo simulado por mensagem")
+    args = parser.parse_args()
+
+    redis_conn = Redis.from_url(args.redis_url)
+    results = []
+    for runner in ("rq", "streams"):
+        cleanup(redis_conn)
+        if runner == "rq":
+            results.append(bench_rq(args.redis_url, args.messages, args.chats, args.workers, args.work_ms))
+        else:
+            results.append(
+                bench_streams(args.redis_url, args.messages, args.chats, args.workers, args.work_ms, args.partitions)
+            )
+    cleanup(redis_conn)
+
+    print("=" * 78)
+    print(f"BENCHMARK INGESTÃO - {args.messages} msgs, {args.chats} chats, {args.workers} workers, {args.work_ms}ms/msg")
+    print("=" * 78)
+    print(f"{'backend':10} {'processadas':>12} {'enqueue/s':>12} {'msgs/s':>10} {'fora de ordem':>14} {'sobrepostas':>12}")
+    for r in results:
+        print(
+            f"{r['backend']:10} {r['processed']:>12} {r['enqueue_rate']:>12} {r['throughput']:>10} "
+            f"{r['order_violations']:>14} {r['overlaps']:>12}"
+        )
+
+
+if __name__ == "__main__":
+    multiprocessing.set_start_method("fork")
+    main()
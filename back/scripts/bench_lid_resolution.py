@@ -0,0 +1,154 @@
+"""
+Benchmark de consultas ao WAHA na resolução de LIDs durante uma rajada.
+
+Simula N contatos novos mandando M mensagens cada (em ondas), processadas em
+paralelo por P processos que compartilham o Redis, e conta as chamadas a
+GET /lids/{lid} num WAHA falso (latência configurável; uma fração dos LIDs não
+tem telefone). Compara:
+- legado: GET no cache Redis e, em caso de miss, uma consulta ao WAHA por
+  mensagem (falhas não são lembradas)
+- camadas: LidResolutionCache (LRU em processo, falhas lembradas, coalescência
+  em processo e entre processos)
+
+Uso:
+    python scripts/bench_lid_resolution.py --redis-url redis://localhost:6379/15 --contacts 200 --messages 8
+
+O prefixo de chaves do benchmark é apagado antes e depois de cada modo.
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from redis import Redis
+
+from robbot.services.leads.lid_resolution_cache import LidResolutionCache, LocalTier
+
+PREFIX = "bench:lid_resolution:"
+
+
+class FakeWaha:
+    """WAHA falso: conta as consultas e responde após ``latency`` segundos."""
+
+    def __init__(self, phones: dict[str, str | None], latency: float):
+        self.phones = phones
+        self.latency = latency
+        self.calls: dict[str, int] = {}
+
+    async def get_phone(self, lid: str) -> str | None:
+        self.calls[lid] = self.calls.get(lid, 0) + 1
+        await asyncio.sleep(self.latency)
+        return self.phones[lid]
+
+
+def build_contacts(count: int, unresolvable: float) -> dict[str, str | None]:
+    rng = random.Random(42)
+    return {
+        f"{10**14 + i}@lid": None if rng.random() < unresolvable else f"55119{i:08d}" for i in range(count)
+    }
+
+
+def build_waves(lids: list[str], messages: int, waves: int) -> list[list[str]]:
+    """Distribui as mensagens de cada contato em ``waves`` ondas, embaralhadas."""
+    rng = random.Random(7)
+    per_wave = [[] for _ in range(waves)]
+    for lid in lids:
+        for i in range(messages):
+            per_wave[i * waves // messages].append(lid)
+    for wave in per_wave:
+        rng.shuffle(wave)
+    return per_wave
+
+
+def clear(redis_conn: Redis) -> None:
+    keys = list(redis_conn.scan_iter(f"{PREFIX}*", count=1000))
+    if keys:
+        redis_conn.delete(*keys)
+
+
+async def run_legacy(redis_conn: Redis, waha: FakeWaha, waves: list[list[str]], gap: float) -> None:
+    async def resolve(lid: str) -> None:
+        if redis_conn.get(f"{PREFIX}{lid}"):
+            return
+        phone = await waha.get_phone(lid)
+        if phone:
+            redis_conn.setex(f"{PREFIX}{lid}", 86400, phone)
+
+    for wave in waves:
+        await asyncio.gather(*(resolve(lid) for lid in wave))
+        await asyncio.sleep(gap)
+
+
+async def run_tiered(
+    redis_conn: Redis, waha: FakeWaha, waves: list[list[str]], gap: float, processes: int
+) -> None:
+    caches = [LidResolutionCache(redis_conn, local=LocalTier(), prefix=PREFIX) for _ in range(processes)]
+
+    async def resolve(index: int, lid: str) -> None:
+        cache = caches[index % processes]
+        if cache.get(lid) is None:
+            await cache.resolve(lid, lambda: waha.get_phone(lid))
+
+    for wave in waves:
+        await asyncio.gather(*(resolve(i, lid) for i, lid in enumerate(wave)))
+        await asyncio.sleep(gap)
+
+
+def summarize(name: str, waha: FakeWaha, contacts: int, messages: int, elapsed: float) -> dict:
+    total = sum(waha.calls.values())
+    return {
+        "mode": name,
+        "waha_calls": total,
+        "calls_per_contact": round(total / contacts, 2),
+        "max_calls_one_contact": max(waha.calls.values(), default=0),
+        "messages": contacts * messages,
+        "elapsed_s": round(elapsed, 3),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de consultas ao WAHA na resolução de LIDs")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/15", help="Redis de teste")
+    parser.add_argument("--contacts", type=int, default=200, help="Contatos novos na rajada")
+    parser.add_argument("--messages", type=int, default=8, help="Mensagens por contato")
+    parser.add_argument("--waves", type=int, default=4, help="Ondas em que as mensagens chegam")
+    parser.add_argument("--gap", type=float, default=0.2, help="Segundos entre ondas")
+    parser.add_argument("--processes", type=int, default=4, help="Processos simulados (LRUs distintos)")
+    parser.add_argument("--latency", type=float, default=0.15, help="Latência do WAHA falso (s)")
+    parser.add_argument("--unresolvable", type=float, default=0.3, help="Fração de LIDs sem telefone")
+    args = parser.parse_args()
+
+    redis_conn = Redis.from_url(args.redis_url)
+    phones = build_contacts(args.contacts, args.unresolvable)
+    waves = build_waves(list(phones), args.messages, min(args.waves, args.messages))
+
+    results = []
+    for name in ("legado", "camadas"):
+        clear(redis_conn)
+        waha = FakeWaha(phones, args.latency)
+        started = time.perf_counter()
+        if name == "legado":
+            asyncio.run(run_legacy(redis_conn, waha, waves, args.gap))
+        else:
+            asyncio.run(run_tiered(redis_conn, waha, waves, args.gap, args.processes))
+        results.append(summarize(name, waha, args.contacts, args.messages, time.perf_counter() - started))
+        clear(redis_conn)
+
+    print("=" * 60)
+    print("BENCHMARK - CONSULTAS AO WAHA POR CONTATO (RAJADA)")
+    print("=" * 60)
+    print(
+        f"  {args.contacts} contatos x {args.messages} mensagens em {args.waves} ondas, "
+        f"{args.processes} processos, {args.unresolvable:.0%} sem telefone"
+    )
+    for result in results:
+        print(
+            f"  {result['mode']:8}: {result['waha_calls']:6} chamadas "
+            f"({result['calls_per_contact']}/contato, máx {result['max_calls_one_contact']}) "
+            f"em {result['elapsed_s']}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+Benchmark de ingestão do webhook WAHA (latência p50/p99 e RPS).
+
+Dispara N POSTs concorrentes contra /api/v1/webhooks/waha e mede a latência
+de cada requisição. Para comparar antes/depois, rode contra cada versão da API
+salvando o resultado com --output e passe o arquivo anterior em --compare.
+
+Uso:
+    python scripts/bench_webhook_ingestion.py --url http://localhost:3333 \\
+        --requests 5000 --concurrency 500 --output after.json --compare before.json
+
+ATENÇÃO: o evento padrão é "message.ack" (persistido, mas não enfileirado).
+Com --event message as mensagens entram na fila e os workers vão responder;
+use somente com WAHA_MOCK_REQUESTS=true ou contra o simulador de WAHA.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import statistics
+import time
+import uuid
+
+import httpx
+
+WEBHOOK_PATH = "/api/v1/webhooks/waha"
+
+
+def build_payload(event: str, session: str, index: int) -> dict:
+    """Monta um evento sintético no formato do envelope WAHA."""
+    chat_id = f"5500000{index % 1000:04d}@c.us"
+    message_id = f"bench_{uuid.uuid4().hex}"
+    if event == "message.ack":
+        body = {"id": message_id, "from": chat_id, "ack": 3, "ackName": "READ"}
+    else:
+        body = {
+            "id": message_id,
+            "from": chat_id,
+            "fromMe": False,
+            "body": f"mensagem de benchmark {index}",
+            "timestamp": int(time.time()),
+            "hasMedia": False,
+        }
+    return {"id": message_id, "timestamp": int(time.time() * 1000), "session": session, "event": event, "payload": body}
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Percentil por nearest-rank (amostras já ordenadas)."""
+    if not samples:
+        return 0.0
+    rank = min(len(samples), max(1, math.ceil(pct / 100 * len(samples)))) - 1
+    return samples[rank]
+
+
+async def run_benchmark(url: str, total: int, concurrency: int, event: str, session: str) -> dict:
+    """Executa o benchmark e devolve as estatísticas agregadas."""
+    latencies: list[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=60) as client:
+
+        async def post_one(index: int) -> None:
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(WEBHOOK_PATH, json=build_payload(event, session, index))
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(post_one(i) for i in range(total)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "concurrency": concurrency,
+        "event": event,
+        "errors": errors,
+        "elapsed_s": round(elapsed, 3),
+        "rps": round(total / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p90_ms": round(percentile(latencies, 90), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+        "mean_ms": round(statistics.fmean(latencies), 1) if latencies else 0.0,
+    }
+
+
+def print_results(result: dict, baseline: dict | None) -> None:
+    """Mostra os resultados (e o delta contra o baseline, se houver)."""
+    print("=" * 60)
+    print("BENCHMARK - INGESTÃO DE WEBHOOK WAHA")
+    print("=" * 60)
+    print(f"  Requisições : {result['requests']} ({result['concurrency']} concorrentes, evento {result['event']})")
+    print(f"  Erros       : {result['errors']}")
+    print(f"  Duração     : {result['elapsed_s']}s")
+    for key in ("rps", "p50_ms", "p90_ms", "p99_ms", "max_ms"):
+        line = f"  {key:12}: {result[key]}"
+        if baseline and baseline.get(key):
+            change = (result[key] - baseline[key]) / baseline[key] * 100
+            line += f"   (antes: {baseline[key]}, {change:+.1f}%)"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark do webhook WAHA")
+    parser.add_argument("--url", default="http://localhost:3333", help="URL base da API")
+    parser.add_argument("--requests", type=int, default=5000, help="Total de POSTs")
+    parser.add_argument("--concurrency", type=int, default=500, help="POSTs simultâneos")
+    parser.add_argument("--event", default="message.ack", choices=["message.ack", "message"], help="Tipo de evento")
+    parser.add_argument("--session", default="bench", help="Nome da sessão WAHA nos eventos")
+    parser.add_argument("--output", help="Salvar resultado em JSON")
+    parser.add_argument("--compare", help="JSON de uma execução anterior (baseline)")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_benchmark(args.url, args.requests, args.concurrency, args.event, args.session))
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print_results(result, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
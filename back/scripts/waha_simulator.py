@@ -0,0 +1,630 @@
+"""
+Simulador local do WAHA para testes de carga e soak (100% offline).
+
+Sobe um servidor HTTP que responde aos endpoints do WAHA usados pelo robbot
+(sendText e demais envios, typing/seen/presence, status de sessão,
+chats/overview, mensagens por chat, LIDs, check-exists, conversão de voz) e,
+ao mesmo tempo, dispara webhooks ``message`` sintéticos contra a API numa taxa
+configurável. As mensagens geradas ficam no histórico dos chats, então o
+polling enxerga o mesmo tráfego que o webhook.
+
+Cada endpoint pertence a uma classe (send, presence, read, control) com
+latência, jitter, taxa de erro e taxa de timeout configuráveis, para ver como
+retries, circuit breaker, send governor e filas se comportam sob falha.
+
+Métricas (GET /_sim/stats e resumo ao sair):
+- requisições por classe, erros e timeouts injetados, endpoints não simulados
+- webhooks postados: status HTTP e latência da API (p50/p90/p99)
+- respostas do bot: latência ponta a ponta, do webhook até o sendText do chat
+
+Uso:
+    python scripts/waha_simulator.py --port 3000 \\
+        --webhook-url http://localhost:3333/api/v1/webhooks/waha \\
+        --rate 20 --duration 600 --chats 500 --latency-ms 80 --jitter-ms 40 \\
+        --error-rate 0.01 --route send=300:100:0.02 --output soak.json
+
+Na API e nos workers: WAHA_URL=http://localhost:3000 e WAHA_MOCK_REQUESTS=false.
+Com --rate 0 o simulador só responde (útil para os benchmarks de envio).
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import statistics
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import httpx
+
+ROUTE_CLASSES = ("send", "presence", "read", "control")
+SAMPLE_SIZE = 100_000  # amostras de latência guardadas (janela deslizante)
+
+INBOUND_TEXTS = (
+    "Oi, bom dia!",
+    "Olá, tudo bem?",
+    "Quanto custa a consulta?",
+    "Vocês atendem por convênio?",
+    "Qual o horário de funcionamento?",
+    "Queria agendar um horário para a próxima semana",
+    "Onde fica a clínica?",
+    "Obrigado!",
+    "Pode me mandar mais informações?",
+    "Tem horário disponível amanhã à tarde?",
+)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    """Percentil por nearest-rank (amostras já ordenadas)."""
+    if not samples:
+        return 0.0
+    rank = min(len(samples), max(1, math.ceil(pct / 100 * len(samples)))) - 1
+    return samples[rank]
+
+
+def summarize(samples) -> dict:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(percentile(ordered, 50), 1),
+        "p90_ms": round(percentile(ordered, 90), 1),
+        "p99_ms": round(percentile(ordered, 99), 1),
+        "max_ms": round(ordered[-1], 1) if ordered else 0.0,
+        "mean_ms": round(statistics.fmean(ordered), 1) if ordered else 0.0,
+    }
+
+
+def classify(method: str, path: str) -> str:
+    """Classe do endpoint (mesma divisão de timeouts do transporte WAHA)."""
+    if path in ("/api/startTyping", "/api/stopTyping", "/api/sendSeen") or "/presence" in path:
+        return "presence"
+    if method != "GET" and (path.startswith("/api/send") or path in ("/api/forwardMessage", "/api/reaction")):
+        return "send"
+    if path.startswith(("/api/sessions", "/api/server")):
+        return "control"
+    return "read"
+
+
+@dataclass
+class Fault:
+    """Latência e falhas injetadas numa classe de endpoints."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    error_rate: float = 0.0
+    error_status: int = 500
+    timeout_rate: float = 0.0
+    timeout_seconds: float = 30.0
+
+    def delay(self, rng: random.Random) -> float:
+        return max(0.0, rng.gauss(self.latency_ms, self.jitter_ms)) / 1000 if self.jitter_ms else self.latency_ms / 1000
+
+    @classmethod
+    def override(cls, base: "Fault", spec: str) -> "Fault":
+        """``latencia[:jitter[:erro[:timeout]]]``, ex.: ``300:100:0.02``."""
+        values = [float(value) for value in spec.split(":")]
+        fields = ("latency_ms", "jitter_ms", "error_rate", "timeout_rate")
+        return cls(**{**base.__dict__, **dict(zip(fields, values, strict=False))})
+
+
+@dataclass
+class Contact:
+    """Contato sintético; metade (``--lid-ratio``) aparece como @lid, como no WhatsApp atual."""
+
+    index: int
+    phone: str
+    lid: str
+    name: str
+    uses_lid: bool
+
+    @property
+    def chat_id(self) -> str:
+        return self.lid if self.uses_lid else f"{self.phone}@c.us"
+
+
+class SimulatorState:
+    """Chats, mensagens e métricas do simulador (compartilhado entre threads)."""
+
+    def __init__(self, chats: int, lid_ratio: float, history: int, session: str, rng: random.Random):
+        self.session = session
+        self.me = "5500000000000@c.us"
+        self.rng = rng
+        self.lock = threading.Lock()
+        self.started = time.monotonic()
+        self.contacts = [
+            Contact(
+                index=i,
+                phone=f"55119{i:08d}",
+                lid=f"{10**14 + i}@lid",
+                name=f"Paciente {i}",
+                uses_lid=rng.random() < lid_ratio,
+            )
+            for i in range(chats)
+        ]
+        self.by_id = {}
+        for contact in self.contacts:
+            self.by_id[f"{contact.phone}@c.us"] = contact
+            self.by_id[contact.lid] = contact
+        self.messages: dict[int, deque] = {contact.index: deque(maxlen=history) for contact in self.contacts}
+        self.last_activity: dict[int, int] = {}
+
+        self.requests: Counter = Counter()
+        self.injected_errors: Counter = Counter()
+        self.injected_timeouts: Counter = Counter()
+        self.unhandled: Counter = Counter()
+        self.sends: Counter = Counter()
+        self.webhook_status: Counter = Counter()
+        self.webhook_latency: deque = deque(maxlen=SAMPLE_SIZE)
+        self.reply_latency: deque = deque(maxlen=SAMPLE_SIZE)
+        # Primeira mensagem ainda sem resposta por contato (monotonic)
+        self.awaiting_reply: dict[int, float] = {}
+        self.on_outbound = None  # callback(message) para os webhooks message.ack
+
+    def contact(self, chat_id: str | None) -> Contact | None:
+        return self.by_id.get(chat_id or "")
+
+    def add_inbound(self, contact: Contact, body: str) -> dict:
+        now = time.time()
+        message = {
+            "id": f"false_{contact.chat_id}_{uuid.uuid4().hex[:20].upper()}",
+            "timestamp": int(now),
+            "from": contact.chat_id,
+            "fromMe": False,
+            "to": self.me,
+            "body": body,
+            "hasMedia": False,
+            "ack": 1,
+            "ackName": "SERVER",
+            "_data": {"notifyName": contact.name},
+        }
+        with self.lock:
+            self.messages[contact.index].append(message)
+            self.last_activity[contact.index] = int(now)
+            self.awaiting_reply.setdefault(contact.index, time.monotonic())
+        return message
+
+    def add_outbound(self, kind: str, chat_id: str, body: str) -> dict:
+        now = time.time()
+        message = {
+            "id": f"true_{chat_id}_{uuid.uuid4().hex[:20].upper()}",
+            "timestamp": int(now),
+            "from": self.me,
+            "fromMe": True,
+            "to": chat_id,
+            "body": body,
+            "hasMedia": kind != "text",
+            "ack": 1,
+            "ackName": "SERVER",
+            "_data": {},
+        }
+        contact = self.contact(chat_id)
+        with self.lock:
+            self.sends[kind] += 1
+            if contact is not None:
+                self.messages[contact.index].append(message)
+                self.last_activity[contact.index] = int(now)
+                asked_at = self.awaiting_reply.pop(contact.index, None)
+                if asked_at is not None:
+                    self.reply_latency.append((time.monotonic() - asked_at) * 1000)
+        if self.on_outbound is not None:
+            self.on_outbound(message)
+        return message
+
+    def overview(self, limit: int, offset: int) -> list[dict]:
+        with self.lock:
+            active = sorted(self.last_activity.items(), key=lambda item: item[1], reverse=True)
+            page = active[offset : offset + limit]
+            return [
+                {
+                    "id": self.contacts[index].chat_id,
+                    "name": self.contacts[index].name,
+                    "picture": None,
+                    "lastMessage": self.messages[index][-1] if self.messages[index] else None,
+                    "_chat": {"unreadCount": 0},
+                }
+                for index, _timestamp in page
+            ]
+
+    def chat_messages(self, chat_id: str, limit: int) -> list[dict] | None:
+        contact = self.contact(chat_id)
+        if contact is None:
+            return None
+        with self.lock:
+            return list(self.messages[contact.index])[-limit:][::-1]
+
+    def lid_entry(self, contact: Contact) -> dict:
+        return {"lid": contact.lid, "pn": f"{contact.phone}@c.us"}
+
+    def stats(self) -> dict:
+        with self.lock:
+            uptime = time.monotonic() - self.started
+            sent = sum(self.sends.values())
+            return {
+                "uptime_s": round(uptime, 1),
+                "requests": {
+                    route: {
+                        "count": self.requests[route],
+                        "injected_errors": self.injected_errors[route],
+                        "injected_timeouts": self.injected_timeouts[route],
+                    }
+                    for route in ROUTE_CLASSES
+                },
+                "unhandled": dict(self.unhandled.most_common(20)),
+                "sent": {"total": sent, "per_second": round(sent / uptime, 2) if uptime else 0.0, **self.sends},
+                "webhooks": {"status": dict(self.webhook_status), **summarize(self.webhook_latency)},
+                "replies": {"awaiting": len(self.awaiting_reply), **summarize(self.reply_latency)},
+            }
+
+
+class WahaHandler(BaseHTTPRequestHandler):
+    """Endpoints do WAHA usados pelo robbot, com latência e falhas injetadas."""
+
+    protocol_version = "HTTP/1.1"
+    server: "WahaSimulatorServer"
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def log_message(self, *_args):
+        pass
+
+    def _handle(self, method: str) -> None:
+        parts = urlsplit(self.path)
+        path = unquote(parts.path)
+        query = {key: values[-1] for key, values in parse_qs(parts.query).items()}
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}") if length else {}
+        except ValueError:
+            body = {}
+
+        if path == "/_sim/stats":
+            self._respond(200, self.server.state.stats())
+            return
+
+        state = self.server.state
+        route = classify(method, path)
+        fault = self.server.faults[route]
+        with state.lock:
+            state.requests[route] += 1
+
+        if self.server.api_key and self.headers.get("X-Api-Key") != self.server.api_key:
+            self._respond(401, {"error": "Unauthorized"})
+            return
+
+        rng = self.server.rng
+        time.sleep(fault.delay(rng))
+        if rng.random() < fault.timeout_rate:
+            with state.lock:
+                state.injected_timeouts[route] += 1
+            # Segura a conexão e fecha sem responder (o cliente vê timeout)
+            time.sleep(fault.timeout_seconds)
+            self.close_connection = True
+            return
+        if rng.random() < fault.error_rate:
+            with state.lock:
+                state.injected_errors[route] += 1
+            self._respond(fault.error_status, {"error": "injected by waha_simulator"})
+            return
+
+        status, payload = dispatch(state, method, path, query, body)
+        if status == 404 and payload.get("error") == "not simulated":
+            with state.lock:
+                state.unhandled[f"{method} {path}"] += 1
+        self._respond(status, payload)
+
+    def _respond(self, status: int, payload) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class WahaSimulatorServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, state: SimulatorState, faults: dict[str, Fault], api_key: str | None):
+        super().__init__(address, WahaHandler)
+        self.state = state
+        self.faults = faults
+        self.api_key = api_key
+        self.rng = random.Random(state.rng.random())
+
+
+_ACK_ONLY = {"/api/startTyping", "/api/stopTyping", "/api/sendSeen", "/api/forwardMessage", "/api/reaction", "/api/star"}
+
+_SEND_KINDS = {
+    "/api/sendText": "text",
+    "/api/sendImage": "image",
+    "/api/sendFile": "file",
+    "/api/sendVoice": "voice",
+    "/api/sendVideo": "video",
+    "/api/sendLocation": "location",
+    "/api/sendPoll": "poll",
+    "/api/sendButtons": "buttons",
+    "/api/sendList": "list",
+    "/api/sendContactVcard": "vcard",
+    "/api/send/link-custom-preview": "link",
+}
+
+
+def dispatch(state: SimulatorState, method: str, path: str, query: dict, body: dict) -> tuple[int, object]:
+    """Resposta simulada de um endpoint WAHA: (status, corpo JSON)."""
+    session_info = {"name": state.session, "status": "WORKING", "me": {"id": state.me, "pushName": "Simulador"}}
+
+    # Sessões e servidor
+    if path == "/api/sessions":
+        if method == "GET":
+            return 200, [session_info]
+        return 201, {**session_info, "name": body.get("name", state.session)}
+    if match := re.fullmatch(r"/api/sessions/([^/]+)(?:/(start|stop|restart|logout))?", path):
+        name, action = match.groups()
+        status = "STOPPED" if action in ("stop", "logout") else "WORKING"
+        return 200, {**session_info, "name": name, "status": status}
+    if path.startswith("/api/server/"):
+        return 200, {"status": "ok", "version": "simulator", "engine": "SIMULATOR"}
+
+    # Envios
+    if method == "POST" and path in _SEND_KINDS:
+        chat_id = body.get("chatId")
+        if not chat_id:
+            return 422, {"error": "chatId is required"}
+        text = body.get("text") or body.get("caption") or f"[{_SEND_KINDS[path]}]"
+        message = state.add_outbound(_SEND_KINDS[path], chat_id, text)
+        return 201, {"id": message["id"], "timestamp": message["timestamp"], "_data": {"id": {"_serialized": message["id"]}}}
+    if path in _ACK_ONLY:
+        return 201, {"success": True}
+
+    # Contatos e LIDs
+    if path == "/api/contacts/check-exists":
+        phone = re.sub(r"\D", "", query.get("phone", ""))
+        return 200, {"numberExists": bool(phone), "chatId": f"{phone}@c.us" if phone else None}
+    if match := re.fullmatch(r"/api/[^/]+/lids", path):
+        limit, offset = int(query.get("limit", 100)), int(query.get("offset", 0))
+        return 200, [state.lid_entry(contact) for contact in state.contacts[offset : offset + limit]]
+    if re.fullmatch(r"/api/[^/]+/lids/count", path):
+        return 200, {"count": len(state.contacts)}
+    if match := re.fullmatch(r"/api/[^/]+/lids/pn/([^/]+)", path):
+        contact = state.contact(f"{re.sub(r'[^0-9]', '', match.group(1))}@c.us")
+        return (200, state.lid_entry(contact)) if contact else (404, {"error": "lid not found"})
+    if match := re.fullmatch(r"/api/[^/]+/lids/([^/]+)", path):
+        contact = state.contact(match.group(1))
+        return (200, state.lid_entry(contact)) if contact else (404, {"error": "pn not found"})
+    if re.fullmatch(r"/api/[^/]+/contacts", path):
+        return 200, [{"id": f"{contact.phone}@c.us", "name": contact.name} for contact in state.contacts]
+
+    # Presença
+    if match := re.fullmatch(r"/api/[^/]+/presence(?:/([^/]+))?(/subscribe)?", path):
+        chat_id, subscribe = match.groups()
+        if method == "POST" or subscribe:
+            return 201, {"success": True}
+        presence = {"id": chat_id, "presences": [{"participant": chat_id, "lastKnownPresence": "offline"}]}
+        return 200, presence if chat_id else []
+
+    # Chats e mensagens
+    if re.fullmatch(r"/api/[^/]+/chats(?:/overview)?", path):
+        limit, offset = int(query.get("limit", 20)), int(query.get("offset", 0))
+        return 200, state.overview(limit, offset)
+    if match := re.fullmatch(r"/api/[^/]+/chats/([^/]+)/messages", path):
+        messages = state.chat_messages(match.group(1), int(query.get("limit", 10)))
+        return (200, messages) if messages is not None else (404, {"error": "chat not found"})
+
+    # Mídia: devolve o próprio arquivo como se tivesse sido convertido
+    if re.fullmatch(r"/api/[^/]+/media/convert/(voice|video)", path):
+        return 201, {"mimetype": "audio/ogg; codecs=opus", "data": body.get("data") or "", "url": body.get("url")}
+
+    return 404, {"error": "not simulated"}
+
+
+def envelope(state: SimulatorState, event: str, payload: dict) -> dict:
+    """Evento no formato do envelope de webhook do WAHA."""
+    return {
+        "id": f"evt_{uuid.uuid4().hex}",
+        "timestamp": int(time.time() * 1000),
+        "session": state.session,
+        "event": event,
+        "me": {"id": state.me, "pushName": "Simulador"},
+        "engine": "SIMULATOR",
+        "payload": payload,
+    }
+
+
+async def run_webhooks(
+    state: SimulatorState, args: argparse.Namespace, stop: threading.Event, generated: threading.Event
+) -> None:
+    """Posta webhooks ``message`` na taxa pedida (e ``message.ack`` dos envios, se ligado)."""
+    loop = asyncio.get_running_loop()
+    rng = random.Random(state.rng.random())
+    semaphore = asyncio.Semaphore(args.webhook_concurrency)
+    limits = httpx.Limits(max_connections=args.webhook_concurrency, max_keepalive_connections=args.webhook_concurrency)
+    tasks: set[asyncio.Task] = set()
+
+    async with httpx.AsyncClient(limits=limits, timeout=args.webhook_timeout) as client:
+
+        async def post(event: dict, delay: float = 0.0) -> None:
+            if delay:
+                await asyncio.sleep(delay)
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(args.webhook_url, json=event)
+                    status = str(response.status_code)
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                with state.lock:
+                    state.webhook_status[status] += 1
+                    state.webhook_latency.append((time.perf_counter() - started) * 1000)
+
+        def spawn(coro) -> None:
+            task = loop.create_task(coro)
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+
+        if args.ack_delay_ms:
+
+            def on_outbound(message: dict) -> None:
+                ack = {"id": message["id"], "from": message["to"], "fromMe": True, "ack": 3, "ackName": "READ"}
+                loop.call_soon_threadsafe(spawn, post(envelope(state, "message.ack", ack), args.ack_delay_ms / 1000))
+
+            state.on_outbound = on_outbound
+
+        posted = 0
+        next_at = loop.time()
+        while args.rate > 0 and not stop.is_set():
+            if args.total and posted >= args.total:
+                break
+            if args.duration and time.monotonic() - state.started >= args.duration:
+                break
+            next_at += rng.expovariate(args.rate) if args.arrival == "poisson" else 1 / args.rate
+            await asyncio.sleep(max(0.0, next_at - loop.time()))
+            contact = rng.choice(state.contacts)
+            message = state.add_inbound(contact, rng.choice(INBOUND_TEXTS))
+            spawn(post(envelope(state, "message", message)))
+            posted += 1
+        generated.set()
+
+        # Aguarda os POSTs em voo e continua postando acks até o simulador parar
+        while not stop.is_set() or tasks:
+            if stop.is_set():
+                await asyncio.gather(*list(tasks), return_exceptions=True)
+                break
+            await asyncio.sleep(0.2)
+        state.on_outbound = None
+
+
+def print_stats(stats: dict) -> None:
+    """Resumo legível das métricas do simulador."""
+    print("=" * 60)
+    print("SIMULADOR WAHA - RESUMO")
+    print("=" * 60)
+    print(f"  Duração        : {stats['uptime_s']}s")
+    for route, counters in stats["requests"].items():
+        print(
+            f"  {route:15}: {counters['count']} req "
+            f"({counters['injected_errors']} erros, {counters['injected_timeouts']} timeouts injetados)"
+        )
+    print(f"  Envios         : {stats['sent']['total']} ({stats['sent']['per_second']}/s)")
+    webhooks = stats["webhooks"]
+    print(f"  Webhooks       : {webhooks['count']} {webhooks['status']}")
+    print(f"    latência API : p50={webhooks['p50_ms']}ms p90={webhooks['p90_ms']}ms p99={webhooks['p99_ms']}ms")
+    replies = stats["replies"]
+    print(f"  Respostas      : {replies['count']} ({replies['awaiting']} chats ainda sem resposta)")
+    print(f"    ponta a ponta: p50={replies['p50_ms']}ms p90={replies['p90_ms']}ms p99={replies['p99_ms']}ms")
+    if stats["unhandled"]:
+        print(f"  Não simulados  : {stats['unhandled']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Simulador local do WAHA (carga e soak)")
+    parser.add_argument("--host", default="127.0.0.1", help="Endereço do servidor simulado")
+    parser.add_argument("--port", type=int, default=3000, help="Porta do servidor simulado (WAHA_URL)")
+    parser.add_argument("--session", default="default", help="Nome da sessão WAHA")
+    parser.add_argument("--api-key", help="Exigir este X-Api-Key (WAHA_API_KEY)")
+    parser.add_argument("--webhook-url", default="http://localhost:3333/api/v1/webhooks/waha", help="Webhook da API")
+    parser.add_argument("--rate", type=float, default=5.0, help="Webhooks message por segundo (0 = não gerar)")
+    parser.add_argument("--arrival", default="poisson", choices=["poisson", "uniform"], help="Intervalo entre mensagens")
+    parser.add_argument("--duration", type=float, default=0, help="Segundos gerando mensagens (0 = até Ctrl+C)")
+    parser.add_argument("--total", type=int, default=0, help="Parar depois de N mensagens (0 = sem limite)")
+    parser.add_argument("--drain-seconds", type=float, default=30, help="Espera por respostas depois da geração")
+    parser.add_argument("--webhook-concurrency", type=int, default=100, help="POSTs de webhook simultâneos")
+    parser.add_argument("--webhook-timeout", type=float, default=30, help="Timeout dos POSTs de webhook")
+    parser.add_argument("--ack-delay-ms", type=float, default=0, help="Postar message.ack dos envios (0 = não)")
+    parser.add_argument("--chats", type=int, default=200, help="Número de chats sintéticos")
+    parser.add_argument("--lid-ratio", type=float, default=0.5, help="Fração dos chats identificados por @lid")
+    parser.add_argument("--history", type=int, default=100, help="Mensagens guardadas por chat")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Latência média de cada endpoint")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="Desvio padrão da latência")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fração de respostas com erro")
+    parser.add_argument("--error-status", type=int, default=500, help="Status HTTP dos erros injetados")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fração de requisições sem resposta")
+    parser.add_argument("--timeout-seconds", type=float, default=30, help="Segundos segurando cada timeout")
+    parser.add_argument(
+        "--route",
+        action="append",
+        default=[],
+        metavar="CLASSE=LAT[:JIT[:ERRO[:TIMEOUT]]]",
+        help=f"Sobrescreve latência/falhas de uma classe ({', '.join(ROUTE_CLASSES)}); repetível",
+    )
+    parser.add_argument("--report-interval", type=float, default=10, help="Segundos entre linhas de progresso")
+    parser.add_argument("--seed", type=int, help="Semente (execuções reproduzíveis)")
+    parser.add_argument("--output", help="Salvar as métricas finais em JSON")
+    args = parser.parse_args()
+
+    base = Fault(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        timeout_rate=args.timeout_rate,
+        timeout_seconds=args.timeout_seconds,
+    )
+    faults = dict.fromkeys(ROUTE_CLASSES, base)
+    for spec in args.route:
+        route, _, values = spec.partition("=")
+        if route not in faults:
+            parser.error(f"classe desconhecida em --route: {route}")
+        faults[route] = Fault.override(base, values)
+
+    state = SimulatorState(args.chats, args.lid_ratio, args.history, args.session, random.Random(args.seed))
+    server = WahaSimulatorServer((args.host, args.port), state, faults, args.api_key)
+    stop, generated = threading.Event(), threading.Event()
+    threading.Thread(target=server.serve_forever, name="waha-sim-http", daemon=True).start()
+    generator = threading.Thread(
+        target=asyncio.run, args=(run_webhooks(state, args, stop, generated),), name="waha-sim-webhooks"
+    )
+    generator.start()
+    print(f"Simulador WAHA em http://{args.host}:{args.port} -> webhooks em {args.webhook_url} ({args.rate}/s)")
+
+    finite = args.rate > 0 and (args.duration or args.total)
+    last_report = time.monotonic()
+    try:
+        while True:
+            time.sleep(0.5)
+            if time.monotonic() - last_report >= args.report_interval:
+                last_report = time.monotonic()
+                stats = state.stats()
+                print(
+                    f"[{stats['uptime_s']:>7}s] webhooks={stats['webhooks']['count']} "
+                    f"envios={stats['sent']['total']} respostas p50={stats['replies']['p50_ms']}ms "
+                    f"p99={stats['replies']['p99_ms']}ms aguardando={stats['replies']['awaiting']}"
+                )
+            if finite and generated.is_set():
+                # Geração encerrada: espera as respostas pendentes (ou o fim do dreno)
+                deadline = time.monotonic() + args.drain_seconds
+                while state.awaiting_reply and time.monotonic() < deadline:
+                    time.sleep(0.5)
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop.set()
+        generator.join(timeout=args.webhook_timeout + 5)
+        server.shutdown()
+
+    stats = state.stats()
+    print_stats(stats)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(stats, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
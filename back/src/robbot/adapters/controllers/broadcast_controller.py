@@ -0,0 +1,130 @@
+"""Broadcast Controller - bulk sends (campaigns, re-engagement) with per-recipient progress."""
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from robbot.api.v1.dependencies import get_db, require_role
+from robbot.core.custom_exceptions import BusinessRuleError, NotFoundException
+from robbot.domain.shared.enums import BroadcastRecipientStatus, BroadcastStatus
+from robbot.schemas.broadcast import (
+    BroadcastCreate,
+    BroadcastList,
+    BroadcastOut,
+    BroadcastRecipientList,
+    BroadcastRecipientOut,
+)
+from robbot.services.communication.broadcast_service import BroadcastService
+
+router = APIRouter()
+
+
+def _out(service: BroadcastService, broadcast) -> BroadcastOut:
+    out = BroadcastOut.model_validate(broadcast)
+    out.progress = service.progress(broadcast.id)
+    return out
+
+
+@router.post("/", response_model=BroadcastOut, status_code=status.HTTP_201_CREATED)
+def create_broadcast(
+    payload: BroadcastCreate,
+    db: Session = Depends(get_db),
+    current_admin=Depends(require_role("admin")),
+):
+    """
+    Create a broadcast (admin only).
+
+    The audience is resolved at ``scheduled_at`` (now when omitted); messages are
+    then sent in chunks by the batch workers, paced per WAHA session.
+    """
+    service = BroadcastService(db)
+    broadcast = service.create(payload, created_by_user_id=current_admin.id)
+    return _out(service, broadcast)
+
+
+@router.get("/", response_model=BroadcastList)
+def list_broadcasts(
+    status_filter: BroadcastStatus | None = Query(None, alias="status"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=100),
+    db: Session = Depends(get_db),
+    _current_admin=Depends(require_role("admin")),
+):
+    """List broadcasts, newest first (admin only)."""
+    service = BroadcastService(db)
+    broadcasts = service.list_broadcasts(status=status_filter, skip=skip, limit=limit)
+    return BroadcastList(broadcasts=[_out(service, b) for b in broadcasts], total=len(broadcasts))
+
+
+@router.get("/{broadcast_id}", response_model=BroadcastOut)
+def get_broadcast(
+    broadcast_id: str,
+    db: Session = Depends(get_db),
+    _current_admin=Depends(require_role("admin")),
+):
+    """Retrieve a broadcast with its delivery progress (admin only)."""
+    service = BroadcastService(db)
+    try:
+        return _out(service, service.get(broadcast_id))
+    except NotFoundException as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+
+
+@router.get("/{broadcast_id}/recipients", response_model=BroadcastRecipientList)
+def list_broadcast_recipients(
+    broadcast_id: str,
+    status_filter: BroadcastRecipientStatus | None = Query(None, alias="status"),
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
+    _current_admin=Depends(require_role("admin")),
+):
+    """Per-recipient delivery status (admin only)."""
+    service = BroadcastService(db)
+    try:
+        recipients = service.list_recipients(broadcast_id, status=status_filter, skip=skip, limit=limit)
+    except NotFoundException as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    return BroadcastRecipientList(
+        recipients=[BroadcastRecipientOut.model_validate(r) for r in recipients], total=len(recipients)
+    )
+
+
+def _transition(broadcast_id: str, db: Session, action: str) -> BroadcastOut:
+    service = BroadcastService(db)
+    try:
+        broadcast = getattr(service, action)(broadcast_id)
+    except NotFoundException as exc:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(exc)) from exc
+    except BusinessRuleError as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc)) from exc
+    return _out(service, broadcast)
+
+
+@router.post("/{broadcast_id}/pause", response_model=BroadcastOut)
+def pause_broadcast(
+    broadcast_id: str,
+    db: Session = Depends(get_db),
+    _current_admin=Depends(require_role("admin")),
+):
+    """Pause sending; unsent recipients stay PENDING (admin only)."""
+    return _transition(broadcast_id, db, "pause")
+
+
+@router.post("/{broadcast_id}/resume", response_model=BroadcastOut)
+def resume_broadcast(
+    broadcast_id: str,
+    db: Session = Depends(get_db),
+    _current_admin=Depends(require_role("admin")),
+):
+    """Resume a paused broadcast where it stopped (admin only)."""
+    return _transition(broadcast_id, db, "resume")
+
+
+@router.post("/{broadcast_id}/cancel", response_model=BroadcastOut)
+def cancel_broadcast(
+    broadcast_id: str,
+    db: Session = Depends(get_db),
+    _current_admin=Depends(require_role("admin")),
+):
+    """Cancel a broadcast; unsent recipients are SKIPPED (admin only)."""
+    return _transition(broadcast_id, db, "cancel")
@@ -23,7 +23,7 @@ def trigger_reengagement_job(
 
     Requires JWT authentication and admin role.
 
-    This job:
+    This job creates a broadcast (see /broadcasts) that:
     - Finds inactive conversations (> 48h without messages)
     - Sends automated re-engagement messages
     - Updates conversation status to AWAITING_RESPONSE
@@ -36,7 +36,7 @@ def trigger_reengagement_job(
         result = run_reengagement_job()
 
         return {
-            "message": "Re-engagement job completed",
+            "message": "Re-engagement broadcast scheduled",
             "result": result,
         }
     except Exception as e:  # noqa: BLE001 (blind exception)
@@ -0,0 +1,30 @@
+"""Media Controller - serves cached, ready-to-send media files to WAHA."""
+
+import re
+
+from fastapi import APIRouter, HTTPException, status
+from fastapi.responses import FileResponse
+
+from robbot.services.communication.media_cache import get_media_cache
+
+router = APIRouter()
+
+_DIGEST = re.compile(r"[0-9a-f]{64}")
+
+
+@router.get("/{digest}")
+def get_media(digest: str):
+    """
+    Download a cached asset by its SHA-256 (no auth: WAHA fetches it when sending).
+
+    The URL is the content hash, so the response never changes and is cached as immutable.
+    """
+    asset = get_media_cache().get(digest) if _DIGEST.fullmatch(digest) else None
+    if asset is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Media not found")
+    return FileResponse(
+        asset.path,
+        media_type=asset.mimetype,
+        filename=asset.filename,
+        headers={"Cache-Control": "public, max-age=31536000, immutable", "ETag": f'"{digest}"'},
+    )
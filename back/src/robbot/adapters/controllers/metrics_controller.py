@@ -9,9 +9,12 @@ from sqlalchemy.orm import Session
 
 from robbot.infra.persistence.repositories.analytics_repository import AnalyticsRepository
 from robbot.api.v1.dependencies import get_current_user, get_db
+from robbot.core import runtime_metrics
 from robbot.infra.redis.client import get_redis_client
 from robbot.infra.redis.queue import get_queue_manager
 from robbot.services.analytics.metrics_service import MetricsService
+from robbot.services.communication.lid_directory import LidDirectory
+from robbot.services.infrastructure.admission_control import get_admission_controller
 
 router = APIRouter()
 
@@ -71,3 +74,26 @@ def get_campaign_metrics(
     """Legacy campaigns metrics endpoint used by API tests."""
     return []
 
+
+@router.get("/runtime")
+def get_runtime_metrics(
+    _current_user=Depends(get_current_user),
+):
+    """Connection reuse per worker process: clients created vs reused, TCP connects and TLS handshakes."""
+    return runtime_metrics.collect(get_redis_client())
+
+
+@router.get("/admission")
+def get_admission_status(
+    _current_user=Depends(get_current_user),
+):
+    """Current admission level (NORMAL/DEGRADED/CRITICAL), inbound lag and thresholds."""
+    return get_admission_controller().status()
+
+
+@router.get("/lid-directory")
+def get_lid_directory_stats(
+    _current_user=Depends(get_current_user),
+):
+    """LID directory size, last syncs and lookup hit rate."""
+    return LidDirectory().stats()
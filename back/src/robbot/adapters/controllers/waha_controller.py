@@ -39,6 +39,7 @@ from robbot.schemas.waha import (
     SessionStatus,
     SetPresenceRequest,
 )
+from robbot.services.communication.media_cache import get_media_cache
 from robbot.services.communication.waha_service import WAHAService
 
 router = APIRouter()
@@ -399,6 +400,16 @@ async def send_voice_message(
         if not session:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No active session")
 
+        if request.file_url:
+            # Áudio já convertido para opus fica em cache (convert: o arquivo ainda não é opus)
+            return await get_media_cache().send(
+                waha,
+                session=session.name,
+                chat_id=request.chat_id,
+                kind="voice",
+                url=request.file_url,
+                mimetype=None if request.convert else request.mimetype,
+            )
         return await waha.send_voice(
             session=session.name,
             chat_id=request.chat_id,
@@ -427,6 +438,17 @@ async def send_video_message(
         if not session:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="No active session")
 
+        if request.file_url:
+            return await get_media_cache().send(
+                waha,
+                session=session.name,
+                chat_id=request.chat_id,
+                kind="video",
+                url=request.file_url,
+                mimetype=None if request.convert else request.mimetype,
+                filename=request.filename,
+                caption=request.caption,
+            )
         return await waha.send_video(
             session=session.name,
             chat_id=request.chat_id,
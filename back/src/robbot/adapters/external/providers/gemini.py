@@ -9,6 +9,7 @@ import time
 from typing import Any
 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
 
+from robbot.core.async_runtime import LoopBoundResource
 from robbot.core.interfaces import LLMProvider
 from robbot.core.custom_exceptions import LLMError
 
@@ -46,13 +47,10 @@ class GeminiProvider(LLMProvider):
         self._timeout = timeout
 
         try:
-            self._client = ChatGoogleGenerativeAI(
-                model=model,
-                google_api_key=api_key,
-                temperature=default_temperature,
-                max_output_tokens=default_max_tokens,
-                timeout=timeout,
-            )
+            # Built eagerly to fail fast on bad configuration
+            self._client = self._build_client()
+            # The SDK's async HTTP pool binds to the loop of its first request: one client per loop
+            self._clients = LoopBoundResource("llm_gemini", self._build_client)
             self._embeddings_client = GoogleGenerativeAIEmbeddings(
                 model="models/text-embedding-004",
                 google_api_key=api_key,
@@ -66,6 +64,15 @@ class GeminiProvider(LLMProvider):
             logger.error("Failed to initialize Gemini provider: %s", e)
             raise LLMError("Gemini", f"Initialization failed: {e}", original_error=e) from e
 
+    def _build_client(self) -> ChatGoogleGenerativeAI:
+        return ChatGoogleGenerativeAI(
+            model=self._current_model,
+            google_api_key=self._api_key,
+            temperature=self._default_temperature,
+            max_output_tokens=self._default_max_tokens,
+            timeout=self._timeout,
+        )
+
     async def generate_response(
         self,
         prompt: str,
@@ -88,15 +95,10 @@ class GeminiProvider(LLMProvider):
                     # Switch model if needed
                     if model_name != self._current_model:
                         logger.info("[FALLBACK] Switching to Gemini model: %s", model_name)
-                        self._client = ChatGoogleGenerativeAI(
-                            model=model_name,
-                            google_api_key=self._api_key,
-                            temperature=self._default_temperature,
-                            max_output_tokens=self._default_max_tokens,
-                            timeout=self._timeout,
-                        )
                         self._current_model = model_name
+                        self._clients.reset()
 
+                    self._client = self._clients.get()
                     response = await self._client.ainvoke(full_prompt)
                     latency_ms = int((time.time() - start_time) * 1000)
                     
@@ -10,6 +10,8 @@ from typing import Any
 
 from langchain_groq import ChatGroq
 
+from robbot.core.async_runtime import LoopBoundResource
+from robbot.core.http_clients import shared_client_kwargs
 from robbot.core.interfaces import LLMProvider
 from robbot.core.custom_exceptions import LLMError
 
@@ -47,13 +49,10 @@ class GroqProvider(LLMProvider):
         self._timeout = timeout
 
         try:
-            self._client = ChatGroq(
-                model=model,
-                groq_api_key=api_key,
-                temperature=default_temperature,
-                max_tokens=default_max_tokens,
-                timeout=timeout,
-            )
+            # Built eagerly to fail fast on bad configuration
+            self._client = self._build_client()
+            # The SDK's async HTTP pool binds to the loop of its first request: one client per loop
+            self._clients = LoopBoundResource("llm_groq", self._build_client)
             logger.info(
                 "Groq provider initialized: model=%s, temp=%s",
                 model,
@@ -63,6 +62,17 @@ class GroqProvider(LLMProvider):
             logger.error("Failed to initialize Groq provider: %s", e)
             raise LLMError("Groq", f"Initialization failed: {e}", original_error=e) from e
 
+    def _build_client(self) -> ChatGroq:
+        return ChatGroq(
+            model=self._current_model,
+            groq_api_key=self._api_key,
+            temperature=self._default_temperature,
+            max_tokens=self._default_max_tokens,
+            timeout=self._timeout,
+            # Keep-alive pools shared with the rest of the process (the SDK passes absolute URLs)
+            **shared_client_kwargs(name="llm_groq_http"),
+        )
+
     async def generate_response(
         self,
         prompt: str,
@@ -85,15 +95,10 @@ class GroqProvider(LLMProvider):
                     # Switch model if needed
                     if model_name != self._current_model:
                         logger.info("[FALLBACK] Switching to Groq model: %s", model_name)
-                        self._client = ChatGroq(
-                            model=model_name,
-                            groq_api_key=self._api_key,
-                            temperature=self._default_temperature,
-                            max_tokens=self._default_max_tokens,
-                            timeout=self._timeout,
-                        )
                         self._current_model = model_name
+                        self._clients.reset()
 
+                    self._client = self._clients.get()
                     response = await self._client.ainvoke(full_prompt)
                     latency_ms = int((time.time() - start_time) * 1000)
                     
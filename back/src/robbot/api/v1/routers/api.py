@@ -6,6 +6,7 @@ from robbot.adapters.controllers import (
     ai_controller,
     audit_controller,
     auth_controller,
+    broadcast_controller,
     content_controller,
     context_controller,
     context_item_controller,
@@ -15,6 +16,7 @@ from robbot.adapters.controllers import (
     health_controller,
     job_controller,
     lead_controller,
+    media_controller,
     metrics_controller,
     notification_controller,
     queue_controller,
@@ -47,12 +49,14 @@ api_router.include_router(conversation_controller.router, prefix="/conversations
 api_router.include_router(lead_controller.router, prefix="/leads", tags=["Leads"])
 api_router.include_router(notification_controller.router, prefix="/notifications", tags=["Notifications"])
 api_router.include_router(tag_controller.router, prefix="/tags", tags=["Tags"])
+api_router.include_router(broadcast_controller.router, prefix="/broadcasts", tags=["Broadcasts"])
 
 # Contents & Contexts
 api_router.include_router(content_controller.router, prefix="/contents", tags=["Contents"])
 api_router.include_router(topic_controller.router, prefix="/topics", tags=["Topics"])
 api_router.include_router(context_controller.router, prefix="/contexts", tags=["Contexts"])
 api_router.include_router(context_item_controller.router, prefix="/context-items", tags=["Context Items"])
+api_router.include_router(media_controller.router, prefix="/media", tags=["Media"])
 
 # AI & Automation
 api_router.include_router(ai_controller.router, prefix="/ai", tags=["AI"])
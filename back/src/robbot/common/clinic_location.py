@@ -75,15 +75,9 @@ def send_clinic_location_via_waha_sync(
 
     Útil para jobs em background (RQ).
     """
-    import asyncio
+    from robbot.core.async_runtime import run_sync
 
-    try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-
-    return loop.run_until_complete(send_clinic_location_via_waha(chat_id, session_name, custom_title))
+    return run_sync(send_clinic_location_via_waha(chat_id, session_name, custom_title))
 
 
 # Atalhos para acesso rápido
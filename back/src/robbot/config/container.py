@@ -14,6 +14,7 @@ from robbot.infra.integrations.llm.llm_client import get_llm_client
 from robbot.infra.integrations.waha.waha_integration import WAHAIntegration
 from robbot.config.prompt_loader import PromptLoader
 from robbot.config.settings import Settings
+from robbot.core.http_clients import get_http_clients
 from robbot.core.interfaces import LLMProvider, VectorStore, WAHAClientInterface
 from robbot.infra.db.base import SessionLocal
 from robbot.infra.redis.client import get_redis_client
@@ -92,6 +93,10 @@ class DIContainer:
         if self._waha:
             await self._waha.close()
 
+        http_clients = get_http_clients()
+        await http_clients.aclose()
+        http_clients.close()
+
     # ===== Getter methods for dependency injection =====
 
     def get_redis(self) -> redis.Redis:
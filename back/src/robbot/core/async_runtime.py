@@ -0,0 +1,124 @@
+"""Persistent per-process event loop for synchronous code (RQ jobs) that runs coroutines.
+
+``asyncio.run`` creates and destroys a loop on every call, so clients that bind
+to a loop on first use (httpx.AsyncClient pools, redis.asyncio connections, LLM
+SDK clients) end up tied to a dead loop and must reconnect, or fail, on the
+next job. ``run_sync`` instead submits the coroutine to one long-lived loop
+running in a daemon thread, and ``LoopBoundResource`` hands out one instance of
+such a client per loop, so connections survive across jobs.
+
+The loop is recreated after a fork (e.g. RQ work-horses), since threads do not
+survive it.
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from collections.abc import Awaitable, Callable, Coroutine
+from typing import Any, Generic, TypeVar
+
+from robbot.core import runtime_metrics
+
+T = TypeVar("T")
+
+
+class AsyncRuntime:
+    """One event loop per process, running forever in a daemon thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._pid: int | None = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._start()
+            return self._loop
+
+    def _start(self) -> None:
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run() -> None:
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        self._thread = threading.Thread(target=run, name="async-runtime", daemon=True)
+        self._thread.start()
+        ready.wait()
+        self._loop = loop
+        self._pid = os.getpid()
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+        """Run ``coro`` on the persistent loop and block until it finishes."""
+        loop = self.loop
+        if threading.current_thread() is self._thread:
+            coro.close()
+            raise RuntimeError("run_sync() called from inside the async runtime loop (would deadlock)")
+        return asyncio.run_coroutine_threadsafe(coro, loop).result(timeout)
+
+    def stop(self) -> None:
+        with self._lock:
+            if self._loop is not None and self._pid == os.getpid():
+                self._loop.call_soon_threadsafe(self._loop.stop)
+                self._thread.join(timeout=5)
+            self._loop = None
+            self._thread = None
+
+
+class LoopBoundResource(Generic[T]):
+    """A lazily built client that is only valid on the event loop it was first used on.
+
+    ``get()`` returns the instance built for the running loop, building one the
+    first time a loop asks. Counters in runtime_metrics show reuse versus creation.
+    """
+
+    def __init__(self, name: str, factory: Callable[[], T], closer: Callable[[T], Awaitable[Any]] | None = None):
+        self.name = name
+        self._factory = factory
+        self._closer = closer
+        self._instances: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, T] = weakref.WeakKeyDictionary()
+
+    def get(self) -> T:
+        loop = asyncio.get_running_loop()
+        instance = self._instances.get(loop)
+        if instance is not None:
+            runtime_metrics.record_reused(self.name)
+            return instance
+
+        instance = self._factory()
+        self._instances[loop] = instance
+        runtime_metrics.record_created(self.name)
+        return instance
+
+    def reset(self) -> None:
+        """Forget every instance (e.g. configuration changed); the next get() rebuilds."""
+        self._instances.clear()
+
+    async def aclose(self) -> None:
+        """Close the instance bound to the running loop."""
+        instance = self._instances.pop(asyncio.get_running_loop(), None)
+        if instance is not None and self._closer is not None:
+            await self._closer(instance)
+
+
+# Singleton global
+_runtime: AsyncRuntime | None = None
+
+
+def get_async_runtime() -> AsyncRuntime:
+    """Get or create the process-wide async runtime."""
+    global _runtime
+    if _runtime is None:
+        _runtime = AsyncRuntime()
+    return _runtime
+
+
+def run_sync(coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+    """Drop-in replacement for ``asyncio.run`` that keeps the loop (and its connections) alive."""
+    return get_async_runtime().run(coro, timeout)
@@ -61,6 +61,18 @@ class WAHAError(ExternalServiceError):
         super().__init__("WAHA", message, original_error, status_code=status_code)
 
 
+class WAHACircuitOpenError(WAHAError):
+    """WAHA indisponível (circuit breaker aberto): a chamada falhou sem ser enviada."""
+
+
+class WAHASendThrottledError(WAHAError):
+    """Sessão WAHA no limite de envio (send governor): a mensagem não foi enviada, tente depois."""
+
+    def __init__(self, message: str, retry_after: float | None = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
 class VectorDBError(ExternalServiceError):
     """Erros no ChromaDB."""
 
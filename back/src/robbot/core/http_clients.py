@@ -0,0 +1,225 @@
+"""Process-wide pooled HTTP clients, one per base URL.
+
+Building an ``httpx.Client`` per service instance (and closing it when the
+instance goes away) means every call pays a new TCP connect, plus a TLS
+handshake for HTTPS. The registry instead keeps one keep-alive pool per
+(base URL, default headers, timeout) and hands it to every caller:
+
+- ``sync_client()``: one ``httpx.Client`` per key for the whole process
+- ``async_client()``: one ``httpx.AsyncClient`` per key and event loop (an
+  async pool is bound to the loop it first ran on, see core.async_runtime)
+
+Pools use HTTP_POOL_* limits and negotiate HTTP/2 when HTTP_CLIENT_HTTP2 is on
+and the ``h2`` package is installed. Every request is traced into
+runtime_metrics under the client's name (requests, TCP connects, TLS
+handshakes), and the open/idle connections of each pool are reported as
+gauges, so GET /api/v1/metrics/runtime shows how well connections are reused.
+
+Callers must not close registry clients. The registry is rebuilt after a fork,
+since pooled sockets must not be shared between processes.
+"""
+
+import contextlib
+import importlib.util
+import os
+import threading
+import weakref
+from typing import Any
+from urllib.parse import urlsplit
+
+import httpx
+
+from robbot.config.settings import settings
+from robbot.core import runtime_metrics
+from robbot.core.async_runtime import LoopBoundResource
+
+_ClientKey = tuple[str, tuple[tuple[str, str], ...], float | None]
+
+
+def http2_available() -> bool:
+    return settings.HTTP_CLIENT_HTTP2 and importlib.util.find_spec("h2") is not None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.HTTP_POOL_MAX_CONNECTIONS,
+        max_keepalive_connections=settings.HTTP_POOL_MAX_KEEPALIVE,
+        keepalive_expiry=settings.HTTP_POOL_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def _pool_usage(transport: httpx.HTTPTransport | httpx.AsyncHTTPTransport) -> dict[str, int]:
+    connections = list(getattr(transport._pool, "connections", []))  # pylint: disable=protected-access
+    idle = sum(1 for connection in connections if connection.is_idle())
+    return {"pool_connections": len(connections), "pool_idle": idle, "pool_in_use": len(connections) - idle}
+
+
+class _TracedTransport(httpx.BaseTransport):
+    """Adds the runtime_metrics trace to requests that do not carry one."""
+
+    def __init__(self, name: str):
+        self.inner = httpx.HTTPTransport(limits=_limits(), http2=http2_available())
+        self._trace = runtime_metrics.httpx_sync_trace(name)
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions.setdefault("trace", self._trace)
+        return self.inner.handle_request(request)
+
+    def close(self) -> None:
+        self.inner.close()
+
+
+class _AsyncTracedTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of ``_TracedTransport``."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.inner = httpx.AsyncHTTPTransport(limits=_limits(), http2=http2_available())
+        self._trace = runtime_metrics.httpx_trace(name)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        request.extensions.setdefault("trace", self._trace)
+        return await self.inner.handle_async_request(request)
+
+    async def aclose(self) -> None:
+        await self.inner.aclose()
+
+
+class HttpClientRegistry:
+    """Shared keep-alive HTTP clients keyed by base URL (see module docstring)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+        self._sync: dict[_ClientKey, tuple[str, httpx.Client]] = {}
+        self._async: dict[_ClientKey, LoopBoundResource[httpx.AsyncClient]] = {}
+        # Transports of live loops only (a client goes away with its loop)
+        self._async_transports: weakref.WeakSet[_AsyncTracedTransport] = weakref.WeakSet()
+
+    @staticmethod
+    def _key(base_url: str, headers: dict[str, str] | None, timeout: float | None) -> _ClientKey:
+        return base_url.rstrip("/"), tuple(sorted((headers or {}).items())), timeout
+
+    @staticmethod
+    def _name(name: str | None, base_url: str) -> str:
+        return name or f"http:{urlsplit(base_url).netloc or 'any'}"
+
+    def _check_fork(self) -> None:
+        # Sockets inherited from the parent process are not ours to use
+        if self._pid != os.getpid():
+            self._sync.clear()
+            self._async.clear()
+            self._async_transports.clear()
+            self._pid = os.getpid()
+
+    def sync_client(
+        self,
+        base_url: str = "",
+        headers: dict[str, str] | None = None,
+        timeout: float | None = 30.0,
+        name: str | None = None,
+    ) -> httpx.Client:
+        """Shared ``httpx.Client`` for ``base_url`` (empty: absolute URLs only)."""
+        key = self._key(base_url, headers, timeout)
+        with self._lock:
+            self._check_fork()
+            entry = self._sync.get(key)
+            if entry is not None:
+                runtime_metrics.record_reused(entry[0])
+                return entry[1]
+
+            name = self._name(name, base_url)
+            client = httpx.Client(
+                base_url=key[0],
+                headers=headers,
+                timeout=timeout,
+                follow_redirects=True,
+                transport=_TracedTransport(name),
+            )
+            self._sync[key] = (name, client)
+        runtime_metrics.record_created(name)
+        return client
+
+    def async_client(
+        self,
+        base_url: str = "",
+        headers: dict[str, str] | None = None,
+        timeout: float | None = 30.0,
+        name: str | None = None,
+    ) -> httpx.AsyncClient:
+        """Shared ``httpx.AsyncClient`` for ``base_url`` on the running event loop."""
+        key = self._key(base_url, headers, timeout)
+        with self._lock:
+            self._check_fork()
+            resource = self._async.get(key)
+            if resource is None:
+                name = self._name(name, base_url)
+
+                def build() -> httpx.AsyncClient:
+                    transport = _AsyncTracedTransport(name)
+                    with self._lock:
+                        self._async_transports.add(transport)
+                    return httpx.AsyncClient(
+                        base_url=key[0],
+                        headers=headers,
+                        timeout=timeout,
+                        follow_redirects=True,
+                        transport=transport,
+                    )
+
+                resource = LoopBoundResource(name, build, closer=lambda client: client.aclose())
+                self._async[key] = resource
+        return resource.get()
+
+    def pool_stats(self) -> dict[str, dict[str, int]]:
+        """Open, idle and in-use connections per client name (summed over loops)."""
+        stats: dict[str, dict[str, int]] = {}
+        with self._lock:
+            transports = [(name, client._transport.inner) for name, client in self._sync.values()]  # pylint: disable=protected-access
+            transports += [(transport.name, transport.inner) for transport in self._async_transports]
+        for name, transport in transports:
+            usage = _pool_usage(transport)
+            current = stats.setdefault(name, dict.fromkeys(usage, 0))
+            for gauge, value in usage.items():
+                current[gauge] += value
+        return stats
+
+    def close(self) -> None:
+        """Close the sync pools (shutdown); the next call builds new ones."""
+        with self._lock:
+            clients = [client for _name, client in self._sync.values()]
+            self._sync.clear()
+        for client in clients:
+            client.close()
+
+    async def aclose(self) -> None:
+        """Close the async pools bound to the running loop (shutdown)."""
+        with self._lock:
+            resources = list(self._async.values())
+        for resource in resources:
+            await resource.aclose()
+
+
+# Singleton global
+_registry: HttpClientRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def get_http_clients() -> HttpClientRegistry:
+    """Get or create the process-wide HTTP client registry."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = HttpClientRegistry()
+                runtime_metrics.register_gauges(_registry.pool_stats)
+    return _registry
+
+
+def shared_client_kwargs(base_url: str = "", name: str | None = None) -> dict[str, Any]:
+    """``http_client``/``http_async_client`` kwargs for SDKs that accept httpx clients (async only inside a loop)."""
+    registry = get_http_clients()
+    kwargs: dict[str, Any] = {"http_client": registry.sync_client(base_url, timeout=None, name=name)}
+    with contextlib.suppress(RuntimeError):  # no running loop: the SDK builds its own async client
+        kwargs["http_async_client"] = registry.async_client(base_url, timeout=None, name=name)
+    return kwargs
@@ -0,0 +1,149 @@
+"""In-process counters for loop-bound resources (HTTP pools, async Redis, LLM clients).
+
+Each process counts how often a cached client was reused versus created, and,
+for HTTP clients, how many requests actually opened a TCP connection or ran a
+TLS handshake (httpcore trace events). Gauges (current values such as open pool
+connections) come from registered sources and are reported apart from counters.
+Workers publish their snapshot to Redis so the API can aggregate every process
+at GET /api/v1/metrics/runtime.
+"""
+
+import json
+import os
+import socket
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from redis import Redis
+
+METRICS_KEY_PREFIX = "runtime:metrics:"
+PUBLISH_TTL_SECONDS = 300
+PUBLISH_INTERVAL_SECONDS = 10
+
+_lock = threading.Lock()
+_counters: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+_gauge_sources: list[Callable[[], dict[str, dict[str, int]]]] = []
+_last_publish = 0.0
+
+# httpcore trace event -> counter
+_HTTP_TRACE_EVENTS = {
+    "connection.connect_tcp.complete": "tcp_connects",
+    "connection.start_tls.complete": "tls_handshakes",
+    "http11.send_request_headers.started": "requests",
+    "http2.send_request_headers.started": "requests",
+}
+
+
+def incr(resource: str, counter: str, amount: int = 1) -> None:
+    with _lock:
+        _counters[resource][counter] += amount
+
+
+def record_created(resource: str) -> None:
+    """A new client/pool was built (its first request pays the connection setup)."""
+    incr(resource, "created")
+
+
+def record_reused(resource: str) -> None:
+    """An existing client/pool was handed out again."""
+    incr(resource, "reused")
+
+
+def httpx_trace(resource: str) -> Callable[[str, dict], Awaitable[None]]:
+    """Async httpx ``trace`` extension counting requests, TCP connects and TLS handshakes."""
+
+    async def trace(event_name: str, _info: dict) -> None:
+        counter = _HTTP_TRACE_EVENTS.get(event_name)
+        if counter:
+            incr(resource, counter)
+
+    return trace
+
+
+def httpx_sync_trace(resource: str) -> Callable[[str, dict], None]:
+    """Sync counterpart of ``httpx_trace`` (for httpx.Client)."""
+
+    def trace(event_name: str, _info: dict) -> None:
+        counter = _HTTP_TRACE_EVENTS.get(event_name)
+        if counter:
+            incr(resource, counter)
+
+    return trace
+
+
+def register_gauges(source: Callable[[], dict[str, dict[str, int]]]) -> None:
+    """Report current values (e.g. open pool connections): ``source() -> {resource: {gauge: n}}``."""
+    if source not in _gauge_sources:
+        _gauge_sources.append(source)
+
+
+def snapshot() -> dict[str, dict[str, int]]:
+    with _lock:
+        return {resource: dict(counters) for resource, counters in _counters.items()}
+
+
+def gauges() -> dict[str, dict[str, int]]:
+    result: dict[str, dict[str, int]] = {}
+    for source in list(_gauge_sources):
+        try:
+            values = source()
+        except Exception:  # noqa: BLE001 (metrics must never break the caller)
+            continue
+        for resource, resource_gauges in values.items():
+            result.setdefault(resource, {}).update(resource_gauges)
+    return result
+
+
+def reset() -> None:
+    global _last_publish
+    with _lock:
+        _counters.clear()
+        _last_publish = 0.0
+
+
+def process_id() -> str:
+    return f"{os.getenv('SERVICE_NAME') or socket.gethostname()}:{os.getpid()}"
+
+
+def publish(redis_client: Redis) -> None:
+    """Store this process' counters in Redis (expires if the process dies)."""
+    global _last_publish
+    _last_publish = time.time()
+    redis_client.set(
+        f"{METRICS_KEY_PREFIX}{process_id()}",
+        json.dumps({"updated_at": _last_publish, "resources": snapshot(), "gauges": gauges()}),
+        ex=PUBLISH_TTL_SECONDS,
+    )
+
+
+def maybe_publish(redis_client: Redis) -> None:
+    """publish() at most once per PUBLISH_INTERVAL_SECONDS (cheap to call after every job)."""
+    if time.time() - _last_publish >= PUBLISH_INTERVAL_SECONDS:
+        publish(redis_client)
+
+
+def collect(redis_client: Redis) -> dict[str, Any]:
+    """Counters of every live process plus totals per resource."""
+    processes: dict[str, Any] = {}
+    for key in redis_client.scan_iter(f"{METRICS_KEY_PREFIX}*"):
+        raw = redis_client.get(key)
+        if raw:
+            key = key.decode() if isinstance(key, bytes) else key
+            processes[key.removeprefix(METRICS_KEY_PREFIX)] = json.loads(raw)
+
+    totals: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    gauge_totals: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+    for data in processes.values():
+        for section, target in (("resources", totals), ("gauges", gauge_totals)):
+            for resource, values in data.get(section, {}).items():
+                for name, value in values.items():
+                    target[resource][name] += value
+
+    return {
+        "processes": processes,
+        "totals": {resource: dict(counters) for resource, counters in totals.items()},
+        "gauges": {resource: dict(values) for resource, values in gauge_totals.items()},
+    }
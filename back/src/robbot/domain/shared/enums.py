@@ -40,6 +40,32 @@ class MessageDirection(str, Enum):
     OUTBOUND = "OUTBOUND"
 
 
+class DeliveryStatus(str, Enum):
+    """Outbound message delivery (transactional outbox)."""
+
+    PENDING = "PENDING"
+    SENDING = "SENDING"
+    SCHEDULED = "SCHEDULED"
+    SENT = "SENT"
+    FAILED = "FAILED"
+
+
+class BroadcastStatus(str, Enum):
+    SCHEDULED = "SCHEDULED"
+    RUNNING = "RUNNING"
+    PAUSED = "PAUSED"
+    COMPLETED = "COMPLETED"
+    CANCELLED = "CANCELLED"
+
+
+class BroadcastRecipientStatus(str, Enum):
+    PENDING = "PENDING"
+    SENDING = "SENDING"
+    SENT = "SENT"
+    FAILED = "FAILED"
+    SKIPPED = "SKIPPED"
+
+
 class SessionStatus(str, Enum):
     STOPPED = "STOPPED"
     STARTING = "STARTING"
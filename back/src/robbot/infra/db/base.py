@@ -1,10 +1,16 @@
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import declarative_base, sessionmaker
 
 from robbot.config.settings import settings
 
+# SQLite (unit tests) uses a pool without size/overflow arguments.
+pool_kwargs = {}
+if make_url(settings.DATABASE_URL).get_backend_name() != "sqlite":
+    pool_kwargs = {"pool_size": settings.DB_POOL_SIZE, "max_overflow": settings.DB_MAX_OVERFLOW}
+
 # Engine configured to use DATABASE_URL (Postgres). For local/dev use docker-compose Postgres service.
 # Do NOT call Base.metadata.create_all() in production; use Alembic migrations instead.
-engine = create_engine(settings.DATABASE_URL, echo=False, future=True)
+engine = create_engine(settings.DATABASE_URL, echo=False, future=True, **pool_kwargs)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
@@ -0,0 +1,364 @@
+"""Resilient HTTP transport under WAHAClient.
+
+Every WAHA call goes through ``WAHATransport.request``:
+
+- Timeouts per endpoint class: presence (typing/seen, best-effort and cheap),
+  send (sendText & co, not idempotent), media (uploads and conversions) and
+  control (sessions, contacts, chats, LIDs, server).
+- Jittered retries (full jitter exponential backoff). Connection failures are
+  retried for every class; timeouts and 500/504 only where repeating is safe
+  (presence and control): a send that timed out may already have been
+  delivered. Retries are bounded by a ``RetryBudget`` (a fraction of the recent
+  requests plus a small floor), so a struggling WAHA does not get 3x the load.
+- A ``CircuitBreaker`` per WAHA base URL: after consecutive failures it opens
+  and calls fail fast with ``WAHACircuitOpenError`` instead of hanging the
+  conversation turn; after WAHA_BREAKER_RESET_SECONDS one probe is let
+  through and its outcome closes or re-opens the circuit.
+
+Breaker state is process-local (each process observes its own calls); it is
+reported by the health check and counted in runtime_metrics ("waha_transport").
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from enum import Enum
+from typing import Any
+
+import httpx
+
+from robbot.config.settings import settings
+from robbot.core import runtime_metrics
+from robbot.core.custom_exceptions import WAHACircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+METRICS_RESOURCE = "waha_transport"
+
+_PRESENCE_ENDPOINTS = {"/api/startTyping", "/api/stopTyping", "/api/sendSeen"}
+_MEDIA_ENDPOINTS = {"/api/sendImage", "/api/sendFile", "/api/sendVideo", "/api/sendVoice"}
+_SEND_ENDPOINTS = {"/api/forwardMessage", "/api/reaction", "/api/star"}
+
+# Statuses meaning "not processed, try again" vs. "may have been processed"
+_SAFE_RETRY_STATUSES = frozenset({429, 502, 503})
+_IDEMPOTENT_RETRY_STATUSES = _SAFE_RETRY_STATUSES | {500, 504}
+
+
+class EndpointClass(str, Enum):
+    PRESENCE = "presence"
+    SEND = "send"
+    MEDIA = "media"
+    CONTROL = "control"
+
+
+def classify(method: str, endpoint: str) -> EndpointClass:
+    """Endpoint class of a WAHA call (drives timeout and retry policy)."""
+    path = endpoint.split("?", 1)[0]
+    if path in _PRESENCE_ENDPOINTS or "/presence" in path:
+        return EndpointClass.PRESENCE
+    if path in _MEDIA_ENDPOINTS or "/media/" in path:
+        return EndpointClass.MEDIA
+    if method.upper() != "GET" and (path.startswith("/api/send") or path in _SEND_ENDPOINTS or path.endswith("/events")):
+        return EndpointClass.SEND
+    return EndpointClass.CONTROL
+
+
+@dataclass(frozen=True)
+class EndpointPolicy:
+    timeout: httpx.Timeout
+    max_attempts: int
+    retry_after_send: bool  # safe to repeat once the request may have reached WAHA
+
+    @property
+    def retry_statuses(self) -> frozenset[int]:
+        return _IDEMPOTENT_RETRY_STATUSES if self.retry_after_send else _SAFE_RETRY_STATUSES
+
+
+def get_policies() -> dict[EndpointClass, EndpointPolicy]:
+    """Per-class policies from settings."""
+    connect = settings.WAHA_CONNECT_TIMEOUT_SECONDS
+
+    def timeout(seconds: float) -> httpx.Timeout:
+        return httpx.Timeout(seconds, connect=min(connect, seconds))
+
+    attempts = settings.WAHA_RETRY_MAX_ATTEMPTS
+    return {
+        # Typing/seen are best-effort: one retry at most, never delay the reply for them
+        EndpointClass.PRESENCE: EndpointPolicy(timeout(settings.WAHA_TIMEOUT_PRESENCE_SECONDS), min(attempts, 2), True),
+        EndpointClass.SEND: EndpointPolicy(timeout(settings.WAHA_TIMEOUT_SEND_SECONDS), attempts, False),
+        EndpointClass.MEDIA: EndpointPolicy(timeout(settings.WAHA_TIMEOUT_MEDIA_SECONDS), attempts, False),
+        EndpointClass.CONTROL: EndpointPolicy(timeout(settings.WAHA_TIMEOUT_CONTROL_SECONDS), attempts, True),
+    }
+
+
+class RetryBudget:
+    """Allow at most ``ratio`` retries per request over a sliding window, plus ``min_per_second``."""
+
+    def __init__(
+        self,
+        ratio: float,
+        min_per_second: float,
+        window_seconds: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window_seconds = window_seconds
+        self._clock = clock
+        self._requests: deque[float] = deque()
+        self._retries: deque[float] = deque()
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        horizon = now - self.window_seconds
+        for events in (self._requests, self._retries):
+            while events and events[0] <= horizon:
+                events.popleft()
+
+    def record_request(self) -> None:
+        with self._lock:
+            now = self._clock()
+            self._prune(now)
+            self._requests.append(now)
+
+    def try_spend(self) -> bool:
+        """Take one retry from the budget; False when it is exhausted."""
+        with self._lock:
+            now = self._clock()
+            self._prune(now)
+            allowed = self.ratio * len(self._requests) + self.min_per_second * self.window_seconds
+            if len(self._retries) >= allowed:
+                return False
+            self._retries.append(now)
+            return True
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int,
+        reset_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._clock = clock
+        self._state = CircuitState.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_started_at: float | None = None
+        self._lock = threading.Lock()
+
+    def _current_state(self, now: float) -> CircuitState:
+        if self._state == CircuitState.OPEN and now - self._opened_at >= self.reset_seconds:
+            self._state = CircuitState.HALF_OPEN
+            self._probe_started_at = None
+        return self._state
+
+    @property
+    def state(self) -> CircuitState:
+        with self._lock:
+            return self._current_state(self._clock())
+
+    def allow(self) -> bool:
+        """Whether a call may go out now (half-open: one probe at a time)."""
+        with self._lock:
+            now = self._clock()
+            state = self._current_state(now)
+            if state == CircuitState.CLOSED:
+                return True
+            if state == CircuitState.OPEN:
+                return False
+            # A probe that never reported back (cancelled) stops blocking after reset_seconds
+            if self._probe_started_at is not None and now - self._probe_started_at < self.reset_seconds:
+                return False
+            self._probe_started_at = now
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CircuitState.CLOSED:
+                logger.info("[WAHA] Circuit breaker fechado (%s)", self.name)
+            self._state = CircuitState.CLOSED
+            self._failures = 0
+            self._probe_started_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            now = self._clock()
+            self._failures += 1
+            state = self._current_state(now)
+            if state == CircuitState.HALF_OPEN or (
+                state == CircuitState.CLOSED and self._failures >= self.failure_threshold
+            ):
+                self._state = CircuitState.OPEN
+                self._opened_at = now
+                self._probe_started_at = None
+                runtime_metrics.incr(METRICS_RESOURCE, "breaker_opened")
+                logger.warning(
+                    "[WAHA] Circuit breaker aberto (%s) após %d falhas seguidas; chamadas falham rápido por %.0fs",
+                    self.name,
+                    self._failures,
+                    self.reset_seconds,
+                )
+
+    def status(self) -> dict[str, Any]:
+        with self._lock:
+            now = self._clock()
+            state = self._current_state(now)
+            status: dict[str, Any] = {"state": state.value, "consecutive_failures": self._failures}
+            if state == CircuitState.OPEN:
+                status["retry_in_seconds"] = round(self.reset_seconds - (now - self._opened_at), 1)
+            return status
+
+
+class WAHATransport:
+    """Runs one logical WAHA request: breaker check, attempts with class timeout, jittered backoff."""
+
+    def __init__(
+        self,
+        breaker: CircuitBreaker,
+        budget: RetryBudget,
+        policies: dict[EndpointClass, EndpointPolicy] | None = None,
+    ):
+        self.breaker = breaker
+        self.budget = budget
+        self.policies = policies or get_policies()
+
+    async def request(
+        self,
+        client: httpx.AsyncClient,
+        method: str,
+        endpoint: str,
+        timeout: float | None = None,
+        **kwargs: Any,
+    ) -> httpx.Response:
+        """Send the request, retrying where safe.
+
+        Args:
+            client: Pooled client of the running loop
+            method: HTTP method
+            endpoint: API endpoint path
+            timeout: Overrides the class read timeout (seconds)
+            **kwargs: Additional httpx request params
+
+        Returns:
+            Last response (callers check the status)
+
+        Raises:
+            WAHACircuitOpenError: Circuit open, nothing was sent
+            httpx.TransportError: Last transport error once retries are over
+        """
+        endpoint_class = classify(method, endpoint)
+        policy = self.policies[endpoint_class]
+        request_timeout = policy.timeout if timeout is None else httpx.Timeout(timeout, connect=policy.timeout.connect)
+        self.budget.record_request()
+
+        attempt = 0
+        while True:
+            attempt += 1
+            if not self.breaker.allow():
+                runtime_metrics.incr(METRICS_RESOURCE, "breaker_rejected")
+                raise WAHACircuitOpenError(f"WAHA circuit open ({self.breaker.name}), {method} {endpoint} not sent")
+
+            response: httpx.Response | None = None
+            try:
+                response = await client.request(method, endpoint, timeout=request_timeout, **kwargs)
+            except httpx.PoolTimeout:
+                raise  # local pool saturation says nothing about WAHA
+            except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+                error: Exception | None = e
+                retryable = True
+                self.breaker.record_failure()
+            except (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError) as e:
+                error = e
+                retryable = policy.retry_after_send
+                self.breaker.record_failure()
+                if isinstance(e, httpx.TimeoutException):
+                    runtime_metrics.incr(METRICS_RESOURCE, f"timeouts_{endpoint_class.value}")
+            else:
+                error = None
+                if response.status_code >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                retryable = response.status_code in policy.retry_statuses
+                if not retryable:
+                    return response
+
+            if not retryable or attempt >= policy.max_attempts or not self._spend_retry():
+                if error is not None:
+                    raise error
+                return response
+
+            delay = self._backoff(attempt)
+            runtime_metrics.incr(METRICS_RESOURCE, "retries")
+            logger.warning(
+                "[WAHA] %s %s falhou (%s), tentativa %d em %.2fs",
+                method,
+                endpoint,
+                error or response.status_code,
+                attempt + 1,
+                delay,
+                extra={"endpoint_class": endpoint_class.value},
+            )
+            await asyncio.sleep(delay)
+
+    def _spend_retry(self) -> bool:
+        if self.budget.try_spend():
+            return True
+        runtime_metrics.incr(METRICS_RESOURCE, "retry_budget_exhausted")
+        return False
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Full jitter: uniform(0, min(cap, base * 2^(attempt-1)))."""
+        ceiling = min(settings.WAHA_RETRY_MAX_DELAY_MS, settings.WAHA_RETRY_BASE_DELAY_MS * 2 ** (attempt - 1))
+        return random.uniform(0, ceiling) / 1000
+
+
+# Singleton global (one breaker/budget per WAHA base URL, shared by every client of the process)
+_transports: dict[str, WAHATransport] = {}
+_transports_lock = threading.Lock()
+
+
+def get_waha_transport(base_url: str) -> WAHATransport:
+    """Get or create the transport of a WAHA base URL."""
+    with _transports_lock:
+        transport = _transports.get(base_url)
+        if transport is None:
+            transport = WAHATransport(
+                breaker=CircuitBreaker(
+                    base_url,
+                    failure_threshold=settings.WAHA_BREAKER_FAILURE_THRESHOLD,
+                    reset_seconds=settings.WAHA_BREAKER_RESET_SECONDS,
+                ),
+                budget=RetryBudget(
+                    ratio=settings.WAHA_RETRY_BUDGET_RATIO,
+                    min_per_second=settings.WAHA_RETRY_BUDGET_MIN_PER_SECOND,
+                ),
+            )
+            _transports[base_url] = transport
+        return transport
+
+
+def breaker_status() -> dict[str, dict[str, Any]]:
+    """Breaker state of every WAHA base URL used by this process (health signal)."""
+    with _transports_lock:
+        transports = dict(_transports)
+    return {base_url: transport.breaker.status() for base_url, transport in transports.items()}
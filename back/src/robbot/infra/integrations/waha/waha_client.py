@@ -13,11 +13,31 @@ from typing import Any
 import httpx
 
 from robbot.config.settings import settings
-from robbot.core.custom_exceptions import WAHAError
+from robbot.core import runtime_metrics
+from robbot.core.custom_exceptions import WAHAError, WAHASendThrottledError
+from robbot.core.http_clients import get_http_clients
 from robbot.core.text_sanitizer import enforce_whatsapp_style
+from robbot.infra.integrations.waha.transport import classify, get_waha_transport
+from robbot.infra.redis.send_governor import get_send_governor
 
 logger = logging.getLogger(__name__)
 
+ANTI_BAN_SECONDS_PER_CHAR = 0.1
+ANTI_BAN_MAX_DELAY_SECONDS = 120
+SESSION_HEARTBEAT_SECONDS = 10
+
+
+def compute_anti_ban_delay(text: str) -> float:
+    """Human-like delay before sending ``text``: 0.1s per character, capped at 2min.
+
+    The random base delay is only added without the send governor; with it the
+    session rate is bounded by the token bucket instead of a fixed sleep.
+    """
+    base_delay = 0.0
+    if not settings.WAHA_SEND_GOVERNOR_ENABLED:
+        base_delay = random.uniform(settings.WAHA_MIN_DELAY_SECONDS, settings.WAHA_MAX_DELAY_SECONDS)
+    return min(base_delay + len(text) * ANTI_BAN_SECONDS_PER_CHAR, ANTI_BAN_MAX_DELAY_SECONDS)
+
 
 class WAHAClient:
     """Async HTTP client for WAHA API with anti-ban features."""
@@ -28,18 +48,21 @@ class WAHAClient:
         self,
         base_url: str | None = None,
         api_key: str | None = None,
-        timeout: int = 30,
+        timeout: float | None = None,
     ):
         """Initialize WAHA client.
 
         Args:
             base_url: WAHA API base URL (default from settings)
             api_key: API key for authentication (default from settings)
-            timeout: Request timeout in seconds
+            timeout: Request timeout in seconds for every call (default: per endpoint class,
+                see transport.get_policies)
         """
         self.base_url = (base_url or settings.WAHA_URL).rstrip("/")
         self.api_key = api_key or settings.WAHA_API_KEY
         self.timeout = timeout
+        # Timeouts, retries and circuit breaker (shared by every client of this WAHA URL)
+        self.transport = get_waha_transport(self.base_url)
         self._client: httpx.AsyncClient | None = None
 
     async def __aenter__(self):
@@ -52,24 +75,21 @@ class WAHAClient:
         await self.close()
 
     async def _ensure_client(self):
-        """Ensure HTTP client is initialized."""
-        if self._client is None:
-            headers = {"Content-Type": "application/json"}
-            if self.api_key:
-                headers["X-Api-Key"] = self.api_key
-
-            self._client = httpx.AsyncClient(
-                base_url=self.base_url,
-                headers=headers,
-                timeout=self.timeout,
-                follow_redirects=True,
-            )
+        """Ensure the HTTP client of the running event loop is initialized.
+
+        The pool is shared by every WAHAClient of this URL in the process (one
+        per event loop, see core.http_clients), so connections survive across
+        jobs and client instances.
+        """
+        headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            headers["X-Api-Key"] = self.api_key
+        # Timeouts come from the transport (per endpoint class)
+        self._client = get_http_clients().async_client(self.base_url, headers=headers, timeout=None, name="waha_http")
 
     async def close(self):
-        """Close HTTP client connection."""
-        if self._client:
-            await self._client.aclose()
-            self._client = None
+        """Release the HTTP client (the shared pool stays open for other users)."""
+        self._client = None
 
     async def _request(
         self,
@@ -88,14 +108,17 @@ class WAHAClient:
             Response JSON as dict
 
         Raises:
-            ExternalServiceError: On HTTP errors or timeouts
+            WAHACircuitOpenError: WAHA is down (circuit open), nothing was sent
+            ExternalServiceError: On HTTP errors or timeouts (after the transport retries)
         """
         await self._ensure_client()
         if settings.DEV_MODE and settings.WAHA_MOCK_REQUESTS:
             return self._mock_request(method, endpoint, **kwargs)
 
         try:
-            response = await self._client.request(method, endpoint, **kwargs)
+            response = await self.transport.request(
+                self._client, method, endpoint, timeout=self.timeout, **kwargs
+            )
             response.raise_for_status()
 
             # Handle empty responses (204 No Content)
@@ -119,13 +142,17 @@ class WAHAClient:
             ) from e
 
         except httpx.TimeoutException as e:
+            endpoint_class = classify(method, endpoint)
             logger.error(
                 "WAHA timeout on %s %s",
                 method,
                 endpoint,
-                extra={"timeout": self.timeout},
+                extra={"endpoint_class": endpoint_class.value, "timeout": self.timeout},
             )
-            raise WAHAError(f"WAHA timeout after {self.timeout}s", original_error=e) from e
+            raise WAHAError(f"WAHA timeout on {endpoint_class.value} request", original_error=e) from e
+
+        except WAHAError:
+            raise
 
         except Exception as e:  # noqa: BLE001 (blind exception)
             logger.error(
@@ -427,6 +454,7 @@ class WAHAClient:
         link_preview: bool | None = None,
         link_preview_high_quality: bool | None = None,
         mentions: list[str] | None = None,
+        max_send_wait: float | None = None,
     ) -> dict[str, Any]:
         """Send text message with optional anti-ban delays.
 
@@ -446,10 +474,14 @@ class WAHAClient:
             link_preview: Enable/disable link preview generation
             link_preview_high_quality: Enable high-quality link preview
             mentions: List of chat IDs to mention (e.g., ['5511999999999@c.us'] or ['all'])
+            max_send_wait: Longest wait for the send governor (default WAHA_SEND_MAX_WAIT_SECONDS)
 
         Returns:
             Sent message data
 
+        Raises:
+            WAHASendThrottledError: No send slot within ``max_send_wait`` (nothing sent)
+
         Docs: POST /api/sendText
         """
         text = enforce_whatsapp_style(text)
@@ -467,6 +499,7 @@ class WAHAClient:
         if mentions:
             payload["mentions"] = mentions
 
+        await self._acquire_send_slot(session, chat_id, max_wait=max_send_wait)
         logger.info("[INFO] Sending text to %s: %s...", chat_id, text[:50])
         return await self._request("POST", "/api/sendText", json=payload)
 
@@ -474,22 +507,24 @@ class WAHAClient:
         self,
         session: str,
         chat_id: str,
-        file_url: str,
+        file_url: str | None = None,
         filename: str | None = None,
         mimetype: str = "image/jpeg",
         caption: str | None = None,
         apply_anti_ban: bool = True,
+        file_data: str | None = None,
     ) -> dict[str, Any]:
         """Send image message.
 
         Args:
             session: Session name
             chat_id: Recipient chat ID
-            file_url: Image URL or base64
+            file_url: Image URL
             filename: Optional filename (e.g., 'image.jpg')
             mimetype: MIME type (default image/jpeg)
             caption: Optional caption text
             apply_anti_ban: Apply anti-ban delays
+            file_data: Base64 encoded image (instead of file_url)
 
         Returns:
             Sent message data
@@ -499,12 +534,17 @@ class WAHAClient:
         if apply_anti_ban:
             await self._apply_anti_ban_flow(session, chat_id, caption or "image")
 
-        payload = {"session": session, "chatId": chat_id, "file": {"url": file_url, "mimetype": mimetype}}
+        payload = {"session": session, "chatId": chat_id, "file": {"mimetype": mimetype}}
+        if file_url:
+            payload["file"]["url"] = file_url
+        elif file_data:
+            payload["file"]["data"] = file_data
         if filename:
             payload["file"]["filename"] = filename
         if caption:
             payload["caption"] = caption
 
+        await self._acquire_send_slot(session, chat_id)
         logger.info("[INFO] Sending image to %s", chat_id)
         return await self._request("POST", "/api/sendImage", json=payload)
 
@@ -512,10 +552,11 @@ class WAHAClient:
         self,
         session: str,
         chat_id: str,
-        file_url: str,
+        file_url: str | None = None,
         filename: str | None = None,
         mimetype: str | None = None,
         caption: str | None = None,
+        file_data: str | None = None,
     ) -> dict[str, Any]:
         """Send file/document message.
 
@@ -526,13 +567,18 @@ class WAHAClient:
             filename: Optional filename
             mimetype: Optional MIME type (e.g., 'application/pdf')
             caption: Optional caption
+            file_data: Base64 encoded file (instead of file_url)
 
         Returns:
             Sent message data
 
         Docs: POST /api/sendFile
         """
-        payload = {"session": session, "chatId": chat_id, "file": {"url": file_url}}
+        payload = {"session": session, "chatId": chat_id, "file": {}}
+        if file_url:
+            payload["file"]["url"] = file_url
+        elif file_data:
+            payload["file"]["data"] = file_data
         if filename:
             payload["file"]["filename"] = filename
         if mimetype:
@@ -540,6 +586,7 @@ class WAHAClient:
         if caption:
             payload["caption"] = caption
 
+        await self._acquire_send_slot(session, chat_id)
         logger.info("[INFO] Sending file to %s: %s", chat_id, filename)
         return await self._request("POST", "/api/sendFile", json=payload)
 
@@ -603,19 +650,13 @@ class WAHAClient:
             await self.start_typing(session, chat_id)
 
             # Calculate human-like delay based on message length
-            # Base: from settings, +0.1s per character (simulate reading/typing)
-            base_delay = random.uniform(
-                settings.WAHA_MIN_DELAY_SECONDS,
-                settings.WAHA_MAX_DELAY_SECONDS
-            )
-            typing_delay = len(text) * 0.1
-            total_delay = min(base_delay + typing_delay, 120)  # Max 2min
+            total_delay = compute_anti_ban_delay(text)
 
             logger.info("Anti-ban delay: %.1fs for %s chars", total_delay, len(text))
 
             # Sleep in intervals with heartbeat pings to keep session alive
             # Ping every 10 seconds to prevent session timeout
-            heartbeat_interval = 10
+            heartbeat_interval = SESSION_HEARTBEAT_SECONDS
             elapsed = 0.0
 
             while elapsed < total_delay:
@@ -639,6 +680,36 @@ class WAHAClient:
             # Don't fail message sending if anti-ban flow fails
             logger.warning("[WARNING] Anti-ban flow error (non-critical): %s", e)
 
+    async def _acquire_send_slot(self, session: str, chat_id: str, max_wait: float | None = None) -> None:
+        """Wait for the session's send governor (token bucket + per-recipient spacing).
+
+        Raises:
+            WAHASendThrottledError: No slot within ``max_wait`` / WAHA_SEND_MAX_WAIT_SECONDS
+                (nothing sent; ``retry_after`` is when the slot would be free)
+        """
+        if not settings.WAHA_SEND_GOVERNOR_ENABLED or (settings.DEV_MODE and settings.WAHA_MOCK_REQUESTS):
+            return
+
+        slot = await asyncio.to_thread(get_send_governor().reserve, session, chat_id, None, max_wait)
+        if not slot.reserved:
+            runtime_metrics.incr("waha_send_governor", "throttled")
+            raise WAHASendThrottledError(
+                f"Send rate limit reached for session {session}: next slot in {slot.wait_seconds:.0f}s",
+                retry_after=slot.wait_seconds,
+            )
+
+        runtime_metrics.incr("waha_send_governor", "acquired")
+        if slot.wait_seconds > 0:
+            runtime_metrics.incr("waha_send_governor", "waited")
+            runtime_metrics.incr("waha_send_governor", "wait_ms", int(slot.wait_seconds * 1000))
+            logger.info(
+                "[ANTI-BAN] Send governor: aguardando %.1fs (session=%s, chat_id=%s)",
+                slot.wait_seconds,
+                session,
+                chat_id,
+            )
+            await asyncio.sleep(slot.wait_seconds)
+
     # ========================================================================
     # MESSAGE MANAGEMENT
     # ========================================================================
@@ -882,6 +953,7 @@ class WAHAClient:
         if convert:
             payload["convert"] = convert
 
+        await self._acquire_send_slot(session, chat_id)
         logger.info("[INFO] Sending voice to %s", chat_id)
         return await self._request("POST", "/api/sendVoice", json=payload)
 
@@ -1448,6 +1520,20 @@ class WAHAClient:
         response = await self._request("GET", f"/api/{session}/lids", params=params)
         return response if isinstance(response, list) else []
 
+    async def get_lids_count(self, session: str) -> int:
+        """Get the number of known LID mappings.
+
+        Args:
+            session: Session name
+
+        Returns:
+            Number of mappings get_all_lids would list
+
+        Docs: GET /api/{session}/lids/count
+        """
+        response = await self._request("GET", f"/api/{session}/lids/count")
+        return int(response.get("count", 0)) if isinstance(response, dict) else 0
+
     async def update_contact(
         self,
         session: str,
@@ -1669,7 +1755,9 @@ class WAHAClient:
             payload["data"] = file_data
 
         logger.info("Converting voice to opus format")
-        return await self._request("POST", f"/api/{session}/media/convert/voice", json=payload)
+        return await self._request(
+            "POST", f"/api/{session}/media/convert/voice", json=payload, headers={"Accept": "application/json"}
+        )
 
     async def convert_video_to_mp4(
         self,
@@ -1696,7 +1784,9 @@ class WAHAClient:
             payload["data"] = file_data
 
         logger.info("Converting video to mp4 format")
-        return await self._request("POST", f"/api/{session}/media/convert/video", json=payload)
+        return await self._request(
+            "POST", f"/api/{session}/media/convert/video", json=payload, headers={"Accept": "application/json"}
+        )
 
     # ========================================================================
     # SERVER OBSERVABILITY
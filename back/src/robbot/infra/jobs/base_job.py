@@ -10,6 +10,8 @@ from datetime import UTC, datetime
 from typing import Any
 
 from robbot.config.settings import settings
+from robbot.core import runtime_metrics
+from robbot.infra.redis.client import get_redis_client
 
 logger = logging.getLogger(__name__)
 
@@ -149,6 +151,16 @@ class BaseJob(ABC):
             return self._handle_failure_error(e)
         except Exception as e:  # noqa: BLE001 (blind exception)
             return self._handle_unexpected_error(e)
+        finally:
+            self._publish_runtime_metrics()
+
+    @staticmethod
+    def _publish_runtime_metrics() -> None:
+        """Compartilhar contadores de reuso de conexões deste processo (no máximo a cada 10s)."""
+        try:
+            runtime_metrics.maybe_publish(get_redis_client())
+        except Exception as e:  # noqa: BLE001 (blind exception)
+            logger.debug("Falha ao publicar métricas de runtime: %s", e)
 
     def _handle_retryable_error(self, error: JobRetryableError) -> None:
         """Tratar erro recuperável (retentável)."""
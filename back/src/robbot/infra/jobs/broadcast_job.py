@@ -0,0 +1,252 @@
+"""
+Jobs de broadcast (campanhas e reengajamento) na lane batch.
+
+- ``start_broadcast_job``: resolve a audiência (uma vez) e dispara os envios
+- ``send_broadcast_batch_job``: reivindica um lote de destinatários, envia e
+  enfileira o próximo lote
+
+Cada broadcast é drenado por BROADCAST_PARALLEL_JOBS cadeias de jobs (limitadas
+pela concorrência da lane batch); os lotes são reivindicados com
+``FOR UPDATE SKIP LOCKED``, então workers diferentes nunca enviam para o mesmo
+destinatário. Cada job carrega o ``send_epoch`` do broadcast e para quando o
+epoch muda (``resume`` enfileira cadeias novas), então pausar e retomar nunca
+deixa mais de BROADCAST_PARALLEL_JOBS cadeias vivas. O ritmo é dado pelo send governor da sessão WAHA (o mesmo que as
+respostas do bot usam), não por sleeps: quando o governor ou o circuit breaker
+recusam o envio, o destinatário volta para PENDING e o próximo lote espera
+BROADCAST_THROTTLE_BACKOFF_SECONDS.
+"""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+from robbot.config.settings import settings
+from robbot.core.async_runtime import run_sync
+from robbot.core.custom_exceptions import WAHACircuitOpenError, WAHASendThrottledError
+from robbot.domain.shared.enums import (
+    BroadcastRecipientStatus,
+    BroadcastStatus,
+    ConversationStatus,
+    DeliveryStatus,
+    MessageDirection,
+)
+from robbot.infra.db.session import get_sync_session
+from robbot.infra.integrations.waha.waha_client import WAHAClient, get_waha_client
+from robbot.infra.jobs.base_job import BaseJob
+from robbot.infra.persistence.models.broadcast_model import BroadcastModel
+from robbot.infra.persistence.models.conversation_message_model import ConversationMessageModel
+from robbot.infra.persistence.repositories.broadcast_repository import BroadcastRepository
+from robbot.infra.persistence.repositories.conversation_repository import ConversationRepository
+from robbot.services.communication.broadcast_service import BroadcastService
+from robbot.services.communication.outbox_relay import sent_message_id
+
+logger = logging.getLogger(__name__)
+
+
+def start_broadcast_job(broadcast_id: str, **kwargs) -> dict[str, Any]:
+    """Module-level function for RQ: resolve the audience and start sending."""
+    return StartBroadcastJob(broadcast_id, **kwargs).run()
+
+
+def send_broadcast_batch_job(broadcast_id: str, **kwargs) -> dict[str, Any]:
+    """Module-level function for RQ: send one chunk of a broadcast."""
+    return BroadcastSendJob(broadcast_id, **kwargs).run()
+
+
+def _base_job_kwargs(kwargs: dict[str, Any]) -> dict[str, Any]:
+    # Filter out RQ-specific kwargs that BaseJob doesn't accept
+    return {key: kwargs[key] for key in ("job_id", "attempt", "metadata") if key in kwargs}
+
+
+@dataclass(frozen=True)
+class BroadcastTarget:
+    """Detached copy of a claimed recipient (the claim session is already closed)."""
+
+    id: str
+    conversation_id: str | None
+    chat_id: str
+    phone_number: str | None
+    text: str
+    attempts: int
+
+
+class StartBroadcastJob(BaseJob):
+    """Materializa os destinatários de um broadcast agendado e dispara as cadeias de envio."""
+
+    def __init__(self, broadcast_id: str, **kwargs):
+        super().__init__(**_base_job_kwargs(kwargs))
+        self.broadcast_id = broadcast_id
+        self.metadata["broadcast_id"] = broadcast_id
+
+    def execute(self) -> dict[str, Any]:
+        with get_sync_session() as session:
+            service = BroadcastService(session)
+            recipients = service.start(self.broadcast_id)
+            if recipients:
+                service.enqueue_send_jobs(self.broadcast_id, service.get(self.broadcast_id).send_epoch)
+        return {"status": "started" if recipients else "skipped", "recipients": recipients}
+
+
+class BroadcastSendJob(BaseJob):
+    """Envia um lote de destinatários de um broadcast e enfileira o próximo."""
+
+    def __init__(self, broadcast_id: str, epoch: int = 0, waha_client: WAHAClient | None = None, **kwargs):
+        super().__init__(**_base_job_kwargs(kwargs))
+        self.broadcast_id = broadcast_id
+        self.epoch = epoch
+        self.waha_client = waha_client or get_waha_client()
+        self.metadata["broadcast_id"] = broadcast_id
+        self.session_name = "default"
+        self.status_after: ConversationStatus | None = None
+
+    def execute(self) -> dict[str, Any]:
+        targets = self.claim()
+        if targets is None:
+            return {"status": "stopped"}
+
+        outcomes: list[str] = []
+        if targets:
+            outcomes = run_sync(self._send_all(targets))
+
+        stats = {outcome: outcomes.count(outcome) for outcome in set(outcomes)}
+        self._schedule_next(claimed=len(targets), throttled="throttled" in stats)
+        logger.info(
+            "[BROADCAST] Lote enviado (id=%s): %s",
+            self.broadcast_id,
+            stats or "nada a enviar",
+            extra=self._log_context(),
+        )
+        return {"status": "sent", **stats}
+
+    def claim(self) -> list[BroadcastTarget] | None:
+        """Claim the next chunk; None when the broadcast is not RUNNING (or this chain is stale)."""
+        with get_sync_session() as session:
+            broadcast = BroadcastRepository(session).get_by_id(self.broadcast_id)
+            if not self._is_current(broadcast):
+                return None
+            self.session_name = broadcast.session_name
+            self.status_after = broadcast.conversation_status_after
+
+            rows = BroadcastRepository(session).claim_recipients(
+                self.broadcast_id, settings.BROADCAST_CHUNK_SIZE, settings.BROADCAST_CLAIM_LEASE_SECONDS
+            )
+            targets = [
+                BroadcastTarget(
+                    id=row.id,
+                    conversation_id=row.conversation_id,
+                    chat_id=row.chat_id,
+                    phone_number=row.phone_number,
+                    text=row.text,
+                    attempts=row.attempts,
+                )
+                for row in rows
+            ]
+            session.commit()
+        return targets
+
+    async def _send_all(self, targets: list[BroadcastTarget]) -> list[str]:
+        semaphore = asyncio.Semaphore(max(1, settings.BROADCAST_SEND_CONCURRENCY))
+        return await asyncio.gather(*(self._send(target, semaphore) for target in targets))
+
+    async def _send(self, target: BroadcastTarget, semaphore: asyncio.Semaphore) -> str:
+        async with semaphore:
+            if not await asyncio.to_thread(self._is_running):
+                await asyncio.to_thread(self._release, target, None)
+                return "paused"
+            try:
+                # Sem anti-ban aleatório quando o send governor dá o ritmo da sessão
+                result = await self.waha_client.send_text(
+                    session=self.session_name,
+                    chat_id=target.chat_id,
+                    text=target.text,
+                    apply_anti_ban=not settings.WAHA_SEND_GOVERNOR_ENABLED,
+                )
+            except (WAHASendThrottledError, WAHACircuitOpenError) as e:
+                await asyncio.to_thread(self._release, target, str(e))
+                return "throttled"
+            except Exception as e:  # noqa: BLE001 (blind exception)
+                return await asyncio.to_thread(self._fail, target, e)
+
+            await asyncio.to_thread(self._record_sent, target, sent_message_id(result))
+            return "sent"
+
+    def _is_current(self, broadcast: BroadcastModel | None) -> bool:
+        """RUNNING and still in this job's epoch (resume started newer chains otherwise)."""
+        return (
+            broadcast is not None
+            and broadcast.status == BroadcastStatus.RUNNING
+            and broadcast.send_epoch == self.epoch
+        )
+
+    def _is_running(self) -> bool:
+        with get_sync_session() as session:
+            return self._is_current(BroadcastRepository(session).get_by_id(self.broadcast_id))
+
+    def _release(self, target: BroadcastTarget, reason: str | None) -> None:
+        """Back to PENDING without spending an attempt (nothing was sent)."""
+        with get_sync_session() as session:
+            BroadcastRepository(session).mark_recipient(
+                target.id, BroadcastRecipientStatus.PENDING, error=reason, count_attempt=False
+            )
+            session.commit()
+
+    def _fail(self, target: BroadcastTarget, error: Exception) -> str:
+        final = target.attempts >= settings.BROADCAST_MAX_ATTEMPTS
+        status = BroadcastRecipientStatus.FAILED if final else BroadcastRecipientStatus.PENDING
+        with get_sync_session() as session:
+            BroadcastRepository(session).mark_recipient(target.id, status, error=str(error)[:500])
+            session.commit()
+        logger.warning(
+            "[BROADCAST] Falha no envio (chat_id=%s, tentativa %d): %s",
+            target.chat_id,
+            target.attempts,
+            error,
+            extra={"broadcast_id": self.broadcast_id, "chat_id": target.chat_id},
+        )
+        return "failed" if final else "retry"
+
+    def _record_sent(self, target: BroadcastTarget, waha_message_id: str | None) -> None:
+        """Mark the recipient SENT and record the message in the conversation (one transaction)."""
+        with get_sync_session() as session:
+            BroadcastRepository(session).mark_recipient(
+                target.id, BroadcastRecipientStatus.SENT, waha_message_id=waha_message_id
+            )
+            if target.conversation_id:
+                now = datetime.utcnow()
+                session.add(
+                    ConversationMessageModel(
+                        conversation_id=target.conversation_id,
+                        direction=MessageDirection.OUTBOUND,
+                        from_phone="BOT",
+                        to_phone=target.phone_number or target.chat_id.split("@")[0],
+                        body=target.text,
+                        chat_id=target.chat_id,
+                        session_name=self.session_name,
+                        delivery_status=DeliveryStatus.SENT,
+                        sent_at=now,
+                        waha_message_id=waha_message_id,
+                    )
+                )
+                if self.status_after is not None:
+                    ConversationRepository(session).update_status(target.conversation_id, self.status_after)
+            session.commit()
+
+    def _schedule_next(self, claimed: int, throttled: bool) -> None:
+        """Keep this job chain going while the broadcast has recipients left."""
+        with get_sync_session() as session:
+            service = BroadcastService(session)
+            broadcast = service.repo.get_by_id(self.broadcast_id)
+            if not self._is_current(broadcast):
+                return
+            if service.complete_if_done(self.broadcast_id):
+                return
+            if throttled:
+                delay = settings.BROADCAST_THROTTLE_BACKOFF_SECONDS
+            elif claimed:
+                delay = 0
+            else:
+                # Só restam destinatários presos em SENDING (de outra cadeia ou de um worker que caiu)
+                delay = settings.BROADCAST_CLAIM_LEASE_SECONDS
+            service.queue_service.enqueue_broadcast_send(self.broadcast_id, delay, epoch=self.epoch)
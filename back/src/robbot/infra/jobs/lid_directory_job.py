@@ -0,0 +1,50 @@
+"""
+Job de sincronização do diretório LID <-> telefone (lane control).
+
+Enfileirado pelo líder do polling na partida e a cada
+LID_DIRECTORY_REFRESH_SECONDS: sync delta, ou completo quando o último passou
+de LID_DIRECTORY_FULL_SYNC_SECONDS (ver services.communication.lid_directory).
+"""
+
+import logging
+from typing import Any
+
+from robbot.config.settings import settings
+from robbot.core.async_runtime import run_sync
+from robbot.core.custom_exceptions import WAHAError
+from robbot.infra.integrations.waha.waha_client import WAHAClient, get_waha_client
+from robbot.infra.jobs.base_job import BaseJob, JobRetryableError
+from robbot.services.communication.lid_directory import LidDirectory
+
+logger = logging.getLogger(__name__)
+
+LID_DIRECTORY_JOB_PATH = "robbot.infra.jobs.lid_directory_job.sync_lid_directory"
+
+
+def sync_lid_directory(full: bool | None = None, **kwargs) -> dict[str, Any]:
+    """Module-level function for RQ: refresh the LID directory."""
+    return LidDirectorySyncJob(full=full, **kwargs).run()
+
+
+class LidDirectorySyncJob(BaseJob):
+    """Copia a listagem de LIDs do WAHA para o diretório em Redis."""
+
+    def __init__(
+        self,
+        full: bool | None = None,
+        directory: LidDirectory | None = None,
+        waha_client: WAHAClient | None = None,
+        **kwargs,
+    ):
+        super().__init__(**{key: kwargs[key] for key in ("job_id", "attempt", "metadata") if key in kwargs})
+        self.directory = directory or LidDirectory()
+        self.waha_client = waha_client or get_waha_client()
+        # None: completo só quando vencido
+        self.full = self.directory.full_sync_due() if full is None else full
+        self.metadata["full"] = self.full
+
+    def execute(self) -> dict[str, Any]:
+        try:
+            return run_sync(self.directory.sync(self.waha_client, settings.WAHA_SESSION_NAME, full=self.full))
+        except WAHAError as e:
+            raise JobRetryableError(f"Listagem de LIDs indisponível: {e}") from e
@@ -0,0 +1,95 @@
+"""
+Job de resolução de LIDs em segundo plano (lane control).
+
+Enfileirado pelo líder do polling a cada LID_RESOLUTION_INTERVAL_SECONDS quando
+há LIDs vencidos no conjunto de trabalho (ver services.leads.lid_work_set):
+reivindica um lote, resolve pelo diretório/cache e, para o resto, no WAHA a no
+máximo LID_RESOLUTION_RATE_PER_SECOND consultas por segundo, e troca o telefone
+provisório (LID) de leads e conversas com um UPDATE em lote por tabela.
+"""
+
+import logging
+import time
+from typing import Any
+
+from robbot.config.settings import settings
+from robbot.core import runtime_metrics
+from robbot.core.async_runtime import run_sync
+from robbot.infra.db.session import get_sync_session
+from robbot.infra.jobs.base_job import BaseJob
+from robbot.infra.persistence.repositories.conversation_repository import ConversationRepository
+from robbot.infra.persistence.repositories.lead_repository import LeadRepository
+from robbot.services.leads.lid_resolver_service import LIDResolverService, get_lid_resolver
+from robbot.services.leads.lid_work_set import LidWorkSet
+
+logger = logging.getLogger(__name__)
+
+LID_RESOLUTION_JOB_PATH = "robbot.infra.jobs.lid_resolution_job.resolve_pending_lids"
+
+
+def resolve_pending_lids(**kwargs) -> dict[str, Any]:
+    """Module-level function for RQ: resolve one batch of queued LIDs."""
+    return LidResolutionJob(**kwargs).run()
+
+
+class LidResolutionJob(BaseJob):
+    """Resolve um lote do conjunto de trabalho e atualiza leads e conversas em lote."""
+
+    def __init__(
+        self,
+        work_set: LidWorkSet | None = None,
+        resolver: LIDResolverService | None = None,
+        **kwargs,
+    ):
+        super().__init__(**{key: kwargs[key] for key in ("job_id", "attempt", "metadata") if key in kwargs})
+        self.work_set = work_set or LidWorkSet()
+        self.resolver = resolver or get_lid_resolver()
+
+    def execute(self) -> dict[str, Any]:
+        lids = self.work_set.claim(settings.LID_RESOLUTION_BATCH_SIZE)
+        if not lids:
+            return {"status": "idle"}
+
+        started = time.time()
+        results = run_sync(
+            self.resolver.resolve_batch(lids, budget_seconds=settings.LID_RESOLUTION_INTERVAL_SECONDS)
+        )
+        resolved = {lid: phone for lid, phone in results.items() if phone and phone != lid}
+        failed = [lid for lid, phone in results.items() if lid not in resolved]
+        untried = [lid for lid in lids if lid not in results]
+
+        leads = conversations = 0
+        if resolved:
+            with get_sync_session() as session:
+                leads = LeadRepository(session).replace_phone_numbers(resolved)
+                conversations = ConversationRepository(session).replace_phone_numbers(resolved)
+                session.commit()
+
+        self.work_set.complete(list(resolved))
+        dropped = self.work_set.retry(failed)
+        self.work_set.release(untried)
+
+        runtime_metrics.incr("lid_resolution", "batch_resolved", len(resolved))
+        runtime_metrics.incr("lid_resolution", "batch_failed", len(failed))
+        logger.info(
+            "[LID RESOLUTION] Lote: %d LIDs, %d resolvidos (%d leads, %d conversas), %d falharam, "
+            "%d descartados, %d adiados (%.1fs)",
+            len(lids),
+            len(resolved),
+            leads,
+            conversations,
+            len(failed),
+            len(dropped),
+            len(untried),
+            time.time() - started,
+        )
+        return {
+            "status": "processed",
+            "claimed": len(lids),
+            "resolved": len(resolved),
+            "failed": len(failed),
+            "dropped": len(dropped),
+            "deferred": len(untried),
+            "leads_updated": leads,
+            "conversations_updated": conversations,
+        }
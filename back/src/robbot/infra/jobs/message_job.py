@@ -3,7 +3,6 @@ Job para processar mensagens recebidas/enviadas via WAHA.
 """
 
 import asyncio
-import json
 import logging
 import time
 from typing import Any
@@ -12,9 +11,10 @@ from robbot.infra.persistence.repositories.conversation_message_repository impor
     ConversationMessageRepository,
 )
 from robbot.config.settings import settings
+from robbot.core.async_runtime import run_sync
 from robbot.infra.db.session import get_sync_session
 from robbot.infra.jobs.base_job import BaseJob, JobRetryableError
-from robbot.infra.redis.client import get_redis_client
+from robbot.infra.redis.debounce import DebounceBuffer
 
 logger = logging.getLogger(__name__)
 
@@ -40,48 +40,58 @@ def process_message_job(
     return job.run()
 
 
+async def process_message_job_async(
+    message_data: dict[str, Any],
+    message_direction: str = "inbound",
+    conversation_id: str | None = None,
+    user_id: str | None = None,
+    **kwargs,
+) -> dict[str, Any]:
+    """
+    Async entry point used by the conversation worker (one long-lived event loop).
+
+    Runs the job body directly on the caller's loop: no run_sync hop per message
+    and no blocking retry sleeps (the consumer retries failed entries itself).
+    """
+    job = MessageProcessingJob(
+        message_data=message_data,
+        message_direction=message_direction,
+        conversation_id=conversation_id,
+        user_id=user_id,
+        **kwargs,
+    )
+    return await job.execute_async()
+
+
 def process_debounced_message(chat_id: str) -> dict[str, Any]:
     """Process buffered messages for a chat as a single inbound message."""
     if not chat_id:
         return {"status": "skipped", "reason": "missing_chat_id"}
 
-    redis_client = get_redis_client()
-    buffer_key = f"waha:debounce:{chat_id}"
-    job_key = f"waha:debounce:job:{chat_id}"
-
-    raw = redis_client.get(buffer_key)
-    if not raw:
-        redis_client.delete(job_key)
-        return {"status": "empty"}
-
-    try:
-        payload = json.loads(raw)
-    except json.JSONDecodeError:
-        redis_client.delete(buffer_key)
-        redis_client.delete(job_key)
-        return {"status": "error", "reason": "invalid_payload"}
+    batch = DebounceBuffer().drain(chat_id)
 
-    messages = [m for m in payload.get("messages", []) if isinstance(m, str) and m.strip()]
+    messages = [m for m in batch.messages if m.strip()]
     if not messages:
-        redis_client.delete(buffer_key)
-        redis_client.delete(job_key)
         return {"status": "empty"}
 
     combined_text = "\n".join(messages).strip()
-    last_payload = payload.get("last_payload", {})
 
     message_data = {
         "from": chat_id,
         "body": combined_text,
         "timestamp": int(time.time()),
-        "session": last_payload.get("session", "default"),
+        "session": batch.session or "default",
         "type": "text",
         "debounced": True,
         "debounce_window": settings.MESSAGE_DEBOUNCE_SECONDS,
     }
 
-    redis_client.delete(buffer_key)
-    redis_client.delete(job_key)
+    if settings.INGESTION_BACKEND == "streams":
+        # Keep the turn ordered with the chat's other work on its stream partition
+        from robbot.services.infrastructure.queue_service import get_queue_service
+
+        entry = get_queue_service().enqueue_message_processing(message_data=message_data, message_direction="inbound")
+        return {"status": "enqueued", "entry": entry}
 
     return process_message_job(message_data=message_data, message_direction="inbound")
 
@@ -168,10 +178,27 @@ class MessageProcessingJob(BaseJob):
         else:
             return self._persist_outbound_message()
 
+    async def execute_async(self) -> dict[str, Any]:
+        """Same as execute(), awaiting the orchestrator on the running event loop."""
+        logger.info(
+            "Processando mensagem %s para %s",
+            self.message_direction,
+            self.message_data.get("phone") or self.message_data.get("from"),
+            extra=self._log_context(),
+        )
+
+        if self.message_direction == "inbound":
+            return await self._process_inbound_message_async()
+        return await asyncio.to_thread(self._persist_outbound_message)
+
     def _process_inbound_message(self) -> dict[str, Any]:
         """
         Processar mensagem inbound com ConversationOrchestrator.
         """
+        # Persistent loop: HTTP/Redis/LLM connections are reused by the next job
+        return run_sync(self._process_inbound_message_async())
+
+    async def _process_inbound_message_async(self) -> dict[str, Any]:
         try:
             from robbot.services.bot.conversation_orchestrator import get_conversation_orchestrator
 
@@ -202,17 +229,15 @@ class MessageProcessingJob(BaseJob):
                 audio_url = potential_url
 
             # Processar com orchestrator
-            result = asyncio.run(
-                orchestrator.process_inbound_message(
-                    chat_id=chat_id,
-                    phone_number=phone,
-                    message_text=text,
-                    session_name=self.message_data.get("session", "default"),
-                    has_audio=has_audio,
-                    audio_url=audio_url,
-                    has_video=has_video,
-                    video_url=video_url,
-                )
+            result = await orchestrator.process_inbound_message(
+                chat_id=chat_id,
+                phone_number=phone,
+                message_text=text,
+                session_name=self.message_data.get("session", "default"),
+                has_audio=has_audio,
+                audio_url=audio_url,
+                has_video=has_video,
+                video_url=video_url,
             )
 
             logger.info(
@@ -1,18 +1,66 @@
 """Job de Polling do WAHA Refatorado (Clean Architecture)."""
 
+import asyncio
 import logging
+import time
+
+from redis import Redis
 from rq import get_current_job
 
 from robbot.config.settings import get_settings
+from robbot.core import runtime_metrics
+from robbot.core.async_runtime import run_sync
+from robbot.infra.redis.client import get_redis_client
 from robbot.services.infrastructure.queue_service import get_queue_service
-from robbot.services.communication.polling_strategies import get_polling_strategy
+from robbot.services.communication.poll_scheduler import PollScheduler
+from robbot.services.communication.polling_coordinator import PollingCoordinator
+from robbot.services.communication.polling_strategies import PollTarget, get_polling_strategy
+from robbot.services.communication.polling_watermarks import PollingWatermarks, Watermark
 from robbot.services.communication.waha_metadata_service import WahaMetadataService
 from robbot.services.communication.message_filter_service import MessageFilterService
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
 
-def poll_waha_messages(**_kwargs):
+POLLING_JOB_PATH = "robbot.infra.jobs.message_polling_job.poll_waha_messages"
+POLLING_JOB_TIMEOUT = 120
+# Um ciclo por vez (por réplica): o polling worker reserva a vaga ao enfileirar e o job a libera ao terminar
+POLLING_INFLIGHT_KEY = "waha:polling:inflight"
+
+# KEYS: inflight | ARGV: job id
+_RELEASE_INFLIGHT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+# Duração do último ciclo deste processo (gauges em GET /api/v1/metrics/runtime)
+_last_cycle: dict[str, int] = {}
+
+
+def _cycle_gauges() -> dict[str, dict[str, int]]:
+    return {"waha_polling": dict(_last_cycle)} if _last_cycle else {}
+
+
+runtime_metrics.register_gauges(_cycle_gauges)
+
+
+def _inflight_key(shard: str | None) -> str:
+    return f"{POLLING_INFLIGHT_KEY}:{shard}" if shard else POLLING_INFLIGHT_KEY
+
+
+def acquire_inflight(redis_client: Redis, job_id: str, shard: str | None = None) -> bool:
+    """Reserva a vaga de ciclo para ``job_id`` (False se o ciclo anterior ainda está rodando)."""
+    return bool(redis_client.set(_inflight_key(shard), job_id, nx=True, ex=POLLING_JOB_TIMEOUT + 5))
+
+
+def release_inflight(redis_client: Redis, job_id: str, shard: str | None = None) -> None:
+    """Libera a vaga, se ainda pertence a ``job_id``."""
+    redis_client.eval(_RELEASE_INFLIGHT, 1, _inflight_key(shard), job_id)
+
+
+def poll_waha_messages(shard: str | None = None, **_kwargs):
     """
     Job otimizado para buscar mensagens do WAHA.
     
@@ -20,9 +68,12 @@ def poll_waha_messages(**_kwargs):
     - Strategy Pattern: Define alvos (DEV=Lista Fixa + Cache, PROD=Todos os Chats)
     - Metadata Service: Resolve LIDs com Cache Redis (Zero HTTP redundante)
     - Message Filter: Centraliza validação de regras de negócio e deduplicação
+    - Watermarks: Polling incremental (chats sem mensagem nova não geram chamada ao WAHA)
+    - Poll Scheduler: chats sem informação do overview seguem agenda adaptativa (backoff)
+    - Shard: com várias réplicas do polling worker, só os chats que o anel atribui a ``shard``
     """
     job = get_current_job()
-    job_id = job.id if job else "no-job"
+    started = time.perf_counter()
 
     # Logger com contexto reduzido para evitar spam, foca no ciclo macro
     # logger.debug("[POLLING] Iniciando ciclo...") 
@@ -33,90 +84,95 @@ def poll_waha_messages(**_kwargs):
         strategy = get_polling_strategy()
         message_filter = MessageFilterService()
         queue_service = get_queue_service()
+        watermarks = PollingWatermarks()
+        scheduler = PollScheduler()
+
+        # 2. Definir alvos (Chats/LIDs) com a última mensagem conhecida pelo WAHA
+        ring = None
+        if shard:
+            ring = PollingCoordinator(replica=shard).current_ring()
+            if ring is None or not ring.includes(shard):
+                # Réplica saiu do anel (morta ou rebalanceada) depois de enfileirar
+                logger.info("[POLLING] Réplica %s fora do anel de polling, ciclo ignorado", shard)
+                return {"status": "skipped", "processed": 0, "skipped": 0}
 
-        # 2. Definir alvos (Chats/LIDs)
-        target_chats = strategy.get_target_chats()
+        targets = strategy.get_targets()
+        if ring is not None:
+            targets = [target for target in targets if ring.owns(shard, target.chat_id)]
         
-        if not target_chats:
+        if not targets:
             if settings.DEV_MODE:
                 logger.warning("[POLLING] Sem alvos configurados ou resolvidos em DEV_MODE")
             return
 
-        messages_processed = 0
-        messages_skipped = 0
+        # 3. Watermarks de todos os alvos em um único round trip Redis
+        incremental = settings.WAHA_POLLING_INCREMENTAL
+        known = watermarks.get_many([target.chat_id for target in targets]) if incremental else {}
 
-        # 3. Iterar Chats
-        for chat_id in target_chats:
-            # Busca mensagens (Já trata erros 404/422 internamente no service)
-            # Aumentado limit de 10 -> 50 para evitar perder mensagens se houver muito tráfego
-            messages = metadata_service.get_messages_from_chat(chat_id, limit=50)
-            
-            # Conjunto para evitar logs repetidos de validação por remetente neste ciclo específico
-            cycle_senders_checked = set()
-
-            # 4. Iterate messages
-            # REMOVED reversed() and early break optimization to ensure reliability.
-            # We process all messages in the batch (limit=10) to guarantee no new message is skipped
-            # regardless of the API sort order (New->Old or Old->New).
-            # Performance impact is minimal for small limits.
-            for message in messages:
-                # 4a. Filtragem e Validação (Regras de Negócio)
-                
-                # Otimização de Log: Só logar verificação uma vez por remetente por ciclo
-                sender = message.get("from")
-                if settings.DEV_MODE and sender and sender not in cycle_senders_checked:
-                    cycle_senders_checked.add(sender)
-                    # O filter service fará a validação real abaixo silenciosamente
-                
-                # DEV Mode logic...
-                allowed_senders = None
-                
-                if not message_filter.should_process(message, allowed_senders=allowed_senders):
-                    messages_skipped += 1
-                    # Removed early break to strictly process all messages
-                    continue
-
-                # 5. Processamento (Enfileiramento)
-                try:
-                    message_data = {
-                        "id": message.get("id"),
-                        "from": message.get("from"),
-                        "to": message.get("to"),
-                        "body": message.get("body", ""),
-                        "timestamp": message.get("timestamp", 0),
-                        "hasMedia": message.get("hasMedia", False),
-                        "ack": message.get("ack", 0),
-                        "_data": message.get("_data", {}),
-                    }
-
-                    # Enfileirar
-                    # Nota: Debounce poderia ser aplicado aqui ou no worker. 
-                    # Mantendo lógica original de debounce da fila.
-                    queue_id = queue_service.enqueue_message_processing_debounced(
-                        message_data=message_data,
-                        message_direction="inbound",
-                    )
-                    
-                    # Marcar como processado no Redis para evitar reprocessamento (Deduplicação)
-                    message_filter.mark_as_processed(message_data["id"])
-                    
-                    messages_processed += 1
-                    logger.info(
-                        "[POLLING] Msg processada: %s | Chat: %s | QID: %s", 
-                        message_data["id"], 
-                        message_data['from'], 
-                        queue_id
-                    )
-
-                except Exception as e:
-                    logger.error("[POLLING] Falha ao enfileirar mensagem %s: %s", message.get("id"), e)
+        stats = {"processed": 0, "skipped": 0, "unchanged": 0, "deferred": 0, "timeouts": 0}
+        advanced: dict[str, Watermark] = {}
+
+        changed: list[PollTarget] = []
+        unknown: list[PollTarget] = []
+        for target in targets:
+            watermark = known.get(target.chat_id)
+            if target.last_message is None:
+                # Sem última mensagem (fora do overview ou fallback /chats): a agenda decide
+                unknown.append(target)
+            elif watermark and target.last_message.message_id == watermark.message_id:
+                # Nada novo desde o último ciclo: nem WAHA nem dedup
+                stats["unchanged"] += 1
+            else:
+                changed.append(target)
+
+        if settings.WAHA_POLLING_ADAPTIVE and unknown:
+            due = set(scheduler.due([target.chat_id for target in unknown]))
+            stats["deferred"] = len(unknown) - len(due)
+            unknown = [target for target in unknown if target.chat_id in due]
+        changed.extend(unknown)
+
+        # 4. Buscar os chats alterados em paralelo (limite de concorrência + timeout por chat)
+        fetch_started = time.perf_counter()
+        pages = run_sync(_fetch_pages(metadata_service, changed, known))
+        fetch_ms = int((time.perf_counter() - fetch_started) * 1000)
+
+        # 5. Filtrar, deduplicar e enfileirar chat a chat (Redis, rápido)
+        activity: dict[str, bool] = {}
+        for target in changed:
+            messages, _elapsed_ms = pages[target.chat_id]
+            if messages is None:
+                # Timeout: o watermark não avança e o próximo ciclo tenta de novo
+                stats["timeouts"] += 1
+                continue
+
+            watermark = known.get(target.chat_id)
+            latest = Watermark.newest(messages)
+            activity[target.chat_id] = latest is not None and latest != watermark
+            newest = _process_chat(messages, message_filter, queue_service, stats)
+            if incremental and newest and newest != watermark:
+                advanced[target.chat_id] = newest
+
+        # 6. Avançar watermarks e a agenda (uma escrita cada)
+        watermarks.set_many(advanced)
+        if settings.WAHA_POLLING_ADAPTIVE:
+            scheduler.record(activity)
+
+        messages_processed = stats["processed"]
+        messages_skipped = stats["skipped"]
+        duration_ms = int((time.perf_counter() - started) * 1000)
+        _record_cycle(duration_ms, fetch_ms, [elapsed for _, elapsed in pages.values()], stats)
 
         # Log Final do Ciclo (Sempre para diagnóstico)
         if messages_processed > 0:
             logger.info(
-                "[POLLING] Ciclo concluído. Processadas: %d | Ignoradas: %d",
+                "[POLLING] Ciclo concluído em %dms. Processadas: %d | Ignoradas: %d | Chats sem mudança: %d/%d"
+                " | Adiados: %d",
+                duration_ms,
                 messages_processed,
-                messages_skipped
+                messages_skipped,
+                stats["unchanged"],
+                len(targets),
+                stats["deferred"],
             )
         elif messages_skipped > 0:
             logger.debug(
@@ -124,13 +180,146 @@ def poll_waha_messages(**_kwargs):
                 messages_skipped
             )
         # Se ambos são 0, nenhuma mensagem foi retornada pela API
+        if stats["timeouts"]:
+            logger.warning(
+                "[POLLING] %d/%d chats excederam %.1fs e ficam para o próximo ciclo",
+                stats["timeouts"],
+                len(changed),
+                settings.WAHA_POLLING_CHAT_TIMEOUT_SECONDS,
+            )
             
         return {
             "status": "success",
             "processed": messages_processed,
-            "skipped": messages_skipped
+            "skipped": messages_skipped,
+            "unchanged": stats["unchanged"],
+            "deferred": stats["deferred"],
+            "timeouts": stats["timeouts"],
+            "duration_ms": duration_ms,
         }
 
     except Exception as e:
         logger.error("[POLLING] Erro crítico no job: %s", e, exc_info=True)
         return {"status": "error", "message": str(e)}
+
+    finally:
+        if job:
+            try:
+                redis_client = get_redis_client()
+                release_inflight(redis_client, job.id, shard=shard)
+                runtime_metrics.maybe_publish(redis_client)
+            except Exception as e:
+                logger.warning("[POLLING] Falha ao liberar o ciclo %s: %s", job.id, e)
+
+
+async def _fetch_pages(
+    metadata_service: WahaMetadataService,
+    targets: list[PollTarget],
+    known: dict[str, Watermark],
+) -> dict[str, tuple[list[dict] | None, int]]:
+    """
+    Busca as mensagens de vários chats com concorrência limitada.
+
+    Retorna ``{chat_id: (mensagens, duração em ms)}``; mensagens é None quando
+    o chat excedeu WAHA_POLLING_CHAT_TIMEOUT_SECONDS. O tempo total fica perto
+    do chat mais lento, não da soma de todos.
+    """
+    semaphore = asyncio.Semaphore(max(1, settings.WAHA_POLLING_CONCURRENCY))
+
+    async def fetch(target: PollTarget) -> tuple[list[dict] | None, int]:
+        watermark = known.get(target.chat_id)
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                # Com watermark, só a partir do timestamp dele (inclusive: mensagens do
+                # mesmo segundo voltam e são descartadas pelo dedup)
+                messages = await asyncio.wait_for(
+                    metadata_service.aget_messages_from_chat(
+                        target.chat_id,
+                        limit=settings.WAHA_POLLING_MESSAGE_LIMIT,
+                        since=watermark.timestamp if watermark else None,
+                    ),
+                    timeout=settings.WAHA_POLLING_CHAT_TIMEOUT_SECONDS,
+                )
+            except TimeoutError:
+                logger.debug("[POLLING] Timeout ao buscar mensagens de %s", target.chat_id)
+                messages = None
+            return messages, int((time.perf_counter() - started) * 1000)
+
+    results = await asyncio.gather(*(fetch(target) for target in targets))
+    return {target.chat_id: result for target, result in zip(targets, results, strict=True)}
+
+
+def _record_cycle(duration_ms: int, fetch_ms: int, chat_ms: list[int], stats: dict[str, int]) -> None:
+    """Contadores acumulados e gauges do último ciclo (duração total, fan-out, chat mais lento)."""
+    runtime_metrics.incr("waha_polling", "cycles")
+    runtime_metrics.incr("waha_polling", "cycle_ms", duration_ms)
+    runtime_metrics.incr("waha_polling", "fetch_ms", fetch_ms)
+    runtime_metrics.incr("waha_polling", "chats_fetched", len(chat_ms))
+    runtime_metrics.incr("waha_polling", "chats_unchanged", stats["unchanged"])
+    runtime_metrics.incr("waha_polling", "chats_deferred", stats["deferred"])
+    runtime_metrics.incr("waha_polling", "chat_timeouts", stats["timeouts"])
+    _last_cycle.update(
+        last_cycle_ms=duration_ms,
+        last_fetch_ms=fetch_ms,
+        last_slowest_chat_ms=max(chat_ms, default=0),
+        last_chat_ms_sum=sum(chat_ms),
+        last_chats_fetched=len(chat_ms),
+    )
+
+
+def _process_chat(
+    messages: list[dict],
+    message_filter: MessageFilterService,
+    queue_service,
+    stats: dict[str, int],
+) -> Watermark | None:
+    """
+    Enfileira as mensagens novas de uma página de chat.
+
+    Retorna o novo watermark do chat, ou None quando ele não deve avançar
+    (página vazia ou falha ao enfileirar alguma mensagem).
+    """
+    # Filtragem + deduplicação em lote: um round trip Redis por chat,
+    # com claim atômico (SET NX) para não competir com o webhook
+    new_messages = message_filter.claim_new(messages, allowed_senders=None)
+    stats["skipped"] += len(messages) - len(new_messages)
+
+    all_enqueued = True
+    for message in new_messages:
+        # Processamento (Enfileiramento)
+        try:
+            message_data = {
+                "id": message.get("id"),
+                "from": message.get("from"),
+                "to": message.get("to"),
+                "body": message.get("body", ""),
+                "timestamp": message.get("timestamp", 0),
+                "hasMedia": message.get("hasMedia", False),
+                "ack": message.get("ack", 0),
+                "_data": message.get("_data", {}),
+            }
+
+            # Enfileirar
+            # Nota: Debounce poderia ser aplicado aqui ou no worker. 
+            # Mantendo lógica original de debounce da fila.
+            queue_id = queue_service.enqueue_message_processing_debounced(
+                message_data=message_data,
+                message_direction="inbound",
+            )
+
+            stats["processed"] += 1
+            logger.info(
+                "[POLLING] Msg processada: %s | Chat: %s | QID: %s", 
+                message_data["id"], 
+                message_data['from'], 
+                queue_id
+            )
+
+        except Exception as e:
+            # Liberar o claim para o próximo ciclo tentar de novo (sem avançar o watermark)
+            message_filter.release([message.get("id")])
+            all_enqueued = False
+            logger.error("[POLLING] Falha ao enfileirar mensagem %s: %s", message.get("id"), e)
+
+    return Watermark.newest(messages) if all_enqueued else None
@@ -1,23 +1,23 @@
 """
 Re-engagement Job - Reactivate inactive conversations.
 
-Job automático que:
-1. Detecta conversas inativas (sem mensagem há > 48h)
-2. Envia mensagem automática via WAHA
-3. Atualiza status para AWAITING_RESPONSE
+Job automático que cria um broadcast (preset "reengagement") para:
+1. Conversas ativas com o bot, sem mensagem há > 48h e não urgentes
+2. Mensagem automática enviada pelos workers batch, no ritmo do send governor
+3. Conversa passa para WAITING_SECRETARY após o envio
+
+Disparar o job de novo enquanto um broadcast anterior ainda envia é seguro:
+chats pendentes em outro broadcast aberto ficam fora da nova audiência.
 """
 
-import asyncio
 import logging
-from datetime import UTC, datetime, timedelta
-
-from robbot.infra.integrations.waha.waha_client import WAHAClient
-from robbot.infra.persistence.repositories.conversation_message_repository import ConversationMessageRepository
-from robbot.infra.persistence.repositories.conversation_repository import ConversationRepository
-from robbot.core.custom_exceptions import DatabaseError, JobError, WAHAError
-from robbot.domain.shared.enums import ConversationStatus, MessageDirection
-from robbot.infra.persistence.models.conversation_message_model import ConversationMessageModel as ConversationMessage
+from datetime import UTC, datetime
+
+from robbot.core.custom_exceptions import JobError
+from robbot.domain.shared.enums import ConversationStatus
 from robbot.infra.db.session import SessionLocal
+from robbot.schemas.broadcast import BroadcastAudience, BroadcastCreate
+from robbot.services.communication.broadcast_service import TEMPLATE_PRESETS, BroadcastService
 
 logger = logging.getLogger(__name__)
 
@@ -32,178 +32,49 @@ class ReEngagementJob:
     - Não tem urgência (is_urgent=False)
 
     Ação:
-    - Envia mensagem automática
-    - Atualiza status para AWAITING_RESPONSE
+    - Cria um broadcast com os templates de re-engagement (envio, progresso e
+      status por destinatário ficam com o broadcast)
+    - Após cada envio a conversa vai para WAITING_SECRETARY
     """
 
     # Template de mensagem de re-engagement
-    REENGAGEMENT_TEMPLATES = [
-        "Olá! Notamos que você estava interessado em nossos serviços. Podemos ajudar em algo?",
-        "Oi! Está tudo bem? Ainda tem interesse em conversar conosco?",
-        "Olá! Vimos que você nos procurou recentemente. Gostaria de retomar nossa conversa?",
-    ]
+    REENGAGEMENT_TEMPLATES = TEMPLATE_PRESETS["reengagement"]
 
     INACTIVE_THRESHOLD_HOURS = 48
 
-    def __init__(self):
-        self.waha_client = WAHAClient()
-
     def execute(self) -> dict:
         """
         Executar job de re-engagement.
 
         Returns:
-            Dict com estatísticas:
+            Dict com o broadcast criado:
             {
-                "status": "success",
-                "conversations_found": int,
-                "messages_sent": int,
-                "errors": int
+                "status": "scheduled",
+                "broadcast_id": str
             }
         """
         logger.info("[INFO] Starting re-engagement job")
 
-        stats = {
-            "status": "success",
-            "conversations_found": 0,
-            "messages_sent": 0,
-            "errors": 0,
-        }
+        payload = BroadcastCreate(
+            name=f"Re-engagement {datetime.now(UTC):%Y-%m-%d %H:%M}",
+            preset="reengagement",
+            audience=BroadcastAudience(
+                conversation_statuses=[ConversationStatus.ACTIVE],
+                inactive_for_hours=self.INACTIVE_THRESHOLD_HOURS,
+                exclude_urgent=True,
+            ),
+            conversation_status_after=ConversationStatus.WAITING_SECRETARY,
+        )
 
         try:
             with SessionLocal() as session:
-                # Buscar conversas inativas
-                inactive_conversations = self._find_inactive_conversations(session)
-                stats["conversations_found"] = len(inactive_conversations)
-
-                logger.info(
-                    "[SUCCESS] Encontradas %s conversas inativas",
-                    len(inactive_conversations),
-                )
-
-                # Processar cada conversa
-                for conversation in inactive_conversations:
-                    try:
-                        self._reengage_conversation(session, conversation)
-                        stats["messages_sent"] += 1
-                    except (WAHAError, DatabaseError) as e:
-                        logger.error(
-                            "[ERROR] Erro ao reengajar conversa %s: %s",
-                            conversation.id,
-                            e,
-                        )
-                        stats["errors"] += 1
-
-                session.commit()
-
-                logger.info(
-                    "[SUCCESS] Re-engagement concluído: %s enviadas, %s erros",
-                    stats["messages_sent"],
-                    stats["errors"],
-                )
-
-        except JobError:
-            raise
+                broadcast = BroadcastService(session).create(payload)
         except Exception as e:  # noqa: BLE001 (blind exception)
             logger.error("[ERROR] Fatal error in re-engagement job: %s", e)
-            stats["status"] = "error"
-            stats["error_message"] = str(e)
             raise JobError(job_name="reengagement", message=f"Fatal error: {e}", original_error=e) from e
 
-        return stats
-
-    def _find_inactive_conversations(self, session) -> list:
-        """
-        Buscar conversas inativas (> 48h sem mensagem).
-
-        Critérios:
-        - Status: ACTIVE
-        - is_urgent: False
-        - Última mensagem: > 48h
-        """
-        conv_repo = ConversationRepository(session)
-        msg_repo = ConversationMessageRepository(session)
-
-        # Data limite (48h atrás)
-        cutoff_time = datetime.now(UTC) - timedelta(hours=self.INACTIVE_THRESHOLD_HOURS)
-
-        # Buscar conversas ACTIVE e não urgentes
-        active_conversations = conv_repo.find_by_criteria(
-            {
-                "status": ConversationStatus.ACTIVE,
-                "is_urgent": False,
-            }
-        )
-
-        # Filtrar por última mensagem
-        inactive_conversations = []
-
-        for conv in active_conversations:
-            # Buscar última mensagem da conversa
-            messages = msg_repo.get_by_conversation(conv.id, limit=1)
-
-            if not messages:
-                # Sem mensagens, pular
-                continue
-
-            last_message = messages[0]
-
-            # Verificar se última mensagem é > 48h
-            if last_message.timestamp < cutoff_time:
-                inactive_conversations.append(conv)
-
-        return inactive_conversations
-
-    def _reengage_conversation(self, session, conversation) -> None:
-        """
-        Reengajar uma conversa inativa.
-
-        1. Envia mensagem via WAHA
-        2. Salva mensagem outbound
-        3. Atualiza status para AWAITING_RESPONSE
-        """
-        # Escolher template (round-robin baseado em ID)
-        template_index = hash(conversation.id) % len(self.REENGAGEMENT_TEMPLATES)
-        message_text = self.REENGAGEMENT_TEMPLATES[template_index]
-
-        # Enviar via WAHA
-        try:
-            asyncio.run(
-                self.waha_client.send_text(
-                    session="default",
-                    chat_id=conversation.chat_id,
-                    text=message_text,
-                )
-            )
-            logger.info(
-                "[SUCCESS] Mensagem de re-engagement enviada (conv_id=%s)",
-                conversation.id,
-            )
-        except Exception as e:  # noqa: BLE001 (blind exception)
-            logger.error("[ERROR] Failed to send via WAHA: %s", e)
-            raise
-
-        # Salvar mensagem outbound
-        msg_repo = ConversationMessageRepository(session)
-        message = ConversationMessage(
-            conversation_id=conversation.id,
-            direction=MessageDirection.OUTBOUND,
-            content=message_text,
-            timestamp=datetime.now(UTC),
-        )
-        msg_repo.create(message)
-        session.flush()
-
-        # Atualizar status da conversa
-        conv_repo = ConversationRepository(session)
-        conversation = conv_repo.update_status(conversation.id, ConversationStatus.WAITING_SECRETARY)
-        session.flush()
-
-        logger.info(
-            "[SUCCESS] Conversa reengajada (id=%s, status=%s)",
-            conversation.id,
-            conversation.status.value,
-        )
+        logger.info("[SUCCESS] Re-engagement agendado (broadcast_id=%s)", broadcast.id)
+        return {"status": "scheduled", "broadcast_id": broadcast.id}
 
 
 def run_reengagement_job():
@@ -217,4 +88,3 @@ def run_reengagement_job():
     """
     job = ReEngagementJob()
     return job.execute()
-
@@ -3,6 +3,7 @@
 from robbot.domain.shared.enums import InteractionType
 from robbot.infra.persistence.models.audit_log_model import AuditLogModel
 from robbot.infra.persistence.models.auth_session_model import AuthSessionModel
+from robbot.infra.persistence.models.broadcast_model import BroadcastModel, BroadcastRecipientModel
 from robbot.infra.persistence.models.conversation_message_model import ConversationMessageModel
 from robbot.infra.persistence.models.conversation_model import ConversationModel
 from robbot.infra.persistence.models.conversation_tag_model import ConversationTagModel
@@ -30,6 +31,8 @@ User = UserModel
 __all__ = [
     "AuditLogModel",
     "AuthSessionModel",
+    "BroadcastModel",
+    "BroadcastRecipientModel",
     "ConversationMessageModel",
     "ConversationModel",
     "ConversationTagModel",
@@ -0,0 +1,103 @@
+"""
+Broadcast Models - campaigns/re-engagement sends and their per-recipient delivery.
+"""
+
+from datetime import datetime
+from uuid import uuid4
+
+from sqlalchemy import JSON, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint
+from sqlalchemy import Enum as SQLEnum
+from sqlalchemy.orm import Mapped, mapped_column
+
+from robbot.domain.shared.enums import BroadcastRecipientStatus, BroadcastStatus, ConversationStatus
+from robbot.infra.db.base import Base
+
+
+class BroadcastModel(Base):
+    """
+    A bulk send: message templates, the audience query and the schedule.
+
+    Recipients are materialized once (when the broadcast starts) into
+    ``broadcast_recipients``, which holds the per-recipient delivery state.
+    """
+
+    __tablename__ = "broadcasts"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    name: Mapped[str] = mapped_column(String(255), nullable=False)
+    templates: Mapped[list] = mapped_column(
+        JSON, nullable=False, comment="Message templates ({name}/{first_name} placeholders), one picked per recipient"
+    )
+    audience: Mapped[dict] = mapped_column(JSON, nullable=False, default=dict, comment="Audience query (filters)")
+    session_name: Mapped[str] = mapped_column(String(100), nullable=False, default="default")
+    status: Mapped[BroadcastStatus] = mapped_column(
+        SQLEnum(BroadcastStatus),
+        nullable=False,
+        default=BroadcastStatus.SCHEDULED,
+        index=True,
+    )
+    conversation_status_after: Mapped[ConversationStatus | None] = mapped_column(
+        SQLEnum(ConversationStatus),
+        nullable=True,
+        comment="Conversation status set after a successful send",
+    )
+    scheduled_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, default=datetime.utcnow)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    completed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    total_recipients: Mapped[int | None] = mapped_column(
+        Integer, nullable=True, comment="Set once the audience is materialized"
+    )
+    send_epoch: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        comment="Bumped on resume; send jobs enqueued under an older epoch stop",
+    )
+    created_by_user_id: Mapped[int | None] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True
+    )
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False
+    )
+
+    def __repr__(self) -> str:
+        return f"<BroadcastModel(id='{self.id}', name='{self.name}', status={self.status})>"
+
+
+class BroadcastRecipientModel(Base):
+    """One recipient of a broadcast with its rendered text and delivery status."""
+
+    __tablename__ = "broadcast_recipients"
+    __table_args__ = (
+        UniqueConstraint("broadcast_id", "chat_id", name="uq_broadcast_recipients_chat"),
+        Index("ix_broadcast_recipients_status", "broadcast_id", "status"),
+    )
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    broadcast_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("broadcasts.id", ondelete="CASCADE"), nullable=False
+    )
+    conversation_id: Mapped[str | None] = mapped_column(
+        String(36), ForeignKey("conversations.id", ondelete="SET NULL"), nullable=True
+    )
+    lead_id: Mapped[str | None] = mapped_column(String(36), nullable=True)
+    chat_id: Mapped[str] = mapped_column(String(100), nullable=False)
+    phone_number: Mapped[str | None] = mapped_column(String(50), nullable=True)
+    name: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    text: Mapped[str] = mapped_column(Text, nullable=False, comment="Rendered message")
+    status: Mapped[BroadcastRecipientStatus] = mapped_column(
+        SQLEnum(BroadcastRecipientStatus),
+        nullable=False,
+        default=BroadcastRecipientStatus.PENDING,
+    )
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0, server_default="0")
+    claimed_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    waha_message_id: Mapped[str | None] = mapped_column(String(255), nullable=True)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<BroadcastRecipientModel(id='{self.id}', chat_id='{self.chat_id}', status={self.status})>"
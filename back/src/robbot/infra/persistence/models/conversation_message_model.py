@@ -4,11 +4,11 @@ from datetime import datetime
 from typing import TYPE_CHECKING
 from uuid import uuid4
 
-from sqlalchemy import DateTime, ForeignKey, String, Text
+from sqlalchemy import DateTime, ForeignKey, Index, Integer, String, Text, text
 from sqlalchemy import Enum as SQLEnum
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
-from robbot.domain.shared.enums import MessageDirection
+from robbot.domain.shared.enums import DeliveryStatus, MessageDirection
 from robbot.infra.db.base import Base
 
 if TYPE_CHECKING:
@@ -19,9 +19,21 @@ class ConversationMessageModel(Base):
     """Model for messages within conversations.
 
     Stores all inbound/outbound messages with metadata.
+
+    Outbound replies double as a transactional outbox: the conversation turn
+    commits them as PENDING and the outbox relay delivers them afterwards,
+    recording the result in the delivery_* columns.
     """
 
     __tablename__ = "conversation_messages"
+    __table_args__ = (
+        Index(
+            "ix_conversation_messages_outbox",
+            "delivery_status",
+            "created_at",
+            postgresql_where=text("delivery_status IN ('PENDING', 'SENDING')"),
+        ),
+    )
 
     id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()), index=True)
 
@@ -57,6 +69,27 @@ class ConversationMessageModel(Base):
 
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, nullable=False, index=True)
 
+    # Outbox (outbound only): where to deliver and how it went
+    chat_id: Mapped[str | None] = mapped_column(String(64), nullable=True, comment="WhatsApp chat ID to deliver to")
+
+    session_name: Mapped[str | None] = mapped_column(String(64), nullable=True, comment="WAHA session to send from")
+
+    delivery_status: Mapped[DeliveryStatus | None] = mapped_column(
+        SQLEnum(DeliveryStatus), nullable=True, comment="Outbox state; NULL for inbound messages"
+    )
+
+    delivery_attempts: Mapped[int] = mapped_column(
+        Integer, default=0, server_default="0", nullable=False, comment="Send attempts made by the relay"
+    )
+
+    delivery_claimed_at: Mapped[datetime | None] = mapped_column(
+        DateTime, nullable=True, comment="When the relay last claimed the message"
+    )
+
+    delivery_error: Mapped[str | None] = mapped_column(Text, nullable=True, comment="Last delivery error")
+
+    sent_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True, comment="When WAHA accepted the send")
+
     # Relationship
     conversation: Mapped["ConversationModel"] = relationship("ConversationModel", back_populates="messages")
 
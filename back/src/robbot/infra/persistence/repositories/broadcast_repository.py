@@ -0,0 +1,235 @@
+"""Repository for broadcasts and their recipients."""
+
+import logging
+from datetime import datetime, timedelta
+from typing import Any
+
+from sqlalchemy import and_, exists, func, or_, update
+from sqlalchemy.orm import Session
+
+from robbot.domain.shared.enums import BroadcastRecipientStatus, BroadcastStatus
+from robbot.infra.persistence.models.broadcast_model import BroadcastModel, BroadcastRecipientModel
+from robbot.infra.persistence.models.conversation_model import ConversationModel
+from robbot.infra.persistence.models.lead_model import LeadModel
+from robbot.infra.persistence.repositories.base_repository import BaseRepository
+
+logger = logging.getLogger(__name__)
+
+
+class BroadcastRepository(BaseRepository[BroadcastModel]):
+    """Repository for broadcasts, their audience query and per-recipient delivery state."""
+
+    def __init__(self, session: Session):
+        """Initialize repository with database session."""
+        super().__init__(session, BroadcastModel)
+
+    def list_broadcasts(
+        self, status: BroadcastStatus | None = None, skip: int = 0, limit: int = 50
+    ) -> list[BroadcastModel]:
+        """List broadcasts, newest first."""
+        query = self.session.query(BroadcastModel)
+        if status is not None:
+            query = query.filter(BroadcastModel.status == status)
+        return query.order_by(BroadcastModel.created_at.desc()).offset(skip).limit(limit).all()
+
+    def find_audience(self, audience: dict[str, Any], limit: int) -> list[tuple[ConversationModel, LeadModel | None]]:
+        """
+        Resolve an audience query into conversations (with their lead, if any).
+
+        Chats still waiting for a message of another open broadcast (recipient
+        PENDING or SENDING) are left out, so overlapping broadcasts (e.g. two
+        re-engagement runs) never send to the same chat twice.
+
+        Args:
+            audience: Filters (see ``BroadcastAudience``): conversation_statuses,
+                lead_statuses, inactive_for_hours, min/max_maturity_score, exclude_urgent
+            limit: Maximum number of recipients
+
+        Returns:
+            (conversation, lead) pairs, least recently active first
+        """
+        query = self.session.query(ConversationModel, LeadModel).outerjoin(
+            LeadModel,
+            and_(LeadModel.conversation_id == ConversationModel.id, LeadModel.deleted_at.is_(None)),
+        )
+
+        recipient = BroadcastRecipientModel
+        open_elsewhere = exists().where(
+            recipient.chat_id == ConversationModel.chat_id,
+            recipient.status.in_((BroadcastRecipientStatus.PENDING, BroadcastRecipientStatus.SENDING)),
+            recipient.broadcast_id == BroadcastModel.id,
+            BroadcastModel.status.in_((BroadcastStatus.RUNNING, BroadcastStatus.PAUSED)),
+        )
+        query = query.filter(~open_elsewhere)
+
+        if audience.get("conversation_statuses"):
+            query = query.filter(ConversationModel.status.in_(audience["conversation_statuses"]))
+        if audience.get("lead_statuses"):
+            query = query.filter(LeadModel.status.in_(audience["lead_statuses"]))
+        if audience.get("inactive_for_hours"):
+            cutoff = datetime.utcnow() - timedelta(hours=audience["inactive_for_hours"])
+            query = query.filter(ConversationModel.last_message_at < cutoff)
+        if audience.get("min_maturity_score") is not None:
+            query = query.filter(LeadModel.maturity_score >= audience["min_maturity_score"])
+        if audience.get("max_maturity_score") is not None:
+            query = query.filter(LeadModel.maturity_score <= audience["max_maturity_score"])
+        if audience.get("exclude_urgent", True):
+            query = query.filter(ConversationModel.is_urgent.is_(False))
+
+        return query.order_by(ConversationModel.last_message_at).limit(limit).all()
+
+    def add_recipients(self, broadcast_id: str, recipients: list[dict[str, Any]]) -> int:
+        """
+        Insert recipients (PENDING), skipping chats already in the broadcast.
+
+        Returns:
+            Number of recipients inserted
+        """
+        existing = {
+            chat_id
+            for (chat_id,) in self.session.query(BroadcastRecipientModel.chat_id).filter(
+                BroadcastRecipientModel.broadcast_id == broadcast_id
+            )
+        }
+        added = 0
+        for recipient in recipients:
+            if recipient["chat_id"] in existing:
+                continue
+            existing.add(recipient["chat_id"])
+            self.session.add(
+                BroadcastRecipientModel(
+                    broadcast_id=broadcast_id, status=BroadcastRecipientStatus.PENDING, **recipient
+                )
+            )
+            added += 1
+        self.session.flush()
+        return added
+
+    def progress(self, broadcast_id: str) -> dict[BroadcastRecipientStatus, int]:
+        """Count recipients per delivery status."""
+        rows = (
+            self.session.query(BroadcastRecipientModel.status, func.count(BroadcastRecipientModel.id))
+            .filter(BroadcastRecipientModel.broadcast_id == broadcast_id)
+            .group_by(BroadcastRecipientModel.status)
+            .all()
+        )
+        counts = dict.fromkeys(BroadcastRecipientStatus, 0)
+        counts.update(dict(rows))
+        return counts
+
+    def count_open(self, broadcast_id: str) -> int:
+        """Recipients still to be sent (PENDING or SENDING)."""
+        return (
+            self.session.query(func.count(BroadcastRecipientModel.id))
+            .filter(
+                BroadcastRecipientModel.broadcast_id == broadcast_id,
+                BroadcastRecipientModel.status.in_(
+                    (BroadcastRecipientStatus.PENDING, BroadcastRecipientStatus.SENDING)
+                ),
+            )
+            .scalar()
+        )
+
+    def claim_recipients(self, broadcast_id: str, limit: int, lease_seconds: int) -> list[BroadcastRecipientModel]:
+        """
+        Claim recipients to send (marks them SENDING, attempts + 1).
+
+        Picks PENDING recipients and SENDING ones whose claim is older than
+        ``lease_seconds`` (worker died mid-send). Rows locked by another job are
+        skipped, so parallel jobs of the same broadcast never share recipients;
+        the caller commits right away.
+        """
+        now = datetime.utcnow()
+        model = BroadcastRecipientModel
+        recipients = (
+            self.session.query(model)
+            .filter(
+                model.broadcast_id == broadcast_id,
+                or_(
+                    model.status == BroadcastRecipientStatus.PENDING,
+                    and_(
+                        model.status == BroadcastRecipientStatus.SENDING,
+                        model.claimed_at <= now - timedelta(seconds=lease_seconds),
+                    ),
+                ),
+            )
+            .order_by(model.created_at, model.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        for recipient in recipients:
+            recipient.status = BroadcastRecipientStatus.SENDING
+            recipient.claimed_at = now
+            recipient.attempts += 1
+        self.session.flush()
+        return recipients
+
+    def mark_recipient(
+        self,
+        recipient_id: str,
+        status: BroadcastRecipientStatus,
+        waha_message_id: str | None = None,
+        error: str | None = None,
+        count_attempt: bool = True,
+    ) -> bool:
+        """
+        Record the outcome of a claimed recipient (only while it is still SENDING).
+
+        Args:
+            recipient_id: Recipient ID
+            status: New status
+            waha_message_id: WAHA ID of the sent message
+            error: Send error (cleared when None)
+            count_attempt: False when the send was not attempted (throttled, paused)
+
+        Returns:
+            True if the recipient was updated
+        """
+        model = BroadcastRecipientModel
+        values: dict = {"status": status, "error": error}
+        if status == BroadcastRecipientStatus.SENT:
+            values["sent_at"] = datetime.utcnow()
+        if waha_message_id:
+            values["waha_message_id"] = waha_message_id
+        if not count_attempt:
+            values["attempts"] = model.attempts - 1
+
+        result = self.session.execute(
+            update(model)
+            .where(model.id == recipient_id, model.status == BroadcastRecipientStatus.SENDING)
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount > 0
+
+    def skip_open(self, broadcast_id: str) -> int:
+        """Mark every PENDING recipient as SKIPPED (broadcast cancelled)."""
+        model = BroadcastRecipientModel
+        result = self.session.execute(
+            update(model)
+            .where(model.broadcast_id == broadcast_id, model.status == BroadcastRecipientStatus.PENDING)
+            .values(status=BroadcastRecipientStatus.SKIPPED)
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    def list_recipients(
+        self,
+        broadcast_id: str,
+        status: BroadcastRecipientStatus | None = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> list[BroadcastRecipientModel]:
+        """List the recipients of a broadcast in send order."""
+        query = self.session.query(BroadcastRecipientModel).filter(
+            BroadcastRecipientModel.broadcast_id == broadcast_id
+        )
+        if status is not None:
+            query = query.filter(BroadcastRecipientModel.status == status)
+        return (
+            query.order_by(BroadcastRecipientModel.created_at, BroadcastRecipientModel.id)
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
@@ -1,9 +1,12 @@
 """Repository for ConversationMessage entity."""
 
 import logging
+from datetime import datetime, timedelta
 
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, exists, or_, update
+from sqlalchemy.orm import Session, aliased
 
+from robbot.domain.shared.enums import DeliveryStatus
 from robbot.infra.persistence.repositories.base_repository import BaseRepository
 from robbot.infra.persistence.models.conversation_message_model import ConversationMessageModel
 
@@ -36,3 +39,96 @@ class ConversationMessageRepository(BaseRepository[ConversationMessageModel]):
             .all()
         )
 
+
+    def claim_pending_outbound(
+        self, limit: int, lease_seconds: int, retry_seconds: int
+    ) -> list[ConversationMessageModel]:
+        """
+        Claim outbound messages waiting in the outbox (marks them SENDING).
+
+        Picks PENDING messages (a failed attempt waits ``retry_seconds``) and
+        SENDING ones whose claim is older than ``lease_seconds`` (relay crashed).
+        Only the oldest undelivered message of each chat is claimable: a message
+        waits while an older one of the same chat is PENDING or SENDING, so
+        replies reach the chat in creation order. Rows locked by another relay
+        are skipped; the caller commits right away.
+
+        Args:
+            limit: Maximum number of messages
+            lease_seconds: Claim lease before a SENDING message is retried
+            retry_seconds: Wait after a failed attempt
+
+        Returns:
+            Claimed messages, oldest first
+        """
+        now = datetime.utcnow()
+        model = ConversationMessageModel
+        older = aliased(ConversationMessageModel)
+        older_undelivered = exists().where(
+            older.chat_id == model.chat_id,
+            older.created_at < model.created_at,
+            older.delivery_status.in_((DeliveryStatus.PENDING, DeliveryStatus.SENDING)),
+        )
+        messages = (
+            self.session.query(model)
+            .filter(
+                or_(
+                    and_(
+                        model.delivery_status == DeliveryStatus.PENDING,
+                        or_(
+                            model.delivery_claimed_at.is_(None),
+                            model.delivery_claimed_at <= now - timedelta(seconds=retry_seconds),
+                        ),
+                    ),
+                    and_(
+                        model.delivery_status == DeliveryStatus.SENDING,
+                        model.delivery_claimed_at <= now - timedelta(seconds=lease_seconds),
+                    ),
+                ),
+                ~older_undelivered,
+            )
+            .order_by(model.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        for message in messages:
+            message.delivery_status = DeliveryStatus.SENDING
+            message.delivery_claimed_at = now
+            message.delivery_attempts += 1
+        self.session.flush()
+        return messages
+
+    def mark_delivery(
+        self,
+        message_id: str,
+        status: DeliveryStatus,
+        from_statuses: tuple[DeliveryStatus, ...] | None = None,
+        waha_message_id: str | None = None,
+        error: str | None = None,
+    ) -> bool:
+        """
+        Record the delivery outcome of an outbound message.
+
+        Args:
+            message_id: Message ID
+            status: New delivery status
+            from_statuses: Only update while in one of these statuses (guards late writers)
+            waha_message_id: WAHA ID of the sent message
+            error: Delivery error (cleared when None)
+
+        Returns:
+            True if the message was updated
+        """
+        model = ConversationMessageModel
+        values: dict = {"delivery_status": status, "delivery_error": error}
+        if status == DeliveryStatus.SENT:
+            values["sent_at"] = datetime.utcnow()
+        if waha_message_id:
+            values["waha_message_id"] = waha_message_id
+
+        stmt = update(model).where(model.id == message_id)
+        if from_statuses:
+            stmt = stmt.where(model.delivery_status.in_(from_statuses))
+        result = self.session.execute(stmt.values(**values).execution_options(synchronize_session=False))
+        return result.rowcount > 0
@@ -2,7 +2,7 @@
 
 from datetime import UTC, datetime
 
-from sqlalchemy import select
+from sqlalchemy import case, select, update
 from sqlalchemy.orm import Session, joinedload
 
 from robbot.infra.persistence.repositories.base_repository import BaseRepository
@@ -27,6 +27,25 @@ class ConversationRepository(BaseRepository[ConversationModel]):
         )
         return self.db.scalars(stmt).first()
 
+    def replace_phone_numbers(self, phones: dict[str, str]) -> int:
+        """Swap placeholder phone numbers (LIDs) for resolved ones in one UPDATE.
+
+        The chat_id is kept: inbound messages keep arriving on the LID chat.
+        """
+        if not phones:
+            return 0
+        resolved = case(phones, value=ConversationModel.phone_number)
+        result = self.db.execute(
+            update(ConversationModel)
+            .where(ConversationModel.phone_number.in_(list(phones)))
+            .values(
+                phone_number=resolved,
+                name=case((ConversationModel.name == ConversationModel.phone_number, resolved), else_=ConversationModel.name),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
     def get_by_id(self, id: str) -> ConversationModel | None:  # Corrected type hint to str (UUID)
         """Get conversation by ID with lead loaded."""
         stmt = (
@@ -1,7 +1,7 @@
 """Repository for Lead entity."""
 
 from sqlalchemy.orm import Session
-from sqlalchemy import select, func
+from sqlalchemy import case, func, select, update
 
 from robbot.infra.persistence.repositories.base_repository import BaseRepository
 from robbot.infra.persistence.models.lead_model import LeadModel
@@ -19,6 +19,25 @@ class LeadRepository(BaseRepository[LeadModel]):
         """Get lead by phone number."""
         return self.session.query(LeadModel).filter_by(phone_number=phone_number).first()
 
+    def replace_phone_numbers(self, phones: dict[str, str]) -> int:
+        """Swap placeholder phone numbers (LIDs) for resolved ones in one UPDATE.
+
+        Leads still named after their placeholder get the phone as name too.
+        """
+        if not phones:
+            return 0
+        resolved = case(phones, value=LeadModel.phone_number)
+        result = self.session.execute(
+            update(LeadModel)
+            .where(LeadModel.phone_number.in_(list(phones)))
+            .values(
+                phone_number=resolved,
+                name=case((LeadModel.name == LeadModel.phone_number, resolved), else_=LeadModel.name),
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
     def get_leads_by_statuses(self, statuses: list[LeadStatus]) -> list[LeadModel]:
         """Get leads by a list of statuses."""
         return self.session.query(LeadModel).filter(LeadModel.status.in_(statuses)).all()
@@ -2,7 +2,7 @@
 
 from datetime import UTC, datetime, timedelta
 
-from sqlalchemy import select
+from sqlalchemy import insert, select
 from sqlalchemy.orm import Session
 
 from robbot.infra.persistence.models.webhook_log_model import WebhookLog
@@ -46,6 +46,21 @@ class WebhookLogRepository:
         self.db.refresh(log)
         return log
 
+    def bulk_create(self, rows: list[dict]) -> int:
+        """Insert many webhook logs in a single multi-row INSERT.
+
+        Args:
+            rows: Dicts with session_name, event_type, payload and created_at
+
+        Returns:
+            Number of inserted logs
+        """
+        if not rows:
+            return 0
+        self.db.execute(insert(WebhookLog), rows)
+        self.db.commit()
+        return len(rows)
+
     def mark_processed(self, log_id: int, error: str | None = None) -> None:
         """Mark webhook log as processed.
 
@@ -3,10 +3,12 @@
 from __future__ import annotations
 
 import redis
+import redis.asyncio as aioredis
 
 from robbot.config.settings import settings
 
 _pool: redis.ConnectionPool | None = None
+_async_pool: aioredis.ConnectionPool | None = None
 
 
 def get_redis_pool() -> redis.ConnectionPool:
@@ -35,3 +37,34 @@ def close_redis_pool() -> None:
     if _pool is not None:
         _pool.disconnect()
         _pool = None
+
+
+def get_async_redis_pool() -> aioredis.ConnectionPool:
+    """Return a singleton asyncio connection pool configured from settings.
+
+    Used by code running on the API event loop (webhooks), where the
+    synchronous client would block every other request while waiting on I/O.
+    """
+    global _async_pool
+    if _async_pool is None:
+        _async_pool = aioredis.ConnectionPool.from_url(
+            settings.REDIS_URL,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+            socket_connect_timeout=2,
+            socket_timeout=2,
+            decode_responses=False,
+        )
+    return _async_pool
+
+
+def get_async_redis_client() -> aioredis.Redis:
+    """Return an asyncio Redis client using the shared async pool."""
+    return aioredis.Redis(connection_pool=get_async_redis_pool())
+
+
+async def close_async_redis_pool() -> None:
+    """Close the shared asyncio pool, freeing resources."""
+    global _async_pool
+    if _async_pool is not None:
+        await _async_pool.disconnect()
+        _async_pool = None
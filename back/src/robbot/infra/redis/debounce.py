@@ -0,0 +1,94 @@
+"""
+Atomic per-chat message debounce buffer backed by Redis Lua scripts.
+
+Each inbound message costs a single EVALSHA that appends the text, refreshes
+the TTLs and arms the delayed job flag in one step. The consumer drains the
+buffer and clears the flag in another single step, so a message arriving
+while a drain runs either lands in the drained batch or arms a new job —
+it is never dropped.
+
+Keys per chat:
+- ``waha:debounce:buf:{chat_id}``     list of buffered message texts
+- ``waha:debounce:session:{chat_id}`` WAHA session of the last message
+- ``waha:debounce:job:{chat_id}``     set while a delayed job is scheduled
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+from redis import Redis
+
+from robbot.infra.redis.client import get_redis_client
+
+# KEYS: buffer, session, job | ARGV: body, session, buffer_ttl, job_ttl
+# Returns 1 when this call armed the delayed job (caller must schedule it).
+_APPEND_AND_ARM = """
+if ARGV[1] ~= '' then
+    redis.call('RPUSH', KEYS[1], ARGV[1])
+    redis.call('EXPIRE', KEYS[1], ARGV[3])
+end
+redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[3])
+if redis.call('SET', KEYS[3], '1', 'NX', 'EX', ARGV[4]) then
+    return 1
+end
+return 0
+"""
+
+# KEYS: buffer, session, job | Returns {session, {messages...}}
+_DRAIN = """
+local messages = redis.call('LRANGE', KEYS[1], 0, -1)
+local session = redis.call('GET', KEYS[2]) or ''
+redis.call('DEL', KEYS[1], KEYS[2], KEYS[3])
+return {session, messages}
+"""
+
+
+@dataclass
+class DebounceBatch:
+    """Messages drained from one chat's debounce window."""
+
+    session: str | None
+    messages: list[str] = field(default_factory=list)
+
+
+class DebounceBuffer:
+    """Append-and-arm / drain operations on the per-chat debounce buffer."""
+
+    BUFFER_PREFIX = "waha:debounce:buf:"
+    SESSION_PREFIX = "waha:debounce:session:"
+    JOB_PREFIX = "waha:debounce:job:"
+
+    def __init__(self, redis_client: Redis | None = None):
+        self.redis = redis_client or get_redis_client()
+        self._append_and_arm = self.redis.register_script(_APPEND_AND_ARM)
+        self._drain = self.redis.register_script(_DRAIN)
+
+    def _keys(self, chat_id: str) -> list[str]:
+        return [
+            f"{self.BUFFER_PREFIX}{chat_id}",
+            f"{self.SESSION_PREFIX}{chat_id}",
+            f"{self.JOB_PREFIX}{chat_id}",
+        ]
+
+    def append(self, chat_id: str, body: str, session: str, debounce_seconds: int) -> bool:
+        """Buffer a message; return True if the caller must schedule the drain job."""
+        text = body if isinstance(body, str) and body.strip() else ""
+        armed = self._append_and_arm(
+            keys=self._keys(chat_id),
+            args=[text, session, debounce_seconds + 10, debounce_seconds + 30],
+        )
+        return bool(armed)
+
+    def disarm(self, chat_id: str) -> None:
+        """Release the job flag (used when scheduling the drain job failed)."""
+        self.redis.delete(f"{self.JOB_PREFIX}{chat_id}")
+
+    def drain(self, chat_id: str) -> DebounceBatch:
+        """Atomically take every buffered message and release the job flag."""
+        session, messages = self._drain(keys=self._keys(chat_id))
+        session = session.decode() if isinstance(session, bytes) else session
+        return DebounceBatch(
+            session=session or None,
+            messages=[m.decode() if isinstance(m, bytes) else m for m in messages],
+        )
@@ -0,0 +1,138 @@
+"""
+Compact time-bucketed index of processed message IDs.
+
+Instead of one ``waha:processed:{message_id}`` string key per message (key,
+value and expiry entry for each ID), processed IDs are stored as 64-bit
+digests in hourly buckets that expire as a whole:
+
+- ``waha:dedup:{hour}:{shard}`` set of signed 64-bit blake2b digests
+
+``hour`` is the Unix hour of the claim and ``shard`` spreads one hour over
+``MESSAGE_DEDUP_SHARDS`` small sets. Sets of integers that stay under
+``set-max-intset-entries`` (512 by default) are stored by Redis as a packed
+intset, i.e. ~8 bytes per message instead of ~100+ for a dedicated key.
+
+A lookup checks the current bucket plus the previous ``MESSAGE_DEDUP_WINDOW_HOURS``
+ones inside a single Lua script, so a whole batch is checked and claimed
+atomically in one round trip. Two different IDs sharing a 64-bit digest are
+astronomically unlikely (~1e-8 for a million IDs in the window).
+
+The scripts build bucket key names themselves, which is fine on the single
+Redis instance the app uses (not Redis Cluster compatible).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import time
+
+from redis import Redis
+
+from robbot.config.settings import settings
+from robbot.infra.redis.client import get_redis_client
+
+# ARGV: bucket_prefix, hour, buckets, ttl, legacy_prefix, add, then (shard, digest, message_id) triples
+# Returns one flag per triple: 1 = not seen before (claimed when add=1), 0 = already seen.
+_CLAIM = """
+local prefix, hour, buckets = ARGV[1], tonumber(ARGV[2]), tonumber(ARGV[3])
+local ttl, legacy, add = ARGV[4], ARGV[5], ARGV[6] == '1'
+local result = {}
+for i = 7, #ARGV, 3 do
+    local shard, digest = ':' .. ARGV[i], ARGV[i + 1]
+    local seen = legacy ~= '' and redis.call('EXISTS', legacy .. ARGV[i + 2]) == 1
+    local h = hour
+    while not seen and h > hour - buckets do
+        seen = redis.call('SISMEMBER', prefix .. string.format('%d', h) .. shard, digest) == 1
+        h = h - 1
+    end
+    if not seen and add then
+        local key = prefix .. string.format('%d', hour) .. shard
+        redis.call('SADD', key, digest)
+        redis.call('EXPIRE', key, ttl)
+    end
+    result[#result + 1] = seen and 0 or 1
+end
+return result
+"""
+
+
+def message_digest(message_id: str) -> int:
+    """Signed 64-bit digest of a message ID (integers keep the bucket sets as intsets)."""
+    return int.from_bytes(hashlib.blake2b(message_id.encode(), digest_size=8).digest(), "big", signed=True)
+
+
+class MessageDedupIndex:
+    """Claim / check / release processed message IDs in hourly buckets."""
+
+    BUCKET_PREFIX = "waha:dedup:"
+    LEGACY_PREFIX = "waha:processed:"
+
+    def __init__(
+        self,
+        redis_client: Redis | None = None,
+        window_hours: int | None = None,
+        shards: int | None = None,
+        legacy_fallback: bool | None = None,
+        bucket_prefix: str | None = None,
+    ):
+        self.redis = redis_client or get_redis_client()
+        self.window_hours = window_hours or settings.MESSAGE_DEDUP_WINDOW_HOURS
+        self.shards = shards or settings.MESSAGE_DEDUP_SHARDS
+        self.legacy_fallback = (
+            settings.MESSAGE_DEDUP_LEGACY_FALLBACK if legacy_fallback is None else legacy_fallback
+        )
+        self.bucket_prefix = bucket_prefix or self.BUCKET_PREFIX
+        # Current (partial) hour + the full window behind it
+        self.buckets = self.window_hours + 1
+        self.bucket_ttl = (self.window_hours + 2) * 3600
+        self._claim = self.redis.register_script(_CLAIM)
+
+    def claim(self, message_ids: list[str], now: float | None = None) -> list[bool]:
+        """Record IDs not seen in the window; returns True for each ID claimed by this call.
+
+        An ID repeated inside the batch is claimed only once (first occurrence).
+        """
+        return self._run(message_ids, add=True, now=now)
+
+    def contains(self, message_id: str, now: float | None = None) -> bool:
+        """Whether the ID was already recorded in the window."""
+        return not self._run([message_id], add=False, now=now)[0]
+
+    def release(self, message_ids: list[str], now: float | None = None) -> None:
+        """Forget IDs so they can be claimed again (e.g. enqueue failed)."""
+        hour = self._hour(now)
+        pipe = self.redis.pipeline(transaction=False)
+        for message_id in filter(None, message_ids):
+            digest = message_digest(message_id)
+            shard = self._shard(digest)
+            for h in range(hour - self.buckets + 1, hour + 1):
+                pipe.srem(self._bucket_key(h, shard), digest)
+            if self.legacy_fallback:
+                pipe.delete(f"{self.LEGACY_PREFIX}{message_id}")
+        pipe.execute()
+
+    def _run(self, message_ids: list[str], add: bool, now: float | None) -> list[bool]:
+        if not message_ids:
+            return []
+        args: list = [
+            self.bucket_prefix,
+            self._hour(now),
+            self.buckets,
+            self.bucket_ttl,
+            self.LEGACY_PREFIX if self.legacy_fallback else "",
+            1 if add else 0,
+        ]
+        for message_id in message_ids:
+            digest = message_digest(message_id)
+            args.extend((self._shard(digest), digest, message_id))
+        return [bool(flag) for flag in self._claim(args=args)]
+
+    def _shard(self, digest: int) -> int:
+        return digest % self.shards
+
+    def _bucket_key(self, hour: int, shard: int) -> str:
+        return f"{self.bucket_prefix}{hour}:{shard}"
+
+    @staticmethod
+    def _hour(now: float | None) -> int:
+        return int((time.time() if now is None else now) // 3600)
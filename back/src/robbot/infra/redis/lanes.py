@@ -0,0 +1,166 @@
+"""
+Scheduling lanes on top of the RQ queues.
+
+Queues are grouped into lanes so one kind of work cannot starve another:
+
+- ``control``     polling cycles and other housekeeping (queue ``control``)
+- ``interactive`` conversation turns (queues ``messages``, ``ai``, ``escalation``)
+- ``batch``       analytics, campaigns, bulk jobs (queue ``batch``)
+
+Before every dequeue a ``LaneWorker`` asks the ``LaneScheduler`` which lane
+goes first. Lanes with backlog share the workers by smooth weighted round
+robin (``RQ_LANE_*_WEIGHT``), and a lane that already has
+``RQ_LANE_*_MAX_CONCURRENCY`` jobs running (counted cluster-wide from the RQ
+StartedJobRegistry) is skipped until one finishes, so a batch backlog can never
+take every worker away from conversation turns. The limit is soft: two workers
+checking at the same instant may briefly run one job over it.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass
+
+from rq import SimpleWorker, Worker
+from rq.registry import StartedJobRegistry
+
+from robbot.config.settings import settings
+
+
+@dataclass(frozen=True)
+class Lane:
+    """A group of RQ queues scheduled together."""
+
+    name: str
+    queues: tuple[str, ...]
+    weight: int
+    max_concurrency: int = 0  # 0 = unlimited
+
+    def has_capacity(self, running: int) -> bool:
+        return not self.max_concurrency or running < self.max_concurrency
+
+
+def get_lanes() -> list[Lane]:
+    """Lanes in tie-break order, configured from settings."""
+    return [
+        Lane(
+            "control",
+            ("control",),
+            settings.RQ_LANE_CONTROL_WEIGHT,
+            settings.RQ_LANE_CONTROL_MAX_CONCURRENCY,
+        ),
+        Lane(
+            "interactive",
+            ("messages", "ai", "escalation"),
+            settings.RQ_LANE_INTERACTIVE_WEIGHT,
+            settings.RQ_LANE_INTERACTIVE_MAX_CONCURRENCY,
+        ),
+        Lane(
+            "batch",
+            ("batch",),
+            settings.RQ_LANE_BATCH_WEIGHT,
+            settings.RQ_LANE_BATCH_MAX_CONCURRENCY,
+        ),
+    ]
+
+
+class LaneScheduler:
+    """Smooth weighted round robin over lanes with backlog and spare capacity."""
+
+    def __init__(self, lanes: list[Lane]):
+        self.lanes = lanes
+        self._current = {lane.name: 0 for lane in lanes}
+
+    def order(self, backlog: dict[str, int], running: dict[str, int]) -> list[Lane]:
+        """Lanes to poll, best first; lanes at their concurrency limit are left out.
+
+        Args:
+            backlog: queued jobs per lane
+            running: jobs currently executing per lane (all workers)
+        """
+        eligible = [lane for lane in self.lanes if lane.has_capacity(running.get(lane.name, 0))]
+        contenders = [lane for lane in eligible if backlog.get(lane.name, 0) > 0]
+        if not contenders:
+            return eligible
+
+        total = sum(lane.weight for lane in contenders)
+        for lane in contenders:
+            self._current[lane.name] += lane.weight
+        best = max(contenders, key=lambda lane: self._current[lane.name])
+        self._current[best.name] -= total
+
+        rest = sorted(
+            (lane for lane in eligible if lane is not best),
+            key=lambda lane: (backlog.get(lane.name, 0) == 0, -self._current[lane.name]),
+        )
+        return [best, *rest]
+
+
+class LaneSchedulingMixin:
+    """Re-orders the worker's queues by lane before each dequeue (mix into an RQ Worker class)."""
+
+    def __init__(self, *args, lanes: list[Lane] | None = None, recheck_seconds: float | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.lane_scheduler = LaneScheduler(lanes or get_lanes())
+        self.recheck_seconds = recheck_seconds or settings.RQ_LANE_RECHECK_SECONDS
+        queues_by_name = {queue.name: queue for queue in self.queues}
+        # Only lanes this worker listens to
+        self._lane_queues = {
+            lane.name: [queues_by_name[name] for name in lane.queues if name in queues_by_name]
+            for lane in self.lane_scheduler.lanes
+        }
+        self.lane_scheduler.lanes = [lane for lane in self.lane_scheduler.lanes if self._lane_queues[lane.name]]
+        self._started_keys = {
+            queue.name: StartedJobRegistry(queue.name, connection=self.connection).key for queue in self.queues
+        }
+
+    def reorder_queues(self, reference_queue) -> None:
+        """Order is decided before every dequeue instead (see dequeue_job_and_maintain_ttl)."""
+
+    def lane_stats(self) -> tuple[dict[str, int], dict[str, int]]:
+        """Queued and running jobs per lane, in one round trip."""
+        pipe = self.connection.pipeline(transaction=False)
+        for lane in self.lane_scheduler.lanes:
+            for queue in self._lane_queues[lane.name]:
+                pipe.llen(queue.key)
+                pipe.zcard(self._started_keys[queue.name])
+        counts = iter(pipe.execute())
+
+        backlog: dict[str, int] = {}
+        running: dict[str, int] = {}
+        for lane in self.lane_scheduler.lanes:
+            for _queue in self._lane_queues[lane.name]:
+                backlog[lane.name] = backlog.get(lane.name, 0) + next(counts)
+                running[lane.name] = running.get(lane.name, 0) + next(counts)
+        return backlog, running
+
+    def dequeue_job_and_maintain_ttl(self, timeout: int | None, max_idle_time: int | None = None):
+        while True:
+            backlog, running = self.lane_stats()
+            order = self.lane_scheduler.order(backlog, running)
+            capped = len(order) < len(self.lane_scheduler.lanes)
+            self._ordered_queues = [queue for lane in order for queue in self._lane_queues[lane.name]]
+
+            if not capped or timeout is None:
+                return super().dequeue_job_and_maintain_ttl(timeout, max_idle_time)
+
+            # Some lane is at its limit: block only briefly so it is re-admitted when a slot frees up
+            recheck = max(1, math.ceil(self.recheck_seconds))
+            if self._ordered_queues:
+                result = super().dequeue_job_and_maintain_ttl(min(timeout, recheck), recheck)
+                if result is not None:
+                    return result
+            else:
+                self.heartbeat()
+                time.sleep(self.recheck_seconds)
+            if self._stop_requested:
+                return None
+
+
+class LaneWorker(LaneSchedulingMixin, SimpleWorker):
+    """SimpleWorker (jobs run in the worker process) with lane scheduling."""
+
+
+class ForkingLaneWorker(LaneSchedulingMixin, Worker):
+    """Forking Worker (one work-horse per job) with lane scheduling."""
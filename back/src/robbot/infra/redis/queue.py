@@ -25,6 +25,8 @@ class RQQueueManager:
         self._queue_ai: Queue | None = None
         self._queue_escalation: Queue | None = None
         self._queue_failed: Queue | None = None
+        self._queue_control: Queue | None = None
+        self._queue_batch: Queue | None = None
 
     @property
     def queue_messages(self) -> Queue:
@@ -69,11 +71,37 @@ class RQQueueManager:
             )
         return self._queue_failed
 
+    @property
+    def queue_control(self) -> Queue:
+        """Lane control: ciclos de polling e housekeeping."""
+        if self._queue_control is None:
+            self._queue_control = Queue(
+                name="control",
+                connection=self.redis_client,
+                default_timeout=settings.RQ_JOB_TIMEOUT_MESSAGE,
+                is_async=True,
+            )
+        return self._queue_control
+
+    @property
+    def queue_batch(self) -> Queue:
+        """Lane batch: analytics e jobs em massa, com concorrência limitada."""
+        if self._queue_batch is None:
+            self._queue_batch = Queue(
+                name="batch",
+                connection=self.redis_client,
+                default_timeout=settings.RQ_JOB_TIMEOUT_BATCH,
+                is_async=True,
+            )
+        return self._queue_batch
+
     def get_queue(self, queue_name: str) -> Queue:
         queues = {
+            "control": self.queue_control,
             "messages": self.queue_messages,
             "ai": self.queue_ai,
             "escalation": self.queue_escalation,
+            "batch": self.queue_batch,
             "failed": self.queue_failed,
         }
         if queue_name not in queues:
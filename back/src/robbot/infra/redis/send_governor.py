@@ -0,0 +1,123 @@
+"""
+Distributed per-session send governor backed by a Redis Lua script.
+
+The random per-message sleep of the anti-ban flow neither bounds how fast a
+WAHA session sends when many workers reply at once, nor lets a quiet session
+send right away. Every send (text, image, file, voice) instead reserves a slot:
+
+- a token bucket per WAHA session: ``WAHA_SEND_BURST`` sends may go out back
+  to back, then the session is paced at ``WAHA_SEND_RATE_PER_MINUTE``
+- per-recipient spacing: two sends to the same chat are at least
+  ``WAHA_SEND_RECIPIENT_SPACING_SECONDS`` apart
+
+The script reserves the earliest allowed instant atomically and returns how
+long the caller must wait for it, so concurrent workers (any process) queue up
+without polling. A slot further away than ``WAHA_SEND_MAX_WAIT_SECONDS`` (or
+the caller's own ``max_wait``) is not reserved and the send is refused (caller
+retries later).
+
+Keys (prefix WAHA_SEND_GOVERNOR_PREFIX):
+- ``{prefix}:bucket:{session}``         HASH tokens, ts
+- ``{prefix}:chat:{session}:{chat_id}`` earliest time of the next send to the chat
+"""
+
+from __future__ import annotations
+
+import time
+from dataclasses import dataclass
+
+from redis import Redis
+
+from robbot.config.settings import settings
+from robbot.infra.redis.client import get_redis_client
+
+# KEYS: bucket, chat | ARGV: now, rate per second, burst, spacing, max wait
+# Returns {1 if reserved else 0, wait seconds}
+_RESERVE = """
+local now = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local burst = tonumber(ARGV[3])
+local spacing = tonumber(ARGV[4])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+if now > ts then
+    tokens = math.min(burst, tokens + (now - ts) * rate)
+    ts = now
+end
+local at = now
+if tokens < 1 then
+    at = now + (1 - tokens) / rate
+end
+local chat_next = tonumber(redis.call('GET', KEYS[2])) or 0
+if chat_next > at then
+    at = chat_next
+end
+local wait = at - now
+if wait > tonumber(ARGV[5]) then
+    return {0, tostring(wait)}
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens - 1), 'ts', tostring(ts))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate + wait) + 60)
+if spacing > 0 then
+    redis.call('SET', KEYS[2], tostring(at + spacing), 'EX', math.ceil(wait + spacing) + 1)
+end
+return {1, tostring(wait)}
+"""
+
+
+@dataclass(frozen=True)
+class SendSlot:
+    """Outcome of a reservation: wait ``wait_seconds`` then send (if ``reserved``)."""
+
+    reserved: bool
+    wait_seconds: float
+
+
+class SendGovernor:
+    """Token bucket per WAHA session plus per-recipient spacing (sync, one EVALSHA per send)."""
+
+    def __init__(self, redis_client: Redis | None = None, prefix: str | None = None):
+        self.redis = redis_client or get_redis_client()
+        self.prefix = prefix or settings.WAHA_SEND_GOVERNOR_PREFIX
+        self._reserve = self.redis.register_script(_RESERVE)
+
+    def bucket_key(self, session: str) -> str:
+        return f"{self.prefix}:bucket:{session}"
+
+    def chat_key(self, session: str, chat_id: str) -> str:
+        return f"{self.prefix}:chat:{session}:{chat_id}"
+
+    def reserve(
+        self, session: str, chat_id: str, now: float | None = None, max_wait: float | None = None
+    ) -> SendSlot:
+        """Reserve the earliest allowed send instant for ``chat_id`` on ``session``.
+
+        ``max_wait`` overrides WAHA_SEND_MAX_WAIT_SECONDS (0 = only a slot available now).
+        """
+        now = time.time() if now is None else now
+        max_wait = settings.WAHA_SEND_MAX_WAIT_SECONDS if max_wait is None else max_wait
+        reserved, wait = self._reserve(
+            keys=[self.bucket_key(session), self.chat_key(session, chat_id)],
+            args=[
+                now,
+                settings.WAHA_SEND_RATE_PER_MINUTE / 60,
+                settings.WAHA_SEND_BURST,
+                settings.WAHA_SEND_RECIPIENT_SPACING_SECONDS,
+                max_wait,
+            ],
+        )
+        wait = float(wait.decode() if isinstance(wait, bytes) else wait)
+        return SendSlot(reserved=bool(int(reserved)), wait_seconds=max(0.0, wait))
+
+
+# Singleton global
+_send_governor: SendGovernor | None = None
+
+
+def get_send_governor() -> SendGovernor:
+    """Get or create the global send governor."""
+    global _send_governor
+    if _send_governor is None:
+        _send_governor = SendGovernor()
+    return _send_governor
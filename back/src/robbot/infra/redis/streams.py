@@ -0,0 +1,536 @@
+"""
+Per-chat ordered ingestion queue on Redis Streams.
+
+Messages are appended to one of ``INGESTION_STREAM_PARTITIONS`` streams chosen
+by ``crc32(chat_id)``, so every message of a chat lands in the same partition.
+Each partition is owned by exactly one consumer at a time (a Redis lease) and
+its entries are handled strictly in stream order, which keeps a chat ordered
+while different partitions run in parallel on any number of workers.
+
+Consumers publish a heartbeat and take a fair share of partitions
+(``ceil(partitions / live_consumers)``), so adding a worker spreads the load
+and a dead worker's partitions are picked up once its leases expire. Entries
+a crashed consumer read but never acknowledged are reclaimed (XAUTOCLAIM)
+before the new owner reads anything newer from that partition.
+
+``ConcurrentPartitionConsumer`` is the asyncio flavour: it runs many entries
+at once on one event loop (different chats in parallel, even inside the same
+partition) while a per-chat lock keeps each chat's turns sequential and in order.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import math
+import time
+import zlib
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
+from typing import Any
+
+from redis import Redis, ResponseError
+
+from robbot.config.settings import settings
+from robbot.infra.redis.client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+CONSUMER_GROUP = "ingest"
+
+# KEYS: lease | ARGV: owner, ttl_ms -> 1 if the lease is (still) ours
+_RENEW_LEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# KEYS: lease | ARGV: owner
+_RELEASE_LEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def partition_for(chat_id: str, partitions: int) -> int:
+    """Stable partition index for a chat (same chat -> same partition)."""
+    return zlib.crc32(chat_id.encode()) % partitions
+
+
+def _decode(value: Any) -> Any:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class PartitionedStreamQueue:
+    """Producer side and key layout of the partitioned ingestion streams."""
+
+    def __init__(
+        self,
+        redis_client: Redis | None = None,
+        partitions: int | None = None,
+        prefix: str | None = None,
+    ):
+        self.redis = redis_client or get_redis_client()
+        self.partitions = partitions or settings.INGESTION_STREAM_PARTITIONS
+        self.prefix = prefix or settings.INGESTION_STREAM_PREFIX
+
+    def stream_key(self, partition: int) -> str:
+        return f"{self.prefix}:{partition}"
+
+    def lease_key(self, partition: int) -> str:
+        return f"{self.prefix}:lease:{partition}"
+
+    @property
+    def consumers_key(self) -> str:
+        return f"{self.prefix}:consumers"
+
+    @property
+    def attempts_key(self) -> str:
+        return f"{self.prefix}:attempts"
+
+    @property
+    def dead_letter_key(self) -> str:
+        return f"{self.prefix}:dead"
+
+    def ensure_groups(self) -> None:
+        """Create the consumer group on every partition stream (idempotent)."""
+        for partition in range(self.partitions):
+            try:
+                self.redis.xgroup_create(self.stream_key(partition), CONSUMER_GROUP, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    def enqueue(self, chat_id: str, payload: dict[str, Any]) -> str:
+        """Append a unit of work for ``chat_id``; returns the stream entry id."""
+        partition = partition_for(chat_id, self.partitions)
+        entry_id = self.redis.xadd(
+            self.stream_key(partition),
+            {"chat_id": chat_id, "payload": json.dumps(payload)},
+            maxlen=settings.INGESTION_STREAM_MAXLEN,
+            approximate=True,
+        )
+        return f"{partition}:{_decode(entry_id)}"
+
+    def backlog(self) -> dict[int, int]:
+        """Entries waiting per partition (for monitoring)."""
+        pipe = self.redis.pipeline(transaction=False)
+        for partition in range(self.partitions):
+            pipe.xlen(self.stream_key(partition))
+        return dict(enumerate(pipe.execute()))
+
+    def lag(self) -> tuple[int, float]:
+        """Entries not yet delivered to the group and the age (seconds) of the oldest one."""
+        pipe = self.redis.pipeline(transaction=False)
+        for partition in range(self.partitions):
+            pipe.xinfo_groups(self.stream_key(partition))
+        cursors: list[tuple[int, str]] = []
+        depth = 0
+        for partition, groups in enumerate(pipe.execute(raise_on_error=False)):
+            if isinstance(groups, Exception):
+                continue  # stream not created yet
+            group = next((g for g in groups if _decode(g["name"]) == CONSUMER_GROUP), None)
+            if group is None or group.get("lag") == 0:
+                continue
+            # "lag" is missing before Redis 7 and None after trims; the age below still applies
+            depth += group.get("lag") or 0
+            cursors.append((partition, _decode(group["last-delivered-id"])))
+
+        if not cursors:
+            return depth, 0.0
+        pipe = self.redis.pipeline(transaction=False)
+        for partition, last_delivered in cursors:
+            pipe.xrange(self.stream_key(partition), min=f"({last_delivered}", count=1)
+        oldest_ms = min(
+            (int(_decode(entries[0][0]).split("-")[0]) for entries in pipe.execute() if entries),
+            default=None,
+        )
+        if oldest_ms is None:
+            return depth, 0.0
+        return depth, max(0.0, time.time() - oldest_ms / 1000)
+
+
+class PartitionConsumer:
+    """Consumer that owns a fair share of partitions and processes each in order."""
+
+    def __init__(
+        self,
+        queue: PartitionedStreamQueue,
+        consumer_name: str,
+        handler: Callable[[dict[str, Any]], Any],
+        lease_seconds: int | None = None,
+        reclaim_idle_ms: int | None = None,
+        max_attempts: int | None = None,
+        batch_size: int = 10,
+    ):
+        self.queue = queue
+        self.redis = queue.redis
+        self.consumer_name = consumer_name
+        self.handler = handler
+        self.lease_ms = (lease_seconds or settings.INGESTION_PARTITION_LEASE_SECONDS) * 1000
+        self.reclaim_idle_ms = reclaim_idle_ms if reclaim_idle_ms is not None else settings.INGESTION_RECLAIM_IDLE_MS
+        self.max_attempts = max_attempts or settings.RQ_MAX_RETRIES
+        self.batch_size = batch_size
+        self.owned: set[int] = set()
+        # Partitions whose pending list must be drained before reading new entries
+        self._needs_recovery: set[int] = set()
+        self._last_rebalance = 0.0
+        self._renew_lease = self.redis.register_script(_RENEW_LEASE)
+        self._release_lease = self.redis.register_script(_RELEASE_LEASE)
+
+    # ------------------------------------------------------------------
+    # Ownership
+    # ------------------------------------------------------------------
+    def heartbeat(self) -> int:
+        """Publish liveness and renew owned leases; returns the number of live consumers.
+
+        Safe to call from a background thread while the handler runs, so long
+        handlers (LLM calls, anti-ban delays) never let a lease expire.
+        """
+        now = time.time()
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zadd(self.queue.consumers_key, {self.consumer_name: now})
+        pipe.zremrangebyscore(self.queue.consumers_key, 0, now - self.lease_ms / 1000)
+        pipe.zcard(self.queue.consumers_key)
+        live_consumers = max(1, pipe.execute()[-1])
+
+        for partition in sorted(self.owned):
+            if not self._renew_lease(keys=[self.queue.lease_key(partition)], args=[self.consumer_name, self.lease_ms]):
+                logger.warning("[STREAMS] Lease perdida na partição %s", partition)
+                self.owned.discard(partition)
+        return live_consumers
+
+    def rebalance(self) -> set[int]:
+        """Heartbeat, renew leases and converge on a fair share of partitions."""
+        self._last_rebalance = time.time()
+        target = math.ceil(self.queue.partitions / self.heartbeat())
+
+        while len(self.owned) > target:
+            self.release(max(self.owned))
+
+        if len(self.owned) < target:
+            # Start from a consumer-specific offset so workers don't all race for partition 0
+            offset = zlib.crc32(self.consumer_name.encode()) % self.queue.partitions
+            for step in range(self.queue.partitions):
+                if len(self.owned) >= target:
+                    break
+                partition = (offset + step) % self.queue.partitions
+                if partition in self.owned:
+                    continue
+                if self.redis.set(self.queue.lease_key(partition), self.consumer_name, nx=True, px=self.lease_ms):
+                    self.owned.add(partition)
+                    self._needs_recovery.add(partition)
+                    logger.info("[STREAMS] Partição %s assumida por %s", partition, self.consumer_name)
+
+        return self.owned
+
+    def release(self, partition: int) -> None:
+        """Give a partition back (e.g. when another worker joins)."""
+        self._release_lease(keys=[self.queue.lease_key(partition)], args=[self.consumer_name])
+        self.owned.discard(partition)
+        self._needs_recovery.discard(partition)
+
+    def release_all(self) -> None:
+        for partition in list(self.owned):
+            self.release(partition)
+        self.redis.zrem(self.queue.consumers_key, self.consumer_name)
+
+    # ------------------------------------------------------------------
+    # Processing
+    # ------------------------------------------------------------------
+    def process_once(self, block_ms: int = 1000) -> int:
+        """Process one round over the owned partitions; returns entries handled."""
+        if time.time() - self._last_rebalance >= self.lease_ms / 3000:
+            self.rebalance()
+
+        handled = 0
+        for partition in sorted(self._needs_recovery & self.owned):
+            handled += self._recover_partition(partition)
+
+        ready = sorted(self.owned - self._needs_recovery)
+        if not ready:
+            if not self.owned:
+                time.sleep(block_ms / 1000)
+            return handled
+
+        result = self.redis.xreadgroup(
+            CONSUMER_GROUP,
+            self.consumer_name,
+            {self.queue.stream_key(p): ">" for p in ready},
+            count=self.batch_size,
+            block=block_ms,
+        )
+        for stream, entries in result or []:
+            partition = int(_decode(stream).rsplit(":", 1)[1])
+            handled += self._handle_in_order(partition, entries)
+        return handled
+
+    def _recover_partition(self, partition: int) -> int:
+        """Take over entries a previous owner left unacknowledged, then replay ours in order."""
+        entries = self._pending_entries(partition)
+        if entries is None:
+            return 0
+        if not entries:
+            self._needs_recovery.discard(partition)
+            return 0
+
+        handled = self._handle_in_order(partition, entries)
+        if handled == len(entries) and len(entries) < self.batch_size:
+            self._needs_recovery.discard(partition)
+        return handled
+
+    def _pending_entries(self, partition: int, start: str = "0") -> list | None:
+        """Reclaim stale entries of other consumers and read our own pending ones after ``start``.
+
+        Returns:
+            Pending entries (oldest first), or None while another consumer still
+            holds fresh pending entries of this partition
+        """
+        stream = self.queue.stream_key(partition)
+
+        cursor = "0-0"
+        while True:
+            next_cursor, _claimed, *_ = self.redis.xautoclaim(
+                stream, CONSUMER_GROUP, self.consumer_name, self.reclaim_idle_ms, start_id=cursor, count=100
+            )
+            cursor = _decode(next_cursor)
+            if cursor == "0-0":
+                break
+
+        # Entries still held by another consumer are too fresh to steal: it may still be
+        # working on them. Reading past them would break the chat order, so wait.
+        for consumer in self.redis.xinfo_consumers(stream, CONSUMER_GROUP):
+            name, pending = _decode(consumer["name"]), consumer["pending"]
+            if name != self.consumer_name and pending:
+                return None
+
+        result = self.redis.xreadgroup(CONSUMER_GROUP, self.consumer_name, {stream: start}, count=self.batch_size)
+        return result[0][1] if result else []
+
+    def _handle_in_order(self, partition: int, entries) -> int:
+        """Run the handler over entries in order, stopping at the first failure."""
+        stream = self.queue.stream_key(partition)
+        handled = 0
+        for entry_id, fields in entries:
+            entry_id = _decode(entry_id)
+            if not fields:
+                # Trimmed while pending: nothing to run
+                self._ack(stream, entry_id)
+                continue
+
+            fields = {_decode(k): _decode(v) for k, v in fields.items()}
+            try:
+                self.handler(json.loads(fields["payload"]))
+            except Exception as e:
+                if self._record_failure(stream, entry_id, fields, e):
+                    handled += 1
+                    continue
+                # Keep it pending; later entries of this partition wait behind it
+                self._needs_recovery.add(partition)
+                break
+
+            self._ack(stream, entry_id)
+            handled += 1
+        return handled
+
+    def _ack(self, stream: str, entry_id: str) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xack(stream, CONSUMER_GROUP, entry_id)
+        pipe.xdel(stream, entry_id)
+        pipe.hdel(self.queue.attempts_key, f"{stream}/{entry_id}")
+        pipe.execute()
+
+    def _record_failure(self, stream: str, entry_id: str, fields: dict, error: Exception) -> bool:
+        """Count a failed attempt; dead-letter the entry once attempts run out.
+
+        Returns:
+            True if the entry was dead-lettered (and acknowledged)
+        """
+        attempts = self.redis.hincrby(self.queue.attempts_key, f"{stream}/{entry_id}", 1)
+        if attempts < self.max_attempts:
+            logger.warning(
+                "[STREAMS] Falha ao processar %s/%s (tentativa %d/%d): %s",
+                stream,
+                entry_id,
+                attempts,
+                self.max_attempts,
+                error,
+            )
+            return False
+
+        logger.error(
+            "[STREAMS] %s/%s falhou %d vezes, movendo para dead-letter: %s",
+            stream,
+            entry_id,
+            attempts,
+            error,
+            extra={"chat_id": fields.get("chat_id")},
+        )
+        self.redis.xadd(
+            self.queue.dead_letter_key,
+            {**fields, "stream": stream, "entry_id": entry_id, "error": str(error)[:500]},
+            maxlen=10_000,
+            approximate=True,
+        )
+        self._ack(stream, entry_id)
+        return True
+
+
+class ConcurrentPartitionConsumer(PartitionConsumer):
+    """Asyncio consumer running up to ``concurrency`` entries at once, each chat in order.
+
+    Every entry becomes a task that first takes its chat's lock and then a
+    concurrency slot. asyncio locks are granted in FIFO order and tasks are
+    created in stream order, so turns of one chat never overlap and keep their
+    order. A failing entry is retried in place while holding its chat lock (later
+    turns of that chat wait behind it) and dead-lettered once attempts run out.
+    """
+
+    RETRY_BACKOFF_SECONDS = (1, 2, 4)
+
+    def __init__(
+        self,
+        queue: PartitionedStreamQueue,
+        consumer_name: str,
+        handler: Callable[[dict[str, Any]], Awaitable[Any]],
+        concurrency: int,
+        **kwargs,
+    ):
+        super().__init__(queue, consumer_name, handler, **kwargs)
+        self.concurrency = concurrency
+        self._slots: asyncio.Semaphore | None = None
+        self._chat_locks: dict[str, asyncio.Lock] = {}
+        self._chat_users: dict[str, int] = {}
+        # "{stream}/{entry_id}" -> task, so recovery never starts an entry twice
+        self._inflight: dict[str, asyncio.Task] = {}
+        self._recovery_cursor: dict[int, str] = {}
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def poll_once(self, block_ms: int = 1000) -> int:
+        """Read entries of the owned partitions and start them as tasks; returns entries started."""
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.concurrency)
+        if time.time() - self._last_rebalance >= self.lease_ms / 3000:
+            await asyncio.to_thread(self.rebalance)
+
+        started = 0
+        for partition in sorted(self._needs_recovery & self.owned):
+            started += await self._recover_partition_async(partition)
+
+        # Bounded read-ahead: entries wait in memory only up to one extra round of slots
+        free = self.concurrency * 2 - len(self._inflight)
+        ready = sorted(self.owned - self._needs_recovery)
+        if free <= 0 or not ready:
+            await self._wait_for_progress(block_ms)
+            return started
+
+        result = await asyncio.to_thread(
+            self.redis.xreadgroup,
+            CONSUMER_GROUP,
+            self.consumer_name,
+            {self.queue.stream_key(p): ">" for p in ready},
+            count=max(1, free // len(ready)),
+            block=block_ms,
+        )
+        for stream, entries in result or []:
+            started += self._dispatch(int(_decode(stream).rsplit(":", 1)[1]), entries)
+        return started
+
+    async def drain(self, timeout: float) -> None:
+        """Wait for in-flight entries (shutdown); unfinished ones stay pending for reclaim."""
+        if self._inflight:
+            await asyncio.wait(list(self._inflight.values()), timeout=timeout)
+
+    def release(self, partition: int) -> None:
+        super().release(partition)
+        self._recovery_cursor.pop(partition, None)
+
+    async def _recover_partition_async(self, partition: int) -> int:
+        start = self._recovery_cursor.get(partition, "0")
+        entries = await asyncio.to_thread(self._pending_entries, partition, start)
+        if entries is None:
+            return 0
+        if not entries:
+            self._needs_recovery.discard(partition)
+            self._recovery_cursor.pop(partition, None)
+            return 0
+        # Page through the pending list: in-flight entries are skipped, not re-read forever
+        self._recovery_cursor[partition] = _decode(entries[-1][0])
+        return self._dispatch(partition, entries)
+
+    def _dispatch(self, partition: int, entries) -> int:
+        stream = self.queue.stream_key(partition)
+        started = 0
+        for entry_id, fields in entries:
+            entry_id = _decode(entry_id)
+            key = f"{stream}/{entry_id}"
+            if key in self._inflight:
+                continue
+            if not fields:
+                # Trimmed while pending: nothing to run
+                self._ack(stream, entry_id)
+                continue
+
+            fields = {_decode(k): _decode(v) for k, v in fields.items()}
+            task = asyncio.create_task(self._run_entry(stream, entry_id, fields))
+            self._inflight[key] = task
+            task.add_done_callback(lambda _task, key=key: self._inflight.pop(key, None))
+            started += 1
+        return started
+
+    async def _run_entry(self, stream: str, entry_id: str, fields: dict) -> None:
+        payload = json.loads(fields["payload"])
+        async with self._chat_lock(fields.get("chat_id", "")):
+            attempt = 0
+            while True:
+                try:
+                    async with self._slots:
+                        await self.handler(payload)
+                except Exception as e:
+                    if self._record_failure(stream, entry_id, fields, e):
+                        return
+                    await asyncio.sleep(self.RETRY_BACKOFF_SECONDS[min(attempt, len(self.RETRY_BACKOFF_SECONDS) - 1)])
+                    attempt += 1
+                    continue
+                self._ack(stream, entry_id)
+                return
+
+    @asynccontextmanager
+    async def _chat_lock(self, chat_id: str) -> AsyncIterator[None]:
+        lock = self._chat_locks.setdefault(chat_id, asyncio.Lock())
+        self._chat_users[chat_id] = self._chat_users.get(chat_id, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._chat_users[chat_id] -= 1
+            if not self._chat_users[chat_id]:
+                del self._chat_users[chat_id]
+                del self._chat_locks[chat_id]
+
+    async def _wait_for_progress(self, block_ms: int) -> None:
+        if self._inflight:
+            await asyncio.wait(
+                list(self._inflight.values()), timeout=block_ms / 1000, return_when=asyncio.FIRST_COMPLETED
+            )
+        else:
+            await asyncio.sleep(block_ms / 1000)
+
+
+# Singleton global
+_stream_queue: PartitionedStreamQueue | None = None
+
+
+def get_stream_queue() -> PartitionedStreamQueue:
+    """Get or create the global partitioned ingestion queue."""
+    global _stream_queue
+    if _stream_queue is None:
+        _stream_queue = PartitionedStreamQueue()
+    return _stream_queue
@@ -16,6 +16,7 @@ from robbot.api.v1.routers.api import api_router
 from robbot.config.container import initialize_container, shutdown_container
 from robbot.config.settings import get_settings
 from robbot.core.logging_setup import configure_logging
+from robbot.infra.redis.client import close_async_redis_pool
 
 
 def create_app() -> FastAPI:
@@ -59,6 +60,8 @@ def create_app() -> FastAPI:
         except Exception as e:
             logger.error("[ERROR] Failed to shutdown DI Container: %s", e)
 
+        await close_async_redis_pool()
+
     application = FastAPI(title="Robbot API", version="0.1.0", lifespan=lifespan)
 
     # Configure CORS middleware for HttpOnly cookies
@@ -0,0 +1,108 @@
+"""Broadcast schemas for API requests and responses."""
+
+from datetime import datetime
+from typing import Literal
+
+from pydantic import BaseModel, ConfigDict, Field, model_validator
+
+from robbot.domain.shared.enums import BroadcastRecipientStatus, BroadcastStatus, ConversationStatus, LeadStatus
+
+
+class BroadcastAudience(BaseModel):
+    """Audience query: conversations (and their lead) matching every filter given."""
+
+    conversation_statuses: list[ConversationStatus] | None = Field(None, description="Conversation statuses")
+    lead_statuses: list[LeadStatus] | None = Field(None, description="Lead statuses (requires a lead)")
+    inactive_for_hours: int | None = Field(None, ge=1, description="No message for at least N hours")
+    min_maturity_score: int | None = Field(None, ge=0, le=100)
+    max_maturity_score: int | None = Field(None, ge=0, le=100)
+    exclude_urgent: bool = Field(True, description="Skip conversations flagged as urgent")
+    limit: int | None = Field(None, ge=1, description="Maximum recipients (capped by BROADCAST_MAX_RECIPIENTS)")
+
+
+class BroadcastCreate(BaseModel):
+    """Schema for creating broadcasts (either ``templates`` or a ``preset``)."""
+
+    name: str = Field(..., min_length=1, max_length=255)
+    templates: list[str] | None = Field(
+        None,
+        min_length=1,
+        description="Message templates; one is picked per recipient. Placeholders: {name}, {first_name}",
+    )
+    preset: Literal["reengagement"] | None = Field(None, description="Use the built-in templates instead")
+    audience: BroadcastAudience = Field(default_factory=BroadcastAudience)
+    scheduled_at: datetime | None = Field(None, description="Start time (UTC); now when omitted")
+    session_name: str = Field("default", min_length=1, max_length=100, description="WAHA session")
+    conversation_status_after: ConversationStatus | None = Field(
+        None, description="Conversation status set after a successful send"
+    )
+
+    @model_validator(mode="after")
+    def _templates_or_preset(self) -> "BroadcastCreate":
+        if bool(self.templates) == bool(self.preset):
+            raise ValueError("Provide either templates or preset")
+        if self.templates and not all(template.strip() for template in self.templates):
+            raise ValueError("Templates must not be empty")
+        return self
+
+
+class BroadcastProgress(BaseModel):
+    """Recipients per delivery status."""
+
+    total: int = 0
+    pending: int = 0
+    sending: int = 0
+    sent: int = 0
+    failed: int = 0
+    skipped: int = 0
+
+
+class BroadcastOut(BaseModel):
+    """Response schema for broadcasts."""
+
+    id: str
+    name: str
+    status: BroadcastStatus
+    templates: list[str]
+    audience: dict
+    session_name: str
+    conversation_status_after: ConversationStatus | None
+    scheduled_at: datetime
+    started_at: datetime | None
+    completed_at: datetime | None
+    total_recipients: int | None
+    created_at: datetime
+    progress: BroadcastProgress | None = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class BroadcastList(BaseModel):
+    """Response schema for listing broadcasts."""
+
+    broadcasts: list[BroadcastOut]
+    total: int
+
+
+class BroadcastRecipientOut(BaseModel):
+    """Response schema for a broadcast recipient."""
+
+    id: str
+    chat_id: str
+    phone_number: str | None
+    name: str | None
+    conversation_id: str | None
+    status: BroadcastRecipientStatus
+    attempts: int
+    waha_message_id: str | None
+    error: str | None
+    sent_at: datetime | None
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class BroadcastRecipientList(BaseModel):
+    """Response schema for listing broadcast recipients."""
+
+    recipients: list[BroadcastRecipientOut]
+    total: int
@@ -127,9 +127,15 @@ class WebhookPayload(BaseModel):
 
 
 class WebhookLogOut(BaseModel):
-    """Webhook log output schema (simplified for less verbosity)."""
+    """Webhook log output schema (simplified for less verbosity).
 
-    id: int
+    With the write-behind buffer enabled the row is not in the database yet
+    when the webhook returns: ``id`` is None and ``buffer_id`` holds the
+    Redis stream entry id instead.
+    """
+
+    id: int | None = None
+    buffer_id: str | None = None
     session_name: str
     event_type: str
     processed: bool
@@ -14,7 +14,11 @@ from typing import Any
 
 from sqlalchemy.orm import Session
 
+from robbot.config.settings import settings
+from robbot.core.async_runtime import run_sync
+from robbot.infra.integrations.waha.waha_client import get_waha_client
 from robbot.services.bot.conversation_service import ConversationService
+from robbot.services.communication.media_cache import get_media_cache
 from robbot.services.content.content_service import ContentService
 from robbot.services.ai.context_service import ContextService
 
@@ -129,6 +133,10 @@ SEND_CONTEXT_CONTENT_DECLARATION = {
 }
 
 
+# Tipo do conteúdo -> tipo de envio no cache de mídia
+_CONTENT_MEDIA_KINDS = {"image": "image", "voice": "voice", "video": "video", "document": "file"}
+
+
 def send_context_content_tool(
     db: Session, content_id: str, conversation_id: str, custom_intro: str = None
 ) -> dict[str, Any]:
@@ -143,7 +151,7 @@ def send_context_content_tool(
 
         # Get conversation
         conv_service = ConversationService(db)
-        conversation = conv_service.get_by_id(conversation_id)
+        conversation = conv_service.repo.get_by_id(conversation_id)
 
         if not conversation:
             return {"success": False, "error": f"Conversation {conversation_id} not found"}
@@ -153,7 +161,7 @@ def send_context_content_tool(
             f"conversation_id={conversation_id}, intro={custom_intro}"
         )
 
-        return {
+        result = {
             "success": True,
             "content_id": content_id,
             "conversation_id": conversation_id,
@@ -161,12 +169,39 @@ def send_context_content_tool(
             "custom_intro": custom_intro,
             "note": "Content queued for sending",
         }
+        if content.type in _CONTENT_MEDIA_KINDS and content.file.url:
+            # Mesmo folheto/áudio para muitos leads: enviado pelo cache (sem baixar/converter de novo)
+            run_sync(_send_media_content(conversation.chat_id, content, custom_intro))
+            result["note"] = "Content sent"
+        return result
 
     except Exception as e:  # noqa: BLE001 (blind exception)
         logger.error("[ERROR] Error sending context content: %s", e)
         return {"success": False, "error": str(e)}
 
 
+async def _send_media_content(chat_id: str, content: Any, custom_intro: str | None) -> None:
+    waha_client = get_waha_client()
+    kind = _CONTENT_MEDIA_KINDS[content.type]
+    apply_anti_ban = not settings.WAHA_SEND_GOVERNOR_ENABLED
+    if kind == "voice" and custom_intro:
+        # Áudio não tem legenda: a introdução vai antes, como texto
+        await waha_client.send_text(
+            session=settings.WAHA_SESSION_NAME, chat_id=chat_id, text=custom_intro, apply_anti_ban=apply_anti_ban
+        )
+    await get_media_cache().send(
+        waha_client,
+        session=settings.WAHA_SESSION_NAME,
+        chat_id=chat_id,
+        kind=kind,
+        url=content.file.url,
+        mimetype=content.file.mimetype,
+        filename=content.file.filename,
+        caption=custom_intro or content.caption,
+        apply_anti_ban=apply_anti_ban,
+    )
+
+
 # ============================================================================
 # TOOL 4: Send Clinic Location
 # ============================================================================
@@ -14,6 +14,7 @@ from typing import Any
 import redis.asyncio as aioredis
 
 from robbot.config.settings import get_settings
+from robbot.core.async_runtime import LoopBoundResource
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -23,17 +24,16 @@ class PersistentMemory:
     """Redis-based persistent memory for conversations."""
 
     def __init__(self):
-        self.redis_client: aioredis.Redis | None = None
+        # redis.asyncio connections belong to the loop that opened them: one client per loop
+        self._clients = LoopBoundResource(
+            "persistent_memory_redis",
+            lambda: aioredis.from_url(settings.REDIS_URL, encoding="utf-8", decode_responses=True),
+            closer=lambda client: client.aclose(),
+        )
 
     async def _get_client(self) -> aioredis.Redis:
-        """Get or create Redis client."""
-        if self.redis_client is None:
-            self.redis_client = await aioredis.from_url(
-                settings.REDIS_URL,
-                encoding="utf-8",
-                decode_responses=True,
-            )
-        return self.redis_client
+        """Get or create the Redis client of the running event loop."""
+        return self._clients.get()
 
     async def add_question(self, conversation_id: str, question: str) -> None:
         """
@@ -199,7 +199,5 @@ class PersistentMemory:
 
     async def close(self) -> None:
         """Close Redis connection."""
-        if self.redis_client:
-            await self.redis_client.aclose()
-            self.redis_client = None
+        await self._clients.aclose()
 
@@ -24,6 +24,7 @@ from robbot.services.bot.response_dispatcher import ResponseDispatcher
 from robbot.services.ai.persistent_memory import PersistentMemory
 from robbot.core.text_sanitizer import enforce_whatsapp_style
 from robbot.services.communication.transcription_service import TranscriptionService
+from robbot.services.infrastructure.admission_control import get_admission_controller
 
 logger = logging.getLogger(__name__)
 
@@ -71,8 +72,9 @@ class ConversationOrchestrator:
                 if self._should_bot_silence(conversation):
                     return await self._handle_silenced(session, conversation, message_text)
 
-                # 4. Pipeline Execution (Ingestion & Analysis)
-                state = await pipeline.execute(conversation, message_text, **media_kwargs)
+                # 4. Pipeline Execution (Ingestion & Analysis), lighter while the inbound queue lags
+                level = await get_admission_controller().level_async()
+                state = await pipeline.execute(conversation, message_text, level=level, **media_kwargs)
                 
                 # Update urgency in DB if detected
                 if state.is_urgent and not conversation.is_urgent:
@@ -12,6 +12,7 @@ from robbot.services.ai.intent_detector import IntentDetector
 from robbot.services.ai.context_validator import ContextValidator
 from robbot.infra.persistence.models.conversation_model import ConversationModel
 from robbot.infra.persistence.repositories.conversation_message_repository import ConversationMessageRepository
+from robbot.services.infrastructure.admission_control import AdmissionController, DegradationLevel
 
 logger = logging.getLogger(__name__)
 
@@ -56,9 +57,13 @@ class ConversationPipeline:
         audio_url: str | None = None,
         has_video: bool = False,
         video_url: str | None = None,
+        level: DegradationLevel = DegradationLevel.NORMAL,
     ) -> PipelineState:
         """
         Execute the ingestion pipeline.
+
+        Under load (admission control) name extraction is skipped from DEGRADED
+        on, and the RAG lookup at CRITICAL (recent history is always kept).
         """
         state = PipelineState(message_inner_text)
         
@@ -74,7 +79,11 @@ class ConversationPipeline:
 
         # 3. Fetch context (RAG - Knowledge Base)
         # We use Chroma for "long-term" or "relevant fact" retrieval, not necessarily conversation flow logs.
-        rag_context = await self.context_builder.get_conversation_context(conversation.id, limit=5)
+        if level >= DegradationLevel.CRITICAL:
+            AdmissionController.record_shed("rag")
+            rag_context = ""
+        else:
+            rag_context = await self.context_builder.get_conversation_context(conversation.id, limit=5)
 
         # 3b. Fetch Recent History (Sliding Window - Postgres)
         # We fetch the last 15 messages to maintain coherent conversation flow.
@@ -119,7 +128,9 @@ class ConversationPipeline:
                 or lead_name == conversation.lead.phone_number
                 or (len(lead_name.split()) == 1 and len(lead_name) < 15)
             )
-            if should_extract:
+            if should_extract and level >= DegradationLevel.DEGRADED:
+                AdmissionController.record_shed("name_extraction")
+            elif should_extract:
                 await self.intent_detector.try_extract_name(
                     self.session, state.message_text, state.context_text, conversation
                 )
@@ -60,17 +60,20 @@ class ConversationService:
             logger.info("[SUCCESS] Conversation found (id=%s, status=%s)", conversation_model.id, conversation_model.status)
             return conversation_model
 
-        # 1. LID Resolution (WhatsApp specific logic)
+        # 1. LID Resolution: directory/cache only, unknown LIDs are resolved in background
         resolved_phone = phone_number
-        from robbot.services.leads.lid_resolver_service import get_lid_resolver
-        lid_resolver = get_lid_resolver()
-        
-        if lid_resolver.is_lid_format(phone_number):
+        if chat_id.endswith("@lid"):
+            from robbot.services.leads.lid_resolver_service import get_lid_resolver
+            from robbot.services.leads.lid_work_set import LidWorkSet
+
             try:
-                resolved = await lid_resolver.try_resolve_lid(phone_number, timeout_seconds=1.0)
+                resolved = get_lid_resolver().cached_phone(phone_number)
                 if resolved:
                     resolved_phone = resolved
                     logger.info("[LID] Phone resolved: %s -> %s", phone_number, resolved_phone)
+                else:
+                    # Placeholder phone, patched by the LID resolution job
+                    LidWorkSet().add([phone_number])
             except Exception as e:
                 logger.debug("[LID] Resolution skipped, will retry later: %s", e)
 
@@ -78,7 +81,7 @@ class ConversationService:
         conversation_domain = Conversation(
             id=None,
             chat_id=chat_id,
-            phone_number=phone_number,
+            phone_number=resolved_phone,
         )
         
         conversation_model = ConversationMapper.to_model(conversation_domain)
@@ -1,5 +1,10 @@
 """
 Response Dispatcher - Handles delivery and logging of robot responses.
+
+Delivery goes through the transactional outbox: the reply is stored as a
+PENDING outbound message in the turn's transaction and the outbox relay
+(services/communication/outbox_relay.py) sends it once the turn commits, so
+no WAHA call (or anti-ban delay) happens while the transaction is open.
 """
 
 import logging
@@ -9,7 +14,7 @@ from sqlalchemy.orm import Session
 from robbot.infra.integrations.waha.waha_client import WAHAClient
 from robbot.infra.persistence.repositories.lead_interaction_repository import LeadInteractionRepository
 from robbot.infra.persistence.repositories.llm_interaction_repository import LLMInteractionRepository
-from robbot.domain.shared.enums import InteractionType
+from robbot.domain.shared.enums import DeliveryStatus, InteractionType
 from robbot.infra.persistence.models.lead_interaction_model import LeadInteractionModel
 from robbot.infra.persistence.models.llm_interaction_model import LLMInteractionModel
 from robbot.services.communication.message_processor import MessageProcessor
@@ -41,22 +46,22 @@ class ResponseDispatcher:
         session_name: str = "default"
     ) -> bool:
         """
-        Send response via WAHA and record all logs.
-        """
-        # 1. Send via WAHA
-        sent = False
-        try:
-            await self.waha_client.send_text(chat_id=chat_id, text=response_text, session=session_name)
-            sent = True
-            logger.info("[SUCCESS] Response sent via WAHA (chat_id=%s)", chat_id)
-        except Exception as e:
-            logger.error("[ERROR] Failed to send via WAHA: %s", e)
-            # We continue to save the message to DB even if WAHA failed - it marks intent was to send
+        Queue the response in the outbox and record all logs (no commit, no WAHA call).
 
-        # 2. Save outbound message to DB
+        Returns:
+            True once the reply is queued; it is sent by the outbox relay after the caller commits
+        """
+        # 1. Save outbound message as PENDING (outbox): the relay sends it after commit
         await self.message_processor.save_outbound_message(
-            self.session, conversation_id, response_text, to_phone=phone_number
+            self.session,
+            conversation_id,
+            response_text,
+            to_phone=phone_number,
+            chat_id=chat_id,
+            session_name=session_name,
+            delivery_status=DeliveryStatus.PENDING,
         )
+        logger.info("[SUCCESS] Response queued in the outbox (chat_id=%s)", chat_id)
 
         # 3. Register Interaction
         await self._register_interaction(lead_id, intent, message_text, response_text)
@@ -70,7 +75,7 @@ class ResponseDispatcher:
             response_data.get("latency_ms", 0),
         )
 
-        return sent
+        return True
 
     async def _register_interaction(self, lead_id: str | None, intent: str, inbound: str, outbound: str):
         if not lead_id:
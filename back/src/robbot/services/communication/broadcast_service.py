@@ -0,0 +1,241 @@
+"""
+Broadcast service: bulk sends for campaigns and re-engagement.
+
+A broadcast is a set of message templates, an audience query and a start time.
+The lifecycle is:
+
+1. ``create`` stores it as SCHEDULED and schedules the start job (batch lane)
+2. at ``scheduled_at`` the start job resolves the audience once into
+   ``broadcast_recipients`` (each with its rendered text, PENDING) and marks
+   the broadcast RUNNING; from then on the recipient list is fixed
+3. send jobs (infra/jobs/broadcast_job.py) claim small chunks of recipients
+   and send them through WAHAClient, paced per session by the send governor;
+   each job enqueues the next one until no recipient is left (COMPLETED)
+
+Progress lives in the recipient rows, so a broadcast survives worker restarts:
+a recipient left in SENDING is claimed again after BROADCAST_CLAIM_LEASE_SECONDS,
+``pause`` stops the jobs between sends and ``resume`` enqueues them again.
+
+Every send job carries the broadcast's ``send_epoch``. ``resume`` bumps it
+before enqueueing fresh chains, so chains from before the pause (a job still
+mid-batch or a delayed retry waiting in the scheduler) stop at their next
+check instead of running alongside the new ones.
+"""
+
+import logging
+import re
+import zlib
+from datetime import UTC, datetime
+
+from sqlalchemy.orm import Session
+
+from robbot.config.settings import settings
+from robbot.core.custom_exceptions import BusinessRuleError, NotFoundException
+from robbot.domain.shared.enums import BroadcastRecipientStatus, BroadcastStatus
+from robbot.infra.persistence.models.broadcast_model import BroadcastModel, BroadcastRecipientModel
+from robbot.infra.persistence.repositories.broadcast_repository import BroadcastRepository
+from robbot.schemas.broadcast import BroadcastCreate, BroadcastProgress
+from robbot.services.infrastructure.queue_service import QueueService, get_queue_service
+
+logger = logging.getLogger(__name__)
+
+# Templates prontos (placeholders: {name}, {first_name})
+TEMPLATE_PRESETS: dict[str, list[str]] = {
+    "reengagement": [
+        "Olá! Notamos que você estava interessado em nossos serviços. Podemos ajudar em algo?",
+        "Oi! Está tudo bem? Ainda tem interesse em conversar conosco?",
+        "Olá! Vimos que você nos procurou recentemente. Gostaria de retomar nossa conversa?",
+    ],
+}
+
+
+class _Placeholders(dict):
+    """Unknown placeholders render as empty text instead of raising."""
+
+    def __missing__(self, key: str) -> str:
+        return ""
+
+
+def render_message(templates: list[str], chat_id: str, name: str | None) -> str:
+    """Pick a template for the recipient (stable across runs) and fill in the placeholders."""
+    template = templates[zlib.crc32(chat_id.encode()) % len(templates)]
+    name = (name or "").strip()
+    values = _Placeholders(name=name, first_name=name.split(" ")[0] if name else "")
+    try:
+        text = template.format_map(values)
+    except (ValueError, IndexError):
+        text = template
+    # "Oi {first_name}, tudo bem?" sem nome -> "Oi, tudo bem?"
+    text = re.sub(r" {2,}", " ", text)
+    return re.sub(r" +([!?,.])", r"\1", text).strip()
+
+
+class BroadcastService:
+    """Creates broadcasts and controls their lifecycle (start, pause, resume, cancel)."""
+
+    def __init__(self, db: Session, queue_service: QueueService | None = None):
+        self.db = db
+        self.repo = BroadcastRepository(db)
+        self._queue_service = queue_service
+
+    @property
+    def queue_service(self) -> QueueService:
+        if self._queue_service is None:
+            self._queue_service = get_queue_service()
+        return self._queue_service
+
+    def create(self, payload: BroadcastCreate, created_by_user_id: int | None = None) -> BroadcastModel:
+        """Store the broadcast (SCHEDULED) and schedule its start."""
+        scheduled_at = payload.scheduled_at or datetime.now(UTC)
+        if scheduled_at.tzinfo:
+            scheduled_at = scheduled_at.astimezone(UTC).replace(tzinfo=None)
+
+        broadcast = self.repo.create(
+            BroadcastModel(
+                name=payload.name,
+                templates=payload.templates or TEMPLATE_PRESETS[payload.preset],
+                audience=payload.audience.model_dump(mode="json", exclude_none=True),
+                session_name=payload.session_name,
+                status=BroadcastStatus.SCHEDULED,
+                conversation_status_after=payload.conversation_status_after,
+                scheduled_at=scheduled_at,
+                created_by_user_id=created_by_user_id,
+            )
+        )
+        self.db.commit()
+
+        self.queue_service.enqueue_broadcast_start(broadcast.id, scheduled_at)
+        logger.info(
+            "[BROADCAST] Broadcast criado (id=%s, início=%s)",
+            broadcast.id,
+            scheduled_at.isoformat(),
+            extra={"broadcast_id": broadcast.id},
+        )
+        return broadcast
+
+    def get(self, broadcast_id: str) -> BroadcastModel:
+        broadcast = self.repo.get_by_id(broadcast_id)
+        if broadcast is None:
+            raise NotFoundException(f"Broadcast {broadcast_id} not found")
+        return broadcast
+
+    def list_broadcasts(
+        self, status: BroadcastStatus | None = None, skip: int = 0, limit: int = 50
+    ) -> list[BroadcastModel]:
+        return self.repo.list_broadcasts(status=status, skip=skip, limit=limit)
+
+    def progress(self, broadcast_id: str) -> BroadcastProgress:
+        counts = self.repo.progress(broadcast_id)
+        return BroadcastProgress(
+            total=sum(counts.values()),
+            **{status.value.lower(): count for status, count in counts.items()},
+        )
+
+    def list_recipients(
+        self,
+        broadcast_id: str,
+        status: BroadcastRecipientStatus | None = None,
+        skip: int = 0,
+        limit: int = 100,
+    ) -> list[BroadcastRecipientModel]:
+        self.get(broadcast_id)
+        return self.repo.list_recipients(broadcast_id, status=status, skip=skip, limit=limit)
+
+    def start(self, broadcast_id: str) -> int:
+        """
+        Resolve the audience into recipients and mark the broadcast RUNNING.
+
+        Runs once per broadcast (start job); returns the number of recipients.
+        Nothing happens unless the broadcast is still SCHEDULED.
+        """
+        broadcast = self.repo.get_by_id(broadcast_id)
+        if broadcast is None or broadcast.status != BroadcastStatus.SCHEDULED:
+            return 0
+
+        limit = min(
+            broadcast.audience.get("limit") or settings.BROADCAST_MAX_RECIPIENTS, settings.BROADCAST_MAX_RECIPIENTS
+        )
+        recipients = []
+        for conversation, lead in self.repo.find_audience(broadcast.audience, limit):
+            name = (lead.name if lead else None) or conversation.name
+            recipients.append(
+                {
+                    "conversation_id": conversation.id,
+                    "lead_id": lead.id if lead else None,
+                    "chat_id": conversation.chat_id,
+                    "phone_number": conversation.phone_number,
+                    "name": name,
+                    "text": render_message(broadcast.templates, conversation.chat_id, name),
+                }
+            )
+
+        added = self.repo.add_recipients(broadcast.id, recipients)
+        broadcast.total_recipients = added
+        broadcast.started_at = datetime.utcnow()
+        broadcast.status = BroadcastStatus.RUNNING
+        if not added:
+            broadcast.status = BroadcastStatus.COMPLETED
+            broadcast.completed_at = broadcast.started_at
+        self.db.commit()
+
+        logger.info(
+            "[BROADCAST] Audiência resolvida: %d destinatários (id=%s)",
+            added,
+            broadcast.id,
+            extra={"broadcast_id": broadcast.id},
+        )
+        return added
+
+    def pause(self, broadcast_id: str) -> BroadcastModel:
+        """Stop sending; jobs already running finish their current send and leave the rest PENDING."""
+        broadcast = self.get(broadcast_id)
+        if broadcast.status not in (BroadcastStatus.SCHEDULED, BroadcastStatus.RUNNING):
+            raise BusinessRuleError(f"Cannot pause a {broadcast.status.value} broadcast")
+        broadcast.status = BroadcastStatus.PAUSED
+        self.db.commit()
+        return broadcast
+
+    def resume(self, broadcast_id: str) -> BroadcastModel:
+        """Continue a paused broadcast where it stopped."""
+        broadcast = self.get(broadcast_id)
+        if broadcast.status != BroadcastStatus.PAUSED:
+            raise BusinessRuleError(f"Cannot resume a {broadcast.status.value} broadcast")
+
+        if broadcast.started_at is None:
+            broadcast.status = BroadcastStatus.SCHEDULED
+            self.db.commit()
+            self.queue_service.enqueue_broadcast_start(broadcast.id, broadcast.scheduled_at)
+        else:
+            broadcast.status = BroadcastStatus.RUNNING
+            broadcast.send_epoch += 1
+            self.db.commit()
+            self.enqueue_send_jobs(broadcast.id, broadcast.send_epoch)
+        return broadcast
+
+    def cancel(self, broadcast_id: str) -> BroadcastModel:
+        """Cancel the broadcast; recipients not sent yet are SKIPPED."""
+        broadcast = self.get(broadcast_id)
+        if broadcast.status in (BroadcastStatus.COMPLETED, BroadcastStatus.CANCELLED):
+            raise BusinessRuleError(f"Cannot cancel a {broadcast.status.value} broadcast")
+        broadcast.status = BroadcastStatus.CANCELLED
+        broadcast.completed_at = datetime.utcnow()
+        skipped = self.repo.skip_open(broadcast.id)
+        self.db.commit()
+        logger.info("[BROADCAST] Broadcast cancelado (id=%s, %d pulados)", broadcast.id, skipped)
+        return broadcast
+
+    def complete_if_done(self, broadcast_id: str) -> bool:
+        """Mark a RUNNING broadcast COMPLETED once no recipient is PENDING/SENDING."""
+        broadcast = self.repo.get_by_id(broadcast_id)
+        if broadcast is None or broadcast.status != BroadcastStatus.RUNNING or self.repo.count_open(broadcast_id):
+            return False
+        broadcast.status = BroadcastStatus.COMPLETED
+        broadcast.completed_at = datetime.utcnow()
+        self.db.commit()
+        logger.info("[BROADCAST] Broadcast concluído (id=%s)", broadcast_id, extra={"broadcast_id": broadcast_id})
+        return True
+
+    def enqueue_send_jobs(self, broadcast_id: str, epoch: int, delay_seconds: float = 0) -> None:
+        """Fan the broadcast out to BROADCAST_PARALLEL_JOBS send jobs of ``epoch`` (each claims its own recipients)."""
+        for _ in range(max(1, settings.BROADCAST_PARALLEL_JOBS)):
+            self.queue_service.enqueue_broadcast_send(broadcast_id, delay_seconds, epoch=epoch)
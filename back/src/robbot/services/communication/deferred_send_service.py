@@ -0,0 +1,432 @@
+"""
+Deferred sends: anti-ban delays without holding a worker.
+
+``WAHAClient._apply_anti_ban_flow`` sleeps inside the job for the whole
+human-like delay (up to 2 minutes), so a worker answers about one message per
+minute. With WAHA_DEFERRED_SEND the conversation turn instead:
+
+1. starts the typing indicator,
+2. records the send in a Redis sorted set scored by its due time
+   (``compute_anti_ban_delay``, the same timing as the in-worker flow),
+3. returns immediately.
+
+``DeferredSendDispatcher`` (workers/send_dispatcher_worker.py) polls the set and
+fires ``stop_typing`` + the actual send when the delay expires, pinging the
+session every 10s while sends are pending, like the in-worker heartbeat. The
+dispatcher never waits for the send governor: a send with no slot free right
+now is put back in the schedule for the time the session's bucket allows it,
+so one throttled session does not hold up the other chats (or outlive the
+claim lease and get sent twice).
+
+Per-chat order is kept: each chat has a FIFO list of pending sends and only its
+head is in the due set; completing a send moves the next one of the chat in,
+so a backlog in one chat (e.g. a throttled session) never crowds the heads of
+other chats out of the claim scan. A send queued behind another one starts
+typing when the previous one goes out and is due its own delay after that,
+exactly as if the same worker had sent them back to back.
+
+Keys (prefix DEFERRED_SEND_PREFIX):
+- ``{prefix}:due``            ZSET head send id of each chat -> next action time (typing or send)
+- ``{prefix}:item:{id}``      HASH session, chat_id, text, reply_to, message_id, typing_at, due_at, phase, attempts
+- ``{prefix}:chat:{chat_id}`` LIST pending send ids of the chat, in order
+- ``{prefix}:session_sends``  HASH session -> sends still pending (heartbeat; dropped at 0)
+
+Sends coming from the transactional outbox (outbox_relay) use the
+conversation message id as send id, so scheduling them again is a no-op, and
+the dispatcher records the outcome on that message (SENT / FAILED).
+"""
+
+import asyncio
+import contextlib
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any
+
+from redis import Redis
+
+from robbot.config.settings import settings
+from robbot.core.custom_exceptions import WAHASendThrottledError
+from robbot.core.text_sanitizer import enforce_whatsapp_style
+from robbot.domain.shared.enums import DeliveryStatus
+from robbot.infra.integrations.waha.waha_client import SESSION_HEARTBEAT_SECONDS, WAHAClient, compute_anti_ban_delay
+from robbot.infra.redis.client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+PHASE_TYPING = "typing"
+PHASE_SEND = "send"
+RETRY_BACKOFF_SECONDS = (2, 5, 15)
+
+# KEYS: due, item, chat list, session sends | ARGV: id, now, delay, session, chat_id, text, reply_to, item prefix, message_id
+# Typing starts when the previous send of the chat is due (or now); due = typing start + delay
+# An id already scheduled is left as is (outbox re-claims)
+_SCHEDULE = """
+if redis.call('EXISTS', KEYS[2]) == 1 then
+    return redis.call('HMGET', KEYS[2], 'typing_at', 'due_at', 'phase')
+end
+local now = tonumber(ARGV[2])
+local typing_at = now
+local tail = redis.call('LINDEX', KEYS[3], -1)
+if tail then
+    local previous_due = tonumber(redis.call('HGET', ARGV[8] .. tail, 'due_at'))
+    if previous_due and previous_due > typing_at then
+        typing_at = previous_due
+    end
+end
+local due_at = typing_at + tonumber(ARGV[3])
+local phase = 'send'
+local score = due_at
+if typing_at > now then
+    phase = 'typing'
+    score = typing_at
+end
+redis.call('HSET', KEYS[2], 'session', ARGV[4], 'chat_id', ARGV[5], 'text', ARGV[6], 'reply_to', ARGV[7],
+    'message_id', ARGV[9], 'typing_at', tostring(typing_at), 'due_at', tostring(due_at), 'phase', phase, 'attempts', 0)
+-- Only the chat head is due; the next one enters when it completes
+if redis.call('RPUSH', KEYS[3], ARGV[1]) == 1 then
+    redis.call('ZADD', KEYS[1], score, ARGV[1])
+end
+redis.call('HINCRBY', KEYS[4], ARGV[4], 1)
+return {tostring(typing_at), tostring(due_at), phase}
+"""
+
+# KEYS: due | ARGV: now, lease until, limit, item prefix, chat prefix
+# Claims due sends (chat heads), leasing them (crash -> retried after the lease)
+_CLAIM = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[3]))
+local claimed = {}
+for _, id in ipairs(ids) do
+    local chat_id = redis.call('HGET', ARGV[4] .. id, 'chat_id')
+    if chat_id and redis.call('LINDEX', ARGV[5] .. chat_id, 0) == id then
+        redis.call('ZADD', KEYS[1], ARGV[2], id)
+        claimed[#claimed + 1] = id
+    else
+        redis.call('ZREM', KEYS[1], id)
+    end
+end
+return claimed
+"""
+
+# KEYS: due, item, chat list, session sends | ARGV: id, item prefix, session
+# Removes a finished send and makes the next send of the chat due
+_COMPLETE = """
+redis.call('ZREM', KEYS[1], ARGV[1])
+redis.call('LREM', KEYS[3], 1, ARGV[1])
+if redis.call('DEL', KEYS[2]) == 1 and redis.call('HINCRBY', KEYS[4], ARGV[3], -1) <= 0 then
+    redis.call('HDEL', KEYS[4], ARGV[3])
+end
+local next_id = redis.call('LINDEX', KEYS[3], 0)
+if next_id then
+    local next_item = redis.call('HMGET', ARGV[2] .. next_id, 'phase', 'typing_at', 'due_at')
+    local score = next_item[3]
+    if next_item[1] == 'typing' then
+        score = next_item[2]
+    end
+    redis.call('ZADD', KEYS[1], tonumber(score) or 0, next_id)
+end
+return 1
+"""
+
+
+def _decode(value: Any) -> Any:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+@dataclass(frozen=True)
+class ScheduledSend:
+    id: str
+    typing_at: float
+    due_at: float
+    typing_now: bool
+
+
+class DeferredSendOutbox:
+    """Redis side of the deferred sends (sync, one round trip per operation)."""
+
+    def __init__(self, redis_client: Redis | None = None, prefix: str | None = None):
+        self.redis = redis_client or get_redis_client()
+        self.prefix = prefix or settings.DEFERRED_SEND_PREFIX
+        self._schedule = self.redis.register_script(_SCHEDULE)
+        self._claim = self.redis.register_script(_CLAIM)
+        self._complete = self.redis.register_script(_COMPLETE)
+
+    @property
+    def due_key(self) -> str:
+        return f"{self.prefix}:due"
+
+    @property
+    def session_sends_key(self) -> str:
+        return f"{self.prefix}:session_sends"
+
+    def item_key(self, send_id: str) -> str:
+        return f"{self.prefix}:item:{send_id}"
+
+    def chat_key(self, chat_id: str) -> str:
+        return f"{self.prefix}:chat:{chat_id}"
+
+    def schedule(
+        self,
+        session: str,
+        chat_id: str,
+        text: str,
+        delay: float,
+        reply_to: str | None = None,
+        now: float | None = None,
+        message_id: str | None = None,
+    ) -> ScheduledSend:
+        """Record a send due ``delay`` seconds after the chat's previous one (or now).
+
+        With ``message_id`` (outbox message) the send id is the message id and
+        scheduling is idempotent.
+        """
+        send_id = message_id or uuid.uuid4().hex
+        now = time.time() if now is None else now
+        typing_at, due_at, phase = self._schedule(
+            keys=[self.due_key, self.item_key(send_id), self.chat_key(chat_id), self.session_sends_key],
+            args=[send_id, now, delay, session, chat_id, text, reply_to or "", f"{self.prefix}:item:", message_id or ""],
+        )
+        return ScheduledSend(
+            id=send_id,
+            typing_at=float(_decode(typing_at)),
+            due_at=float(_decode(due_at)),
+            typing_now=_decode(phase) == PHASE_SEND,
+        )
+
+    def claim_due(self, limit: int, now: float | None = None) -> list[dict[str, Any]]:
+        """Lease up to ``limit`` due sends (at most one per chat) and return them."""
+        now = time.time() if now is None else now
+        ids = self._claim(
+            keys=[self.due_key],
+            args=[now, now + settings.DEFERRED_SEND_LEASE_SECONDS, limit, f"{self.prefix}:item:", f"{self.prefix}:chat:"],
+        )
+        if not ids:
+            return []
+        pipe = self.redis.pipeline(transaction=False)
+        for send_id in ids:
+            pipe.hgetall(self.item_key(_decode(send_id)))
+        items = []
+        for send_id, fields in zip(ids, pipe.execute(), strict=True):
+            item = {_decode(k): _decode(v) for k, v in fields.items()}
+            item["id"] = _decode(send_id)
+            items.append(item)
+        return items
+
+    def advance_to_send(self, item: dict[str, Any], now: float | None = None) -> float:
+        """Typing started: schedule the send itself and return its due time.
+
+        If the previous send of the chat went out late, the whole typing delay
+        still runs from now, as it would have in a worker sending back to back.
+        """
+        now = time.time() if now is None else now
+        typing_at, due_at = float(item["typing_at"]), float(item["due_at"])
+        due_at = max(due_at, now + (due_at - typing_at))
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(self.item_key(item["id"]), mapping={"phase": PHASE_SEND, "due_at": due_at})
+        pipe.zadd(self.due_key, {item["id"]: due_at})
+        pipe.execute()
+        return due_at
+
+    def complete(self, item: dict[str, Any]) -> None:
+        """Remove a finished (or abandoned) send, unblocking the next one of the chat."""
+        self._complete(
+            keys=[self.due_key, self.item_key(item["id"]), self.chat_key(item["chat_id"]), self.session_sends_key],
+            args=[item["id"], f"{self.prefix}:item:", item["session"]],
+        )
+
+    def postpone(self, item: dict[str, Any], until: float) -> None:
+        """Put a claimed send back in the schedule at ``until`` (no attempt counted)."""
+        self.redis.zadd(self.due_key, {item["id"]: until})
+
+    def retry_later(self, item: dict[str, Any], now: float | None = None) -> bool:
+        """Reschedule a failed send with backoff; False when attempts are exhausted."""
+        attempts = self.redis.hincrby(self.item_key(item["id"]), "attempts", 1)
+        if attempts >= settings.DEFERRED_SEND_MAX_ATTEMPTS:
+            return False
+        now = time.time() if now is None else now
+        backoff = RETRY_BACKOFF_SECONDS[min(attempts, len(RETRY_BACKOFF_SECONDS)) - 1]
+        self.redis.zadd(self.due_key, {item["id"]: now + backoff})
+        return True
+
+    def pending(self) -> int:
+        return self.redis.zcard(self.due_key)
+
+    def sessions(self) -> list[str]:
+        return [_decode(session) for session in self.redis.hkeys(self.session_sends_key)]
+
+
+class DeferredSendScheduler:
+    """Producer side, used by the conversation turn: start typing, schedule, return."""
+
+    def __init__(self, waha_client: WAHAClient | None = None, outbox: DeferredSendOutbox | None = None):
+        self.waha_client = waha_client or WAHAClient()
+        self.outbox = outbox or DeferredSendOutbox()
+
+    async def schedule_text(
+        self,
+        session: str,
+        chat_id: str,
+        text: str,
+        message_id_to_reply: str | None = None,
+        message_id: str | None = None,
+    ) -> ScheduledSend:
+        """Schedule ``text`` with the same human-like delay as WAHAClient.send_text.
+
+        ``message_id`` links the send to its outbox message (see outbox_relay).
+        """
+        text = enforce_whatsapp_style(text)
+        delay = compute_anti_ban_delay(text)
+        scheduled = await asyncio.to_thread(
+            self.outbox.schedule, session, chat_id, text, delay, message_id_to_reply, None, message_id
+        )
+
+        if scheduled.typing_now:
+            try:
+                await self.waha_client.start_typing(session, chat_id)
+            except Exception as e:  # noqa: BLE001
+                logger.warning("[DEFERRED SEND] Falha ao iniciar typing (não crítico): %s", e)
+
+        logger.info(
+            "[DEFERRED SEND] Envio agendado em %.1fs para %s (%s chars)",
+            scheduled.due_at - time.time(),
+            chat_id,
+            len(text),
+            extra={"send_id": scheduled.id, "chat_id": chat_id, "due_at": scheduled.due_at},
+        )
+        return scheduled
+
+
+class DeferredSendDispatcher:
+    """Consumer side: fires typing and sends when they are due."""
+
+    def __init__(
+        self,
+        waha_client: WAHAClient | None = None,
+        outbox: DeferredSendOutbox | None = None,
+        concurrency: int | None = None,
+    ):
+        self.waha_client = waha_client or WAHAClient()
+        self.outbox = outbox or DeferredSendOutbox()
+        self.concurrency = concurrency or settings.DEFERRED_SEND_CONCURRENCY
+        self._last_heartbeat = 0.0
+
+    async def run_once(self, now: float | None = None) -> int:
+        """Fire every due action (one per chat); returns how many were handled."""
+        items = await asyncio.to_thread(self.outbox.claim_due, self.concurrency, now)
+        if items:
+            await asyncio.gather(*(self._fire(item, now) for item in items))
+        await self._heartbeat_sessions()
+        return len(items)
+
+    async def run_forever(self, stop: asyncio.Event) -> None:
+        poll_seconds = settings.DEFERRED_SEND_POLL_MS / 1000
+        while not stop.is_set():
+            try:
+                handled = await self.run_once()
+            except Exception as e:
+                logger.error("[DEFERRED SEND] Erro no dispatcher: %s", e, exc_info=True)
+                handled = 0
+            if not handled:
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(stop.wait(), timeout=poll_seconds)
+
+    async def _fire(self, item: dict[str, Any], now: float | None = None) -> None:
+        session, chat_id = item["session"], item["chat_id"]
+
+        if item.get("phase") == PHASE_TYPING:
+            try:
+                await self.waha_client.start_typing(session, chat_id)
+            except Exception as e:  # noqa: BLE001
+                logger.warning("[DEFERRED SEND] Falha ao iniciar typing (não crítico): %s", e)
+            await asyncio.to_thread(self.outbox.advance_to_send, item, now)
+            return
+
+        try:
+            await self.waha_client.stop_typing(session, chat_id)
+        except Exception as e:  # noqa: BLE001
+            logger.warning("[DEFERRED SEND] Falha ao parar typing (não crítico): %s", e)
+
+        try:
+            result = await self.waha_client.send_text(
+                session=session,
+                chat_id=chat_id,
+                text=item["text"],
+                apply_anti_ban=False,  # the delay already happened here
+                message_id_to_reply=item.get("reply_to") or None,
+                max_send_wait=0,  # never hold the dispatch round for the send governor
+            )
+        except WAHASendThrottledError as e:
+            retry_after = e.retry_after or RETRY_BACKOFF_SECONDS[0]
+            await asyncio.to_thread(
+                self.outbox.postpone, item, (time.time() if now is None else now) + retry_after
+            )
+            logger.info("[DEFERRED SEND] Sessão no limite de envio, reagendado em %.1fs (%s)", retry_after, chat_id)
+            return
+        except Exception as e:
+            if await asyncio.to_thread(self.outbox.retry_later, item, now):
+                logger.warning("[DEFERRED SEND] Envio falhou, nova tentativa agendada (%s): %s", chat_id, e)
+                return
+            logger.error(
+                "[DEFERRED SEND] Envio descartado após %d tentativas (%s): %s",
+                settings.DEFERRED_SEND_MAX_ATTEMPTS,
+                chat_id,
+                e,
+                extra={"send_id": item["id"], "chat_id": chat_id},
+            )
+            await self._record_delivery(item, DeliveryStatus.FAILED, error=str(e)[:500])
+        else:
+            lateness = (time.time() if now is None else now) - float(item["due_at"])
+            logger.info(
+                "[DEFERRED SEND] Enviado para %s (atraso sobre o previsto: %.2fs)",
+                chat_id,
+                lateness,
+                extra={"send_id": item["id"], "chat_id": chat_id, "lateness_seconds": lateness},
+            )
+            await self._record_delivery(item, DeliveryStatus.SENT, result=result)
+        await asyncio.to_thread(self.outbox.complete, item)
+
+    async def _record_delivery(
+        self, item: dict[str, Any], status: DeliveryStatus, result: Any = None, error: str | None = None
+    ) -> None:
+        """Record the outcome on the outbox message the send came from, if any."""
+        if not item.get("message_id"):
+            return
+        from robbot.services.communication.outbox_relay import record_delivery, sent_message_id
+
+        try:
+            await asyncio.to_thread(
+                record_delivery,
+                item["message_id"],
+                status,
+                (DeliveryStatus.SENDING, DeliveryStatus.SCHEDULED),
+                sent_message_id(result),
+                error,
+            )
+        except Exception as e:  # noqa: BLE001
+            logger.warning("[DEFERRED SEND] Falha ao registrar entrega no outbox (não crítico): %s", e)
+
+    async def _heartbeat_sessions(self) -> None:
+        """Ping sessions every 10s while sends are pending (keeps them alive, as the in-worker flow did)."""
+        if time.monotonic() - self._last_heartbeat < SESSION_HEARTBEAT_SECONDS:
+            return
+        self._last_heartbeat = time.monotonic()
+        if not await asyncio.to_thread(self.outbox.pending):
+            return
+        for session in await asyncio.to_thread(self.outbox.sessions):
+            try:
+                await self.waha_client.get_session_status(session)
+            except Exception as e:  # noqa: BLE001
+                logger.warning("[HEARTBEAT] Ping failed (non-critical): %s", e)
+
+
+# Singleton global
+_deferred_send_scheduler: DeferredSendScheduler | None = None
+
+
+def get_deferred_send_scheduler() -> DeferredSendScheduler:
+    """Get or create the global deferred send scheduler."""
+    global _deferred_send_scheduler
+    if _deferred_send_scheduler is None:
+        _deferred_send_scheduler = DeferredSendScheduler()
+    return _deferred_send_scheduler
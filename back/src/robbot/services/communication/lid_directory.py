@@ -0,0 +1,184 @@
+"""
+Directory of every LID <-> phone mapping known to WAHA, prefetched into Redis.
+
+Resolving LIDs one contact at a time costs one or two WAHA calls per unknown
+contact, on the webhook hot path. The directory instead copies the whole
+``GET /api/{session}/lids`` listing into two Redis hashes:
+
+- ``<prefix>:lid2pn``: LID number -> phone number
+- ``<prefix>:pn2lid``: phone number -> LID number
+
+so a resolution is a single HGET (plus a HINCRBY of the hit/miss counters in
+``<prefix>:stats``, both in one Lua call).
+
+The polling leader enqueues a sync on startup and every
+LID_DIRECTORY_REFRESH_SECONDS. A delta sync first asks WAHA for the LID count
+and stops there when it did not change; otherwise it pages through the listing
+and writes only the mappings that are new or changed. Every
+LID_DIRECTORY_FULL_SYNC_SECONDS a full sync rebuilds both hashes (dropping
+mappings WAHA no longer knows) and swaps them in atomically.
+"""
+
+import logging
+import time
+from typing import Any
+
+from redis import Redis
+
+from robbot.config.settings import settings
+from robbot.core.custom_exceptions import WAHAError
+from robbot.infra.integrations.waha.waha_client import WAHAClient
+from robbot.infra.redis.client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# KEYS: mapping hash, stats hash | ARGV: field -> value or false (one round trip with the counter)
+_LOOKUP = """
+local value = redis.call('HGET', KEYS[1], ARGV[1])
+redis.call('HINCRBY', KEYS[2], value and 'hits' or 'misses', 1)
+return value
+"""
+
+
+def _number(identifier: str) -> str:
+    """'123@lid' / '5511...@c.us' / '123' -> the bare number."""
+    return identifier.split("@")[0]
+
+
+def _text(value: bytes | str | None) -> str | None:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class LidDirectory:
+    """Redis-backed LID <-> phone directory (see module docstring).
+
+    ``redis_client`` may be the asyncio client, for the ``a*`` lookups on the API
+    event loop; ``sync`` and the other methods need the sync client.
+    """
+
+    def __init__(self, redis_client: Redis | None = None, prefix: str | None = None):
+        self.redis = redis_client or get_redis_client()
+        self.prefix = prefix or settings.LID_DIRECTORY_PREFIX
+        self.lid_key = f"{self.prefix}:lid2pn"
+        self.phone_key = f"{self.prefix}:pn2lid"
+        self.stats_key = f"{self.prefix}:stats"
+        self.meta_key = f"{self.prefix}:meta"
+        self._lookup = self.redis.register_script(_LOOKUP)
+
+    # ------------------------------------------------------------------ lookup
+
+    def phone_for_lid(self, lid: str) -> str | None:
+        """Phone number (no suffix) of ``lid``, or None when the directory does not know it."""
+        return _text(self._lookup(keys=[self.lid_key, self.stats_key], args=[_number(lid)]))
+
+    def lid_for_phone(self, phone: str) -> str | None:
+        """LID (``<number>@lid``) of ``phone``, or None when the directory does not know it."""
+        lid = _text(self._lookup(keys=[self.phone_key, self.stats_key], args=[_number(phone)]))
+        return f"{lid}@lid" if lid else None
+
+    async def aphone_for_lid(self, lid: str) -> str | None:
+        """``phone_for_lid`` for the asyncio Redis client (webhook ingestion)."""
+        return _text(await self._lookup(keys=[self.lid_key, self.stats_key], args=[_number(lid)]))
+
+    def stats(self) -> dict[str, Any]:
+        """Size, last syncs and hit rate of the lookups since the directory was created."""
+        counters = {_text(k): int(v) for k, v in self.redis.hgetall(self.stats_key).items()}
+        meta = {_text(k): _text(v) for k, v in self.redis.hgetall(self.meta_key).items()}
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "size": self.redis.hlen(self.lid_key),
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(hits / (hits + misses), 4) if hits + misses else None,
+            "synced_at": float(meta["synced_at"]) if meta.get("synced_at") else None,
+            "full_synced_at": float(meta["full_synced_at"]) if meta.get("full_synced_at") else None,
+            "waha_count": int(meta["count"]) if meta.get("count") else None,
+            "syncs": {k: v for k, v in counters.items() if k.startswith("sync_")},
+        }
+
+    # -------------------------------------------------------------------- sync
+
+    def claim_sync(self) -> bool:
+        """True at most once per LID_DIRECTORY_REFRESH_SECONDS across all processes."""
+        return bool(
+            self.redis.set(f"{self.prefix}:sync_lock", 1, nx=True, ex=settings.LID_DIRECTORY_REFRESH_SECONDS)
+        )
+
+    def full_sync_due(self, now: float | None = None) -> bool:
+        last = _text(self.redis.hget(self.meta_key, "full_synced_at"))
+        now = time.time() if now is None else now
+        return last is None or now - float(last) >= settings.LID_DIRECTORY_FULL_SYNC_SECONDS
+
+    async def sync(self, waha_client: WAHAClient, session: str, full: bool = False) -> dict[str, Any]:
+        """
+        Copy WAHA's LID listing into the directory (delta unless ``full``).
+
+        Raises:
+            WAHAError: The listing could not be read (the directory is left as it was)
+        """
+        started = time.time()
+        count = await self._waha_count(waha_client, session)
+        if not full and count is not None and str(count) == _text(self.redis.hget(self.meta_key, "count")):
+            self.redis.hincrby(self.stats_key, "sync_unchanged", 1)
+            return {"status": "unchanged", "count": count}
+
+        lid_target, phone_target = (
+            (f"{self.lid_key}:rebuild", f"{self.phone_key}:rebuild") if full else (self.lid_key, self.phone_key)
+        )
+        if full:
+            self.redis.delete(lid_target, phone_target)
+
+        seen = written = 0
+        offset, page_size = 0, settings.LID_DIRECTORY_PAGE_SIZE
+        while True:
+            page = await waha_client.get_all_lids(session, limit=page_size, offset=offset)
+            mappings = {
+                _number(entry["lid"]): _number(entry["pn"]) for entry in page if entry.get("lid") and entry.get("pn")
+            }
+            seen += len(mappings)
+            written += self._write(mappings, lid_target, phone_target, only_changes=not full)
+            if len(page) < page_size:
+                break
+            offset += page_size
+
+        pipe = self.redis.pipeline(transaction=True)
+        if full:
+            if seen:
+                pipe.rename(lid_target, self.lid_key)
+                pipe.rename(phone_target, self.phone_key)
+            else:
+                pipe.delete(self.lid_key, self.phone_key)
+            pipe.hset(self.meta_key, "full_synced_at", started)
+        pipe.hset(self.meta_key, mapping={"synced_at": started, "count": count if count is not None else seen})
+        pipe.hincrby(self.stats_key, "sync_full" if full else "sync_delta", 1)
+        pipe.execute()
+
+        logger.info(
+            "[LID_DIRECTORY] Sync %s concluído: %d mapeamentos, %d gravados (%.1fs)",
+            "completo" if full else "delta",
+            seen,
+            written,
+            time.time() - started,
+        )
+        return {"status": "full" if full else "delta", "count": seen, "written": written}
+
+    async def _waha_count(self, waha_client: WAHAClient, session: str) -> int | None:
+        try:
+            return await waha_client.get_lids_count(session)
+        except WAHAError as e:
+            logger.debug("[LID_DIRECTORY] Contagem de LIDs indisponível: %s", e)
+            return None
+
+    def _write(self, mappings: dict[str, str], lid_target: str, phone_target: str, only_changes: bool) -> int:
+        if only_changes and mappings:
+            current = self.redis.hmget(lid_target, list(mappings))
+            mappings = {
+                lid: phone for (lid, phone), known in zip(mappings.items(), current, strict=True) if _text(known) != phone
+            }
+        if not mappings:
+            return 0
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(lid_target, mapping=mappings)
+        pipe.hset(phone_target, mapping={phone: lid for lid, phone in mappings.items()})
+        pipe.execute()
+        return len(mappings)
@@ -0,0 +1,318 @@
+"""
+Content-addressed cache of ready-to-send media for WAHA.
+
+Knowledge-base contents (brochures, images, audio) go out to thousands of
+leads. Sent by their original URL, every send makes WAHA download the file
+again, and voice notes are re-encoded to opus each time. The cache keeps each
+asset once, already in its WhatsApp format, under the SHA-256 of its bytes:
+
+- files live on disk at MEDIA_CACHE_DIR/<2 hex>/<sha256> (written atomically,
+  so concurrent writers of the same asset are harmless)
+- Redis maps each source URL, and each distinct raw file, to the digest of
+  its ready asset and keeps the asset metadata: a known URL is neither
+  downloaded nor converted again
+- voice notes are stored encoded as opus and videos as mp4 (the WAHA
+  conversion runs once per distinct file)
+- sends reference the asset as MEDIA_CACHE_PUBLIC_URL/api/v1/media/<sha256>
+  (served by the API with immutable cache headers), or carry the cached bytes
+  inline when no public URL is configured
+
+Disk usage is bounded by MEDIA_CACHE_MAX_BYTES: the least recently sent assets
+are evicted first. When the cache cannot prepare an asset, the send falls back
+to the original URL (with WAHA-side conversion).
+"""
+
+import asyncio
+import base64
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import httpx
+from redis import Redis
+
+from robbot.config.settings import settings
+from robbot.core import runtime_metrics
+from robbot.core.custom_exceptions import ExternalServiceError, WAHAError
+from robbot.core.http_clients import get_http_clients
+from robbot.infra.integrations.waha.waha_client import WAHAClient
+from robbot.infra.redis.client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+MEDIA_KINDS = ("image", "file", "voice", "video")
+
+# kind -> (formato pronto para o WhatsApp, método de conversão do WAHAClient)
+_CONVERSIONS = {
+    "voice": ("audio/ogg; codecs=opus", "convert_voice_to_opus"),
+    "video": ("video/mp4", "convert_video_to_mp4"),
+}
+_DEFAULT_MIMETYPES = {"image": "image/jpeg", "file": "application/octet-stream"}
+_EXTENSIONS = {"voice": "ogg", "video": "mp4"}
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def _text(value: bytes | str) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _is_ready(kind: str, mimetype: str | None) -> bool:
+    """Whether the file is already in the format WhatsApp plays natively."""
+    if kind not in _CONVERSIONS:
+        return True
+    mimetype = (mimetype or "").lower()
+    if kind == "voice":
+        return mimetype.startswith("audio/ogg") and "opus" in mimetype
+    return mimetype.startswith("video/mp4")
+
+
+@dataclass(frozen=True)
+class MediaAsset:
+    """One cached, ready-to-send file."""
+
+    digest: str
+    kind: str
+    mimetype: str
+    filename: str
+    size: int
+    path: Path
+
+
+class MediaCache:
+    """Content-addressed media store (see module docstring)."""
+
+    def __init__(self, redis_client: Redis | None = None, root: str | Path | None = None):
+        self.redis = redis_client or get_redis_client()
+        self.root = Path(root or settings.MEDIA_CACHE_DIR)
+        self.prefix = settings.MEDIA_CACHE_PREFIX
+
+    # ------------------------------------------------------------------ lookup
+
+    def _key(self, *parts: str) -> str:
+        return ":".join((self.prefix, *parts))
+
+    def _path(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest
+
+    def get(self, digest: str) -> MediaAsset | None:
+        """Cached asset by digest (None when unknown or not on this disk)."""
+        meta = self.redis.hgetall(self._key("asset", digest))
+        if not meta:
+            return None
+        meta = {_text(key): _text(value) for key, value in meta.items()}
+        path = self._path(digest)
+        if not path.is_file():
+            return None
+        return MediaAsset(
+            digest=digest,
+            kind=meta.get("kind", "file"),
+            mimetype=meta.get("mimetype", "application/octet-stream"),
+            filename=meta.get("filename", digest),
+            size=int(meta.get("size", 0)),
+            path=path,
+        )
+
+    def _lookup(self, index_key: str) -> MediaAsset | None:
+        digest = self.redis.get(index_key)
+        return self.get(_text(digest)) if digest is not None else None
+
+    def _touch(self, asset: MediaAsset) -> None:
+        self.redis.zadd(self._key("lru"), {asset.digest: time.time()})
+
+    # ----------------------------------------------------------------- prepare
+
+    async def prepare(
+        self,
+        kind: str,
+        session: str,
+        waha_client: WAHAClient,
+        url: str | None = None,
+        data: bytes | None = None,
+        mimetype: str | None = None,
+        filename: str | None = None,
+    ) -> MediaAsset:
+        """
+        Ready-to-send asset for ``url`` or ``data``, downloading/converting only on a miss.
+
+        Raises:
+            httpx.HTTPError: The source could not be downloaded
+            ExternalServiceError: The WAHA conversion failed
+        """
+        if kind not in MEDIA_KINDS:
+            raise ValueError(f"Unknown media kind: {kind}")
+        source_key = self._key("src", kind, _sha256(url.encode())) if url else None
+        if source_key:
+            asset = self._lookup(source_key)
+            if asset is not None:
+                runtime_metrics.incr("media_cache", "hits")
+                self._touch(asset)
+                return asset
+
+        runtime_metrics.incr("media_cache", "misses")
+        if data is None:
+            data = await self._download(url)
+        # Mesmos bytes vindos de outra URL: reaproveita a conversão
+        raw_key = self._key("raw", kind, _sha256(data))
+        asset = self._lookup(raw_key)
+        if asset is None:
+            ready, ready_mimetype = await self._convert(kind, session, waha_client, data, mimetype)
+            asset = await asyncio.to_thread(self._store, kind, ready, ready_mimetype, filename)
+            self.redis.set(raw_key, asset.digest, ex=settings.MEDIA_CACHE_SOURCE_TTL_SECONDS)
+        if source_key:
+            self.redis.set(source_key, asset.digest, ex=settings.MEDIA_CACHE_SOURCE_TTL_SECONDS)
+        self._touch(asset)
+        return asset
+
+    async def _download(self, url: str) -> bytes:
+        client = get_http_clients().async_client(timeout=30.0, name="media_download_http")
+        response = await client.get(url)
+        response.raise_for_status()
+        runtime_metrics.incr("media_cache", "downloads")
+        return response.content
+
+    async def _convert(
+        self, kind: str, session: str, waha_client: WAHAClient, data: bytes, mimetype: str | None
+    ) -> tuple[bytes, str]:
+        if _is_ready(kind, mimetype):
+            return data, mimetype or _DEFAULT_MIMETYPES.get(kind) or _CONVERSIONS[kind][0]
+
+        target, method = _CONVERSIONS[kind]
+        result = await getattr(waha_client, method)(session=session, file_data=base64.b64encode(data).decode())
+        if isinstance(result, bytes):
+            converted = result
+        elif isinstance(result, dict) and result.get("data"):
+            converted = base64.b64decode(result["data"])
+        else:
+            raise WAHAError(f"{kind} conversion returned no data")
+        runtime_metrics.incr("media_cache", "conversions")
+        return converted, target
+
+    def _store(self, kind: str, data: bytes, mimetype: str, filename: str | None) -> MediaAsset:
+        digest = _sha256(data)
+        path = self._path(digest)
+        if not path.is_file():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp, path)
+            except BaseException:
+                Path(tmp).unlink(missing_ok=True)
+                raise
+
+        if kind in _EXTENSIONS:
+            filename = f"{Path(filename or digest[:16]).stem}.{_EXTENSIONS[kind]}"
+        asset = MediaAsset(
+            digest=digest, kind=kind, mimetype=mimetype, filename=filename or digest[:16], size=len(data), path=path
+        )
+        added = self.redis.hsetnx(self._key("asset", digest), "size", asset.size)
+        self.redis.hset(
+            self._key("asset", digest), mapping={"kind": kind, "mimetype": mimetype, "filename": asset.filename}
+        )
+        if added:
+            total = self.redis.incrby(self._key("bytes"), asset.size)
+            self.redis.zadd(self._key("lru"), {digest: time.time()})
+            if total > settings.MEDIA_CACHE_MAX_BYTES:
+                self._evict(total - settings.MEDIA_CACHE_MAX_BYTES, keep=digest)
+        logger.info("[MEDIA_CACHE] Asset armazenado (%s, %s, %d bytes)", kind, digest[:12], asset.size)
+        return asset
+
+    def _evict(self, excess: int, keep: str) -> None:
+        """Drop the least recently sent assets until ``excess`` bytes are freed."""
+        freed = 0
+        for raw in self.redis.zrange(self._key("lru"), 0, -1):
+            if freed >= excess:
+                break
+            digest = _text(raw)
+            if digest == keep:
+                continue
+            size = int(self.redis.hget(self._key("asset", digest), "size") or 0)
+            pipe = self.redis.pipeline()
+            pipe.delete(self._key("asset", digest))
+            pipe.zrem(self._key("lru"), digest)
+            pipe.decrby(self._key("bytes"), size)
+            pipe.execute()
+            self._path(digest).unlink(missing_ok=True)
+            freed += size
+            runtime_metrics.incr("media_cache", "evictions")
+
+    # -------------------------------------------------------------------- send
+
+    def file_reference(self, asset: MediaAsset) -> dict[str, str]:
+        """``file_url`` (API endpoint) or inline ``file_data`` for a WAHAClient send."""
+        if settings.MEDIA_CACHE_PUBLIC_URL:
+            return {"file_url": f"{settings.MEDIA_CACHE_PUBLIC_URL.rstrip('/')}/api/v1/media/{asset.digest}"}
+        return {"file_data": base64.b64encode(asset.path.read_bytes()).decode()}
+
+    async def send(
+        self,
+        waha_client: WAHAClient,
+        session: str,
+        chat_id: str,
+        kind: str,
+        url: str,
+        mimetype: str | None = None,
+        filename: str | None = None,
+        caption: str | None = None,
+        apply_anti_ban: bool = True,
+    ) -> dict[str, Any]:
+        """Send ``url`` as ``kind`` through the cache (falls back to the original URL)."""
+        file: dict[str, Any] = {"file_url": url}
+        ready = _is_ready(kind, mimetype)
+        # Só URLs http(s) passam pelo cache (base64/data URIs seguem direto)
+        if settings.MEDIA_CACHE_ENABLED and url.startswith(("http://", "https://")):
+            try:
+                asset = await self.prepare(kind, session, waha_client, url=url, mimetype=mimetype, filename=filename)
+                file = await asyncio.to_thread(self.file_reference, asset)
+                mimetype, filename, ready = asset.mimetype, asset.filename, True
+            except (httpx.HTTPError, ExternalServiceError, OSError) as e:
+                runtime_metrics.incr("media_cache", "fallbacks")
+                logger.warning("[MEDIA_CACHE] Enviando pela URL original (%s): %s", url, e)
+
+        if kind == "image":
+            return await waha_client.send_image(
+                session=session,
+                chat_id=chat_id,
+                filename=filename,
+                mimetype=mimetype or _DEFAULT_MIMETYPES["image"],
+                caption=caption,
+                apply_anti_ban=apply_anti_ban,
+                **file,
+            )
+        if kind == "voice":
+            voice_mimetype = mimetype if ready and mimetype else _CONVERSIONS["voice"][0]
+            return await waha_client.send_voice(
+                session=session, chat_id=chat_id, mimetype=voice_mimetype, convert=not ready, **file
+            )
+        if kind == "video":
+            return await waha_client.send_video(
+                session=session, chat_id=chat_id, filename=filename, caption=caption, convert=not ready, **file
+            )
+        return await waha_client.send_file(
+            session=session, chat_id=chat_id, filename=filename, mimetype=mimetype, caption=caption, **file
+        )
+
+
+# Singleton global
+_media_cache: MediaCache | None = None
+_media_cache_lock = threading.Lock()
+
+
+def get_media_cache() -> MediaCache:
+    """Get or create the process-wide media cache."""
+    global _media_cache
+    if _media_cache is None:
+        with _media_cache_lock:
+            if _media_cache is None:
+                _media_cache = MediaCache()
+    return _media_cache
@@ -3,10 +3,10 @@ Service for filtering WhatsApp messages based on business rules and state (dedup
 Ensures only valid, new, and allowed messages are processed.
 """
 import logging
-from typing import Set
 
 from robbot.config.settings import settings
 from robbot.infra.redis.client import get_redis_client
+from robbot.infra.redis.dedup import MessageDedupIndex
 
 logger = logging.getLogger(__name__)
 
@@ -16,14 +16,15 @@ class MessageFilterService:
     Filters inbound messages applying:
     - Self-message checks (fromMe)
     - DEV_MODE sender allow-listing
-    - Deduplication (Redis check of message ID)
+    - Deduplication (compact hourly Redis index of message IDs, see MessageDedupIndex)
     """
 
     def __init__(self):
         self.redis = get_redis_client()
+        self.dedup = MessageDedupIndex(self.redis)
         self.last_check_was_processed = False
 
-    def should_process(self, message: dict, allowed_senders: Set[str] | None = None) -> bool:
+    def should_process(self, message: dict, allowed_senders: set[str] | None = None) -> bool:
         """
         Determines if a message should be processed.
         
@@ -35,6 +36,59 @@ class MessageFilterService:
             True if message is valid and new, False otherwise.
         """
         message_id = message.get("id")
+
+        if not self._passes_rules(message, allowed_senders):
+            return False
+
+        # 3. Deduplication Check (Idempotency)
+        if not message_id:
+            self.last_check_was_processed = False
+            logger.debug("[FILTER] Rejeitada (sem message_id)")
+            return False
+        
+        is_processed = self._is_processed(message_id)
+        self.last_check_was_processed = is_processed
+        
+        if is_processed:
+            # DEBUG level to avoid spam — dedup is normal in polling mode
+            logger.debug("[FILTER] Rejeitada (já processada): msg_id=%s", message_id)
+            return False
+
+        return True
+
+    def claim_new(self, messages: list[dict], allowed_senders: set[str] | None = None) -> list[dict]:
+        """
+        Returns the messages that are valid and new, claiming them atomically.
+
+        Applies the same rules as should_process(), then claims every candidate
+        in the dedup index with a single Lua call. A message is returned to
+        exactly one caller even if webhook and polling see it at the same time.
+        Callers that fail to enqueue a claimed message should release() it.
+
+        Args:
+            messages: Raw message dicts from WAHA (e.g. one chat page or one webhook).
+            allowed_senders: Optional set of allowed sender IDs (for DEV mode).
+
+        Returns:
+            Claimed messages, in input order.
+        """
+        candidates = [m for m in messages if m.get("id") and self._passes_rules(m, allowed_senders)]
+        if not candidates:
+            return []
+
+        results = self.dedup.claim([m["id"] for m in candidates])
+
+        claimed = [m for m, was_claimed in zip(candidates, results, strict=True) if was_claimed]
+        logger.debug("[FILTER] %d/%d mensagens novas reivindicadas", len(claimed), len(messages))
+        return claimed
+
+    def release(self, message_ids: list[str]) -> None:
+        """Releases claims so the messages can be picked up again (e.g. enqueue failed)."""
+        self.dedup.release(message_ids)
+
+    def _passes_rules(self, message: dict, allowed_senders: set[str] | None) -> bool:
+        """Business rules that don't depend on dedup state (fromMe, DEV allow-list)."""
+        message_id = message.get("id")
         sender = message.get("from")
 
         # 1. Ignore messages sent by the bot itself
@@ -61,29 +115,13 @@ class MessageFilterService:
                 )
                 return False
 
-        # 3. Deduplication Check (Idempotency)
-        if not message_id:
-            self.last_check_was_processed = False
-            logger.debug("[FILTER] Rejeitada (sem message_id)")
-            return False
-        
-        is_processed = self._is_processed(message_id)
-        self.last_check_was_processed = is_processed
-        
-        if is_processed:
-            # DEBUG level to avoid spam — dedup is normal in polling mode
-            logger.debug("[FILTER] Rejeitada (já processada): msg_id=%s", message_id)
-            return False
-
         return True
 
     def mark_as_processed(self, message_id: str):
-        """Marks a message ID as processed in Redis with 24h TTL."""
+        """Marks a message ID as processed (remembered for MESSAGE_DEDUP_WINDOW_HOURS)."""
         if message_id:
-            key = f"waha:processed:{message_id}"
-            self.redis.set(key, "1", ex=86400)
+            self.dedup.claim([message_id])
 
     def _is_processed(self, message_id: str) -> bool:
-        """Checks if message ID exists in Redis."""
-        key = f"waha:processed:{message_id}"
-        return bool(self.redis.get(key))
+        """Checks if message ID is in the dedup index."""
+        return self.dedup.contains(message_id)
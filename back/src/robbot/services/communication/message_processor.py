@@ -16,7 +16,7 @@ from sqlalchemy.orm import Session
 
 from robbot.infra.persistence.repositories.conversation_message_repository import ConversationMessageRepository
 from robbot.core.custom_exceptions import DatabaseError
-from robbot.domain.shared.enums import MessageDirection
+from robbot.domain.shared.enums import DeliveryStatus, MessageDirection
 from robbot.infra.persistence.models.conversation_message_model import ConversationMessageModel
 from robbot.services.communication.transcription_service import TranscriptionService
 
@@ -134,11 +134,22 @@ class MessageProcessor:
             raise DatabaseError(f"Failed to save inbound message: {e}") from e
 
     async def save_outbound_message(
-        self, session: Any, conversation_id: str, text: str, to_phone: str, from_phone: str = "BOT"
+        self,
+        session: Any,
+        conversation_id: str,
+        text: str,
+        to_phone: str,
+        from_phone: str = "BOT",
+        chat_id: str | None = None,
+        session_name: str | None = None,
+        delivery_status: DeliveryStatus | None = None,
     ) -> ConversationMessageModel:
         """
         Persistir mensagem enviada pelo bot no banco.
 
+        Com ``delivery_status=PENDING`` a mensagem entra no outbox e o relay
+        faz o envio para ``chat_id`` depois do commit.
+
         Returns:
             ConversationMessageModel: Mensagem salva com timestamp UTC
         """
@@ -154,6 +165,9 @@ class MessageProcessor:
                 from_phone=from_phone,
                 to_phone=to_phone,
                 body=text,
+                chat_id=chat_id,
+                session_name=session_name,
+                delivery_status=delivery_status,
             )
             repo.create(message)
             session.flush()
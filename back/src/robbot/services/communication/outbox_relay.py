@@ -0,0 +1,195 @@
+"""
+Transactional outbox relay: delivers bot replies after the turn has committed.
+
+The conversation turn never talks to WAHA while its database transaction is
+open. ``ResponseDispatcher`` stores the reply in ``conversation_messages`` as
+PENDING (same transaction as the lead and LLM interaction rows) and commits;
+this relay then:
+
+1. claims PENDING messages in a short transaction (``FOR UPDATE SKIP LOCKED``,
+   status -> SENDING, attempts + 1) and commits,
+2. delivers them with no transaction open:
+   - WAHA_DEFERRED_SEND: hands them to the deferred send schedule (keyed by
+     the message id, so a re-claim after a crash does not schedule twice) and
+     marks them SCHEDULED; the send dispatcher marks them SENT/FAILED
+   - otherwise: ``send_text`` with the anti-ban flow, then SENT
+3. on error puts them back to PENDING (retried after OUTBOX_RETRY_SECONDS) or
+   FAILED after OUTBOX_MAX_ATTEMPTS.
+
+A message stuck in SENDING (relay died mid-delivery) is claimed again after
+OUTBOX_CLAIM_LEASE_SECONDS, so delivery is at-least-once with the window for
+duplicates limited to a crash between the WAHA call and the status update.
+
+Messages of the same chat are delivered one after the other, in creation
+order: only the oldest undelivered message of a chat is claimed, and a failed
+send holds the rest of the chat back until it is retried. Different chats are
+delivered concurrently. The relay runs inside the
+send dispatcher process (workers/send_dispatcher_worker.py).
+"""
+
+import asyncio
+import contextlib
+import logging
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any
+
+from robbot.config.settings import settings
+from robbot.domain.shared.enums import DeliveryStatus
+from robbot.infra.db.session import get_sync_session
+from robbot.infra.integrations.waha.waha_client import WAHAClient
+from robbot.infra.persistence.repositories.conversation_message_repository import ConversationMessageRepository
+from robbot.services.communication.deferred_send_service import DeferredSendScheduler
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class OutboundMessage:
+    """Detached copy of a claimed outbox row (the claim session is already closed)."""
+
+    id: str
+    session_name: str
+    chat_id: str
+    text: str
+    attempts: int
+
+
+def sent_message_id(result: Any) -> str | None:
+    """Extract the WAHA message id from a send response (engines differ in shape)."""
+    if not isinstance(result, dict):
+        return None
+    message_id = result.get("id")
+    if isinstance(message_id, dict):
+        message_id = message_id.get("_serialized")
+    return message_id if isinstance(message_id, str) and message_id else None
+
+
+def record_delivery(
+    message_id: str,
+    status: DeliveryStatus,
+    from_statuses: tuple[DeliveryStatus, ...] | None = None,
+    waha_message_id: str | None = None,
+    error: str | None = None,
+) -> bool:
+    """Write a delivery outcome in its own short transaction (blocking; run it in a thread)."""
+    with get_sync_session() as session:
+        updated = ConversationMessageRepository(session).mark_delivery(
+            message_id, status, from_statuses=from_statuses, waha_message_id=waha_message_id, error=error
+        )
+        session.commit()
+        return updated
+
+
+class OutboxRelay:
+    """Claims PENDING outbound messages and delivers them outside any DB transaction."""
+
+    def __init__(
+        self,
+        waha_client: WAHAClient | None = None,
+        scheduler: DeferredSendScheduler | None = None,
+        batch_size: int | None = None,
+    ):
+        self.waha_client = waha_client or WAHAClient()
+        self.scheduler = scheduler or DeferredSendScheduler(self.waha_client)
+        self.batch_size = batch_size or settings.OUTBOX_RELAY_BATCH_SIZE
+
+    async def run_once(self) -> int:
+        """Deliver one batch; returns how many messages were claimed."""
+        messages = await asyncio.to_thread(self.claim_batch)
+        if not messages:
+            return 0
+
+        by_chat: dict[str, list[OutboundMessage]] = defaultdict(list)
+        for message in messages:
+            by_chat[message.chat_id].append(message)
+        await asyncio.gather(*(self._deliver_chat(chat_messages) for chat_messages in by_chat.values()))
+        return len(messages)
+
+    async def run_forever(self, stop: asyncio.Event) -> None:
+        poll_seconds = settings.OUTBOX_RELAY_POLL_MS / 1000
+        while not stop.is_set():
+            try:
+                handled = await self.run_once()
+            except Exception as e:
+                logger.error("[OUTBOX] Erro no relay: %s", e, exc_info=True)
+                handled = 0
+            if not handled:
+                with contextlib.suppress(TimeoutError):
+                    await asyncio.wait_for(stop.wait(), timeout=poll_seconds)
+
+    def claim_batch(self) -> list[OutboundMessage]:
+        """Claim a batch in a short transaction (blocking; run it in a thread)."""
+        with get_sync_session() as session:
+            rows = ConversationMessageRepository(session).claim_pending_outbound(
+                self.batch_size,
+                lease_seconds=settings.OUTBOX_CLAIM_LEASE_SECONDS,
+                retry_seconds=settings.OUTBOX_RETRY_SECONDS,
+            )
+            messages = [
+                OutboundMessage(
+                    id=row.id,
+                    session_name=row.session_name or "default",
+                    chat_id=row.chat_id or row.to_phone,
+                    text=row.body,
+                    attempts=row.delivery_attempts,
+                )
+                for row in rows
+            ]
+            session.commit()
+        return messages
+
+    async def _deliver_chat(self, messages: list[OutboundMessage]) -> None:
+        for message in messages:
+            if not await self._deliver(message):
+                break
+
+    async def _deliver(self, message: OutboundMessage) -> bool:
+        """Deliver one message; False when it failed (the rest of its chat must wait)."""
+        try:
+            if settings.WAHA_DEFERRED_SEND:
+                await self.scheduler.schedule_text(
+                    message.session_name, message.chat_id, message.text, message_id=message.id
+                )
+                await asyncio.to_thread(
+                    record_delivery, message.id, DeliveryStatus.SCHEDULED, (DeliveryStatus.SENDING,)
+                )
+                logger.info("[OUTBOX] Resposta agendada (chat_id=%s)", message.chat_id, extra={"message_id": message.id})
+                return True
+
+            result = await self.waha_client.send_text(
+                session=message.session_name, chat_id=message.chat_id, text=message.text
+            )
+        except Exception as e:
+            await self._fail(message, e)
+            return False
+
+        await asyncio.to_thread(
+            record_delivery,
+            message.id,
+            DeliveryStatus.SENT,
+            (DeliveryStatus.SENDING,),
+            sent_message_id(result),
+        )
+        logger.info("[OUTBOX] Resposta enviada via WAHA (chat_id=%s)", message.chat_id, extra={"message_id": message.id})
+        return True
+
+    async def _fail(self, message: OutboundMessage, error: Exception) -> None:
+        status = DeliveryStatus.FAILED if message.attempts >= settings.OUTBOX_MAX_ATTEMPTS else DeliveryStatus.PENDING
+        await asyncio.to_thread(record_delivery, message.id, status, (DeliveryStatus.SENDING,), None, str(error)[:500])
+        if status == DeliveryStatus.FAILED:
+            logger.error(
+                "[OUTBOX] Resposta descartada após %d tentativas (chat_id=%s): %s",
+                message.attempts,
+                message.chat_id,
+                error,
+                extra={"message_id": message.id, "chat_id": message.chat_id},
+            )
+        else:
+            logger.warning(
+                "[OUTBOX] Falha no envio, nova tentativa em %ss (chat_id=%s): %s",
+                settings.OUTBOX_RETRY_SECONDS,
+                message.chat_id,
+                error,
+                extra={"message_id": message.id, "chat_id": message.chat_id},
+            )
@@ -0,0 +1,82 @@
+"""
+Adaptive per-chat poll schedule for the WAHA polling safety net.
+
+Polling every target chat every WAHA_POLLING_INTERVAL seconds spends most of
+its WAHA calls on chats that have been silent for days. The scheduler keeps,
+per chat, the time of its next poll and the interval that produced it:
+
+- Redis ZSET ``<key>``: chat_id -> next poll time (unix seconds)
+- Redis hash ``<key>:interval``: chat_id -> current interval (seconds)
+
+After a poll the interval of a chat goes back to WAHA_POLLING_INTERVAL when the
+chat had something new, and is multiplied by WAHA_POLLING_BACKOFF_FACTOR (up to
+WAHA_POLLING_MAX_INTERVAL_SECONDS) when it had nothing. Webhook and presence
+events promote a chat: it is due on the next cycle, back at the minimum
+interval. Chats the scheduler has never seen are due immediately.
+
+The schedule only decides for chats without fresher evidence: a chat whose
+``chats/overview`` last message moved past its watermark is polled anyway.
+"""
+
+import time
+
+from redis import Redis
+
+from robbot.config.settings import settings
+from robbot.infra.redis.client import get_redis_client
+
+
+class PollScheduler:
+    """Redis-backed next-poll times with exponential backoff (see module docstring).
+
+    ``redis_client`` may be the asyncio client, for ``apromote`` on the API
+    event loop; every other method needs the sync client.
+    """
+
+    def __init__(self, redis_client: Redis | None = None, key: str | None = None):
+        self.redis = redis_client or get_redis_client()
+        self.key = key or settings.WAHA_POLLING_SCHEDULE_KEY
+        self.interval_key = f"{self.key}:interval"
+
+    def due(self, chat_ids: list[str], now: float | None = None) -> list[str]:
+        """The chats of ``chat_ids`` whose next poll time has passed (one ZMSCORE)."""
+        if not chat_ids:
+            return []
+        now = time.time() if now is None else now
+        scores = self.redis.zmscore(self.key, chat_ids)
+        return [chat_id for chat_id, score in zip(chat_ids, scores, strict=True) if score is None or score <= now]
+
+    def record(self, activity: dict[str, bool], now: float | None = None) -> None:
+        """Schedule the next poll of each polled chat (``activity``: had it anything new?)."""
+        if not activity:
+            return
+        now = time.time() if now is None else now
+        chat_ids = list(activity)
+        intervals = {}
+        for chat_id, current in zip(chat_ids, self.redis.hmget(self.interval_key, chat_ids), strict=True):
+            if activity[chat_id] or current is None:
+                intervals[chat_id] = float(settings.WAHA_POLLING_INTERVAL)
+            else:
+                intervals[chat_id] = min(
+                    float(current) * settings.WAHA_POLLING_BACKOFF_FACTOR,
+                    float(settings.WAHA_POLLING_MAX_INTERVAL_SECONDS),
+                )
+
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.hset(self.interval_key, mapping=intervals)
+        pipe.zadd(self.key, {chat_id: now + interval for chat_id, interval in intervals.items()})
+        pipe.execute()
+
+    def promote(self, chat_id: str) -> None:
+        """Make ``chat_id`` due now, at the minimum interval."""
+        self._promotion(chat_id).execute()
+
+    async def apromote(self, chat_id: str) -> None:
+        """``promote`` for the asyncio Redis client (webhook ingestion)."""
+        await self._promotion(chat_id).execute()
+
+    def _promotion(self, chat_id: str):
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.zadd(self.key, {chat_id: time.time()})
+        pipe.hset(self.interval_key, chat_id, float(settings.WAHA_POLLING_INTERVAL))
+        return pipe
@@ -0,0 +1,154 @@
+"""
+Coordination of WAHA polling across several polling worker replicas.
+
+Every replica heartbeats into a Redis ZSET. One of them holds the leader lease
+(SET NX PX, renewed by its owner) and is the only one that changes membership:
+it drops replicas whose heartbeat is older than WAHA_POLLING_LEASE_SECONDS and
+publishes the live set as the ring, with an epoch that grows on every change.
+
+Chats are assigned to ring members by consistent hashing (virtual nodes), so
+each chat is polled by exactly one replica, and when a replica joins or dies
+only its share of chats moves. A replica that is not (yet) in the published
+ring polls nothing, and a dead leader is replaced as soon as its lease expires.
+
+During a rebalance a chat can be polled by its old and new owner once; the
+dedup claim keeps that harmless.
+"""
+
+import bisect
+import hashlib
+import json
+import logging
+import os
+import socket
+import time
+from dataclasses import dataclass
+
+from redis import Redis
+
+from robbot.config.settings import settings
+from robbot.infra.redis.client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+LEADER_KEY = "waha:polling:leader"
+REPLICAS_KEY = "waha:polling:replicas"
+RING_KEY = "waha:polling:ring"
+VIRTUAL_NODES = 64
+
+# KEYS: lease | ARGV: owner, ttl_ms -> 1 if the lease is (still) ours
+_RENEW_LEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('PEXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+# KEYS: lease | ARGV: owner
+_RELEASE_LEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _text(value: bytes | str) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+def replica_name() -> str:
+    """This process' replica id (hostname:pid; scaled containers share SERVICE_NAME)."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class HashRing:
+    """Consistent-hash ring of polling replicas."""
+
+    def __init__(self, members: list[str], vnodes: int = VIRTUAL_NODES):
+        self.members = sorted(members)
+        points = sorted((_hash(f"{member}#{i}"), member) for member in self.members for i in range(vnodes))
+        self._hashes = [point for point, _ in points]
+        self._owners = [member for _, member in points]
+
+    def owner(self, key: str) -> str | None:
+        """Replica that polls ``key`` (None for an empty ring)."""
+        if not self._hashes:
+            return None
+        index = bisect.bisect(self._hashes, _hash(key)) % len(self._hashes)
+        return self._owners[index]
+
+
+@dataclass(frozen=True)
+class RingView:
+    """The published ring as seen by one replica."""
+
+    epoch: int
+    ring: HashRing
+
+    def includes(self, replica: str) -> bool:
+        return replica in self.ring.members
+
+    def owns(self, replica: str, chat_id: str) -> bool:
+        return self.ring.owner(chat_id) == replica
+
+
+class PollingCoordinator:
+    """Heartbeat, leader lease and ring publication (see module docstring)."""
+
+    def __init__(self, redis_client: Redis | None = None, replica: str | None = None):
+        self.redis = redis_client or get_redis_client()
+        self.replica = replica or replica_name()
+        self.lease_ms = settings.WAHA_POLLING_LEASE_SECONDS * 1000
+        self._renew_lease = self.redis.register_script(_RENEW_LEASE)
+        self._release_lease = self.redis.register_script(_RELEASE_LEASE)
+        self.is_leader = False
+
+    def tick(self, now: float | None = None) -> RingView | None:
+        """Heartbeat, keep or take the leader lease and, as leader, publish membership changes.
+
+        Call more often than WAHA_POLLING_LEASE_SECONDS / 3. Returns the current ring.
+        """
+        now = time.time() if now is None else now
+        self.redis.zadd(REPLICAS_KEY, {self.replica: now})
+
+        was_leader = self.is_leader
+        self.is_leader = bool(self._renew_lease(keys=[LEADER_KEY], args=[self.replica, self.lease_ms])) or bool(
+            self.redis.set(LEADER_KEY, self.replica, nx=True, px=self.lease_ms)
+        )
+        if self.is_leader != was_leader:
+            logger.info("[POLLING] %s %s líder do polling", self.replica, "assumiu como" if self.is_leader else "deixou de ser")
+        if self.is_leader:
+            self._publish_members(now)
+        return self.current_ring()
+
+    def _publish_members(self, now: float) -> None:
+        self.redis.zremrangebyscore(REPLICAS_KEY, 0, now - self.lease_ms / 1000)
+        members = sorted(_text(member) for member in self.redis.zrange(REPLICAS_KEY, 0, -1))
+        current = self._read_ring()
+        if current is not None and current["members"] == members:
+            return
+        epoch = (current["epoch"] + 1) if current else 1
+        self.redis.set(RING_KEY, json.dumps({"epoch": epoch, "members": members}))
+        logger.info("[POLLING] Anel de polling atualizado (época %d): %s", epoch, ", ".join(members))
+
+    def _read_ring(self) -> dict | None:
+        raw = self.redis.get(RING_KEY)
+        return json.loads(raw) if raw else None
+
+    def current_ring(self) -> RingView | None:
+        """The ring published by the leader (None before the first leader ran)."""
+        data = self._read_ring()
+        if data is None:
+            return None
+        return RingView(epoch=data["epoch"], ring=HashRing(data["members"]))
+
+    def leave(self) -> None:
+        """Stop taking part (graceful shutdown): the leader rebalances on its next tick."""
+        self.redis.zrem(REPLICAS_KEY, self.replica)
+        self._release_lease(keys=[LEADER_KEY], args=[self.replica])
+        self.is_leader = False
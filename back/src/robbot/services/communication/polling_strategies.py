@@ -1,17 +1,31 @@
 """
 Strategy definitions for WAHA Chat Polling.
 Allows dynamic switching of polling behavior based on environment (DEV vs PROD).
+
+Targets carrying their chats/overview last message are polled when it moved;
+targets without it (DEV chats outside the overview, /chats fallback) follow
+the adaptive schedule in poll_scheduler.
 """
 import logging
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
 from typing import List
 
 from robbot.config.settings import settings
+from robbot.services.communication.polling_watermarks import Watermark
 from robbot.services.communication.waha_metadata_service import WahaMetadataService
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class PollTarget:
+    """A chat to poll and, when chats/overview reported it, its last message."""
+
+    chat_id: str
+    last_message: Watermark | None = None
+
+
 class PollingStrategy(ABC):
     """Abstract base strategy for fetching target chat IDs to monitor."""
     
@@ -20,6 +34,10 @@ class PollingStrategy(ABC):
         """Returns a list of Chat IDs (LIDs or Phone IDs) to monitor."""
         pass
 
+    def get_targets(self) -> List[PollTarget]:
+        """Target chats with their last message, when known (incremental polling)."""
+        return [PollTarget(chat_id) for chat_id in self.get_target_chats()]
+
 
 class DevPollingStrategy(PollingStrategy):
     """
@@ -53,6 +71,17 @@ class DevPollingStrategy(PollingStrategy):
                 
         return target_chats
 
+    def get_targets(self) -> List[PollTarget]:
+        target_chats = self.get_target_chats()
+        if not target_chats:
+            return []
+        # Uma chamada ao overview diz quais chats DEV tiveram mensagem nova
+        overview = {
+            chat["id"]: Watermark.from_overview(chat)
+            for chat in self.metadata_service.get_chats_overview(limit=settings.WAHA_POLLING_CHAT_LIMIT)
+        }
+        return [PollTarget(chat_id, overview.get(chat_id)) for chat_id in target_chats]
+
 
 class ProdPollingStrategy(PollingStrategy):
     """
@@ -64,11 +93,14 @@ class ProdPollingStrategy(PollingStrategy):
          self.metadata_service = metadata_service
 
     def get_target_chats(self) -> List[str]:
-        # Fetch all chats from WAHA session
-        chats = self.metadata_service.get_all_chats(limit=200)
+        return [target.chat_id for target in self.get_targets()]
+
+    def get_targets(self) -> List[PollTarget]:
+        # Fetch all chats from WAHA session (overview traz a última mensagem de cada chat)
+        chats = self.metadata_service.get_chats_overview(limit=settings.WAHA_POLLING_CHAT_LIMIT)
         if not chats:
             logger.info("[POLLING][PROD] No active chats found.")
-        return chats
+        return [PollTarget(chat["id"], Watermark.from_overview(chat)) for chat in chats]
 
 
 def get_polling_strategy() -> PollingStrategy:
@@ -0,0 +1,75 @@
+"""
+Per-chat watermarks for incremental WAHA polling.
+
+The watermark of a chat is the newest message polling has seen in it (any
+direction): its WAHA ID and timestamp. With it a polling cycle can
+
+- skip a chat whose ``chats/overview`` last message is the watermark (nothing
+  new since the previous cycle, no WAHA call and no dedup round trip)
+- fetch only messages at or after the watermark timestamp for the others
+
+All watermarks live in one Redis hash, read with a single HMGET and written
+with a single HSET per cycle.
+"""
+
+import json
+from dataclasses import dataclass
+
+from redis import Redis
+
+from robbot.config.settings import settings
+from robbot.infra.redis.client import get_redis_client
+
+
+@dataclass(frozen=True)
+class Watermark:
+    """Newest message seen in a chat."""
+
+    message_id: str
+    timestamp: int
+
+    @classmethod
+    def newest(cls, messages: list[dict]) -> "Watermark | None":
+        """Watermark of the newest message in a WAHA page (None for an empty page)."""
+        dated = [m for m in messages if m.get("id") and m.get("timestamp") is not None]
+        if not dated:
+            return None
+        newest = max(dated, key=lambda m: int(m["timestamp"]))
+        return cls(message_id=newest["id"], timestamp=int(newest["timestamp"]))
+
+    @classmethod
+    def from_overview(cls, chat: dict) -> "Watermark | None":
+        """Watermark of the ``lastMessage`` of a ``chats/overview`` entry, if present."""
+        last = chat.get("lastMessage") or {}
+        if not last.get("id") or last.get("timestamp") is None:
+            return None
+        return cls(message_id=last["id"], timestamp=int(last["timestamp"]))
+
+
+class PollingWatermarks:
+    """Redis-backed store of per-chat watermarks (see module docstring)."""
+
+    def __init__(self, redis_client: Redis | None = None, key: str | None = None):
+        self.redis = redis_client or get_redis_client()
+        self.key = key or settings.WAHA_POLLING_WATERMARKS_KEY
+
+    def get_many(self, chat_ids: list[str]) -> dict[str, Watermark]:
+        """Watermarks of ``chat_ids`` (chats never polled are left out)."""
+        if not chat_ids:
+            return {}
+        watermarks = {}
+        for chat_id, raw in zip(chat_ids, self.redis.hmget(self.key, chat_ids), strict=True):
+            if raw:
+                data = json.loads(raw)
+                watermarks[chat_id] = Watermark(message_id=data["id"], timestamp=int(data["ts"]))
+        return watermarks
+
+    def set_many(self, watermarks: dict[str, Watermark]) -> None:
+        if watermarks:
+            self.redis.hset(
+                self.key,
+                mapping={
+                    chat_id: json.dumps({"id": mark.message_id, "ts": mark.timestamp})
+                    for chat_id, mark in watermarks.items()
+                },
+            )
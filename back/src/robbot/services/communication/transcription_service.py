@@ -8,6 +8,7 @@ import httpx
 
 from robbot.config.settings import get_settings
 from robbot.core.custom_exceptions import LLMError
+from robbot.core.http_clients import get_http_clients
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -116,10 +117,10 @@ class TranscriptionService:
     async def _download_audio(self, url: str) -> bytes | None:
         """Download audio file from URL (asynchronous)."""
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(url)
-                response.raise_for_status()
-                return response.content
+            client = get_http_clients().async_client(timeout=30.0, name="media_download_http")
+            response = await client.get(url)
+            response.raise_for_status()
+            return response.content
         except httpx.HTTPError as e:
             logger.error("[ERROR] Failed to download audio from %s: %s", url, e)
             return None
@@ -127,10 +128,10 @@ class TranscriptionService:
     def _download_audio_sync(self, url: str) -> bytes | None:
         """Download audio file from URL (synchronous)."""
         try:
-            with httpx.Client(timeout=30.0) as client:
-                response = client.get(url)
-                response.raise_for_status()
-                return response.content
+            client = get_http_clients().sync_client(timeout=30.0, name="media_download_http")
+            response = client.get(url)
+            response.raise_for_status()
+            return response.content
         except httpx.HTTPError as e:
             logger.error("[ERROR] Failed to download audio from %s: %s", url, e)
             return None
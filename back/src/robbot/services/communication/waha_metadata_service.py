@@ -6,7 +6,9 @@ Designed to be used by background jobs (RQ) that require blocking I/O.
 import logging
 import httpx
 from robbot.config.settings import settings
+from robbot.core.http_clients import get_http_clients
 from robbot.infra.redis.client import get_redis_client
+from robbot.services.communication.lid_directory import LidDirectory
 
 logger = logging.getLogger(__name__)
 
@@ -22,16 +24,14 @@ class WahaMetadataService:
         self.base_url = settings.WAHA_URL.rstrip("/")
         self.api_key = settings.WAHA_API_KEY
         self.session = settings.WAHA_SESSION_NAME
-        self.headers = {
-            "Content-Type": "application/json",
-            "X-Api-Key": self.api_key,
-        }
-        # Connection Pooling: Persistent client for multiple calls per cycle
-        self.client = httpx.Client(
-            base_url=self.base_url,
-            headers=self.headers,
-            timeout=10.0
+        self.headers = {"Content-Type": "application/json"}
+        if self.api_key:
+            self.headers["X-Api-Key"] = self.api_key
+        # Connection Pooling: process-wide keep-alive pool shared by every instance
+        self.client = get_http_clients().sync_client(
+            self.base_url, headers=self.headers, timeout=10.0, name="waha_metadata_http"
         )
+        self.lid_directory = LidDirectory(self.redis)
         # Cache TTLs
         self.CACHE_TTL_LID = 3600  # 1 hour for direct mapping
         self.CACHE_TTL_REVERSE = 86400  # 24 hours for reverse mapping
@@ -41,7 +41,7 @@ class WahaMetadataService:
         Resolves a phone number to its WAHA LID (Logical ID).
         
         Flow:
-        1. Check Redis cache (waha:target_phone_lid:{phone})
+        1. Check the prefetched LID directory, then Redis cache (waha:target_phone_lid:{phone})
         2. If miss, call WAHA API:
            a. /api/contacts/check-exists (normalize phone)
            b. /api/{session}/lids/pn/{phone} (get LID)
@@ -53,7 +53,12 @@ class WahaMetadataService:
         Returns:
             LID string (e.g., '123456@lid') or None if not found/error.
         """
-        # 1. Cache Check
+        # 1. Directory / Cache Check
+        if settings.LID_DIRECTORY_ENABLED:
+            directory_lid = self.lid_directory.lid_for_phone(phone)
+            if directory_lid:
+                return directory_lid
+
         cache_key = f"waha:target_phone_lid:{phone}"
         cached_lid = self.redis.get(cache_key)
 
@@ -132,7 +137,21 @@ class WahaMetadataService:
         Returns:
             List of chat IDs strings.
         """
-        chat_ids = []
+        return [chat["id"] for chat in self.get_chats_overview(limit=limit, offset=offset)]
+
+    def get_chats_overview(self, limit: int = 200, offset: int = 0) -> list[dict]:
+        """
+        Retrieves chat summaries (id, name, lastMessage) synchronously.
+        Attempts optimized /chats/overview first, falls back to /chats.
+
+        Args:
+            limit: Max chats to retrieve.
+            offset: Pagination offset.
+
+        Returns:
+            List of chat dicts with an "id" (lastMessage is only present on the overview).
+        """
+        chats = []
         try:
             # 1. Try Optimized Overview Endpoint
             overview_url = f"/api/{self.session}/chats/overview"
@@ -144,8 +163,7 @@ class WahaMetadataService:
                 try:
                     payload = resp.json()
                     # Overview payload is typically a list of chat objects
-                    chat_ids = [c.get("id") for c in payload if c.get("id")]
-                    return chat_ids
+                    return [c for c in payload if c.get("id")]
                 except ValueError:
                     logger.warning("[WAHA_METADATA] Invalid JSON from chats/overview")
 
@@ -159,7 +177,7 @@ class WahaMetadataService:
             if resp.status_code == 200:
                 try:
                     payload = resp.json()
-                    chat_ids = [c.get("id") for c in payload if c.get("id")]
+                    chats = [{"id": c["id"]} for c in payload if c.get("id")]
                 except ValueError:
                     logger.warning("[WAHA_METADATA] Invalid JSON from chats")
             else:
@@ -170,9 +188,9 @@ class WahaMetadataService:
         except Exception as e:
             logger.error("[WAHA_METADATA] Unexpected error fetching chats: %s", e)
 
-        return chat_ids
+        return chats
 
-    def get_messages_from_chat(self, chat_id: str, limit: int = 10) -> list[dict]:
+    def get_messages_from_chat(self, chat_id: str, limit: int = 10, since: int | None = None) -> list[dict]:
         """
         Retrieves messages for a specific chat synchronously.
         Handles errors gracefully (return empty list on failure).
@@ -180,39 +198,59 @@ class WahaMetadataService:
         Args:
             chat_id: The chat ID (LID or phone ID).
             limit: Number of messages to retrieve.
+            since: Only messages with timestamp >= since (unix seconds), when given.
 
         Returns:
             List of message dictionaries.
         """
-        messages = []
         try:
-            url = f"/api/{self.session}/chats/{chat_id}/messages"
-            params = {"limit": limit}
+            resp = self.client.get(*self._messages_request(chat_id, limit, since))
+            return self._parse_messages(resp, chat_id)
+        except httpx.HTTPError as e:
+            logger.error("[WAHA_METADATA] HTTP error fetching messages for %s: %s", chat_id, e)
+        except Exception as e:
+            logger.error("[WAHA_METADATA] Unexpected error fetching messages for %s: %s", chat_id, e)
 
-            resp = self.client.get(url, params=params)
+        return []
 
-            if resp.status_code == 200:
-                try:
-                    messages = resp.json()
-                except ValueError:
-                    logger.warning("[WAHA_METADATA] Invalid JSON from messages endpoint for %s", chat_id)
-            elif resp.status_code == 404:
-                logger.debug("[WAHA_METADATA] Chat not found/empty messages: %s", chat_id)
-            elif resp.status_code == 422:
-                logger.warning("[WAHA_METADATA] Unprocessable Entity (session not ready?) for %s", chat_id)
-            else:
-                logger.warning("[WAHA_METADATA] Failed to fetch messages for %s: %s", chat_id, resp.status_code)
+    async def aget_messages_from_chat(self, chat_id: str, limit: int = 10, since: int | None = None) -> list[dict]:
+        """
+        Async counterpart of get_messages_from_chat, for fanning out over many chats.
 
+        Uses the process-wide async pool of the running event loop (see
+        core.async_runtime); errors are handled the same way (empty list).
+        """
+        client = get_http_clients().async_client(
+            self.base_url, headers=self.headers, timeout=10.0, name="waha_metadata_http_async"
+        )
+        try:
+            url, params = self._messages_request(chat_id, limit, since)
+            resp = await client.get(url, params=params)
+            return self._parse_messages(resp, chat_id)
         except httpx.HTTPError as e:
             logger.error("[WAHA_METADATA] HTTP error fetching messages for %s: %s", chat_id, e)
         except Exception as e:
             logger.error("[WAHA_METADATA] Unexpected error fetching messages for %s: %s", chat_id, e)
 
-        return messages
-
-    def __del__(self):
-        """Ensure the client is closed when the service is destroyed."""
-        try:
-            self.client.close()
-        except Exception:
-            pass
+        return []
+
+    def _messages_request(self, chat_id: str, limit: int, since: int | None) -> tuple[str, dict]:
+        params = {"limit": limit}
+        if since is not None:
+            params["filter.timestamp.gte"] = since
+        return f"/api/{self.session}/chats/{chat_id}/messages", params
+
+    @staticmethod
+    def _parse_messages(resp: httpx.Response, chat_id: str) -> list[dict]:
+        if resp.status_code == 200:
+            try:
+                return resp.json()
+            except ValueError:
+                logger.warning("[WAHA_METADATA] Invalid JSON from messages endpoint for %s", chat_id)
+        elif resp.status_code == 404:
+            logger.debug("[WAHA_METADATA] Chat not found/empty messages: %s", chat_id)
+        elif resp.status_code == 422:
+            logger.warning("[WAHA_METADATA] Unprocessable Entity (session not ready?) for %s", chat_id)
+        else:
+            logger.warning("[WAHA_METADATA] Failed to fetch messages for %s: %s", chat_id, resp.status_code)
+        return []
@@ -12,6 +12,7 @@ from robbot.infra.persistence.repositories.session_repository import SessionRepo
 from robbot.config.settings import settings
 from robbot.infra.persistence.models.session_model import WhatsAppSession
 from robbot.infra.redis.client import get_redis_client
+from robbot.services.communication.media_cache import get_media_cache
 from robbot.schemas.waha import (
     MessageSentResponse,
     SendFileRequest,
@@ -354,10 +355,14 @@ class WAHAService:
         if not await self._check_rate_limit(data.chat_id):
             raise ValueError(f"Rate limit exceeded: max {settings.WAHA_MESSAGES_PER_HOUR} msg/hour")
 
-        response = await self.waha_client.send_image(
+        response = await get_media_cache().send(
+            self.waha_client,
             session=self.session_name,
             chat_id=data.chat_id,
-            file_url=data.file_url,
+            kind="image",
+            url=data.file_url,
+            mimetype=data.mimetype,
+            filename=data.filename,
             caption=data.caption,
             apply_anti_ban=data.apply_anti_ban and settings.WAHA_ANTI_BAN_ENABLED,
         )
@@ -375,10 +380,13 @@ class WAHAService:
         if not await self._check_rate_limit(data.chat_id):
             raise ValueError(f"Rate limit exceeded: max {settings.WAHA_MESSAGES_PER_HOUR} msg/hour")
 
-        response = await self.waha_client.send_file(
+        response = await get_media_cache().send(
+            self.waha_client,
             session=self.session_name,
             chat_id=data.chat_id,
-            file_url=data.file_url,
+            kind="file",
+            url=data.file_url,
+            mimetype=data.mimetype,
             filename=data.filename,
             caption=data.caption,
         )
@@ -0,0 +1,280 @@
+"""
+Non-blocking ingestion of WAHA webhook events.
+
+The webhook endpoint runs on the API event loop, so nothing here may block it:
+- Redis lookups use the asyncio client (``get_async_redis_client``)
+- webhook_logs rows go through the write-behind buffer (one XADD); with
+  WEBHOOK_LOG_WRITE_BEHIND=false the SQLAlchemy insert runs in the threadpool
+- The dedup claim and the RQ enqueue (synchronous libraries) are offloaded
+  to the threadpool together, so each message pays a single hop
+
+Message and presence events also promote their chat in the adaptive poll
+schedule (see poll_scheduler), so polling checks it on the next cycle.
+
+LIDs are resolved from the prefetched LID directory (one HGET) or the
+per-contact cache; misses are queued for background resolution (see
+lid_work_set), so no message waits on a WAHA lookup.
+
+Under load (see admission_control) optional steps are shed: from DEGRADED on,
+ack events are not logged, chats are not promoted and unknown LIDs are not
+queued here.
+"""
+
+import logging
+from datetime import datetime
+from typing import Any
+
+from fastapi.concurrency import run_in_threadpool
+
+from robbot.config.settings import settings
+from robbot.core.custom_exceptions import ExternalServiceError, QueueError
+from robbot.infra.db.session import get_sync_session
+from robbot.infra.persistence.repositories.webhook_log_repository import WebhookLogRepository
+from robbot.infra.redis.client import get_async_redis_client
+from robbot.schemas.waha import WebhookLogOut, WebhookPayload
+from robbot.services.communication.lid_directory import LidDirectory
+from robbot.services.communication.message_filter_service import MessageFilterService
+from robbot.services.communication.poll_scheduler import PollScheduler
+from robbot.services.infrastructure.admission_control import AdmissionController, DegradationLevel
+from robbot.services.infrastructure.queue_service import get_queue_service
+from robbot.services.infrastructure.webhook_log_buffer import get_webhook_log_buffer
+from robbot.services.leads.lid_work_set import LidWorkSet
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_EVENTS = {"message", "message.any"}
+ACK_EVENTS = {"message.ack", "message.ack.group"}
+PRESENCE_EVENTS = {"presence.update"}
+
+
+class WebhookIngestionService:
+    """Persist, filter and enqueue WAHA webhook events without blocking the event loop."""
+
+    def __init__(self):
+        self.redis = get_async_redis_client()
+        self.queue_service = get_queue_service()
+        self.log_buffer = get_webhook_log_buffer()
+        self.poll_scheduler = PollScheduler(self.redis)
+        self.lid_directory = LidDirectory(self.redis)
+        self.lid_work_set = LidWorkSet(self.redis)
+
+    async def ingest(
+        self, payload: WebhookPayload, level: DegradationLevel = DegradationLevel.NORMAL
+    ) -> WebhookLogOut:
+        """Handle one webhook event and return the persisted log entry.
+
+        Args:
+            payload: WAHA webhook event
+            level: current admission level; above NORMAL optional steps are skipped
+        """
+        AdmissionController.admit(level)
+        if level >= DegradationLevel.DEGRADED and payload.event in ACK_EVENTS:
+            AdmissionController.record_shed("ack_log")
+            return WebhookLogOut(
+                session_name=payload.session,
+                event_type=payload.event,
+                processed=False,
+                created_at=datetime.utcnow(),
+            )
+
+        log = await self._store_log(payload)
+        log_ref = log.id if log.id is not None else log.buffer_id
+
+        if payload.event in MESSAGE_EVENTS | PRESENCE_EVENTS and settings.WAHA_POLLING_ADAPTIVE:
+            if level >= DegradationLevel.DEGRADED:
+                AdmissionController.record_shed("poll_promotion")
+            else:
+                await self._promote_chat(payload)
+
+        if payload.event not in MESSAGE_EVENTS or not payload.payload:
+            logger.debug(
+                "Evento '%s' registrado mas não enfileirado",
+                payload.event,
+                extra={"event": payload.event, "webhook_log_id": log_ref},
+            )
+            return log
+
+        message_data = payload.payload
+        if message_data.get("fromMe") is True:
+            logger.debug(
+                "[WEBHOOK] Ignorando mensagem enviada pelo bot (fromMe=true)",
+                extra={"event": payload.event, "webhook_log_id": log_ref},
+            )
+            return log
+
+        chat_id = message_data.get("from", "")
+        phone = chat_id.split("@")[0] if "@" in chat_id else chat_id
+
+        if "@lid" in chat_id:
+            phone = await self._resolve_lid(
+                chat_id, phone, payload.session, log_ref, queue=level < DegradationLevel.DEGRADED
+            )
+
+        if not await self._is_sender_allowed(chat_id, phone, payload.session, log_ref):
+            return log
+
+        try:
+            job_id = await run_in_threadpool(self._enqueue_message, message_data)
+            if job_id is None:
+                return log
+            logger.info(
+                "[SUCCESS] Mensagem enfileirada para processamento: %s",
+                job_id,
+                extra={"job_id": job_id, "phone": phone, "chat_id": chat_id, "webhook_log_id": log_ref},
+            )
+        except (QueueError, ExternalServiceError) as e:
+            logger.error(
+                "Erro ao enfileirar mensagem: %s",
+                e,
+                extra={"webhook_log_id": log_ref, "error": str(e)},
+                exc_info=True,
+            )
+
+        return log
+
+    async def _promote_chat(self, payload: WebhookPayload) -> None:
+        """Bring the event's chat forward in the adaptive poll schedule (best effort)."""
+        data = payload.payload or {}
+        if payload.event in PRESENCE_EVENTS:
+            chat_id = data.get("id")
+        else:
+            chat_id = data.get("to") if data.get("fromMe") else data.get("from")
+        if not chat_id:
+            return
+        try:
+            await self.poll_scheduler.apromote(chat_id)
+        except Exception as e:  # noqa: BLE001 (the schedule is an optimization)
+            logger.debug("[WEBHOOK] Falha ao antecipar polling de %s: %s", chat_id, e)
+
+    async def _store_log(self, payload: WebhookPayload) -> WebhookLogOut:
+        """Record the event in webhook_logs (buffered unless write-behind is disabled)."""
+        if settings.WEBHOOK_LOG_WRITE_BEHIND:
+            return await self.log_buffer.append(payload.session, payload.event, payload.payload)
+        return await run_in_threadpool(self._persist_log, payload)
+
+    @staticmethod
+    def _persist_log(payload: WebhookPayload) -> WebhookLogOut:
+        """Insert the webhook log (runs in the threadpool)."""
+        with get_sync_session() as session:
+            log = WebhookLogRepository(session).create(
+                session_name=payload.session,
+                event_type=payload.event,
+                payload=payload.payload,
+            )
+            return WebhookLogOut.model_validate(log)
+
+    def _enqueue_message(self, message_data: dict[str, Any]) -> str | None:
+        """Claim the message (dedup against polling) and enqueue it (runs in the threadpool).
+
+        Returns:
+            Job id, or None if polling already picked this message up
+        """
+        message_filter = MessageFilterService()
+        message_id = message_data.get("id")
+
+        if message_id and not message_filter.claim_new([message_data]):
+            logger.debug("[WEBHOOK] Mensagem já reivindicada pelo polling: %s", message_id)
+            return None
+
+        try:
+            return self.queue_service.enqueue_message_processing_debounced(
+                message_data=message_data,
+                message_direction="inbound",
+            )
+        except Exception:
+            # Let polling pick it up instead of losing it
+            message_filter.release([message_id])
+            raise
+
+    async def _resolve_lid(
+        self, chat_id: str, phone: str, session: str, log_ref: int | str | None, queue: bool = True
+    ) -> str:
+        """Resolve a LID from the directory or the cache, falling back to the LID itself.
+
+        Never waits on WAHA: an unknown LID is queued in the LID work set (unless
+        ``queue`` is False, when shedding load; the conversation job queues it
+        on get_or_create) and resolved by the background batch.
+        """
+        from robbot.services.leads.lid_resolver_service import LIDResolverService
+
+        if settings.LID_DIRECTORY_ENABLED:
+            try:
+                directory_phone = await self.lid_directory.aphone_for_lid(phone)
+            except Exception as e:  # noqa: BLE001 (fall back to the per-contact cache)
+                logger.debug("[WEBHOOK] Diretório de LIDs indisponível: %s", e)
+                directory_phone = None
+            if directory_phone:
+                return directory_phone
+
+        cached = await self.redis.get(f"{LIDResolverService.LID_CACHE_PREFIX}{phone}")
+        if cached:
+            return cached.decode() if isinstance(cached, bytes) else cached
+        if not queue:
+            AdmissionController.record_shed("lid_lookup")
+            return phone
+
+        try:
+            await self.lid_work_set.aadd(phone)
+            logger.debug(
+                "[WEBHOOK] LID enviado para resolução em segundo plano: %s",
+                phone,
+                extra={"lid": chat_id, "webhook_log_id": log_ref},
+            )
+        except Exception as e:
+            logger.warning(
+                "[WEBHOOK] Falha ao enfileirar LID para resolução: %s - %s",
+                phone,
+                str(e),
+                extra={"lid": chat_id, "webhook_log_id": log_ref},
+            )
+        return phone
+
+    async def _is_sender_allowed(self, chat_id: str, phone: str, session: str, log_ref: int | str | None) -> bool:
+        """DEV MODE: only accept numbers from DEV_PHONE_NUMBERS (test session is always accepted)."""
+        if not (settings.DEV_MODE and settings.dev_phone_list and session != "test"):
+            return True
+
+        # IMPORTANTE: O WAHA pode retornar LID (24988337893388@lid) ou número (555191628223@c.us)
+        phone_is_allowed = phone in settings.dev_phone_list
+
+        # Se não encontrou direto e recebeu um LID, tenta encontrar via Redis cache
+        if not phone_is_allowed and "@lid" in chat_id:
+            cached_number = await self.redis.get(f"waha:dev_phone:{phone}")
+            if cached_number:
+                cached_number_str = cached_number.decode() if isinstance(cached_number, bytes) else cached_number
+                if cached_number_str in settings.dev_phone_list:
+                    phone_is_allowed = True
+                    logger.debug("[DEV MODE] LID encontrado em cache: %s -> %s", phone, cached_number_str)
+
+        if not phone_is_allowed:
+            logger.info(
+                "[DEV MODE] Mensagem ignorada - número não autorizado: %s (permitidos: %s)",
+                phone,
+                ", ".join(settings.dev_phone_list),
+                extra={
+                    "dev_mode": True,
+                    "phone": phone,
+                    "allowed_phones": settings.dev_phone_list,
+                    "webhook_log_id": log_ref,
+                },
+            )
+            return False
+
+        logger.info(
+            "[DEV MODE] Mensagem aceita de número autorizado: %s",
+            phone,
+            extra={"dev_mode": True, "phone": phone, "webhook_log_id": log_ref},
+        )
+        return True
+
+
+# Singleton global
+_webhook_ingestion_service: WebhookIngestionService | None = None
+
+
+def get_webhook_ingestion_service() -> WebhookIngestionService:
+    """Get or create the global webhook ingestion service."""
+    global _webhook_ingestion_service
+    if _webhook_ingestion_service is None:
+        _webhook_ingestion_service = WebhookIngestionService()
+    return _webhook_ingestion_service
@@ -209,15 +209,9 @@ class VisionService:
 
         Useful for background jobs (RQ).
         """
-        import asyncio
+        from robbot.core.async_runtime import run_sync
 
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-
-        return loop.run_until_complete(self.analyze_image(image_url, context))
+        return run_sync(self.analyze_image(image_url, context))
 
 
 # Singleton para reutilizar modelo carregado
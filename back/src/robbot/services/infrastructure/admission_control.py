@@ -0,0 +1,173 @@
+"""
+Admission control driven by live ingestion lag.
+
+When the LLM slows down the inbound queue grows without bound; instead of
+falling minutes behind, the system sheds optional work in predictable steps:
+
+- NORMAL:   everything on
+- DEGRADED: webhook skips LID queueing and ack event persistence (and answers
+            with ``X-Backpressure``); the conversation pipeline skips name extraction
+- CRITICAL: additionally skips the RAG lookup (Chroma) in the pipeline
+
+The level comes from the age of the oldest waiting inbound message and the
+queue depth (``messages`` RQ queue, or the ingestion streams with
+INGESTION_BACKEND=streams), measured at most once per ADMISSION_REFRESH_SECONDS
+per process. Every decision and every skipped step is counted in runtime_metrics
+under ``admission``.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from enum import IntEnum
+from typing import Any
+
+from redis import Redis
+from rq.job import Job
+from rq.utils import utcparse
+
+from robbot.config.settings import settings
+from robbot.core import runtime_metrics
+from robbot.infra.redis.client import get_redis_client
+from robbot.infra.redis.streams import PartitionedStreamQueue
+
+logger = logging.getLogger(__name__)
+
+METRICS_RESOURCE = "admission"
+
+
+class DegradationLevel(IntEnum):
+    NORMAL = 0
+    DEGRADED = 1
+    CRITICAL = 2
+
+
+class AdmissionController:
+    """Cached degradation level computed from the inbound queue lag."""
+
+    def __init__(self, redis_client: Redis | None = None):
+        self.redis = redis_client or get_redis_client()
+        self._lock = threading.Lock()
+        self._level = DegradationLevel.NORMAL
+        self._lag_seconds = 0.0
+        self._depth = 0
+        self._measured_at = 0.0
+
+    def level(self) -> DegradationLevel:
+        """Current level (measures Redis at most once per ADMISSION_REFRESH_SECONDS)."""
+        if not settings.ADMISSION_CONTROL_ENABLED:
+            return DegradationLevel.NORMAL
+        if self._is_stale():
+            self.refresh()
+        return self._level
+
+    async def level_async(self) -> DegradationLevel:
+        """level() for the event loop: a stale measurement runs in a worker thread."""
+        if settings.ADMISSION_CONTROL_ENABLED and self._is_stale():
+            await asyncio.to_thread(self.refresh)
+        return self.level()
+
+    @staticmethod
+    def admit(level: DegradationLevel) -> None:
+        """Count one unit of work admitted at ``level``."""
+        runtime_metrics.incr(METRICS_RESOURCE, f"admitted_{level.name.lower()}")
+
+    @staticmethod
+    def record_shed(step: str) -> None:
+        """Count one optional step skipped because of the current level."""
+        runtime_metrics.incr(METRICS_RESOURCE, f"shed_{step}")
+
+    def refresh(self) -> DegradationLevel:
+        """Measure the inbound lag now and recompute the level."""
+        with self._lock:
+            if not self._is_stale():
+                return self._level
+            try:
+                depth, lag_seconds = self._measure()
+            except Exception as e:
+                # Keep the last level rather than shedding (or un-shedding) on a Redis hiccup
+                logger.warning("[ADMISSION] Falha ao medir a fila: %s", e)
+                self._measured_at = time.monotonic()
+                return self._level
+
+            previous = self._level
+            self._depth, self._lag_seconds = depth, lag_seconds
+            self._level = self._classify(depth, lag_seconds)
+            self._measured_at = time.monotonic()
+
+        if self._level != previous:
+            log = logger.warning if self._level > previous else logger.info
+            log(
+                "[ADMISSION] Nível %s -> %s (lag=%.1fs, fila=%d)",
+                previous.name,
+                self._level.name,
+                lag_seconds,
+                depth,
+                extra={"level": self._level.name, "lag_seconds": lag_seconds, "depth": depth},
+            )
+            runtime_metrics.incr(METRICS_RESOURCE, f"entered_{self._level.name.lower()}")
+        # The API process has no job loop to publish its counters, so piggyback on the refresh
+        runtime_metrics.maybe_publish(self.redis)
+        return self._level
+
+    def status(self) -> dict[str, Any]:
+        """Level, last measurement and thresholds (for the metrics endpoint)."""
+        level = self.level()
+        return {
+            "enabled": settings.ADMISSION_CONTROL_ENABLED,
+            "level": level.name,
+            "lag_seconds": round(self._lag_seconds, 3),
+            "depth": self._depth,
+            "thresholds": {
+                "degraded_lag_seconds": settings.ADMISSION_DEGRADED_LAG_SECONDS,
+                "critical_lag_seconds": settings.ADMISSION_CRITICAL_LAG_SECONDS,
+                "degraded_depth": settings.ADMISSION_DEGRADED_DEPTH,
+                "critical_depth": settings.ADMISSION_CRITICAL_DEPTH,
+            },
+        }
+
+    def _is_stale(self) -> bool:
+        return time.monotonic() - self._measured_at >= settings.ADMISSION_REFRESH_SECONDS
+
+    @staticmethod
+    def _classify(depth: int, lag_seconds: float) -> DegradationLevel:
+        if lag_seconds >= settings.ADMISSION_CRITICAL_LAG_SECONDS or depth >= settings.ADMISSION_CRITICAL_DEPTH:
+            return DegradationLevel.CRITICAL
+        if lag_seconds >= settings.ADMISSION_DEGRADED_LAG_SECONDS or depth >= settings.ADMISSION_DEGRADED_DEPTH:
+            return DegradationLevel.DEGRADED
+        return DegradationLevel.NORMAL
+
+    def _measure(self) -> tuple[int, float]:
+        """(messages waiting, age in seconds of the oldest one)."""
+        if settings.INGESTION_BACKEND == "streams":
+            return PartitionedStreamQueue(redis_client=self.redis).lag()
+
+        # RQ pushes to the tail and pops from the head: index 0 is the oldest job
+        queue_key = "rq:queue:messages"
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.llen(queue_key)
+        pipe.lindex(queue_key, 0)
+        depth, head = pipe.execute()
+        if not head:
+            return depth, 0.0
+
+        job_id = head.decode() if isinstance(head, bytes) else head
+        enqueued_at = self.redis.hget(Job.key_for(job_id), "enqueued_at")
+        if not enqueued_at:
+            return depth, 0.0
+        enqueued_at = enqueued_at.decode() if isinstance(enqueued_at, bytes) else enqueued_at
+        lag_seconds = time.time() - utcparse(enqueued_at).timestamp()
+        return depth, max(0.0, lag_seconds)
+
+
+# Singleton global
+_admission_controller: AdmissionController | None = None
+
+
+def get_admission_controller() -> AdmissionController:
+    """Get or create the process-wide admission controller."""
+    global _admission_controller
+    if _admission_controller is None:
+        _admission_controller = AdmissionController()
+    return _admission_controller
@@ -2,6 +2,7 @@ from datetime import UTC, datetime
 
 from sqlalchemy.orm import Session
 
+from robbot.infra.integrations.waha.transport import breaker_status
 from robbot.infra.integrations.waha.waha_client import get_waha_client
 from robbot.infra.persistence.repositories.auth_session_repository import AuthSessionRepository
 from robbot.infra.persistence.repositories.health_repository import HealthRepository
@@ -47,7 +48,7 @@ class HealthService:
             redis_ok = False
             redis_error = str(exc)
 
-        # Check WAHA health
+        # Check WAHA health (while the circuit breaker is open the ping fails fast)
         try:
             waha_client = get_waha_client()
             await waha_client.ping()
@@ -82,7 +83,7 @@ class HealthService:
             components={
                 "database": {"ok": db_ok, "error": db_error},
                 "redis": {"ok": redis_ok, "error": redis_error},
-                "waha": {"ok": waha_ok, "error": waha_error},
+                "waha": {"ok": waha_ok, "error": waha_error, "breaker": breaker_status()},
                 "queue": {"ok": queue_ok, "error": queue_error},
             },
             active_sessions=active_sessions,
@@ -2,15 +2,16 @@
 Service para orquestração de filas (jobs assíncronos).
 """
 
-import json
 import logging
-from datetime import timedelta
+from datetime import UTC, datetime, timedelta
 from typing import Any
 from uuid import uuid4
 
 from robbot.config.settings import settings
 from robbot.infra.redis.client import get_redis_client
+from robbot.infra.redis.debounce import DebounceBuffer
 from robbot.infra.redis.queue import get_queue_manager
+from robbot.infra.redis.streams import get_stream_queue
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +24,7 @@ class QueueService:
     def __init__(self):
         """Inicializar serviço de filas."""
         self.queue_manager = get_queue_manager()
+        self.debounce_buffer = DebounceBuffer()
         logger.info("[SUCCESS] QueueService inicializado")
 
     def enqueue_custom(
@@ -31,6 +33,7 @@ class QueueService:
         queue_name: str = "messages",
         job_id: str | None = None,
         timeout: int = 300,
+        kwargs: dict[str, Any] | None = None,
     ) -> str:
         """Enfileirar um job customizado (função ou string path)."""
         queue = self.queue_manager.get_queue(queue_name)
@@ -42,6 +45,7 @@ class QueueService:
             func,
             job_id=job_id,
             job_timeout=timeout,
+            kwargs=kwargs,
         )
         
         # CRITICAL: Force timeout explicitly (RQ sometimes ignores job_timeout parameter)
@@ -71,6 +75,9 @@ class QueueService:
         message_direction: str = "inbound",
     ) -> str:
         """Enfileirar mensagem para processamento (usando string path para evitar circularidade)."""
+        if settings.INGESTION_BACKEND == "streams":
+            return self._enqueue_message_stream(message_data, conversation_id, message_direction)
+
         job_id = str(uuid4())
 
         enqueued_job = self.queue_manager.queue_messages.enqueue(
@@ -93,13 +100,32 @@ class QueueService:
 
         return job_id
 
+    def _enqueue_message_stream(
+        self,
+        message_data: dict[str, Any],
+        conversation_id: str | None,
+        message_direction: str,
+    ) -> str:
+        """Enfileirar no Redis Streams particionado por chat (ordem garantida por chat)."""
+        peer_field = "to" if message_direction == "outbound" else "from"
+        chat_id = message_data.get(peer_field) or message_data.get("chatId") or message_data.get("phone") or ""
+        entry = get_stream_queue().enqueue(
+            chat_id,
+            {
+                "message_data": message_data,
+                "message_direction": message_direction,
+                "conversation_id": conversation_id,
+            },
+        )
+        return f"stream:{entry}"
+
     def enqueue_message_processing_debounced(
         self,
         message_data: dict[str, Any],
         conversation_id: str | None = None,
         message_direction: str = "inbound",
     ) -> str:
-        """Enfileirar mensagens com debounce."""
+        """Enfileirar mensagens com debounce (1 round trip Redis por mensagem, atômico)."""
         if message_direction != "inbound":
             return self.enqueue_message_processing(message_data, conversation_id, message_direction)
 
@@ -111,29 +137,27 @@ class QueueService:
         if debounce_seconds == 0:
             return self.enqueue_message_processing(message_data, conversation_id, message_direction)
 
-        redis_client = get_redis_client()
-        buffer_key = f"waha:debounce:{chat_id}"
-        job_key = f"waha:debounce:job:{chat_id}"
-
-        existing = redis_client.get(buffer_key)
-        payload = json.loads(existing) if existing else {"messages": [], "last_payload": {}}
-        
-        body = message_data.get("body", "")
-        if isinstance(body, str) and body.strip():
-            payload.setdefault("messages", []).append(body)
-
-        payload["last_payload"] = {"session": message_data.get("session", "default")}
-        redis_client.setex(buffer_key, debounce_seconds + 10, json.dumps(payload))
+        armed = self.debounce_buffer.append(
+            chat_id=chat_id,
+            body=message_data.get("body", ""),
+            session=message_data.get("session", "default"),
+            debounce_seconds=debounce_seconds,
+        )
 
-        if redis_client.set(job_key, "1", nx=True, ex=debounce_seconds + 30):
+        if armed:
             delay = timedelta(seconds=debounce_seconds)
-            self.queue_manager.queue_messages.enqueue_in(
-                delay,
-                "robbot.infra.jobs.message_job.process_debounced_message",
-                chat_id=chat_id,
-                result_ttl=settings.RQ_DEFAULT_RESULT_TTL,
-                failure_ttl=settings.RQ_DEFAULT_FAILURE_TTL,
-            )
+            try:
+                self.queue_manager.queue_messages.enqueue_in(
+                    delay,
+                    "robbot.infra.jobs.message_job.process_debounced_message",
+                    chat_id=chat_id,
+                    result_ttl=settings.RQ_DEFAULT_RESULT_TTL,
+                    failure_ttl=settings.RQ_DEFAULT_FAILURE_TTL,
+                )
+            except Exception:
+                # Let the next message arm the job again instead of waiting for the flag TTL
+                self.debounce_buffer.disarm(chat_id)
+                raise
             return f"debounced:{chat_id}"
 
         return f"buffered:{chat_id}"
@@ -180,6 +204,40 @@ class QueueService:
         )
         return job_id
 
+    def enqueue_broadcast_start(self, broadcast_id: str, scheduled_at: datetime | None = None) -> str:
+        """Agendar o início de um broadcast (materializa a audiência) na lane batch."""
+        queue = self.queue_manager.queue_batch
+        kwargs = {
+            "broadcast_id": broadcast_id,
+            "result_ttl": settings.RQ_DEFAULT_RESULT_TTL,
+            "failure_ttl": settings.RQ_DEFAULT_FAILURE_TTL,
+        }
+        func = "robbot.infra.jobs.broadcast_job.start_broadcast_job"
+        if scheduled_at is not None:
+            scheduled_at = scheduled_at if scheduled_at.tzinfo else scheduled_at.replace(tzinfo=UTC)
+        if scheduled_at is not None and scheduled_at > datetime.now(UTC):
+            job = queue.enqueue_at(scheduled_at, func, **kwargs)
+        else:
+            job = queue.enqueue(func, **kwargs)
+        logger.info("Broadcast %s agendado (job %s)", broadcast_id, job.id, extra={"broadcast_id": broadcast_id})
+        return job.id
+
+    def enqueue_broadcast_send(self, broadcast_id: str, delay_seconds: float = 0, epoch: int = 0) -> str:
+        """Enfileirar um lote de envios de um broadcast na lane batch (opcionalmente com atraso)."""
+        queue = self.queue_manager.queue_batch
+        kwargs = {
+            "broadcast_id": broadcast_id,
+            "epoch": epoch,
+            "result_ttl": settings.RQ_DEFAULT_RESULT_TTL,
+            "failure_ttl": settings.RQ_DEFAULT_FAILURE_TTL,
+        }
+        func = "robbot.infra.jobs.broadcast_job.send_broadcast_batch_job"
+        if delay_seconds > 0:
+            job = queue.enqueue_in(timedelta(seconds=delay_seconds), func, **kwargs)
+        else:
+            job = queue.enqueue(func, **kwargs)
+        return job.id
+
     def health_check(self) -> dict[str, Any]:
         """Verifica saúde do serviço de filas (conexão Redis)."""
         try:
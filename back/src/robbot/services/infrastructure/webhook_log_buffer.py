@@ -0,0 +1,295 @@
+"""
+Write-behind buffer for ``webhook_logs``.
+
+The webhook appends each event to a Redis stream (one XADD, no Postgres on the
+critical path). ``WebhookLogFlusher`` consumes the stream through a consumer
+group and writes rows with a single multi-row INSERT whenever the batch size
+or the flush interval is reached, acknowledging entries only after commit.
+
+Delivery is at-least-once: entries read but not yet acknowledged stay in the
+group's pending list and are flushed again after a crash.
+
+A batch holds at most ``batch_size`` entries and nothing new is read while it
+is full. A batch whose INSERT fails WEBHOOK_LOG_FLUSH_MAX_RETRIES times is
+written row by row; rows that still fail (and entries that cannot be parsed)
+go to the WEBHOOK_LOG_DEAD_LETTER_STREAM stream with the error, so one bad
+event does not block the logs behind it. Connection errors are not
+dead-lettered: the batch waits for the database to come back.
+"""
+
+import json
+import logging
+import time
+from collections.abc import Callable
+from datetime import datetime
+from typing import Any
+
+import redis
+from sqlalchemy.exc import OperationalError
+
+from robbot.config.settings import settings
+from robbot.infra.db.session import get_sync_session
+from robbot.infra.persistence.repositories.webhook_log_repository import WebhookLogRepository
+from robbot.infra.redis.client import get_async_redis_client, get_redis_client
+from robbot.schemas.waha import WebhookLogOut
+
+logger = logging.getLogger(__name__)
+
+CONSUMER_GROUP = "webhook-log-flusher"
+# Entries pending longer than this on another consumer are considered orphaned
+RECLAIM_MIN_IDLE_MS = 60_000
+
+
+def _decode(value: Any) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class WebhookLogBuffer:
+    """Producer side: append webhook events to the Redis stream (async)."""
+
+    def __init__(self, redis_client=None):
+        self.redis = redis_client or get_async_redis_client()
+
+    async def append(self, session_name: str, event_type: str, payload: dict) -> WebhookLogOut:
+        """Buffer one webhook event and return its (not yet persisted) log view."""
+        created_at = datetime.utcnow()
+        entry_id = await self.redis.xadd(
+            settings.WEBHOOK_LOG_STREAM,
+            {
+                "session_name": session_name,
+                "event_type": event_type,
+                "payload": json.dumps(payload),
+                "created_at": created_at.isoformat(),
+            },
+            maxlen=settings.WEBHOOK_LOG_STREAM_MAXLEN,
+            approximate=True,
+        )
+        return WebhookLogOut(
+            buffer_id=_decode(entry_id),
+            session_name=session_name,
+            event_type=event_type,
+            processed=False,
+            created_at=created_at,
+        )
+
+
+class WebhookLogFlusher:
+    """Consumer side: drain the stream into Postgres in batches (sync)."""
+
+    def __init__(
+        self,
+        consumer_name: str,
+        redis_client: redis.Redis | None = None,
+        session_factory: Callable = get_sync_session,
+        batch_size: int | None = None,
+        flush_interval_ms: int | None = None,
+    ):
+        self.consumer_name = consumer_name
+        self.redis = redis_client or get_redis_client()
+        self.session_factory = session_factory
+        self.stream = settings.WEBHOOK_LOG_STREAM
+        self.batch_size = batch_size or settings.WEBHOOK_LOG_FLUSH_BATCH_SIZE
+        self.flush_interval_ms = flush_interval_ms or settings.WEBHOOK_LOG_FLUSH_INTERVAL_MS
+        self._buffer: list[tuple[str, dict]] = []
+        self._first_buffered_at: float | None = None
+        self._failed_flushes = 0
+
+    def ensure_group(self) -> None:
+        """Create the consumer group (and the stream) if missing."""
+        try:
+            self.redis.xgroup_create(self.stream, CONSUMER_GROUP, id="0", mkstream=True)
+        except redis.ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    def recover_pending(self) -> int:
+        """Buffer entries left unacknowledged by this consumer or orphaned by dead ones."""
+        recovered = 0
+
+        # Own pending list (previous run of this consumer crashed before XACK)
+        for _, entries in self.redis.xreadgroup(CONSUMER_GROUP, self.consumer_name, {self.stream: "0"}) or []:
+            recovered += self._add_entries(entries)
+
+        # Entries stuck on other consumers
+        start = "0-0"
+        while True:
+            result = self.redis.xautoclaim(
+                self.stream, CONSUMER_GROUP, self.consumer_name, RECLAIM_MIN_IDLE_MS, start_id=start, count=self.batch_size
+            )
+            start, entries = _decode(result[0]), result[1]
+            recovered += self._add_entries(entries)
+            if start == "0-0" or not entries:
+                break
+
+        if recovered:
+            logger.warning("[WEBHOOK LOG] %d entradas pendentes recuperadas do stream", recovered)
+        return recovered
+
+    def poll_once(self) -> int:
+        """Read new entries, flushing when the size or time threshold is hit.
+
+        Returns:
+            Number of rows written to the database in this call
+        """
+        if len(self._buffer) >= self.batch_size:
+            # Previous flush failed: retry it before reading anything new
+            return self.flush()
+
+        block_ms = self.flush_interval_ms
+        if self._first_buffered_at is not None:
+            elapsed_ms = (time.monotonic() - self._first_buffered_at) * 1000
+            block_ms = max(1, int(self.flush_interval_ms - elapsed_ms))
+
+        result = self.redis.xreadgroup(
+            CONSUMER_GROUP,
+            self.consumer_name,
+            {self.stream: ">"},
+            count=self.batch_size - len(self._buffer),
+            block=block_ms,
+        )
+        for _, entries in result or []:
+            self._add_entries(entries)
+
+        if self._should_flush():
+            return self.flush()
+        return 0
+
+    def flush(self) -> int:
+        """Write up to ``batch_size`` buffered rows with one multi-row INSERT, then ACK them.
+
+        After WEBHOOK_LOG_FLUSH_MAX_RETRIES failed INSERTs the batch is written
+        row by row and the rows that still fail are dead-lettered; each row is
+        ACKed as soon as it is written, so a retry never inserts it twice.
+        """
+        if not self._buffer:
+            return 0
+
+        batch = self._buffer[: self.batch_size]
+        try:
+            with self.session_factory() as session:
+                inserted = WebhookLogRepository(session).bulk_create([row for _, row in batch])
+        except Exception:
+            self._failed_flushes += 1
+            if self._failed_flushes < settings.WEBHOOK_LOG_FLUSH_MAX_RETRIES:
+                raise
+            logger.warning(
+                "[WEBHOOK LOG] Lote falhou %d vezes, gravando linha a linha (%d logs)",
+                self._failed_flushes,
+                len(batch),
+            )
+            inserted = self._flush_row_by_row(batch)
+        else:
+            self._ack([entry_id for entry_id, _ in batch])
+            del self._buffer[: len(batch)]
+
+        self._failed_flushes = 0
+        self._first_buffered_at = time.monotonic() if self._buffer else None
+        logger.debug("[WEBHOOK LOG] %d logs persistidos em lote", inserted)
+        return inserted
+
+    def run_forever(self) -> None:
+        """Flush loop for the dedicated worker process."""
+        self.ensure_group()
+        self.recover_pending()
+        while True:
+            try:
+                self.poll_once()
+            except Exception as e:
+                # Rows stay buffered (and pending in Redis); retry on the next iteration
+                logger.error("[WEBHOOK LOG] Falha ao persistir lote: %s", e, exc_info=True)
+                time.sleep(1)
+
+    def _should_flush(self) -> bool:
+        if not self._buffer:
+            return False
+        if len(self._buffer) >= self.batch_size:
+            return True
+        return (time.monotonic() - self._first_buffered_at) * 1000 >= self.flush_interval_ms
+
+    def _flush_row_by_row(self, batch: list[tuple[str, dict]]) -> int:
+        """Insert each row on its own; dead-letter the ones the database rejects.
+
+        ``batch`` is the head of the buffer: each row leaves it (and is ACKed)
+        right after its own commit or dead-letter.
+        """
+        inserted = 0
+        for entry_id, row in batch:
+            try:
+                with self.session_factory() as session:
+                    inserted += WebhookLogRepository(session).bulk_create([row])
+            except OperationalError:
+                # Database unreachable, not a bad row: keep the rest buffered and retry later
+                raise
+            except Exception as e:
+                self._dead_letter(
+                    entry_id,
+                    {
+                        "session_name": row["session_name"],
+                        "event_type": row["event_type"],
+                        "payload": json.dumps(row["payload"], default=str),
+                        "created_at": row["created_at"].isoformat(),
+                    },
+                    e,
+                )
+            self._ack([entry_id])
+            del self._buffer[0]
+        return inserted
+
+    def _dead_letter(self, entry_id: str, fields: dict, error: Exception) -> None:
+        self.redis.xadd(
+            settings.WEBHOOK_LOG_DEAD_LETTER_STREAM,
+            {**fields, "entry_id": entry_id, "error": str(error)[:500]},
+            maxlen=settings.WEBHOOK_LOG_STREAM_MAXLEN,
+            approximate=True,
+        )
+        logger.error(
+            "[WEBHOOK LOG] Log descartado para o dead-letter (entry_id=%s): %s",
+            entry_id,
+            error,
+            extra={"entry_id": entry_id, "event_type": fields.get("event_type")},
+        )
+
+    def _ack(self, entry_ids: list[str]) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.xack(self.stream, CONSUMER_GROUP, *entry_ids)
+        pipe.xdel(self.stream, *entry_ids)
+        pipe.execute()
+
+    def _add_entries(self, entries) -> int:
+        added = 0
+        for entry_id, fields in entries:
+            entry_id = _decode(entry_id)
+            if not fields:
+                # Entry was trimmed from the stream but is still pending: nothing left to persist
+                self.redis.xack(self.stream, CONSUMER_GROUP, entry_id)
+                continue
+            fields = {_decode(k): _decode(v) for k, v in fields.items()}
+            try:
+                row = {
+                    "session_name": fields["session_name"],
+                    "event_type": fields["event_type"],
+                    "payload": json.loads(fields["payload"]),
+                    "processed": False,
+                    "created_at": datetime.fromisoformat(fields["created_at"]),
+                }
+            except (KeyError, TypeError, ValueError) as e:
+                self._dead_letter(entry_id, fields, e)
+                self._ack([entry_id])
+                continue
+            if self._first_buffered_at is None:
+                self._first_buffered_at = time.monotonic()
+            self._buffer.append((entry_id, row))
+            added += 1
+        return added
+
+
+# Singleton global
+_webhook_log_buffer: WebhookLogBuffer | None = None
+
+
+def get_webhook_log_buffer() -> WebhookLogBuffer:
+    """Get or create the global webhook log buffer (API process)."""
+    global _webhook_log_buffer
+    if _webhook_log_buffer is None:
+        _webhook_log_buffer = WebhookLogBuffer()
+    return _webhook_log_buffer
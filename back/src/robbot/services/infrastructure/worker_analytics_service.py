@@ -33,7 +33,7 @@ class WorkerAnalyticsService:
 
     def get_queue_stats(self) -> dict[str, dict]:
         """Get statistics for all queues."""
-        queue_names = ["messages", "ai", "escalation", "failed"]
+        queue_names = ["control", "messages", "ai", "escalation", "batch", "failed"]
         stats = {}
 
         for name in queue_names:
@@ -83,7 +83,7 @@ class WorkerAnalyticsService:
         worker_stats = self.get_worker_stats()
 
         # Calculate total pending jobs (exclude failed queue)
-        total_pending = sum([queue_stats[name]["pending"] for name in ["messages", "ai", "escalation"]])
+        total_pending = sum(stats["pending"] for name, stats in queue_stats.items() if name != "failed")
 
         # Get historical stats
         processed = int(self.redis.get("rq:stat:processed") or 0)
@@ -0,0 +1,224 @@
+"""
+Tiered cache of per-contact LID -> phone resolutions.
+
+A new contact usually writes several messages in a burst, and every webhook
+and conversation job resolving its LID used to call WAHA on its own. An
+unresolvable LID was never remembered, so it cost a WAHA call per message.
+Lookups now go through three tiers:
+
+- in-process LRU (LID_CACHE_LOCAL_SIZE entries): no Redis round trip for the
+  contacts this process saw recently
+- Redis: ``<prefix><lid>`` holds a resolved phone for 24h (the key the webhook
+  already reads), ``<prefix>miss:<lid>`` marks a failed resolution for
+  LID_CACHE_NEGATIVE_TTL_SECONDS; both are read with one MGET
+- WAHA, coalesced: concurrent lookups of one LID in a process share a single
+  task, and across processes only the holder of ``<prefix>lock:<lid>`` calls
+  WAHA while the others wait for its result to appear in Redis
+
+Callers that time out stop waiting but do not cancel the shared lookup, whose
+result still lands in the cache for the next message.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+
+from redis import Redis
+
+from robbot.config.settings import settings
+from robbot.core import runtime_metrics
+from robbot.infra.redis.client import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+METRICS_RESOURCE = "lid_resolution"
+DEFAULT_PREFIX = "waha:lid_resolution:"
+POSITIVE_TTL_SECONDS = 86400
+# Intervalo entre leituras do Redis enquanto outro processo consulta o WAHA
+_FOLLOWER_POLL_SECONDS = 0.05
+
+# KEYS: lock | ARGV: token
+_RELEASE_LOCK = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+@dataclass(frozen=True)
+class Resolution:
+    """A cached outcome: the phone number, or None for a remembered failure."""
+
+    phone: str | None
+
+
+class LocalTier:
+    """Thread-safe in-process LRU of resolutions, plus this process' in-flight lookups."""
+
+    def __init__(self, max_size: int | None = None, ttl_seconds: float | None = None):
+        self.max_size = max_size or settings.LID_CACHE_LOCAL_SIZE
+        self.ttl_seconds = settings.LID_CACHE_LOCAL_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        self._entries: OrderedDict[str, tuple[Resolution, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        # (event loop, lid) -> shared lookup task
+        self.inflight: dict[tuple[int, str], asyncio.Task] = {}
+
+    def get(self, lid: str, now: float | None = None) -> Resolution | None:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            entry = self._entries.get(lid)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._entries[lid]
+                return None
+            self._entries.move_to_end(lid)
+            return entry[0]
+
+    def put(self, lid: str, resolution: Resolution, ttl_seconds: float | None = None) -> None:
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        with self._lock:
+            self._entries[lid] = (resolution, time.monotonic() + ttl)
+            self._entries.move_to_end(lid)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def forget(self, lid: str) -> None:
+        with self._lock:
+            self._entries.pop(lid, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class LidResolutionCache:
+    """Local LRU -> Redis -> coalesced WAHA lookup (see module docstring)."""
+
+    def __init__(
+        self,
+        redis_client: Redis | None = None,
+        local: LocalTier | None = None,
+        prefix: str = DEFAULT_PREFIX,
+    ):
+        self.redis = redis_client or get_redis_client()
+        self.local = local if local is not None else get_local_tier()
+        self.prefix = prefix
+        self._release_lock = self.redis.register_script(_RELEASE_LOCK)
+
+    def _keys(self, lid: str) -> tuple[str, str]:
+        return f"{self.prefix}{lid}", f"{self.prefix}miss:{lid}"
+
+    # ------------------------------------------------------------------ lookup
+
+    def get(self, lid: str) -> Resolution | None:
+        """Cached outcome for ``lid`` (None when no tier knows it)."""
+        resolution = self.local.get(lid)
+        if resolution is not None:
+            runtime_metrics.incr(METRICS_RESOURCE, "local_hits")
+            return resolution
+
+        resolution = self._get_remote(lid)
+        if resolution is None:
+            runtime_metrics.incr(METRICS_RESOURCE, "misses")
+            return None
+        runtime_metrics.incr(METRICS_RESOURCE, "redis_hits" if resolution.phone else "negative_hits")
+        self.local.put(lid, resolution, None if resolution.phone else settings.LID_CACHE_NEGATIVE_TTL_SECONDS)
+        return resolution
+
+    def _get_remote(self, lid: str) -> Resolution | None:
+        phone, miss = self.redis.mget(self._keys(lid))
+        if phone:
+            return Resolution(phone.decode() if isinstance(phone, bytes) else phone)
+        if miss:
+            return Resolution(None)
+        return None
+
+    def put(self, lid: str, phone: str | None) -> None:
+        """Remember a resolution (``phone``) or a failed one (None, for a short while)."""
+        positive_key, miss_key = self._keys(lid)
+        if phone:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.setex(positive_key, POSITIVE_TTL_SECONDS, phone)
+            pipe.delete(miss_key)
+            pipe.execute()
+            self.local.put(lid, Resolution(phone))
+        else:
+            self.redis.setex(miss_key, settings.LID_CACHE_NEGATIVE_TTL_SECONDS, 1)
+            self.local.put(lid, Resolution(None), settings.LID_CACHE_NEGATIVE_TTL_SECONDS)
+
+    def forget_failure(self, lid: str) -> None:
+        """Drop a remembered failure (e.g. after the contact was saved in WhatsApp)."""
+        if self.local.get(lid) == Resolution(None):
+            self.local.forget(lid)
+        self.redis.delete(self._keys(lid)[1])
+
+    # --------------------------------------------------------------- coalescing
+
+    async def resolve(self, lid: str, fetch: Callable[[], Awaitable[str | None]]) -> str | None:
+        """
+        Resolve ``lid`` with ``fetch`` (the WAHA call), sharing one call per LID.
+
+        ``fetch`` returns the phone or None and may raise; both a None and an
+        error are remembered as a failure. Cancelling the caller does not
+        cancel the shared lookup.
+        """
+        flight = (id(asyncio.get_running_loop()), lid)
+        task = self.local.inflight.get(flight)
+        if task is None:
+            task = asyncio.ensure_future(self._lookup(lid, fetch))
+            self.local.inflight[flight] = task
+            task.add_done_callback(lambda _: self.local.inflight.pop(flight, None))
+        else:
+            runtime_metrics.incr(METRICS_RESOURCE, "coalesced")
+        return await asyncio.shield(task)
+
+    async def _lookup(self, lid: str, fetch: Callable[[], Awaitable[str | None]]) -> str | None:
+        lock_key = f"{self.prefix}lock:{lid}"
+        token = uuid.uuid4().hex
+        window = settings.LID_CACHE_COALESCE_SECONDS
+        if not self.redis.set(lock_key, token, nx=True, px=int(window * 1000)):
+            runtime_metrics.incr(METRICS_RESOURCE, "coalesced_remote")
+            return await self._follow(lid, lock_key, window)
+
+        try:
+            runtime_metrics.incr(METRICS_RESOURCE, "waha_calls")
+            try:
+                phone = await fetch()
+            except Exception as e:  # noqa: BLE001 (remembered as a failure)
+                logger.warning("[LID RESOLVER] Error resolving LID %s: %s", lid, e)
+                phone = None
+            self.put(lid, phone)
+            return phone
+        finally:
+            self._release_lock(keys=[lock_key], args=[token])
+
+    async def _follow(self, lid: str, lock_key: str, window: float) -> str | None:
+        """Wait for another process' lookup of ``lid`` to land in Redis."""
+        deadline = time.monotonic() + window
+        while time.monotonic() < deadline:
+            await asyncio.sleep(_FOLLOWER_POLL_SECONDS)
+            resolution = self._get_remote(lid)
+            if resolution is not None:
+                self.local.put(lid, resolution, None if resolution.phone else settings.LID_CACHE_NEGATIVE_TTL_SECONDS)
+                return resolution.phone
+            if not self.redis.exists(lock_key):
+                break
+        return None
+
+
+# Singleton global
+_local_tier: LocalTier | None = None
+
+
+def get_local_tier() -> LocalTier:
+    """The in-process tier shared by every resolver of this process."""
+    global _local_tier
+    if _local_tier is None:
+        _local_tier = LocalTier()
+    return _local_tier
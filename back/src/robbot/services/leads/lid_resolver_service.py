@@ -3,9 +3,11 @@
 Provides progressive resolution of WhatsApp LIDs to real phone numbers.
 
 Strategy:
-1. First message: Accept LID, try quick resolution (non-blocking)
+1. First message: Accept LID; resolve it from the directory/cache only, or
+   queue it in the LID work set (never waits on WAHA)
 2. When name detected: Try to save contact in WhatsApp + resolve LID
-3. Periodic attempts: Keep trying to resolve LID over conversation lifetime
+3. Background batches: the LID resolution job resolves queued LIDs at a
+   bounded rate (resolve_batch) and patches leads/conversations in bulk
 4. Update lead.phone_number when resolution succeeds
 
 Based on WAHA-LID-RESOLUTION-PLAN.md
@@ -14,6 +16,12 @@ Based on WAHA-LID-RESOLUTION-PLAN.md
 import logging
 
 from robbot.infra.persistence.repositories.lead_repository import LeadRepository
+from robbot.services.leads.lid_resolution_cache import (
+    DEFAULT_PREFIX,
+    POSITIVE_TTL_SECONDS,
+    LidResolutionCache,
+    Resolution,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -21,21 +29,25 @@ logger = logging.getLogger(__name__)
 class LIDResolverService:
     """Service for progressive LID resolution."""
 
-    LID_CACHE_PREFIX = "waha:lid_resolution:"
-    LID_CACHE_TTL = 86400  # 24 hours
+    LID_CACHE_PREFIX = DEFAULT_PREFIX
+    LID_CACHE_TTL = POSITIVE_TTL_SECONDS
 
-    def __init__(self, waha_client):
+    def __init__(self, waha_client, cache: LidResolutionCache | None = None):
         """Initialize LID resolver.
 
         Args:
             waha_client: WAHA client instance for API calls
+            cache: Resolution cache (default: Redis + this process' LRU tier)
         """
         from robbot.config.settings import settings
         from robbot.infra.redis.client import get_redis_client
+        from robbot.services.communication.lid_directory import LidDirectory
 
         self.waha_client = waha_client
         self.redis = get_redis_client()
         self.settings = settings
+        self.lid_directory = LidDirectory(self.redis)
+        self.cache = cache or LidResolutionCache(self.redis)
 
     def is_lid_format(self, identifier: str) -> bool:
         """Check if identifier is in LID format.
@@ -56,6 +68,10 @@ class LIDResolverService:
     ) -> str | None:
         """Attempt to resolve LID to real phone number with timeout.
 
+        Concurrent calls for the same LID share one WAHA lookup, and failed
+        lookups are remembered for LID_CACHE_NEGATIVE_TTL_SECONDS (see
+        lid_resolution_cache).
+
         Args:
             lid: LID identifier (e.g., '24988337893388@lid' or '24988337893388')
             session: Session name (default from settings)
@@ -66,40 +82,100 @@ class LIDResolverService:
         """
         import asyncio
 
-        from robbot.core.custom_exceptions import WAHAError
-
         session = session or self.settings.WAHA_SESSION_NAME
 
-        # Check cache first
-        cache_key = f"{self.LID_CACHE_PREFIX}{lid}"
-        cached_phone = self.redis.get(cache_key)
-        if cached_phone:
-            phone = cached_phone.decode() if isinstance(cached_phone, bytes) else cached_phone
-            logger.debug("[LID RESOLVER] Cache hit: %s -> %s", lid, phone)
-            return phone
+        known = self._known(lid)
+        if known is not None:
+            return known.phone
 
-        # Try resolution with timeout
         try:
-            result = await asyncio.wait_for(
-                self.waha_client.get_phone_by_lid(session, lid),
+            phone = await asyncio.wait_for(
+                self.cache.resolve(lid, lambda: self._fetch_phone(lid, session)),
                 timeout=timeout_seconds,
             )
+        except asyncio.TimeoutError:
+            logger.warning("[LID RESOLVER] Timeout resolving LID: %s", lid)
+            return None
+
+        if phone:
+            logger.info("[LID RESOLVER] Resolved: %s -> %s", lid, phone)
+        return phone
+
+    def cached_phone(self, lid: str) -> str | None:
+        """Phone of ``lid`` from the directory or the resolution cache, without asking WAHA."""
+        known = self._known(lid)
+        return known.phone if known is not None else None
+
+    def _known(self, lid: str) -> Resolution | None:
+        # Prefetched directory first (one HGET), then the per-contact cache
+        if self.settings.LID_DIRECTORY_ENABLED:
+            directory_phone = self.lid_directory.phone_for_lid(lid)
+            if directory_phone:
+                logger.debug("[LID RESOLVER] Directory hit: %s -> %s", lid, directory_phone)
+                return Resolution(directory_phone)
+
+        cached = self.cache.get(lid)
+        if cached is not None:
+            logger.debug("[LID RESOLVER] Cache hit: %s -> %s", lid, cached.phone)
+        return cached
+
+    async def resolve_batch(
+        self,
+        lids: list[str],
+        session: str | None = None,
+        budget_seconds: float | None = None,
+    ) -> dict[str, str | None]:
+        """Resolve many LIDs off the request path, starting at most
+        LID_RESOLUTION_RATE_PER_SECOND WAHA lookups per second.
+
+        Args:
+            lids: LID numbers (without @lid)
+            session: Session name (default from settings)
+            budget_seconds: Stop starting WAHA lookups after this long
+
+        Returns:
+            LID -> phone, or None when it could not be resolved. LIDs left out
+            were not tried (the budget ran out).
+        """
+        import asyncio
+
+        session = session or self.settings.WAHA_SESSION_NAME
+        results: dict[str, str | None] = {}
+        remote = []
+        for lid in lids:
+            known = self._known(lid)
+            if known is not None:
+                results[lid] = known.phone
+            else:
+                remote.append(lid)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + budget_seconds if budget_seconds is not None else None
+        spacing = 1 / self.settings.LID_RESOLUTION_RATE_PER_SECOND
+        lookups = {}
+        for index, lid in enumerate(remote):
+            if deadline is not None and loop.time() >= deadline:
+                break
+            if index:
+                await asyncio.sleep(spacing)
+            lookups[lid] = asyncio.ensure_future(
+                self.cache.resolve(lid, lambda lid=lid: self._fetch_phone(lid, session))
+            )
+        for lid, lookup in lookups.items():
+            results[lid] = await lookup
+        return results
 
-            if result and result.get("pn"):
-                phone = result["pn"].split("@")[0]
-                # Cache successful resolution
-                self.redis.setex(cache_key, self.LID_CACHE_TTL, phone)
-                logger.info("[LID RESOLVER] Resolved: %s -> %s", lid, phone)
-                return phone
+    async def _fetch_phone(self, lid: str, session: str) -> str | None:
+        """One WAHA lookup (None when WAHA does not know the LID)."""
+        from robbot.core.custom_exceptions import WAHAError
 
+        try:
+            result = await self.waha_client.get_phone_by_lid(session, lid)
         except WAHAError:
             # Expected error for not found
-            pass
-        except asyncio.TimeoutError:
-            logger.warning("[LID RESOLVER] Timeout resolving LID: %s", lid)
-        except Exception as e:
-            logger.warning("[LID RESOLVER] Error resolving LID %s: %s", lid, str(e))
-
+            return None
+        if result and result.get("pn"):
+            return result["pn"].split("@")[0]
         return None
 
     async def try_resolve_phone_to_lid(
@@ -249,7 +325,8 @@ class LIDResolverService:
         logger.debug("[LID RESOLVER] Waiting 2s for WhatsApp contact sync...")
         await asyncio.sleep(2.0)
 
-        # STEP 3: Try resolution
+        # STEP 3: Try resolution (a failure remembered before the save no longer applies)
+        self.cache.forget_failure(current_phone)
         resolved_phone = await self.try_resolve_lid(current_phone)
 
         if resolved_phone and resolved_phone != current_phone:
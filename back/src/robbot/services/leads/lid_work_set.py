@@ -0,0 +1,120 @@
+"""
+Work set of LIDs waiting for background resolution.
+
+Inbound messages never wait on a WAHA lookup: a LID that neither the directory
+nor the resolution cache knows is added here (by the webhook and by
+``ConversationService.get_or_create``) and its conversation and lead keep the
+LID as a placeholder phone. The LID resolution job, enqueued by the polling
+leader, claims due LIDs in batches, resolves them at a bounded rate and
+patches leads and conversations in bulk. A batch stops starting WAHA lookups
+after LID_RESOLUTION_INTERVAL_SECONDS and releases what is left, so batches do
+not overlap and the rate limit holds across them.
+
+- Redis ZSET ``<key>``: LID number -> time it is next due (unix seconds)
+- Redis hash ``<key>:attempts``: LID number -> failed attempts so far
+
+Claiming pushes the due time of the claimed LIDs forward by
+LID_RESOLUTION_CLAIM_SECONDS, so a crashed batch is picked up again later.
+A failed LID backs off exponentially from LID_RESOLUTION_RETRY_SECONDS and is
+dropped after LID_RESOLUTION_MAX_ATTEMPTS (``resolve_and_update_lead`` still
+resolves it once the contact gets a name).
+"""
+
+import time
+
+from redis import Redis
+
+from robbot.config.settings import settings
+from robbot.infra.redis.client import get_redis_client
+
+# KEYS: work set | ARGV: now, limit, claimed until -> due LIDs, now claimed
+_CLAIM = """
+local lids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, tonumber(ARGV[2]))
+for _, lid in ipairs(lids) do
+    redis.call('ZADD', KEYS[1], ARGV[3], lid)
+end
+return lids
+"""
+
+
+def _number(identifier: str) -> str:
+    """'123@lid' / '123' -> '123'."""
+    return identifier.split("@")[0]
+
+
+class LidWorkSet:
+    """Redis-backed set of LIDs to resolve, with claim and backoff (see module docstring).
+
+    ``redis_client`` may be the asyncio client, for ``aadd`` on the API event
+    loop; every other method needs the sync client.
+    """
+
+    def __init__(self, redis_client: Redis | None = None, key: str | None = None):
+        self.redis = redis_client or get_redis_client()
+        self.key = key or settings.LID_RESOLUTION_WORK_SET_KEY
+        self.attempts_key = f"{self.key}:attempts"
+        self._claim = self.redis.register_script(_CLAIM)
+
+    def add(self, lids: list[str], now: float | None = None) -> int:
+        """Queue ``lids`` for resolution (LIDs already queued keep their due time)."""
+        if not lids:
+            return 0
+        now = time.time() if now is None else now
+        return self.redis.zadd(self.key, {_number(lid): now for lid in lids}, nx=True)
+
+    async def aadd(self, lid: str) -> None:
+        """``add`` of one LID for the asyncio Redis client (webhook ingestion)."""
+        await self.redis.zadd(self.key, {_number(lid): time.time()}, nx=True)
+
+    def claim(self, limit: int, now: float | None = None) -> list[str]:
+        """Up to ``limit`` due LIDs, hidden from other claims for LID_RESOLUTION_CLAIM_SECONDS."""
+        now = time.time() if now is None else now
+        lids = self._claim(keys=[self.key], args=[now, limit, now + settings.LID_RESOLUTION_CLAIM_SECONDS])
+        return [lid.decode() if isinstance(lid, bytes) else lid for lid in lids]
+
+    def release(self, lids: list[str], now: float | None = None) -> None:
+        """Make claimed LIDs due again without counting an attempt (batch ran out of time)."""
+        if lids:
+            now = time.time() if now is None else now
+            self.redis.zadd(self.key, dict.fromkeys(lids, now))
+
+    def complete(self, lids: list[str]) -> None:
+        """Drop resolved LIDs."""
+        if lids:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zrem(self.key, *lids)
+            pipe.hdel(self.attempts_key, *lids)
+            pipe.execute()
+
+    def retry(self, lids: list[str], now: float | None = None) -> list[str]:
+        """Back off failed LIDs; returns the ones dropped after LID_RESOLUTION_MAX_ATTEMPTS."""
+        if not lids:
+            return []
+        now = time.time() if now is None else now
+        pipe = self.redis.pipeline(transaction=False)
+        for lid in lids:
+            pipe.hincrby(self.attempts_key, lid, 1)
+        attempts = pipe.execute()
+
+        dropped = [lid for lid, count in zip(lids, attempts, strict=True) if count >= settings.LID_RESOLUTION_MAX_ATTEMPTS]
+        due = {
+            lid: now + settings.LID_RESOLUTION_RETRY_SECONDS * 2 ** (count - 1)
+            for lid, count in zip(lids, attempts, strict=True)
+            if count < settings.LID_RESOLUTION_MAX_ATTEMPTS
+        }
+        if due:
+            self.redis.zadd(self.key, due)
+        self.complete(dropped)
+        return dropped
+
+    def claim_run(self) -> bool:
+        """True at most once per LID_RESOLUTION_INTERVAL_SECONDS across all processes."""
+        return bool(self.redis.set(f"{self.key}:run_lock", 1, nx=True, ex=settings.LID_RESOLUTION_INTERVAL_SECONDS))
+
+    def pending(self, now: float | None = None) -> int:
+        """Number of LIDs due now."""
+        now = time.time() if now is None else now
+        return self.redis.zcount(self.key, "-inf", now)
+
+    def size(self) -> int:
+        return self.redis.zcard(self.key)
@@ -0,0 +1,109 @@
+"""
+Conversation worker asyncio sobre Redis Streams (INGESTION_BACKEND=streams).
+
+Um único event loop de longa duração roda até CONVERSATION_WORKER_CONCURRENCY
+turnos de conversa ao mesmo tempo: quase todo o turno é espera por LLM, WAHA e
+Redis, então um container atende dezenas de conversas em vez de uma. Turnos do
+mesmo chat nunca se sobrepõem (lock por chat) e mantêm a ordem do stream.
+
+Cada turno segura uma conexão do pool do SQLAlchemy enquanto roda, por isso a
+concorrência efetiva é limitada a DB_POOL_SIZE + DB_MAX_OVERFLOW.
+
+Uso:
+    python -m robbot.workers.conversation_worker
+"""
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+import threading
+from typing import Any
+
+from robbot.config.settings import get_settings
+from robbot.core import runtime_metrics
+from robbot.core.logging_setup import configure_logging
+from robbot.infra.jobs.message_job import process_message_job_async
+from robbot.infra.redis.streams import ConcurrentPartitionConsumer, get_stream_queue
+
+# Configuração global de logging para o processo
+configure_logging()
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+SHUTDOWN_GRACE_SECONDS = 60
+
+
+async def handle_entry(payload: dict[str, Any]) -> Any:
+    """Executa o turno da conversa no event loop do worker."""
+    return await process_message_job_async(**payload)
+
+
+def effective_concurrency() -> int:
+    """Concorrência configurada, limitada ao pool de conexões do banco."""
+    db_connections = settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    if db_connections < settings.CONVERSATION_WORKER_CONCURRENCY:
+        # Um turno esperando conexão bloquearia o event loop inteiro
+        logger.warning(
+            "[CONVERSATION] CONVERSATION_WORKER_CONCURRENCY=%d excede o pool do banco (%d); usando %d",
+            settings.CONVERSATION_WORKER_CONCURRENCY,
+            db_connections,
+            db_connections,
+        )
+        return db_connections
+    return settings.CONVERSATION_WORKER_CONCURRENCY
+
+
+async def run_conversation_worker_async():
+    """Loop principal: lê as partições e dispara os turnos como tasks."""
+    queue = get_stream_queue()
+    await asyncio.to_thread(queue.ensure_groups)
+
+    consumer_name = f"conversation-{socket.gethostname()}-{os.getpid()}"
+    consumer = ConcurrentPartitionConsumer(
+        queue=queue,
+        consumer_name=consumer_name,
+        handler=handle_entry,
+        concurrency=effective_concurrency(),
+    )
+    stop = threading.Event()
+
+    def keep_leases():
+        # Thread própria: um turno que bloqueie o loop não deixa a lease expirar
+        while not stop.wait(consumer.lease_ms / 3000):
+            try:
+                consumer.heartbeat()
+            except Exception as e:
+                logger.warning("[CONVERSATION] Falha no heartbeat: %s", e)
+
+    threading.Thread(target=keep_leases, name="conversation-heartbeat", daemon=True).start()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+
+    logger.info(
+        "=== CONVERSATION WORKER INICIADO ===",
+        extra={"consumer": consumer_name, "concurrency": consumer.concurrency, "partitions": queue.partitions},
+    )
+
+    try:
+        while not stop.is_set():
+            try:
+                await consumer.poll_once(block_ms=1000)
+                runtime_metrics.maybe_publish(queue.redis)
+            except Exception as e:
+                logger.error("[CONVERSATION] Erro inesperado: %s", e, exc_info=True)
+                await asyncio.sleep(1)
+    finally:
+        logger.info("[CONVERSATION] Aguardando %d turnos em andamento...", consumer.inflight)
+        await consumer.drain(timeout=SHUTDOWN_GRACE_SECONDS)
+        stop.set()
+        await asyncio.to_thread(consumer.release_all)
+        logger.info("[CONVERSATION] Worker %s finalizado, partições liberadas", consumer_name)
+
+
+def run_conversation_worker():
+    asyncio.run(run_conversation_worker_async())
+
+
+if __name__ == "__main__":
+    run_conversation_worker()
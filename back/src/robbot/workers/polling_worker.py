@@ -1,15 +1,27 @@
 """Worker dedicado para executar polling periódico de mensagens WAHA."""
 
 import logging
+import re
+import signal
+import threading
 import time
 from datetime import UTC, datetime
 
-from rq.job import Job, JobStatus
-
 from robbot.config.settings import get_settings
 from robbot.core.logging_setup import configure_logging
+from robbot.infra.jobs.lid_directory_job import LID_DIRECTORY_JOB_PATH
+from robbot.infra.jobs.lid_resolution_job import LID_RESOLUTION_JOB_PATH
+from robbot.infra.jobs.message_polling_job import (
+    POLLING_JOB_PATH,
+    POLLING_JOB_TIMEOUT,
+    acquire_inflight,
+    release_inflight,
+)
 from robbot.infra.redis.client import get_redis_client
+from robbot.services.communication.lid_directory import LidDirectory
+from robbot.services.communication.polling_coordinator import PollingCoordinator
 from robbot.services.infrastructure.queue_service import get_queue_service
+from robbot.services.leads.lid_work_set import LidWorkSet
 
 # Configuração global de logging para o processo
 configure_logging()
@@ -20,49 +32,94 @@ settings = get_settings()
 def run_polling_worker():
     """
     Executa polling de mensagens WAHA a cada intervalo configurado.
+
+    Várias réplicas podem rodar ao mesmo tempo: cada uma publica heartbeat, uma
+    delas (líder, lease em Redis) mantém o anel de réplicas vivas e cada réplica
+    enfileira ciclos só para os chats que o hash consistente lhe atribui
+    (ver polling_coordinator).
+
+    O líder também enfileira a sincronização do diretório de LIDs (na partida e
+    a cada LID_DIRECTORY_REFRESH_SECONDS) e, quando há LIDs pendentes, um lote de
+    resolução a cada LID_RESOLUTION_INTERVAL_SECONDS (ver lid_work_set).
+
+    Sobreposição é evitada por uma vaga em Redis por réplica (POLLING_INFLIGHT_KEY):
+    o worker só enfileira um ciclo quando o anterior já a liberou, sem esperar
+    pelo job.
     """
     queue_service = get_queue_service()
     redis_client = get_redis_client()
+    coordinator = PollingCoordinator(redis_client)
+    lid_directory = LidDirectory(redis_client)
+    lid_work_set = LidWorkSet(redis_client)
     polling_interval = getattr(settings, "WAHA_POLLING_INTERVAL", 10)
+    # Heartbeat/lease renovados bem antes de expirar, mesmo com intervalo longo
+    tick_seconds = min(polling_interval, settings.WAHA_POLLING_LEASE_SECONDS / 3)
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
 
     logger.info(
         "=== WAHA POLLING WORKER INICIADO ===",
         extra={
             "interval_seconds": polling_interval,
             "dev_mode": settings.DEV_MODE,
+            "concurrency": settings.WAHA_POLLING_CONCURRENCY,
+            "replica": coordinator.replica,
         },
     )
 
-    while True:
-        try:
-            now = datetime.now(UTC)
-            job_func_path = "robbot.infra.jobs.message_polling_job.poll_waha_messages"
-            
-            job_id_val = queue_service.enqueue_custom(
-                func=job_func_path,
-                queue_name="messages",
-                job_id=f"waha-polling-{int(now.timestamp())}",
-                timeout=120,
-            )
-
-            if job_id_val:
-                logger.info("[POLLING WORKER] Job enfileirado: %s", job_id_val)
-                
-                # Aguardar conclusão para evitar sobreposição se o job demorar
-                try:
-                    job = Job.fetch(job_id_val, connection=redis_client)
-                    start_wait = time.time()
-                    while job.get_status() not in [JobStatus.FINISHED, JobStatus.FAILED]:
-                        if time.time() - start_wait > 125: # Pouco mais que o timeout do job
-                            break
-                        time.sleep(1)
-                except Exception as e:
-                    logger.error("[POLLING WORKER] Erro ao monitorar job: %s", e)
-            
-        except Exception as e:
-            logger.error("[POLLING WORKER] Erro inesperado: %s", e, exc_info=True)
-
-        time.sleep(polling_interval)
+    last_cycle = 0.0
+    try:
+        while not stop.is_set():
+            try:
+                view = coordinator.tick()
+                if time.monotonic() - last_cycle >= polling_interval:
+                    if view is None or not view.includes(coordinator.replica):
+                        logger.info("[POLLING WORKER] Aguardando entrada no anel de polling (%s)", coordinator.replica)
+                    else:
+                        last_cycle = time.monotonic()
+                        _enqueue_cycle(queue_service, redis_client, coordinator.replica)
+
+                if coordinator.is_leader and settings.LID_DIRECTORY_ENABLED and lid_directory.claim_sync():
+                    queue_service.enqueue_custom(func=LID_DIRECTORY_JOB_PATH, queue_name="control", timeout=300)
+
+                if coordinator.is_leader and lid_work_set.pending() and lid_work_set.claim_run():
+                    queue_service.enqueue_custom(
+                        func=LID_RESOLUTION_JOB_PATH,
+                        queue_name="control",
+                        timeout=settings.LID_RESOLUTION_INTERVAL_SECONDS * 3 + 30,
+                    )
+
+            except Exception as e:
+                logger.error("[POLLING WORKER] Erro inesperado: %s", e, exc_info=True)
+
+            stop.wait(tick_seconds)
+    finally:
+        coordinator.leave()
+        logger.info("[POLLING WORKER] Réplica %s finalizada, chats redistribuídos", coordinator.replica)
+
+
+def _enqueue_cycle(queue_service, redis_client, replica: str) -> None:
+    """Enfileira o ciclo desta réplica, se o anterior já terminou."""
+    now = datetime.now(UTC)
+    job_id = f"waha-polling-{re.sub(r'[^A-Za-z0-9_-]', '-', replica)}-{int(now.timestamp())}"
+
+    if not acquire_inflight(redis_client, job_id, shard=replica):
+        # Ciclo anterior ainda em andamento: pula este tick
+        logger.warning("[POLLING WORKER] Ciclo anterior ainda em andamento, pulando")
+        return
+
+    try:
+        job_id_val = queue_service.enqueue_custom(
+            func=POLLING_JOB_PATH,
+            queue_name="control",
+            job_id=job_id,
+            timeout=POLLING_JOB_TIMEOUT,
+            kwargs={"shard": replica},
+        )
+    except Exception:
+        release_inflight(redis_client, job_id, shard=replica)
+        raise
+    logger.info("[POLLING WORKER] Job enfileirado: %s", job_id_val)
 
 
 if __name__ == "__main__":
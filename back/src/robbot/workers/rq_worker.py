@@ -1,10 +1,14 @@
 """
 Worker RQ para processar jobs das filas.
 
-Este worker processa jobs de múltiplas filas em ordem de prioridade:
-1. messages (alta prioridade - processamento rápido)
-2. ai (média prioridade - pode demorar mais)
-3. escalation (baixa prioridade - transferências para secretária)
+As filas são agrupadas em lanes (robbot.infra.redis.lanes):
+1. control (polling) - concorrência limitada, não fica atrás de conversas
+2. interactive: messages, ai, escalation (nesta ordem) - turnos de conversa
+3. batch (analytics, jobs em massa) - concorrência limitada para não tomar todos os workers
+
+Lanes com jobs pendentes dividem o worker por round robin ponderado
+(RQ_LANE_*_WEIGHT); uma lane com RQ_LANE_*_MAX_CONCURRENCY jobs rodando no
+cluster é pulada até liberar uma vaga.
 
 Uso:
     # Rodar localmente:
@@ -28,6 +32,7 @@ from rq.registry import clean_registries
 from robbot.config.settings import settings
 from robbot.core.logging_setup import configure_logging
 from robbot.infra.redis.client import get_redis_client
+from robbot.infra.redis.lanes import ForkingLaneWorker, LaneWorker
 from robbot.infra.redis.queue import get_queue_manager
 
 # Configurar logging estruturado
@@ -103,9 +108,11 @@ def main():
     # Get queues
     queue_manager = get_queue_manager(redis_conn)
     queues = [
-        queue_manager.queue_messages,  # High priority
-        queue_manager.queue_ai,  # Medium priority
-        queue_manager.queue_escalation,  # Low priority
+        queue_manager.queue_control,  # Lane control
+        queue_manager.queue_messages,  # Lane interactive
+        queue_manager.queue_ai,
+        queue_manager.queue_escalation,
+        queue_manager.queue_batch,  # Lane batch
     ]
 
     logger.info("Queues configured: %s", [q.name for q in queues])
@@ -137,7 +144,11 @@ def main():
     except Exception as e:  # pylint: disable=broad-except
         logger.warning("Failed to cleanup stale workers: %s", e)
 
-    worker = Worker(
+    # Sem fork por job o processo (com seu event loop e pools de conexão) sobrevive entre jobs
+    worker_class = ForkingLaneWorker if settings.RQ_WORKER_FORK_PER_JOB else LaneWorker
+    logger.info("Worker class: %s", worker_class.__name__)
+
+    worker = worker_class(
         queues,
         connection=redis_conn,
         name=worker_name,
@@ -0,0 +1,68 @@
+"""
+Send dispatcher: entrega as respostas do bot fora da transação do turno.
+
+Os workers de conversa só gravam a resposta como PENDING (outbox) e fazem
+commit. Neste processo:
+- o relay do outbox pega as mensagens PENDING e as agenda no envio diferido
+  (WAHA_DEFERRED_SEND) ou envia direto pelo WAHA;
+- o dispatcher dispara "digitando..." e stop_typing + envio quando o delay
+  anti-ban expira, preservando a ordem por chat.
+Um único event loop atende dezenas de chats em paralelo (quase tudo é espera).
+
+Uso:
+    python -m robbot.workers.send_dispatcher_worker
+"""
+
+import asyncio
+import logging
+import signal
+
+from robbot.config.settings import get_settings
+from robbot.core import runtime_metrics
+from robbot.core.logging_setup import configure_logging
+from robbot.services.communication.deferred_send_service import DeferredSendDispatcher
+from robbot.services.communication.outbox_relay import OutboxRelay
+
+# Configuração global de logging para o processo
+configure_logging()
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+async def run_send_dispatcher_async():
+    """Loop principal: relay do outbox + envios vencidos até receber SIGTERM."""
+    dispatcher = DeferredSendDispatcher()
+    relay = OutboxRelay(waha_client=dispatcher.waha_client)
+    stop = asyncio.Event()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, stop.set)
+
+    logger.info(
+        "=== SEND DISPATCHER INICIADO ===",
+        extra={
+            "prefix": dispatcher.outbox.prefix,
+            "concurrency": dispatcher.concurrency,
+            "poll_ms": settings.DEFERRED_SEND_POLL_MS,
+            "outbox_batch_size": relay.batch_size,
+        },
+    )
+
+    async def publish_metrics():
+        while not stop.is_set():
+            runtime_metrics.maybe_publish(dispatcher.outbox.redis)
+            await asyncio.sleep(runtime_metrics.PUBLISH_INTERVAL_SECONDS)
+
+    metrics_task = asyncio.create_task(publish_metrics())
+    try:
+        await asyncio.gather(relay.run_forever(stop), dispatcher.run_forever(stop))
+    finally:
+        metrics_task.cancel()
+        await dispatcher.waha_client.close()
+        logger.info("[SEND DISPATCHER] Finalizado")
+
+
+def run_send_dispatcher():
+    asyncio.run(run_send_dispatcher_async())
+
+
+if __name__ == "__main__":
+    run_send_dispatcher()
@@ -0,0 +1,74 @@
+"""
+Worker de ingestão sobre Redis Streams (INGESTION_BACKEND=streams).
+
+Cada worker assume uma fatia das partições (lease no Redis) e processa as
+mensagens de cada partição em ordem, garantindo ordem estrita por chat com
+paralelismo entre chats. Escale com quantas réplicas quiser (até o número de
+partições).
+
+Uso:
+    python -m robbot.workers.stream_worker
+"""
+
+import logging
+import os
+import signal
+import socket
+import threading
+from typing import Any
+
+from robbot.config.settings import get_settings
+from robbot.core.logging_setup import configure_logging
+from robbot.infra.jobs.message_job import process_message_job
+from robbot.infra.redis.streams import PartitionConsumer, get_stream_queue
+
+# Configuração global de logging para o processo
+configure_logging()
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def handle_entry(payload: dict[str, Any]) -> Any:
+    """Executa o mesmo job da fila RQ para uma entrada do stream."""
+    return process_message_job(**payload)
+
+
+def run_stream_worker():
+    """Loop principal: heartbeat em background + processamento ordenado das partições."""
+    queue = get_stream_queue()
+    queue.ensure_groups()
+
+    consumer_name = f"stream-{socket.gethostname()}-{os.getpid()}"
+    consumer = PartitionConsumer(queue=queue, consumer_name=consumer_name, handler=handle_entry)
+    stop = threading.Event()
+
+    def keep_leases():
+        # Handlers podem demorar (LLM, anti-ban): a lease não pode expirar no meio
+        while not stop.wait(consumer.lease_ms / 3000):
+            try:
+                consumer.heartbeat()
+            except Exception as e:
+                logger.warning("[STREAMS] Falha no heartbeat: %s", e)
+
+    threading.Thread(target=keep_leases, name="stream-heartbeat", daemon=True).start()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+
+    logger.info(
+        "=== STREAM WORKER INICIADO ===",
+        extra={"consumer": consumer_name, "partitions": queue.partitions, "prefix": queue.prefix},
+    )
+
+    try:
+        while not stop.is_set():
+            try:
+                consumer.process_once(block_ms=1000)
+            except Exception as e:
+                logger.error("[STREAMS] Erro inesperado: %s", e, exc_info=True)
+                stop.wait(1)
+    finally:
+        consumer.release_all()
+        logger.info("[STREAMS] Worker %s finalizado, partições liberadas", consumer_name)
+
+
+if __name__ == "__main__":
+    run_stream_worker()
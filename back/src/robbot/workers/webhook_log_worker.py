@@ -0,0 +1,39 @@
+"""Worker dedicado para persistir em lote os webhook_logs bufferizados no Redis."""
+
+import logging
+import os
+import socket
+
+from robbot.config.settings import get_settings
+from robbot.core.logging_setup import configure_logging
+from robbot.services.infrastructure.webhook_log_buffer import WebhookLogFlusher
+
+# Configuração global de logging para o processo
+configure_logging()
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+def run_webhook_log_worker():
+    """
+    Consome o stream de webhook logs e grava no Postgres com INSERT multi-linha.
+    """
+    # Nome estável entre restarts do container: recupera as próprias entradas pendentes
+    consumer_name = os.getenv("SERVICE_NAME") or socket.gethostname()
+    flusher = WebhookLogFlusher(consumer_name=consumer_name)
+
+    logger.info(
+        "=== WEBHOOK LOG WORKER INICIADO ===",
+        extra={
+            "consumer": consumer_name,
+            "stream": settings.WEBHOOK_LOG_STREAM,
+            "batch_size": flusher.batch_size,
+            "flush_interval_ms": flusher.flush_interval_ms,
+        },
+    )
+
+    flusher.run_forever()
+
+
+if __name__ == "__main__":
+    run_webhook_log_worker()
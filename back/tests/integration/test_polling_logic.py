@@ -1,8 +1,11 @@
 
 import pytest
-from unittest.mock import MagicMock, patch
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
 from robbot.infra.jobs.message_polling_job import poll_waha_messages
 from robbot.config.settings import Settings
+from robbot.services.communication.polling_strategies import PollTarget
+from robbot.services.communication.polling_watermarks import Watermark
 
 class TestPollingLogic:
     """
@@ -15,7 +18,9 @@ class TestPollingLogic:
              patch("robbot.infra.jobs.message_polling_job.WahaMetadataService") as mock_metadata_cls, \
              patch("robbot.infra.jobs.message_polling_job.get_polling_strategy") as mock_get_strategy, \
              patch("robbot.infra.jobs.message_polling_job.MessageFilterService") as mock_filter_cls, \
-             patch("robbot.infra.jobs.message_polling_job.get_queue_service") as mock_get_queue:
+             patch("robbot.infra.jobs.message_polling_job.get_queue_service") as mock_get_queue, \
+             patch("robbot.infra.jobs.message_polling_job.PollingWatermarks") as mock_watermarks_cls, \
+             patch("robbot.infra.jobs.message_polling_job.PollScheduler") as mock_scheduler_cls:
             
             # Setup Mocks
             mock_settings = MagicMock(spec=Settings)
@@ -27,13 +32,19 @@ class TestPollingLogic:
             mock_strategy = mock_get_strategy.return_value
             mock_filter = mock_filter_cls.return_value
             mock_queue = mock_get_queue.return_value
+            mock_watermarks = mock_watermarks_cls.return_value
+            mock_watermarks.get_many.return_value = {}
+            mock_scheduler = mock_scheduler_cls.return_value
+            mock_scheduler.due.side_effect = lambda chat_ids: list(chat_ids)
 
             yield {
                 "settings": mock_settings,
                 "metadata": mock_metadata,
                 "strategy": mock_strategy,
                 "filter": mock_filter,
-                "queue": mock_queue
+                "queue": mock_queue,
+                "watermarks": mock_watermarks,
+                "scheduler": mock_scheduler,
             }
 
     def test_polling_accepts_valid_phone_in_dev_mode(self, mock_dependencies):
@@ -48,7 +59,7 @@ class TestPollingLogic:
         # - Message is from: 5511999999999@c.us
         # - Config allows: 5511999999999
         
-        mocks["strategy"].get_target_chats.return_value = ["5511999999999@lid"]
+        mocks["strategy"].get_targets.return_value = [PollTarget("5511999999999@lid")]
         
         msg_payload = {
             "id": "msg_123",
@@ -57,32 +68,129 @@ class TestPollingLogic:
             "fromMe": False,
             "timestamp": 1234567890
         }
-        mocks["metadata"].get_messages_from_chat.return_value = [msg_payload]
-        
-        # Mock filter to behave like real service (partial logic reproduction for test validity)
-        # But wait, we patched the class, so we need to mock the method behavior OR spy on arguments.
-        # Since we modified the CALLER to pass the correct allowed_senders, we just need to verify
-        # that 'should_process' is called with the settings list, NOT the target list.
+        mocks["metadata"].aget_messages_from_chat = AsyncMock(return_value=[msg_payload])
         
+        # The filter claims the whole chat page in one call (dedup + business rules)
+        mocks["filter"].claim_new.return_value = [msg_payload]
+
         poll_waha_messages()
-        
-        # Verify allowlist passed to filter
-        expected_allowlist = {"5511999999999"}
-        
-        # Get the call args
-        call_args = mocks["filter"].should_process.call_args
-        assert call_args is not None
-        
-        _, kwargs = call_args
-        passed_allowlist = kwargs.get("allowed_senders")
-        
-        # Verify the allowlist contains the raw phone number
-        assert passed_allowlist == expected_allowlist
-        
-        # Verify message was enqueued (assuming filter returned True by default mock)
-        mocks["filter"].should_process.return_value = True
-        
-        # Re-run to trigger enqueue
+
+        mocks["filter"].claim_new.assert_called_once()
+        args, kwargs = mocks["filter"].claim_new.call_args
+        assert args[0] == [msg_payload]
+        assert kwargs.get("allowed_senders") is None
+
+        # Claimed message is enqueued
+        mocks["queue"].enqueue_message_processing_debounced.assert_called_once()
+        assert mocks["queue"].enqueue_message_processing_debounced.call_args.kwargs["message_data"]["id"] == "msg_123"
+
+    def test_polling_releases_claim_when_enqueue_fails(self, mock_dependencies):
+        """A failed enqueue must release the claim so the next cycle retries it."""
+        mocks = mock_dependencies
+        mocks["strategy"].get_targets.return_value = [PollTarget("5511999999999@c.us")]
+        msg_payload = {"id": "msg_456", "from": "5511999999999@c.us", "body": "Oi", "fromMe": False}
+        mocks["metadata"].aget_messages_from_chat = AsyncMock(return_value=[msg_payload])
+        mocks["filter"].claim_new.return_value = [msg_payload]
+        mocks["queue"].enqueue_message_processing_debounced.side_effect = RuntimeError("queue down")
+
         poll_waha_messages()
-        mocks["queue"].enqueue_message_processing_debounced.assert_called()
 
+        mocks["filter"].release.assert_called_once_with(["msg_456"])
+        # Watermark is not advanced, so the next cycle fetches the chat again
+        mocks["watermarks"].set_many.assert_called_once_with({})
+
+    def test_polling_skips_chats_without_new_messages(self, mock_dependencies):
+        """Chats whose last message is the stored watermark are not fetched; the others fetch from it."""
+        mocks = mock_dependencies
+        seen = Watermark("msg_old", 1700000000)
+        mocks["strategy"].get_targets.return_value = [
+            PollTarget("idle@c.us", last_message=seen),
+            PollTarget("busy@c.us", last_message=Watermark("msg_new", 1700000100)),
+        ]
+        mocks["watermarks"].get_many.return_value = {"idle@c.us": seen, "busy@c.us": seen}
+        msg_payload = {"id": "msg_new", "from": "busy@c.us", "body": "Oi", "fromMe": False, "timestamp": 1700000100}
+        mocks["metadata"].aget_messages_from_chat = AsyncMock(return_value=[msg_payload])
+        mocks["filter"].claim_new.return_value = [msg_payload]
+
+        result = poll_waha_messages()
+
+        mocks["metadata"].aget_messages_from_chat.assert_awaited_once()
+        args, kwargs = mocks["metadata"].aget_messages_from_chat.call_args
+        assert args[0] == "busy@c.us"
+        assert kwargs["since"] == 1700000000
+        mocks["watermarks"].set_many.assert_called_once_with({"busy@c.us": Watermark("msg_new", 1700000100)})
+        assert (result["processed"], result["unchanged"]) == (1, 1)
+
+    def test_polling_fetches_chats_concurrently_with_per_chat_timeout(self, mock_dependencies):
+        """Chats are fetched in parallel; a chat past the timeout is left for the next cycle."""
+        mocks = mock_dependencies
+        mocks["strategy"].get_targets.return_value = [PollTarget(f"{i}@c.us") for i in range(10)] + [
+            PollTarget("slow@c.us")
+        ]
+
+        async def fetch(chat_id, limit, since):
+            await asyncio.sleep(5 if chat_id == "slow@c.us" else 0.2)
+            return [{"id": f"msg_{chat_id}", "from": chat_id, "timestamp": 1700000000}]
+
+        mocks["metadata"].aget_messages_from_chat = AsyncMock(side_effect=fetch)
+        mocks["filter"].claim_new.side_effect = lambda messages, allowed_senders: messages
+
+        with patch("robbot.infra.jobs.message_polling_job.settings") as settings:
+            settings.WAHA_POLLING_INCREMENTAL = True
+            settings.WAHA_POLLING_MESSAGE_LIMIT = 50
+            settings.WAHA_POLLING_CONCURRENCY = 10
+            settings.WAHA_POLLING_CHAT_TIMEOUT_SECONDS = 0.5
+            settings.WAHA_POLLING_ADAPTIVE = True
+            result = poll_waha_messages()
+
+        assert (result["processed"], result["timeouts"]) == (10, 1)
+        # Ten 200ms chats at concurrency 10 plus one 500ms timeout, not 2s + 5s in series
+        assert result["duration_ms"] < 1500
+        advanced = mocks["watermarks"].set_many.call_args.args[0]
+        assert "slow@c.us" not in advanced and len(advanced) == 10
+
+    def test_polling_defers_idle_chats_without_overview(self, mock_dependencies):
+        """Chats without overview data follow the adaptive schedule; chats with new overview messages are always polled."""
+        mocks = mock_dependencies
+        mocks["strategy"].get_targets.return_value = [
+            PollTarget("active@c.us", last_message=Watermark("msg_new", 1700000100)),
+            PollTarget("due@c.us"),
+            PollTarget("idle@c.us"),
+        ]
+        mocks["scheduler"].due.side_effect = lambda chat_ids: [c for c in chat_ids if c != "idle@c.us"]
+
+        async def fetch(chat_id, limit, since):
+            if chat_id == "active@c.us":
+                return [{"id": "msg_new", "from": chat_id, "timestamp": 1700000100}]
+            return []
+
+        mocks["metadata"].aget_messages_from_chat = AsyncMock(side_effect=fetch)
+        mocks["filter"].claim_new.side_effect = lambda messages, allowed_senders: messages
+
+        result = poll_waha_messages()
+
+        fetched = {call.args[0] for call in mocks["metadata"].aget_messages_from_chat.call_args_list}
+        assert fetched == {"active@c.us", "due@c.us"}
+        mocks["scheduler"].due.assert_called_once_with(["due@c.us", "idle@c.us"])
+        mocks["scheduler"].record.assert_called_once_with({"active@c.us": True, "due@c.us": False})
+        assert result["deferred"] == 1
+
+    def test_polling_shard_only_fetches_chats_assigned_to_its_replica(self, mock_dependencies):
+        """With several polling replicas, a shard cycle only polls the chats the ring assigns to it."""
+        from robbot.services.communication.polling_coordinator import HashRing, RingView
+
+        mocks = mock_dependencies
+        chats = [f"{i}@c.us" for i in range(20)]
+        mocks["strategy"].get_targets.return_value = [PollTarget(chat_id) for chat_id in chats]
+        mocks["metadata"].aget_messages_from_chat = AsyncMock(return_value=[])
+        ring = RingView(epoch=1, ring=HashRing(["pwk-1", "pwk-2"]))
+
+        with patch("robbot.infra.jobs.message_polling_job.PollingCoordinator") as coordinator_cls:
+            coordinator_cls.return_value.current_ring.return_value = ring
+            poll_waha_messages(shard="pwk-1")
+            coordinator_cls.return_value.current_ring.return_value = RingView(epoch=2, ring=HashRing(["pwk-2"]))
+            assert poll_waha_messages(shard="pwk-1")["status"] == "skipped"
+
+        fetched = {call.args[0] for call in mocks["metadata"].aget_messages_from_chat.call_args_list}
+        assert fetched == {chat_id for chat_id in chats if ring.owns("pwk-1", chat_id)}
+        assert 0 < len(fetched) < len(chats)
@@ -0,0 +1,117 @@
+"""
+Testes unitários do runtime asyncio persistente (run_sync) e das métricas de reuso.
+"""
+import asyncio
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import fakeredis
+import pytest
+
+from robbot.core import runtime_metrics
+from robbot.core.async_runtime import AsyncRuntime, LoopBoundResource
+
+
+@pytest.fixture
+def runtime():
+    runtime_metrics.reset()
+    async_runtime = AsyncRuntime()
+    yield async_runtime
+    async_runtime.stop()
+
+
+@pytest.fixture
+def waha_server():
+    """Servidor HTTP/1.1 local com keep-alive, no lugar do WAHA."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            body = b'{"ok": true}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *_args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+class TestAsyncRuntime:
+    """Test suite for AsyncRuntime / LoopBoundResource."""
+
+    def test_every_call_runs_on_the_same_loop(self, runtime):
+        """run() reaproveita o mesmo loop entre chamadas (ao contrário de asyncio.run)."""
+
+        async def current_loop():
+            return asyncio.get_running_loop()
+
+        loops = {runtime.run(current_loop()) for _ in range(3)}
+
+        assert len(loops) == 1 and not next(iter(loops)).is_closed()
+
+    def test_exceptions_propagate(self, runtime):
+        """Exceções do coroutine chegam ao chamador como no asyncio.run."""
+
+        async def boom():
+            raise ValueError("falhou")
+
+        with pytest.raises(ValueError, match="falhou"):
+            runtime.run(boom())
+
+    def test_loop_bound_resource_is_reused_across_jobs(self, runtime):
+        """O cliente é criado uma vez por loop e reutilizado pelos jobs seguintes."""
+        resource = LoopBoundResource("fake_client", factory=object)
+
+        async def job():
+            return resource.get()
+
+        instances = {id(runtime.run(job())) for _ in range(5)}
+
+        assert len(instances) == 1
+        assert runtime_metrics.snapshot()["fake_client"] == {"created": 1, "reused": 4}
+
+    def test_waha_client_pays_one_tcp_connect_for_many_jobs(self, runtime, waha_server, monkeypatch):
+        """Vários jobs no runtime persistente reutilizam a mesma conexão TCP com o WAHA."""
+        from robbot.infra.integrations.waha.waha_client import WAHAClient, settings
+
+        monkeypatch.setattr(settings, "WAHA_MOCK_REQUESTS", False)
+        client = WAHAClient(base_url=waha_server, api_key="test")
+
+        for _ in range(5):
+            assert runtime.run(client._request("GET", "/api/sessions")) == {"ok": True}
+        runtime.run(client.close())
+
+        counters = runtime_metrics.snapshot()["waha_http"]
+        assert counters["requests"] == 5
+        assert counters["tcp_connects"] == 1
+        assert counters["created"] == 1 and counters["reused"] == 4
+
+
+class TestRuntimeMetrics:
+    """Test suite for runtime_metrics publish/collect."""
+
+    def test_collect_aggregates_published_processes(self, monkeypatch):
+        """Cada processo publica seus contadores; o endpoint soma por recurso."""
+        redis_client = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+
+        for pid, created in ((101, 1), (102, 2)):
+            runtime_metrics.reset()
+            for _ in range(created):
+                runtime_metrics.record_created("waha_http")
+            runtime_metrics.record_reused("waha_http")
+            monkeypatch.setattr(runtime_metrics.os, "getpid", lambda pid=pid: pid)
+            runtime_metrics.publish(redis_client)
+
+        collected = runtime_metrics.collect(redis_client)
+
+        assert len(collected["processes"]) == 2
+        assert collected["totals"]["waha_http"] == {"created": 3, "reused": 2}
+        assert 0 < redis_client.ttl(next(redis_client.scan_iter("runtime:metrics:*"))) <= 300
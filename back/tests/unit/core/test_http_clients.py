@@ -0,0 +1,99 @@
+"""
+Testes unitários do registro de clientes HTTP compartilhados (pool keep-alive por URL base).
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+
+from robbot.core import http_clients, runtime_metrics
+from robbot.core.async_runtime import AsyncRuntime
+from robbot.core.http_clients import HttpClientRegistry
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    runtime_metrics.reset()
+    registry = HttpClientRegistry()
+    monkeypatch.setattr(http_clients, "_registry", registry)
+    yield registry
+    registry.close()
+
+
+@pytest.fixture
+def server():
+    """Servidor HTTP/1.1 local com keep-alive, no lugar do WAHA."""
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            body = b'{"chatId": "5511@c.us", "lid": "123@lid"}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *_args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+class TestHttpClientRegistry:
+    """Test suite for HttpClientRegistry."""
+
+    def test_sync_client_is_shared_per_base_url_and_headers(self, registry, server):
+        """Mesma URL base e headers: o mesmo pool; headers diferentes: outro pool."""
+        first = registry.sync_client(server, headers={"X-Api-Key": "a"})
+        assert registry.sync_client(server + "/", headers={"X-Api-Key": "a"}) is first
+        assert registry.sync_client(server, headers={"X-Api-Key": "b"}) is not first
+        assert runtime_metrics.snapshot()[f"http:{server.split('//')[1]}"] == {"created": 2, "reused": 1}
+
+    def test_metadata_services_share_one_connection(self, registry, server):
+        """Cada WahaMetadataService novo reaproveita o pool: várias chamadas, uma conexão TCP."""
+        from robbot.services.communication.waha_metadata_service import WahaMetadataService, settings
+
+        with (
+            patch.object(settings, "WAHA_URL", server),
+            patch("robbot.services.communication.waha_metadata_service.get_redis_client") as redis_client,
+        ):
+            redis_client.return_value = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+            for phone in ("5511", "5512", "5513"):
+                assert WahaMetadataService().get_lid_for_phone(phone) == "123@lid"
+
+        counters = runtime_metrics.snapshot()["waha_metadata_http"]
+        assert counters["requests"] == 6
+        assert counters["tcp_connects"] == 1
+        assert registry.pool_stats()["waha_metadata_http"] == {"pool_connections": 1, "pool_idle": 1, "pool_in_use": 0}
+
+    def test_async_client_is_bound_to_the_running_loop(self, registry, server):
+        """O cliente async é um por loop: jobs no runtime persistente reutilizam a mesma conexão."""
+        runtime = AsyncRuntime()
+
+        async def call():
+            client = registry.async_client(server, name="test_async")
+            response = await client.get("/api/sessions")
+            return client, response.status_code
+
+        try:
+            results = [runtime.run(call()) for _ in range(3)]
+            assert {id(client) for client, _ in results} == {id(results[0][0])}
+            counters = runtime_metrics.snapshot()["test_async"]
+            assert (counters["created"], counters["tcp_connects"], counters["requests"]) == (1, 1, 3)
+            assert registry.pool_stats()["test_async"]["pool_connections"] == 1
+            runtime.run(registry.aclose())
+        finally:
+            runtime.stop()
+
+    def test_pools_are_rebuilt_after_fork(self, registry, server, monkeypatch):
+        """Depois de um fork o processo filho não reaproveita sockets do pai."""
+        parent = registry.sync_client(server)
+        monkeypatch.setattr(http_clients.os, "getpid", lambda: -1)
+        assert registry.sync_client(server) is not parent
@@ -0,0 +1,107 @@
+"""
+Testes unitários do AdmissionController (níveis de degradação pelo lag da fila de entrada).
+"""
+import time
+from datetime import UTC, datetime, timedelta
+from unittest.mock import patch
+
+import fakeredis
+import pytest
+from rq import Queue
+from rq.utils import utcformat
+
+from robbot.core import runtime_metrics
+from robbot.infra.redis.streams import PartitionedStreamQueue
+from robbot.services.infrastructure.admission_control import AdmissionController, DegradationLevel
+
+MODULE = "robbot.services.infrastructure.admission_control"
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis(server=fakeredis.FakeServer())
+
+
+@pytest.fixture
+def controller(redis_client):
+    runtime_metrics.reset()
+    with patch(f"{MODULE}.settings") as mock_settings:
+        mock_settings.ADMISSION_CONTROL_ENABLED = True
+        mock_settings.ADMISSION_REFRESH_SECONDS = 1.0
+        mock_settings.ADMISSION_DEGRADED_LAG_SECONDS = 30
+        mock_settings.ADMISSION_CRITICAL_LAG_SECONDS = 120
+        mock_settings.ADMISSION_DEGRADED_DEPTH = 200
+        mock_settings.ADMISSION_CRITICAL_DEPTH = 1000
+        mock_settings.INGESTION_BACKEND = "rq"
+        admission = AdmissionController(redis_client)
+        admission.settings = mock_settings
+        yield admission
+
+
+def _enqueue_aged(redis_client, age_seconds: float, count: int = 1):
+    queue = Queue("messages", connection=redis_client)
+    for _ in range(count):
+        job = queue.enqueue("time.time")
+        redis_client.hset(job.key, "enqueued_at", utcformat(datetime.now(UTC) - timedelta(seconds=age_seconds)))
+
+
+class TestAdmissionController:
+    """Test suite for AdmissionController."""
+
+    def test_empty_queue_is_normal(self, controller):
+        """Sem fila, nada é degradado."""
+        assert controller.level() == DegradationLevel.NORMAL
+
+    @pytest.mark.parametrize(
+        ("age", "expected"),
+        [(5, DegradationLevel.NORMAL), (45, DegradationLevel.DEGRADED), (300, DegradationLevel.CRITICAL)],
+    )
+    def test_level_follows_oldest_message_age(self, controller, redis_client, age, expected):
+        """O nível vem da idade da mensagem mais antiga esperando na fila messages."""
+        _enqueue_aged(redis_client, age)
+        _enqueue_aged(redis_client, 1)
+
+        assert controller.level() == expected
+        assert controller.status()["depth"] == 2
+
+    def test_depth_alone_degrades(self, controller, redis_client):
+        """Fila profunda degrada mesmo com mensagens recentes."""
+        controller.settings.ADMISSION_DEGRADED_DEPTH = 3
+        _enqueue_aged(redis_client, 0, count=3)
+
+        assert controller.level() == DegradationLevel.DEGRADED
+
+    def test_level_is_cached_between_refreshes(self, controller, redis_client):
+        """Dentro de ADMISSION_REFRESH_SECONDS o Redis não é consultado de novo."""
+        assert controller.level() == DegradationLevel.NORMAL
+        _enqueue_aged(redis_client, 300)
+
+        assert controller.level() == DegradationLevel.NORMAL
+
+        controller._measured_at = time.monotonic() - 2
+        assert controller.level() == DegradationLevel.CRITICAL
+        assert runtime_metrics.snapshot()["admission"]["entered_critical"] == 1
+
+    def test_disabled_is_always_normal(self, controller, redis_client):
+        """ADMISSION_CONTROL_ENABLED=false nunca degrada."""
+        controller.settings.ADMISSION_CONTROL_ENABLED = False
+        _enqueue_aged(redis_client, 300)
+
+        assert controller.level() == DegradationLevel.NORMAL
+
+    def test_streams_backend_uses_undelivered_entries(self, controller, redis_client):
+        """Com INGESTION_BACKEND=streams o lag vem das entradas ainda não entregues ao grupo."""
+        controller.settings.INGESTION_BACKEND = "streams"
+        queue = PartitionedStreamQueue(redis_client=redis_client, partitions=2, prefix="waha:ingest")
+        queue.ensure_groups()
+        old_ms = int((time.time() - 60) * 1000)
+        redis_client.xadd(queue.stream_key(0), {"chat_id": "a", "payload": "{}"}, id=f"{old_ms}-0")
+        redis_client.xadd(queue.stream_key(1), {"chat_id": "b", "payload": "{}"})
+
+        with patch("robbot.infra.redis.streams.settings") as stream_settings:
+            stream_settings.INGESTION_STREAM_PARTITIONS = 2
+            stream_settings.INGESTION_STREAM_PREFIX = "waha:ingest"
+            level = controller.level()
+
+        assert level == DegradationLevel.DEGRADED
+        assert controller.status()["depth"] == 2
@@ -0,0 +1,299 @@
+"""
+Testes unitários de broadcasts (audiência, envio em lotes, pausa/retomada, status por destinatário).
+"""
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+from pydantic import ValidationError
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import robbot.infra.persistence.models  # noqa: F401  (mappers)
+from robbot.core.custom_exceptions import BusinessRuleError, WAHASendThrottledError
+from robbot.domain.shared.enums import (
+    BroadcastRecipientStatus,
+    BroadcastStatus,
+    ConversationStatus,
+    DeliveryStatus,
+    LeadStatus,
+)
+from robbot.infra.db.base import Base
+from robbot.infra.jobs.broadcast_job import BroadcastSendJob
+from robbot.infra.persistence.models import (
+    BroadcastModel,
+    BroadcastRecipientModel,
+    ConversationMessageModel,
+    ConversationModel,
+    LeadModel,
+)
+from robbot.schemas.broadcast import BroadcastAudience, BroadcastCreate
+from robbot.services.communication.broadcast_service import BroadcastService, render_message, settings
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite+pysqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    tables = (ConversationModel, LeadModel, ConversationMessageModel, BroadcastModel, BroadcastRecipientModel)
+    Base.metadata.create_all(engine, tables=[model.__table__ for model in tables])
+    factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+    # Os envios abrem sessões em threads e a StaticPool compartilha uma única conexão:
+    # o rollback ao fechar uma sessão desfaria o UPDATE ainda não commitado de outra.
+    lock = threading.Lock()
+
+    @contextmanager
+    def sync_session():
+        with lock:
+            session = factory()
+            try:
+                yield session
+            finally:
+                session.close()
+
+    with patch("robbot.infra.jobs.broadcast_job.get_sync_session", sync_session):
+        yield factory
+
+
+@pytest.fixture
+def queue_service():
+    queue = MagicMock()
+    with patch("robbot.services.communication.broadcast_service.get_queue_service", return_value=queue):
+        yield queue
+
+
+@pytest.fixture(autouse=True)
+def broadcast_settings(monkeypatch):
+    for name, value in {
+        "BROADCAST_CHUNK_SIZE": 10,
+        "BROADCAST_PARALLEL_JOBS": 2,
+        "BROADCAST_SEND_CONCURRENCY": 3,
+        "BROADCAST_MAX_ATTEMPTS": 2,
+        "BROADCAST_CLAIM_LEASE_SECONDS": 600,
+        "BROADCAST_THROTTLE_BACKOFF_SECONDS": 30,
+        "BROADCAST_MAX_RECIPIENTS": 100,
+        "WAHA_SEND_GOVERNOR_ENABLED": True,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+
+
+@pytest.fixture
+def waha():
+    client = MagicMock()
+    client.sent = []
+
+    async def send_text(**kwargs):
+        client.sent.append(kwargs)
+        return {"id": f"true_{kwargs['chat_id']}"}
+
+    client.send_text = AsyncMock(side_effect=send_text)
+    return client
+
+
+def _conversation(factory, phone: str, idle_hours: int, status=ConversationStatus.ACTIVE_BOT, urgent=False, lead=None):
+    with factory() as session:
+        conversation = ConversationModel(
+            chat_id=f"{phone}@c.us",
+            phone_number=phone,
+            status=status,
+            is_urgent=urgent,
+            meta_data={},
+            last_message_at=datetime.utcnow() - timedelta(hours=idle_hours),
+        )
+        session.add(conversation)
+        session.flush()
+        if lead:
+            session.add(LeadModel(conversation_id=conversation.id, phone_number=phone, **lead))
+        session.commit()
+        return conversation.id
+
+
+def _create(factory, queue_service, **payload) -> str:
+    payload.setdefault("name", "Campanha")
+    payload.setdefault("templates", ["Oi {first_name}, tudo bem?"])
+    with factory() as session:
+        return BroadcastService(session).create(BroadcastCreate(**payload)).id
+
+
+def _start(factory, broadcast_id: str) -> int:
+    with factory() as session:
+        return BroadcastService(session).start(broadcast_id)
+
+
+def _recipients(factory, broadcast_id: str) -> dict[str, BroadcastRecipientModel]:
+    with factory() as session:
+        rows = session.query(BroadcastRecipientModel).filter_by(broadcast_id=broadcast_id).all()
+        session.expunge_all()
+        return {row.chat_id: row for row in rows}
+
+
+def _status(factory, broadcast_id: str) -> BroadcastStatus:
+    with factory() as session:
+        return session.get(BroadcastModel, broadcast_id).status
+
+
+class TestBroadcastService:
+    """Test suite for BroadcastService / BroadcastSendJob."""
+
+    def test_create_requires_templates_or_preset(self):
+        """O broadcast tem templates próprios ou um preset, nunca os dois (nem nenhum)."""
+        with pytest.raises(ValidationError):
+            BroadcastCreate(name="x")
+        with pytest.raises(ValidationError):
+            BroadcastCreate(name="x", templates=["oi"], preset="reengagement")
+        assert BroadcastCreate(name="x", preset="reengagement").audience == BroadcastAudience()
+
+    def test_render_message_is_stable_and_fills_names(self):
+        """O template escolhido é estável por chat e placeholders sem nome não deixam espaço sobrando."""
+        templates = ["A {first_name}!", "B {name}!", "C"]
+        assert render_message(templates, "5511@c.us", "Ana Souza") == render_message(
+            templates, "5511@c.us", "Ana Souza"
+        )
+        assert render_message(["Oi {first_name}, tudo bem?"], "x", "Ana Souza") == "Oi Ana, tudo bem?"
+        assert render_message(["Oi {first_name}, tudo bem? {outro}"], "x", None) == "Oi, tudo bem?"
+
+    def test_start_resolves_audience_once(self, session_factory, queue_service):
+        """A audiência é resolvida uma vez no início: filtros de status, inatividade, lead e urgência."""
+        _conversation(session_factory, "1", 72, lead={"name": "Ana Souza", "status": LeadStatus.ENGAGED})
+        _conversation(session_factory, "2", 72, lead={"name": "Bia", "status": LeadStatus.LOST})
+        _conversation(session_factory, "3", 1, lead={"name": "Caio", "status": LeadStatus.ENGAGED})
+        _conversation(session_factory, "4", 72, urgent=True, lead={"name": "Duda", "status": LeadStatus.ENGAGED})
+        _conversation(session_factory, "5", 72, status=ConversationStatus.CLOSED)
+
+        scheduled_at = datetime.utcnow() + timedelta(hours=1)
+        broadcast_id = _create(
+            session_factory,
+            queue_service,
+            scheduled_at=scheduled_at,
+            audience={
+                "conversation_statuses": ["ACTIVE_BOT"],
+                "lead_statuses": ["ENGAGED", "INTERESTED"],
+                "inactive_for_hours": 48,
+            },
+        )
+        queue_service.enqueue_broadcast_start.assert_called_once_with(broadcast_id, scheduled_at)
+
+        assert _start(session_factory, broadcast_id) == 1
+        assert _start(session_factory, broadcast_id) == 0
+        recipients = _recipients(session_factory, broadcast_id)
+        assert list(recipients) == ["1@c.us"]
+        assert recipients["1@c.us"].text == "Oi Ana, tudo bem?"
+        assert recipients["1@c.us"].status == BroadcastRecipientStatus.PENDING
+        assert _status(session_factory, broadcast_id) == BroadcastStatus.RUNNING
+
+    def test_overlapping_broadcast_skips_chats_still_open_elsewhere(self, session_factory, queue_service, waha):
+        """Um segundo broadcast (ex.: reengajamento disparado de novo) não pega chats ainda pendentes no primeiro."""
+        _conversation(session_factory, "1", 72)
+        first = _create(session_factory, queue_service)
+        _start(session_factory, first)
+        _conversation(session_factory, "2", 72)
+
+        second = _create(session_factory, queue_service)
+        assert _start(session_factory, second) == 1
+        assert list(_recipients(session_factory, second)) == ["2@c.us"]
+
+        with session_factory() as session:
+            BroadcastService(session).cancel(first)
+        third = _create(session_factory, queue_service)
+        assert _start(session_factory, third) == 1
+        assert list(_recipients(session_factory, third)) == ["1@c.us"]
+
+    def test_send_job_delivers_chunk_and_completes(self, session_factory, queue_service, waha):
+        """O lote é enviado pelo governor (sem anti-ban), registrado na conversa e o broadcast conclui."""
+        conversation_id = _conversation(session_factory, "1", 72)
+        _conversation(session_factory, "2", 72)
+        broadcast_id = _create(
+            session_factory, queue_service, conversation_status_after=ConversationStatus.WAITING_SECRETARY
+        )
+        _start(session_factory, broadcast_id)
+
+        result = BroadcastSendJob(broadcast_id, waha_client=waha).execute()
+
+        assert result == {"status": "sent", "sent": 2}
+        assert {kwargs["chat_id"] for kwargs in waha.sent} == {"1@c.us", "2@c.us"}
+        assert all(kwargs["apply_anti_ban"] is False for kwargs in waha.sent)
+        recipient = _recipients(session_factory, broadcast_id)["1@c.us"]
+        assert (recipient.status, recipient.waha_message_id) == (BroadcastRecipientStatus.SENT, "true_1@c.us")
+        with session_factory() as session:
+            message = session.query(ConversationMessageModel).filter_by(conversation_id=conversation_id).one()
+            assert (message.delivery_status, message.body) == (DeliveryStatus.SENT, "Oi, tudo bem?")
+            assert session.get(ConversationModel, conversation_id).status == ConversationStatus.PENDING_HANDOFF
+        assert _status(session_factory, broadcast_id) == BroadcastStatus.COMPLETED
+        queue_service.enqueue_broadcast_send.assert_not_called()
+
+    def test_throttled_send_is_released_and_retried_later(self, session_factory, queue_service, waha):
+        """Envio recusado pelo governor volta para PENDING sem gastar tentativa; o próximo lote espera."""
+        _conversation(session_factory, "1", 72)
+        broadcast_id = _create(session_factory, queue_service)
+        _start(session_factory, broadcast_id)
+        waha.send_text.side_effect = WAHASendThrottledError("slot too far")
+
+        assert BroadcastSendJob(broadcast_id, waha_client=waha).execute() == {"status": "sent", "throttled": 1}
+
+        recipient = _recipients(session_factory, broadcast_id)["1@c.us"]
+        assert (recipient.status, recipient.attempts) == (BroadcastRecipientStatus.PENDING, 0)
+        queue_service.enqueue_broadcast_send.assert_called_once_with(broadcast_id, 30, epoch=0)
+        assert _status(session_factory, broadcast_id) == BroadcastStatus.RUNNING
+
+    def test_failed_send_is_retried_then_failed(self, session_factory, queue_service, waha):
+        """Erro no envio volta para PENDING; esgotadas as tentativas o destinatário fica FAILED."""
+        _conversation(session_factory, "1", 72)
+        broadcast_id = _create(session_factory, queue_service)
+        _start(session_factory, broadcast_id)
+        waha.send_text.side_effect = RuntimeError("waha down")
+
+        assert BroadcastSendJob(broadcast_id, waha_client=waha).execute() == {"status": "sent", "retry": 1}
+        queue_service.enqueue_broadcast_send.assert_called_once_with(broadcast_id, 0, epoch=0)
+        assert BroadcastSendJob(broadcast_id, waha_client=waha).execute() == {"status": "sent", "failed": 1}
+
+        recipient = _recipients(session_factory, broadcast_id)["1@c.us"]
+        assert (recipient.status, recipient.error) == (BroadcastRecipientStatus.FAILED, "waha down")
+        assert _status(session_factory, broadcast_id) == BroadcastStatus.COMPLETED
+
+    def test_pause_resume_and_cancel(self, session_factory, queue_service, waha):
+        """Pausado não envia; retomar reenfileira os lotes; cancelar pula quem não recebeu."""
+        _conversation(session_factory, "1", 72)
+        broadcast_id = _create(session_factory, queue_service)
+        _start(session_factory, broadcast_id)
+
+        with session_factory() as session:
+            BroadcastService(session).pause(broadcast_id)
+        assert BroadcastSendJob(broadcast_id, waha_client=waha).execute() == {"status": "stopped"}
+        waha.send_text.assert_not_called()
+
+        with session_factory() as session:
+            service = BroadcastService(session)
+            service.resume(broadcast_id)
+            assert queue_service.enqueue_broadcast_send.call_count == settings.BROADCAST_PARALLEL_JOBS
+            with pytest.raises(BusinessRuleError):
+                service.resume(broadcast_id)
+            service.cancel(broadcast_id)
+            assert service.progress(broadcast_id).skipped == 1
+
+        assert _recipients(session_factory, broadcast_id)["1@c.us"].status == BroadcastRecipientStatus.SKIPPED
+        assert _status(session_factory, broadcast_id) == BroadcastStatus.CANCELLED
+
+    def test_resume_stops_chains_from_before_the_pause(self, session_factory, queue_service, waha):
+        """Retomar troca o epoch: cadeias antigas (no meio do lote ou com retry atrasado) param e não se somam às novas."""
+        _conversation(session_factory, "1", 72)
+        _conversation(session_factory, "2", 72)
+        broadcast_id = _create(session_factory, queue_service)
+        _start(session_factory, broadcast_id)
+
+        with session_factory() as session:
+            service = BroadcastService(session)
+            service.pause(broadcast_id)
+            service.resume(broadcast_id)
+        assert {call.kwargs["epoch"] for call in queue_service.enqueue_broadcast_send.call_args_list} == {1}
+        queue_service.enqueue_broadcast_send.reset_mock()
+
+        assert BroadcastSendJob(broadcast_id, epoch=0, waha_client=waha).execute() == {"status": "stopped"}
+        waha.send_text.assert_not_called()
+
+        with patch.object(settings, "BROADCAST_CHUNK_SIZE", 1):
+            assert BroadcastSendJob(broadcast_id, epoch=1, waha_client=waha).execute() == {"status": "sent", "sent": 1}
+        queue_service.enqueue_broadcast_send.assert_called_once_with(broadcast_id, 0, epoch=1)
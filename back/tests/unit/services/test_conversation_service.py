@@ -70,6 +70,24 @@ async def test_get_or_create_existing_conversation(service):
     assert conv1.id == conv2.id
 
 
+@pytest.mark.asyncio
+async def test_get_or_create_queues_unknown_lid_without_waiting(service):
+    """Test that an unknown LID keeps its placeholder phone and is queued for background resolution."""
+    from unittest.mock import AsyncMock, patch
+
+    with (
+        patch("robbot.services.leads.lid_resolver_service.get_lid_resolver") as mock_resolver,
+        patch("robbot.services.leads.lid_work_set.LidWorkSet") as mock_work_set,
+    ):
+        mock_resolver.return_value.cached_phone.return_value = None
+        mock_resolver.return_value.try_resolve_lid = AsyncMock(return_value="5511777777777")
+        conversation = await service.get_or_create(chat_id="24988337893388@lid", phone_number="24988337893388")
+
+    mock_resolver.return_value.try_resolve_lid.assert_not_called()
+    mock_work_set.return_value.add.assert_called_once_with(["24988337893388"])
+    assert conversation.lead.phone_number == "24988337893388"
+
+
 # =====================================================================
 # STATUS & ESCALATION TESTS
 # =====================================================================
@@ -0,0 +1,168 @@
+"""
+Testes unitários do envio diferido (agenda no Redis + send dispatcher).
+"""
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import fakeredis
+import pytest
+
+from robbot.core.custom_exceptions import WAHASendThrottledError
+from robbot.services.communication.deferred_send_service import (
+    DeferredSendDispatcher,
+    DeferredSendOutbox,
+    DeferredSendScheduler,
+)
+
+MODULE = "robbot.services.communication.deferred_send_service"
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture
+def outbox():
+    return DeferredSendOutbox(fakeredis.FakeRedis(server=fakeredis.FakeServer()), prefix="test:outbox")
+
+
+@pytest.fixture
+def waha():
+    """WAHAClient falso que registra a sequência de chamadas."""
+    client = MagicMock()
+    client.calls = []
+    for name in ("start_typing", "stop_typing"):
+        setattr(client, name, AsyncMock(side_effect=lambda *a, _n=name, **kw: client.calls.append((_n, a[-1]))))
+    client.get_session_status = AsyncMock()  # heartbeat, fora da sequência registrada
+    client.send_text = AsyncMock(side_effect=lambda **kw: client.calls.append(("send_text", kw["text"])))
+    return client
+
+
+@pytest.fixture
+def dispatcher(outbox, waha):
+    return DeferredSendDispatcher(waha_client=waha, outbox=outbox, concurrency=10)
+
+
+class TestDeferredSend:
+    """Test suite for DeferredSendScheduler / DeferredSendDispatcher."""
+
+    @pytest.mark.asyncio
+    async def test_schedule_types_now_and_sends_after_same_delay(self, outbox, waha, dispatcher):
+        """Agendar inicia o typing e o envio sai com o mesmo delay do fluxo anti-ban no worker."""
+        scheduler = DeferredSendScheduler(waha_client=waha, outbox=outbox)
+        with (
+            patch("robbot.infra.integrations.waha.waha_client.settings.WAHA_SEND_GOVERNOR_ENABLED", False),
+            patch("robbot.infra.integrations.waha.waha_client.random.uniform", return_value=5.0),
+            patch(f"{MODULE}.time.time", return_value=NOW),
+        ):
+            scheduled = await scheduler.schedule_text("default", "5511@c.us", "x" * 50)
+
+        assert scheduled.due_at == NOW + 5.0 + 50 * 0.1
+        assert waha.calls == [("start_typing", "5511@c.us")]
+
+        assert await dispatcher.run_once(now=NOW + 9.9) == 0
+        assert await dispatcher.run_once(now=NOW + 10.0) == 1
+
+        assert waha.calls[1:] == [("stop_typing", "5511@c.us"), ("send_text", "x" * 50)]
+        assert waha.send_text.await_args.kwargs["apply_anti_ban"] is False
+        assert outbox.pending() == 0
+
+    @pytest.mark.asyncio
+    async def test_same_chat_sends_keep_order_and_spacing(self, outbox, waha, dispatcher):
+        """A segunda resposta do chat digita depois da primeira sair e respeita o próprio delay."""
+        first = outbox.schedule("default", "chat@c.us", "primeira", delay=4, now=NOW)
+        second = outbox.schedule("default", "chat@c.us", "segunda", delay=6, now=NOW + 1)
+
+        assert second.typing_at == first.due_at and not second.typing_now
+        assert second.due_at == NOW + 10
+
+        await dispatcher.run_once(now=NOW + 4)  # primeira sai
+        await dispatcher.run_once(now=NOW + 4)  # segunda começa a digitar
+        await dispatcher.run_once(now=NOW + 9.9)
+        await dispatcher.run_once(now=NOW + 10)
+
+        assert waha.calls == [
+            ("stop_typing", "chat@c.us"),
+            ("send_text", "primeira"),
+            ("start_typing", "chat@c.us"),
+            ("stop_typing", "chat@c.us"),
+            ("send_text", "segunda"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_different_chats_fire_in_the_same_pass(self, outbox, waha, dispatcher):
+        """Chats diferentes não esperam uns pelos outros."""
+        for i in range(5):
+            outbox.schedule("default", f"chat{i}@c.us", f"msg {i}", delay=3, now=NOW)
+
+        assert await dispatcher.run_once(now=NOW + 3) == 5
+        assert waha.send_text.await_count == 5
+
+    @pytest.mark.asyncio
+    async def test_failed_send_retries_and_blocks_later_messages(self, outbox, waha, dispatcher):
+        """Envio com falha é retentado antes das próximas mensagens do mesmo chat."""
+        outbox.schedule("default", "chat@c.us", "primeira", delay=1, now=NOW)
+        outbox.schedule("default", "chat@c.us", "segunda", delay=1, now=NOW)
+        waha.send_text.side_effect = [RuntimeError("waha down"), None, None]
+
+        await dispatcher.run_once(now=NOW + 1)
+        assert await dispatcher.run_once(now=NOW + 2.5) == 0  # segunda não passa na frente
+
+        await dispatcher.run_once(now=NOW + 3)  # retry da primeira
+        texts = [call.kwargs["text"] for call in waha.send_text.await_args_list]
+        assert texts == ["primeira", "primeira"]
+        assert outbox.redis.lrange(outbox.chat_key("chat@c.us"), 0, -1) != []
+
+    @pytest.mark.asyncio
+    async def test_throttled_send_is_rescheduled_without_blocking_other_chats(self, outbox, waha, dispatcher):
+        """Sem slot no send governor o envio volta para a agenda no horário do bucket; os outros chats seguem."""
+
+        async def send_text(**kw):
+            if kw["chat_id"] == "busy@c.us" and waha.send_text.await_count == 1:
+                raise WAHASendThrottledError("no slot", retry_after=7)
+            waha.calls.append(("send_text", kw["text"]))
+
+        waha.send_text.side_effect = send_text
+        outbox.schedule("other", "busy@c.us", "limitado", delay=1, now=NOW)
+        outbox.schedule("default", "free@c.us", "livre", delay=1, now=NOW + 0.5)
+
+        assert await dispatcher.run_once(now=NOW + 2) == 2
+        assert ("send_text", "livre") in waha.calls
+        assert all(call.kwargs["max_send_wait"] == 0 for call in waha.send_text.await_args_list)
+
+        assert await dispatcher.run_once(now=NOW + 8.9) == 0
+        assert await dispatcher.run_once(now=NOW + 9) == 1
+        assert waha.calls[-1] == ("send_text", "limitado")
+        assert outbox.pending() == 0
+
+    def test_chat_backlog_does_not_starve_other_chats(self, outbox):
+        """Só a cabeça de cada chat fica na agenda: um chat com fila longa não esconde os outros."""
+        for i in range(10):
+            outbox.schedule("default", "busy@c.us", f"msg {i}", delay=0, now=NOW)
+        outbox.schedule("default", "free@c.us", "livre", delay=0.5, now=NOW)
+
+        assert outbox.pending() == 2
+        assert [item["chat_id"] for item in outbox.claim_due(1, now=NOW + 1)] == ["busy@c.us"]
+        assert [item["chat_id"] for item in outbox.claim_due(1, now=NOW + 1)] == ["free@c.us"]
+
+    def test_completed_sends_move_the_chat_queue_and_drop_idle_sessions(self, outbox):
+        """Concluir um envio torna o próximo do chat devido; a sessão sai do heartbeat quando esvazia."""
+        outbox.schedule("default", "chat@c.us", "primeira", delay=1, now=NOW)
+        outbox.schedule("default", "chat@c.us", "segunda", delay=1, now=NOW)
+        assert outbox.sessions() == ["default"]
+
+        (first,) = outbox.claim_due(10, now=NOW + 1)
+        outbox.complete(first)
+        (second,) = outbox.claim_due(10, now=NOW + 2)
+        assert second["text"] == "segunda"
+        assert outbox.sessions() == ["default"]
+
+        outbox.complete(second)
+        assert outbox.pending() == 0
+        assert outbox.sessions() == []
+
+    @pytest.mark.asyncio
+    async def test_claimed_send_is_retried_after_lease_expires(self, outbox, dispatcher):
+        """Se o dispatcher morre com o envio reivindicado, ele volta após a lease."""
+        outbox.schedule("default", "chat@c.us", "oi", delay=1, now=NOW)
+        assert len(outbox.claim_due(10, now=NOW + 1)) == 1
+
+        assert outbox.claim_due(10, now=NOW + 2) == []
+        with patch(f"{MODULE}.settings.DEFERRED_SEND_LEASE_SECONDS", 60):
+            assert len(outbox.claim_due(10, now=NOW + 62)) == 1
@@ -0,0 +1,85 @@
+"""
+Testes unitários do diretório LID <-> telefone (sync completo/delta da listagem do WAHA, lookup com hit rate).
+"""
+from unittest.mock import AsyncMock, MagicMock
+
+import fakeredis
+import pytest
+
+from robbot.services.communication.lid_directory import LidDirectory, settings
+
+
+def _entries(count, start=0):
+    return [{"lid": f"{10**14 + i}@lid", "pn": f"55119{i:08d}@c.us"} for i in range(start, start + count)]
+
+
+@pytest.fixture(autouse=True)
+def page_size(monkeypatch):
+    monkeypatch.setattr(settings, "LID_DIRECTORY_PAGE_SIZE", 10)
+
+
+@pytest.fixture
+def directory():
+    return LidDirectory(redis_client=fakeredis.FakeRedis(server=fakeredis.FakeServer()), prefix="test:lids")
+
+
+def _waha(entries):
+    client = MagicMock()
+    client.get_lids_count = AsyncMock(side_effect=lambda session: len(entries))
+    client.get_all_lids = AsyncMock(
+        side_effect=lambda session, limit, offset: entries[offset : offset + limit]
+    )
+    return client
+
+
+class TestLidDirectory:
+    """Test suite for LidDirectory."""
+
+    @pytest.mark.asyncio
+    async def test_full_sync_pages_through_waha_and_resolves_both_ways(self, directory):
+        """O sync completo pagina GET /lids; depois LID -> telefone e telefone -> LID são um HGET cada."""
+        waha = _waha(_entries(25))
+
+        result = await directory.sync(waha, "default", full=True)
+
+        assert result == {"status": "full", "count": 25, "written": 25}
+        assert waha.get_all_lids.await_count == 3
+        assert directory.phone_for_lid("100000000000007@lid") == "5511900000007"
+        assert directory.lid_for_phone("5511900000024@c.us") == "100000000000024@lid"
+        assert directory.phone_for_lid("999@lid") is None
+        stats = directory.stats()
+        assert (stats["size"], stats["hits"], stats["misses"], stats["hit_rate"]) == (25, 2, 1, 0.6667)
+
+    @pytest.mark.asyncio
+    async def test_delta_sync_skips_unchanged_listing_and_writes_only_changes(self, directory):
+        """Delta: contagem igual não lista nada; com contatos novos só eles são gravados."""
+        entries = _entries(12)
+        waha = _waha(entries)
+        await directory.sync(waha, "default", full=True)
+        waha.get_all_lids.reset_mock()
+
+        assert (await directory.sync(waha, "default"))["status"] == "unchanged"
+        waha.get_all_lids.assert_not_awaited()
+
+        entries.extend(_entries(3, start=12))
+        result = await directory.sync(waha, "default")
+
+        assert (result["status"], result["count"], result["written"]) == ("delta", 15, 3)
+        assert directory.phone_for_lid("100000000000014") == "5511900000014"
+        assert directory.stats()["syncs"] == {"sync_full": 1, "sync_unchanged": 1, "sync_delta": 1}
+
+    @pytest.mark.asyncio
+    async def test_full_sync_drops_mappings_waha_no_longer_knows(self, directory):
+        """O rebuild completo troca os hashes de uma vez e remove mapeamentos que sumiram do WAHA."""
+        await directory.sync(_waha(_entries(5)), "default", full=True)
+        await directory.sync(_waha(_entries(3, start=2)), "default", full=True)
+
+        assert directory.phone_for_lid("100000000000000@lid") is None
+        assert directory.lid_for_phone("5511900000000") is None
+        assert directory.phone_for_lid("100000000000004@lid") == "5511900000004"
+        assert directory.stats()["size"] == 3
+
+    def test_claim_sync_once_per_refresh_interval(self, directory):
+        """Só um processo enfileira o sync por intervalo."""
+        assert directory.claim_sync() is True
+        assert directory.claim_sync() is False
@@ -0,0 +1,113 @@
+"""
+Testes unitários do cache de resoluções LID (LRU em processo, falhas lembradas, coalescência de consultas ao WAHA).
+"""
+import asyncio
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import fakeredis
+import pytest
+
+from robbot.core.custom_exceptions import WAHAError
+from robbot.services.leads.lid_resolution_cache import LidResolutionCache, LocalTier, Resolution, settings
+from robbot.services.leads.lid_resolver_service import LIDResolverService
+
+LID = "24988337893388@lid"
+
+
+@pytest.fixture(autouse=True)
+def no_directory(monkeypatch):
+    monkeypatch.setattr(settings, "LID_DIRECTORY_ENABLED", False)
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis(server=fakeredis.FakeServer())
+
+
+def _waha(phone="5511999990000", delay=0.05):
+    async def lookup(session, lid):
+        await asyncio.sleep(delay)
+        if phone is None:
+            raise WAHAError("LID not found", status_code=404)
+        return {"lid": lid, "pn": f"{phone}@c.us"}
+
+    client = MagicMock()
+    client.get_phone_by_lid = AsyncMock(side_effect=lookup)
+    return client
+
+
+def _resolver(waha, redis_client, local=None):
+    with patch("robbot.infra.redis.client.get_redis_client", return_value=redis_client):
+        return LIDResolverService(waha, cache=LidResolutionCache(redis_client, local=local or LocalTier()))
+
+
+class TestLidResolutionCache:
+    """Test suite for LidResolutionCache."""
+
+    @pytest.mark.asyncio
+    async def test_burst_for_one_lid_shares_a_single_waha_call(self, redis_client):
+        """Vinte mensagens simultâneas do mesmo contato fazem uma consulta; as seguintes vêm do LRU."""
+        waha = _waha()
+        resolver = _resolver(waha, redis_client)
+
+        results = await asyncio.gather(*(resolver.try_resolve_lid(LID, "default") for _ in range(20)))
+        again = await resolver.try_resolve_lid(LID, "default")
+
+        assert set(results) == {"5511999990000"} and again == "5511999990000"
+        assert waha.get_phone_by_lid.await_count == 1
+        assert redis_client.get(f"waha:lid_resolution:{LID}") == b"5511999990000"
+
+    @pytest.mark.asyncio
+    async def test_failed_lookup_is_remembered_until_forgotten(self, redis_client):
+        """LID sem resolução não volta ao WAHA dentro do TTL negativo, exceto após forget_failure."""
+        waha = _waha(phone=None, delay=0)
+        resolver = _resolver(waha, redis_client)
+
+        assert await resolver.try_resolve_lid(LID, "default") is None
+        assert await resolver.try_resolve_lid(LID, "default") is None
+        assert waha.get_phone_by_lid.await_count == 1
+        assert 0 < redis_client.ttl(f"waha:lid_resolution:miss:{LID}") <= settings.LID_CACHE_NEGATIVE_TTL_SECONDS
+
+        resolver.cache.forget_failure(LID)
+        assert await resolver.try_resolve_lid(LID, "default") is None
+        assert waha.get_phone_by_lid.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_processes_sharing_redis_coalesce_on_the_lock(self, redis_client):
+        """Dois processos (LRUs distintos, mesmo Redis): só o dono do lock consulta o WAHA."""
+        waha = _waha(delay=0.2)
+        first, second = _resolver(waha, redis_client), _resolver(waha, redis_client)
+
+        results = await asyncio.gather(
+            first.try_resolve_lid(LID, "default", timeout_seconds=2),
+            second.try_resolve_lid(LID, "default", timeout_seconds=2),
+        )
+
+        assert results == ["5511999990000", "5511999990000"]
+        assert waha.get_phone_by_lid.await_count == 1
+        assert second.cache.local.get(LID) == Resolution("5511999990000")
+
+    @pytest.mark.asyncio
+    async def test_caller_timeout_does_not_cancel_the_shared_lookup(self, redis_client):
+        """Quem desiste por timeout recebe None, mas o resultado ainda chega ao cache."""
+        waha = _waha(delay=0.1)
+        resolver = _resolver(waha, redis_client)
+
+        assert await resolver.try_resolve_lid(LID, "default", timeout_seconds=0.01) is None
+        await asyncio.sleep(0.2)
+
+        assert resolver.cache.get(LID) == Resolution("5511999990000")
+        assert await resolver.try_resolve_lid(LID, "default") == "5511999990000"
+        assert waha.get_phone_by_lid.await_count == 1
+
+    def test_local_tier_evicts_least_recently_used(self):
+        """O LRU descarta a entrada menos usada e expira entradas vencidas."""
+        tier = LocalTier(max_size=2, ttl_seconds=60)
+        tier.put("a", Resolution("1"))
+        tier.put("b", Resolution("2"))
+        tier.get("a")
+        tier.put("c", Resolution("3"))
+
+        assert tier.get("b") is None
+        assert tier.get("a") == Resolution("1") and tier.get("c") == Resolution("3")
+        assert tier.get("a", now=10**12) is None
@@ -0,0 +1,129 @@
+"""
+Testes unitários da resolução de LIDs em segundo plano (conjunto de trabalho, lote com limite de taxa, UPDATE em lote).
+"""
+import time
+from contextlib import contextmanager
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import fakeredis
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from robbot.infra.db.base import Base
+from robbot.infra.jobs.lid_resolution_job import LidResolutionJob
+from robbot.infra.persistence.models.conversation_model import ConversationModel
+from robbot.infra.persistence.models.lead_model import LeadModel
+from robbot.services.leads.lid_resolution_cache import LidResolutionCache, LocalTier
+from robbot.services.leads.lid_resolver_service import LIDResolverService
+from robbot.services.leads.lid_work_set import LidWorkSet, settings
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis(server=fakeredis.FakeServer())
+
+
+@pytest.fixture
+def work_set(redis_client):
+    return LidWorkSet(redis_client=redis_client, key="test:lid_pending")
+
+
+@pytest.fixture
+def db_session():
+    """In-memory SQLite database with the ORM tables."""
+    engine = create_engine("sqlite+pysqlite:///:memory:", echo=False)
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine, autocommit=False, autoflush=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+class TestLidWorkSet:
+    """Test suite for LidWorkSet."""
+
+    def test_claim_hides_lids_until_released(self, work_set):
+        """LIDs reivindicados somem para outros lotes até serem liberados; add não adia LIDs já na fila."""
+        work_set.add(["111@lid", "222"], now=100)
+        work_set.add(["111"], now=500)
+
+        assert sorted(work_set.claim(10, now=200)) == ["111", "222"]
+        assert work_set.claim(10, now=200) == []
+        assert work_set.pending(now=200) == 0
+
+        work_set.release(["222"], now=200)
+        assert work_set.claim(10, now=200) == ["222"]
+
+    def test_retry_backs_off_and_drops_after_max_attempts(self, work_set, monkeypatch):
+        """Falhas voltam com atraso exponencial e saem da fila após LID_RESOLUTION_MAX_ATTEMPTS."""
+        monkeypatch.setattr(settings, "LID_RESOLUTION_MAX_ATTEMPTS", 3)
+        monkeypatch.setattr(settings, "LID_RESOLUTION_RETRY_SECONDS", 10)
+        work_set.add(["111"], now=0)
+
+        assert work_set.retry(["111"], now=0) == []
+        assert work_set.claim(10, now=9) == []
+        assert work_set.claim(10, now=10) == ["111"]
+        assert work_set.retry(["111"], now=10) == []
+        assert work_set.claim(10, now=29) == []
+        assert work_set.retry(["111"], now=30) == ["111"]
+        assert work_set.size() == 0
+
+
+class TestLidResolutionBatch:
+    """Test suite for LIDResolverService.resolve_batch and LidResolutionJob."""
+
+    @pytest.mark.asyncio
+    async def test_resolve_batch_paces_waha_lookups_and_uses_the_cache(self, redis_client, monkeypatch):
+        """Só LIDs fora do cache vão ao WAHA, espaçados por LID_RESOLUTION_RATE_PER_SECOND."""
+        monkeypatch.setattr(settings, "LID_DIRECTORY_ENABLED", False)
+        monkeypatch.setattr(settings, "LID_RESOLUTION_RATE_PER_SECOND", 20.0)
+        starts = []
+
+        async def lookup(session, lid):
+            starts.append(time.monotonic())
+            return {"pn": f"55{lid}@c.us"} if lid != "333" else None
+
+        waha = MagicMock(get_phone_by_lid=AsyncMock(side_effect=lookup))
+        with patch("robbot.infra.redis.client.get_redis_client", return_value=redis_client):
+            resolver = LIDResolverService(waha, cache=LidResolutionCache(redis_client, local=LocalTier()))
+        resolver.cache.put("000", "5500")
+
+        results = await resolver.resolve_batch(["000", "111", "222", "333"], session="default")
+
+        assert results == {"000": "5500", "111": "55111", "222": "55222", "333": None}
+        assert waha.get_phone_by_lid.await_count == 3
+        assert starts[-1] - starts[0] >= 2 * 0.05 - 0.01
+        assert await resolver.resolve_batch(["111", "444"], budget_seconds=0) == {"111": "55111"}
+
+    def test_job_updates_leads_and_conversations_in_bulk(self, work_set, db_session):
+        """O lote troca o telefone provisório (e o nome provisório) em leads e conversas e reagenda falhas."""
+        for lid, name in (("111", None), ("222", "Maria"), ("333", None)):
+            conversation = ConversationModel(chat_id=f"{lid}@lid", phone_number=lid, name=name or lid)
+            db_session.add(conversation)
+            db_session.flush()
+            db_session.add(LeadModel(phone_number=lid, name=name or lid, conversation_id=conversation.id))
+        db_session.commit()
+        work_set.add(["111", "222", "333", "444"])
+
+        resolver = MagicMock()
+        resolver.resolve_batch = AsyncMock(return_value={"111": "5511", "222": "5522", "333": None})
+
+        @contextmanager
+        def session_scope():
+            yield db_session
+
+        with patch("robbot.infra.jobs.lid_resolution_job.get_sync_session", session_scope):
+            result = LidResolutionJob(work_set=work_set, resolver=resolver).execute()
+
+        assert result["resolved"] == 2 and result["failed"] == 1 and result["deferred"] == 1
+        assert result["leads_updated"] == 2 and result["conversations_updated"] == 2
+        db_session.expire_all()
+        leads = {lead.conversation.chat_id: (lead.phone_number, lead.name) for lead in db_session.query(LeadModel)}
+        assert leads == {"111@lid": ("5511", "5511"), "222@lid": ("5522", "Maria"), "333@lid": ("333", "333")}
+        conversation = db_session.query(ConversationModel).filter_by(chat_id="111@lid").one()
+        assert (conversation.phone_number, conversation.name) == ("5511", "5511")
+        # Resolvidos saem da fila, a falha volta depois, o não tentado fica disponível já
+        assert work_set.claim(10) == ["444"]
+        assert work_set.size() == 2
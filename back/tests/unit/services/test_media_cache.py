@@ -0,0 +1,101 @@
+"""
+Testes unitários do cache de mídia endereçado por conteúdo (voz em opus pronta, reuso entre envios).
+"""
+import base64
+import hashlib
+from unittest.mock import AsyncMock, MagicMock
+
+import fakeredis
+import httpx
+import pytest
+
+from robbot.services.communication.media_cache import MediaCache, settings
+
+OPUS = b"OggS-opus-bytes"
+
+
+@pytest.fixture(autouse=True)
+def media_settings(monkeypatch):
+    monkeypatch.setattr(settings, "MEDIA_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "MEDIA_CACHE_PUBLIC_URL", None)
+    monkeypatch.setattr(settings, "MEDIA_CACHE_MAX_BYTES", 10_000)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = MediaCache(redis_client=fakeredis.FakeRedis(server=fakeredis.FakeServer()), root=tmp_path)
+    cache._download = AsyncMock(side_effect=lambda url: f"mp3 de {url.split('/')[-1]}".encode())
+    return cache
+
+
+@pytest.fixture
+def waha():
+    client = MagicMock()
+    client.convert_voice_to_opus = AsyncMock(return_value={"mimetype": "audio/ogg", "data": base64.b64encode(OPUS)})
+    for method in ("send_voice", "send_image", "send_file", "send_video"):
+        setattr(client, method, AsyncMock(return_value={"id": "true_x"}))
+    return client
+
+
+class TestMediaCache:
+    """Test suite for MediaCache."""
+
+    @pytest.mark.asyncio
+    async def test_voice_is_converted_once_and_reused(self, cache, waha):
+        """O áudio é baixado e convertido para opus uma vez; os envios seguintes usam o arquivo pronto."""
+        for chat_id in ("1@c.us", "2@c.us", "3@c.us"):
+            await cache.send(waha, "default", chat_id, "voice", "https://cdn/audio.mp3", mimetype="audio/mpeg")
+
+        cache._download.assert_awaited_once()
+        waha.convert_voice_to_opus.assert_awaited_once()
+        sent = waha.send_voice.await_args.kwargs
+        assert (sent["file_data"], sent["convert"]) == (base64.b64encode(OPUS).decode(), False)
+        assert sent["mimetype"] == "audio/ogg; codecs=opus"
+        asset = cache.get(hashlib.sha256(OPUS).hexdigest())
+        assert asset.path.read_bytes() == OPUS
+        assert asset.filename.endswith(".ogg")
+
+    @pytest.mark.asyncio
+    async def test_same_bytes_from_another_url_share_the_asset(self, cache, waha):
+        """Outra URL com os mesmos bytes: baixa de novo, mas não converte nem duplica o arquivo."""
+        cache._download.side_effect = None
+        cache._download.return_value = b"mesmo audio"
+        first = await cache.prepare("voice", "default", waha, url="https://a/audio.mp3", mimetype="audio/mpeg")
+        second = await cache.prepare("voice", "default", waha, url="https://b/audio.mp3", mimetype="audio/mpeg")
+
+        assert first.digest == second.digest
+        assert cache._download.await_count == 2
+        waha.convert_voice_to_opus.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_public_url_references_the_api_endpoint(self, cache, waha, monkeypatch):
+        """Com MEDIA_CACHE_PUBLIC_URL o WAHA recebe a URL do asset na API, não os bytes."""
+        monkeypatch.setattr(settings, "MEDIA_CACHE_PUBLIC_URL", "http://go:3333/")
+        await cache.send(waha, "default", "1@c.us", "image", "https://cdn/folder.jpg", mimetype="image/jpeg")
+
+        sent = waha.send_image.await_args.kwargs
+        digest = hashlib.sha256(b"mp3 de folder.jpg").hexdigest()
+        assert sent["file_url"] == f"http://go:3333/api/v1/media/{digest}"
+        assert "file_data" not in sent
+
+    @pytest.mark.asyncio
+    async def test_least_recently_sent_assets_are_evicted(self, cache, waha, monkeypatch):
+        """Acima de MEDIA_CACHE_MAX_BYTES os assets enviados há mais tempo saem do disco e do índice."""
+        monkeypatch.setattr(settings, "MEDIA_CACHE_MAX_BYTES", 40)
+        old = await cache.prepare("file", "default", waha, url="https://cdn/antigo.pdf")
+        recent = await cache.prepare("file", "default", waha, url="https://cdn/recente.pdf")
+        await cache.prepare("file", "default", waha, url="https://cdn/antigo.pdf")  # reenvio: volta a ser recente
+        await cache.prepare("file", "default", waha, url="https://cdn/novo.pdf")
+
+        assert cache.get(recent.digest) is None
+        assert not recent.path.exists()
+        assert cache.get(old.digest) is not None
+
+    @pytest.mark.asyncio
+    async def test_download_failure_falls_back_to_original_url(self, cache, waha):
+        """Se o cache não consegue preparar o arquivo, o envio segue pela URL original (conversão no WAHA)."""
+        cache._download.side_effect = httpx.ConnectError("cdn fora do ar")
+        await cache.send(waha, "default", "1@c.us", "voice", "https://cdn/audio.mp3", mimetype="audio/mpeg")
+
+        sent = waha.send_voice.await_args.kwargs
+        assert (sent["file_url"], sent["convert"]) == ("https://cdn/audio.mp3", True)
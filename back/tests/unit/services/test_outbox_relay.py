@@ -0,0 +1,246 @@
+"""
+Testes unitários do outbox transacional (resposta gravada como PENDING + relay).
+"""
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import fakeredis
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+import robbot.infra.persistence.models  # noqa: F401  (mappers)
+from robbot.domain.shared.enums import DeliveryStatus, MessageDirection
+from robbot.infra.persistence.models.conversation_message_model import ConversationMessageModel
+from robbot.services.bot.response_dispatcher import ResponseDispatcher
+from robbot.services.communication.deferred_send_service import (
+    DeferredSendDispatcher,
+    DeferredSendOutbox,
+    DeferredSendScheduler,
+)
+from robbot.services.communication.message_processor import MessageProcessor
+from robbot.services.communication.outbox_relay import OutboundMessage, OutboxRelay
+
+MODULE = "robbot.services.communication.outbox_relay"
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine(
+        "sqlite+pysqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    ConversationMessageModel.__table__.create(bind=engine)
+    factory = sessionmaker(bind=engine, autocommit=False, autoflush=False)
+
+    @contextmanager
+    def sync_session():
+        session = factory()
+        try:
+            yield session
+        finally:
+            session.close()
+
+    with patch(f"{MODULE}.get_sync_session", sync_session):
+        yield factory
+
+
+@pytest.fixture
+def relay_settings():
+    with patch(f"{MODULE}.settings") as mock_settings:
+        mock_settings.WAHA_DEFERRED_SEND = False
+        mock_settings.OUTBOX_RELAY_BATCH_SIZE = 50
+        mock_settings.OUTBOX_MAX_ATTEMPTS = 2
+        mock_settings.OUTBOX_RETRY_SECONDS = 0
+        mock_settings.OUTBOX_CLAIM_LEASE_SECONDS = 300
+        yield mock_settings
+
+
+@pytest.fixture
+def waha():
+    client = MagicMock()
+    client.sent = []
+
+    async def send_text(**kwargs):
+        client.sent.append((kwargs["chat_id"], kwargs["text"]))
+        return {"id": {"_serialized": f"true_{kwargs['chat_id']}_{len(client.sent)}"}}
+
+    client.send_text = AsyncMock(side_effect=send_text)
+    client.start_typing = AsyncMock()
+    client.stop_typing = AsyncMock()
+    client.get_session_status = AsyncMock()
+    return client
+
+
+def _pending(factory, chat_id: str, body: str, age_seconds: int = 0) -> str:
+    with factory() as session:
+        message = ConversationMessageModel(
+            conversation_id="conv-1",
+            direction=MessageDirection.OUTBOUND,
+            from_phone="BOT",
+            to_phone=chat_id.split("@")[0],
+            body=body,
+            chat_id=chat_id,
+            session_name="default",
+            delivery_status=DeliveryStatus.PENDING,
+            created_at=datetime.utcnow() - timedelta(seconds=age_seconds),
+        )
+        session.add(message)
+        session.commit()
+        return message.id
+
+
+def _get(factory, message_id: str) -> ConversationMessageModel:
+    with factory() as session:
+        message = session.get(ConversationMessageModel, message_id)
+        session.expunge(message)
+        return message
+
+
+class TestOutboxRelay:
+    """Test suite for ResponseDispatcher (outbox) / OutboxRelay."""
+
+    @pytest.mark.asyncio
+    async def test_dispatch_only_writes_pending_message(self, session_factory, waha):
+        """O turno grava a resposta como PENDING na própria transação e não chama o WAHA."""
+        session = session_factory()
+        dispatcher = ResponseDispatcher(session, waha)
+        dispatcher.lead_interaction_repo = MagicMock()
+        dispatcher.llm_interaction_repo = MagicMock()
+
+        assert await dispatcher.dispatch(
+            "conv-1", "5511@c.us", "5511", None, "Oi!", "OUTRO", "oi", {}, session_name="default"
+        )
+
+        message = session.query(ConversationMessageModel).one()
+        assert message.delivery_status == DeliveryStatus.PENDING
+        assert (message.chat_id, message.session_name) == ("5511@c.us", "default")
+        waha.send_text.assert_not_called()
+        session.close()
+
+    @pytest.mark.asyncio
+    async def test_inbound_message_is_saved_outside_the_outbox(self, session_factory):
+        """Mensagem recebida é gravada sem campos de entrega (não entra no outbox)."""
+        session = session_factory()
+        processor = MessageProcessor(session, transcription_service=MagicMock())
+
+        message = await processor.save_inbound_message(session, "conv-1", "oi", from_phone="5511")
+        session.commit()
+
+        assert message.direction == MessageDirection.INBOUND
+        assert (message.chat_id, message.session_name, message.delivery_status) == (None, None, None)
+        session.close()
+
+    @pytest.mark.asyncio
+    async def test_relay_sends_in_chat_order_and_marks_sent(self, session_factory, relay_settings, waha):
+        """O relay envia fora da transação, na ordem do chat, e grava SENT com o id do WAHA."""
+        first = _pending(session_factory, "a@c.us", "primeira", age_seconds=2)
+        second = _pending(session_factory, "a@c.us", "segunda", age_seconds=1)
+        other = _pending(session_factory, "b@c.us", "outro chat")
+
+        relay = OutboxRelay(waha_client=waha, scheduler=MagicMock())
+        assert await relay.run_once() == 2  # só a mais antiga de cada chat
+        assert await relay.run_once() == 1
+        assert await relay.run_once() == 0
+
+        assert [text for chat, text in waha.sent if chat == "a@c.us"] == ["primeira", "segunda"]
+        for message_id in (first, second, other):
+            message = _get(session_factory, message_id)
+            assert message.delivery_status == DeliveryStatus.SENT
+            assert message.sent_at is not None and message.waha_message_id.startswith("true_")
+        assert waha.send_text.await_args.kwargs.get("apply_anti_ban", True) is True
+
+    @pytest.mark.asyncio
+    async def test_failed_send_is_retried_then_failed(self, session_factory, relay_settings, waha):
+        """Falha volta para PENDING; esgotadas as tentativas fica FAILED com o erro."""
+        waha.send_text.side_effect = RuntimeError("waha down")
+        message_id = _pending(session_factory, "a@c.us", "oi")
+        relay = OutboxRelay(waha_client=waha, scheduler=MagicMock())
+
+        await relay.run_once()
+        message = _get(session_factory, message_id)
+        assert (message.delivery_status, message.delivery_attempts) == (DeliveryStatus.PENDING, 1)
+        assert message.delivery_error == "waha down"
+
+        await relay.run_once()
+        assert _get(session_factory, message_id).delivery_status == DeliveryStatus.FAILED
+        assert await relay.run_once() == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_send_holds_back_the_rest_of_the_chat(self, session_factory, relay_settings, waha):
+        """Se a primeira resposta do chat falha, a segunda espera: nunca chega antes dela."""
+        relay_settings.OUTBOX_MAX_ATTEMPTS = 3
+        relay_settings.OUTBOX_RETRY_SECONDS = 300
+        first = _pending(session_factory, "a@c.us", "primeira", age_seconds=2)
+        second = _pending(session_factory, "a@c.us", "segunda", age_seconds=1)
+        send_text = waha.send_text.side_effect
+        waha.send_text.side_effect = RuntimeError("waha down")
+        relay = OutboxRelay(waha_client=waha, scheduler=MagicMock())
+
+        assert await relay.run_once() == 1
+        assert await relay.run_once() == 0  # primeira aguardando retry; segunda bloqueada
+        assert _get(session_factory, first).delivery_status == DeliveryStatus.PENDING
+        assert _get(session_factory, second).delivery_status == DeliveryStatus.PENDING
+
+        waha.send_text.side_effect = send_text
+        relay_settings.OUTBOX_RETRY_SECONDS = 0
+        assert await relay.run_once() == 1
+        assert await relay.run_once() == 1
+        assert waha.sent == [("a@c.us", "primeira"), ("a@c.us", "segunda")]
+
+    @pytest.mark.asyncio
+    async def test_failed_send_stops_the_chat_batch(self, relay_settings, waha):
+        """Dentro de um lote, o relay para o chat na primeira falha."""
+        waha.send_text.side_effect = RuntimeError("waha down")
+        relay = OutboxRelay(waha_client=waha, scheduler=MagicMock())
+        relay.claim_batch = lambda: [
+            OutboundMessage(id=str(i), session_name="default", chat_id="a@c.us", text=str(i), attempts=1)
+            for i in range(2)
+        ]
+
+        with patch(f"{MODULE}.record_delivery"):
+            assert await relay.run_once() == 2
+        assert waha.send_text.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_sending_claim_is_taken_again(self, session_factory, relay_settings, waha):
+        """Mensagem presa em SENDING (relay caiu) é reenviada depois do lease."""
+        message_id = _pending(session_factory, "a@c.us", "oi")
+        with session_factory() as session:
+            message = session.get(ConversationMessageModel, message_id)
+            message.delivery_status = DeliveryStatus.SENDING
+            message.delivery_claimed_at = datetime.utcnow() - timedelta(seconds=60)
+            session.commit()
+
+        relay = OutboxRelay(waha_client=waha, scheduler=MagicMock())
+        assert await relay.run_once() == 0
+
+        relay_settings.OUTBOX_CLAIM_LEASE_SECONDS = 30
+        assert await relay.run_once() == 1
+        assert _get(session_factory, message_id).delivery_status == DeliveryStatus.SENT
+
+    @pytest.mark.asyncio
+    async def test_deferred_send_is_scheduled_once_and_marked_sent(self, session_factory, relay_settings, waha):
+        """Com envio diferido o relay agenda pelo id da mensagem (idempotente) e o dispatcher grava SENT."""
+        relay_settings.WAHA_DEFERRED_SEND = True
+        outbox = DeferredSendOutbox(fakeredis.FakeRedis(server=fakeredis.FakeServer()), prefix="test:outbox")
+        relay = OutboxRelay(waha_client=waha, scheduler=DeferredSendScheduler(waha_client=waha, outbox=outbox))
+        message_id = _pending(session_factory, "a@c.us", "oi")
+
+        assert await relay.run_once() == 1
+        assert _get(session_factory, message_id).delivery_status == DeliveryStatus.SCHEDULED
+        waha.send_text.assert_not_called()
+
+        # Re-claim após queda do relay: não agenda de novo
+        await DeferredSendScheduler(waha_client=waha, outbox=outbox).schedule_text(
+            "default", "a@c.us", "oi", message_id=message_id
+        )
+        assert outbox.pending() == 1
+
+        dispatcher = DeferredSendDispatcher(waha_client=waha, outbox=outbox, concurrency=10)
+        assert await dispatcher.run_once(now=float("inf")) == 1
+        assert waha.sent == [("a@c.us", "oi")]
+        message = _get(session_factory, message_id)
+        assert message.delivery_status == DeliveryStatus.SENT
+        assert message.waha_message_id == "true_a@c.us_1"
@@ -0,0 +1,61 @@
+"""
+Testes unitários da agenda adaptativa de polling (backoff de chats ociosos, promoção por eventos).
+"""
+import fakeredis
+import pytest
+
+from robbot.services.communication.poll_scheduler import PollScheduler, settings
+
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture(autouse=True)
+def schedule_settings(monkeypatch):
+    monkeypatch.setattr(settings, "WAHA_POLLING_INTERVAL", 10)
+    monkeypatch.setattr(settings, "WAHA_POLLING_BACKOFF_FACTOR", 2.0)
+    monkeypatch.setattr(settings, "WAHA_POLLING_MAX_INTERVAL_SECONDS", 60)
+
+
+@pytest.fixture
+def scheduler():
+    return PollScheduler(redis_client=fakeredis.FakeRedis(server=fakeredis.FakeServer()), key="test:schedule")
+
+
+class TestPollScheduler:
+    """Test suite for PollScheduler."""
+
+    def test_unknown_chats_are_due(self, scheduler):
+        """Chats nunca agendados entram no próximo ciclo."""
+        assert scheduler.due(["a@c.us", "b@c.us"], now=NOW) == ["a@c.us", "b@c.us"]
+
+    def test_idle_chat_backs_off_exponentially_up_to_the_cap(self, scheduler):
+        """Cada poll sem novidade dobra o intervalo, até WAHA_POLLING_MAX_INTERVAL_SECONDS."""
+        now, intervals = NOW, []
+        for _ in range(5):
+            scheduler.record({"idle@c.us": False}, now=now)
+            next_poll = scheduler.redis.zscore(scheduler.key, "idle@c.us")
+            intervals.append(next_poll - now)
+            assert scheduler.due(["idle@c.us"], now=next_poll - 1) == []
+            now = next_poll
+
+        assert intervals == [10, 20, 40, 60, 60]
+
+    def test_activity_resets_the_interval(self, scheduler):
+        """Mensagem nova volta o chat ao intervalo mínimo."""
+        for _ in range(3):
+            scheduler.record({"chat@c.us": False}, now=NOW)
+        scheduler.record({"chat@c.us": True}, now=NOW)
+
+        assert scheduler.redis.zscore(scheduler.key, "chat@c.us") == NOW + 10
+
+    def test_promote_makes_a_backed_off_chat_due(self, scheduler):
+        """Webhook/presença: o chat ocioso é consultado no próximo ciclo e volta ao intervalo mínimo."""
+        for _ in range(4):
+            scheduler.record({"chat@c.us": False})
+        assert scheduler.due(["chat@c.us"]) == []
+
+        scheduler.promote("chat@c.us")
+
+        assert scheduler.due(["chat@c.us"]) == ["chat@c.us"]
+        scheduler.record({"chat@c.us": False}, now=NOW)
+        assert scheduler.redis.zscore(scheduler.key, "chat@c.us") == NOW + 20
@@ -0,0 +1,102 @@
+"""
+Testes unitários da coordenação do polling entre réplicas (lease de líder, anel de hash consistente).
+"""
+import fakeredis
+import pytest
+
+from robbot.services.communication.polling_coordinator import (
+    LEADER_KEY,
+    HashRing,
+    PollingCoordinator,
+    settings,
+)
+
+CHATS = [f"55119{i:08d}@c.us" for i in range(300)]
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture(autouse=True)
+def lease(monkeypatch):
+    monkeypatch.setattr(settings, "WAHA_POLLING_LEASE_SECONDS", 30)
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis(server=fakeredis.FakeServer())
+
+
+def _assignment(view, replicas):
+    return {replica: {chat for chat in CHATS if view.owns(replica, chat)} for replica in replicas}
+
+
+class TestHashRing:
+    """Test suite for HashRing."""
+
+    def test_removing_a_replica_only_moves_its_chats(self):
+        """Cada chat tem um dono; quando uma réplica sai, só os chats dela mudam de dono."""
+        before = HashRing(["a", "b", "c"])
+        after = HashRing(["a", "c"])
+
+        owners = {chat: before.owner(chat) for chat in CHATS}
+        assert set(owners.values()) == {"a", "b", "c"}
+        assert min(list(owners.values()).count(r) for r in "abc") > len(CHATS) // 6
+        assert all(after.owner(chat) == owner for chat, owner in owners.items() if owner != "b")
+
+
+class TestPollingCoordinator:
+    """Test suite for PollingCoordinator."""
+
+    def test_replicas_split_chats_without_overlap(self, redis_client):
+        """Uma réplica vira líder e publica o anel; as duas dividem os chats sem sobreposição."""
+        first = PollingCoordinator(redis_client, replica="pwk-1")
+        second = PollingCoordinator(redis_client, replica="pwk-2")
+
+        first.tick(now=NOW)
+        assert second.tick(now=NOW).includes("pwk-2") is False  # entra no anel no próximo tick do líder
+        view = first.tick(now=NOW + 1)
+
+        assert (first.is_leader, second.is_leader) == (True, False)
+        shares = _assignment(view, ["pwk-1", "pwk-2"])
+        assert shares["pwk-1"] and shares["pwk-2"]
+        assert shares["pwk-1"] | shares["pwk-2"] == set(CHATS)
+        assert not shares["pwk-1"] & shares["pwk-2"]
+
+    def test_dead_replica_is_dropped_and_its_chats_rebalanced(self, redis_client):
+        """Sem heartbeat por mais que a lease, a réplica sai do anel e o sobrevivente assume tudo."""
+        leader = PollingCoordinator(redis_client, replica="pwk-1")
+        follower = PollingCoordinator(redis_client, replica="pwk-2")
+        leader.tick(now=NOW)
+        follower.tick(now=NOW)
+        epoch = leader.tick(now=NOW + 1).epoch
+
+        view = leader.tick(now=NOW + 40)
+
+        assert view.epoch == epoch + 1
+        assert _assignment(view, ["pwk-1"])["pwk-1"] == set(CHATS)
+
+    def test_follower_takes_over_when_leader_lease_expires(self, redis_client):
+        """Líder morto: quando a lease expira, outra réplica assume e remove o antigo líder do anel."""
+        leader = PollingCoordinator(redis_client, replica="pwk-1")
+        follower = PollingCoordinator(redis_client, replica="pwk-2")
+        leader.tick(now=NOW)
+        follower.tick(now=NOW)
+        leader.tick(now=NOW + 1)
+
+        redis_client.delete(LEADER_KEY)  # lease expirada
+        view = follower.tick(now=NOW + 40)
+
+        assert follower.is_leader
+        assert view.ring.members == ["pwk-2"]
+
+    def test_leave_hands_over_immediately(self, redis_client):
+        """Desligamento gracioso: a réplica sai do anel e libera a liderança na hora."""
+        leader = PollingCoordinator(redis_client, replica="pwk-1")
+        follower = PollingCoordinator(redis_client, replica="pwk-2")
+        leader.tick(now=NOW)
+        follower.tick(now=NOW)
+
+        leader.leave()
+        view = follower.tick(now=NOW + 1)
+
+        assert follower.is_leader
+        assert view.ring.members == ["pwk-2"]
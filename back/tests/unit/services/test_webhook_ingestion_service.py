@@ -0,0 +1,227 @@
+"""
+Testes unitários para WebhookIngestionService.
+Garante que o I/O síncrono (DB, RQ) sai do event loop e que o fluxo de filtros se mantém.
+"""
+import threading
+from datetime import datetime
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from robbot.schemas.waha import WebhookLogOut, WebhookPayload
+
+MODULE = "robbot.services.communication.webhook_ingestion_service"
+
+
+@pytest.fixture
+def service():
+    """WebhookIngestionService with Redis, DB and queue mocked."""
+    with (
+        patch(f"{MODULE}.get_async_redis_client") as mock_get_redis,
+        patch(f"{MODULE}.get_queue_service") as mock_get_queue,
+        patch(f"{MODULE}.get_webhook_log_buffer"),
+    ):
+        mock_get_redis.return_value = MagicMock(get=AsyncMock(return_value=None))
+        from robbot.services.communication.webhook_ingestion_service import WebhookIngestionService
+
+        ingestion = WebhookIngestionService()
+        ingestion.persist_threads = []
+
+        def fake_persist(payload):
+            ingestion.persist_threads.append(threading.get_ident())
+            return WebhookLogOut(
+                id=1,
+                session_name=payload.session,
+                event_type=payload.event,
+                processed=False,
+                created_at=datetime(2025, 1, 1),
+            )
+
+        async def fake_append(session_name, event_type, payload):
+            ingestion.persist_threads.append(threading.get_ident())
+            return WebhookLogOut(
+                buffer_id="1-0",
+                session_name=session_name,
+                event_type=event_type,
+                processed=False,
+                created_at=datetime(2025, 1, 1),
+            )
+
+        ingestion._persist_log = fake_persist
+        ingestion.log_buffer = MagicMock(append=AsyncMock(side_effect=fake_append))
+        ingestion.poll_scheduler = MagicMock(apromote=AsyncMock())
+        ingestion.lid_directory = MagicMock(aphone_for_lid=AsyncMock(return_value=None))
+        ingestion.lid_work_set = MagicMock(aadd=AsyncMock())
+        ingestion.queue_service = mock_get_queue.return_value
+        ingestion.queue_service.enqueue_message_processing_debounced.return_value = "debounced:5511999@c.us"
+        yield ingestion
+
+
+def _payload(event="message", **message):
+    body = {"id": "msg_001", "from": "5511999@c.us", "body": "oi"}
+    body.update(message)
+    return WebhookPayload(session="default", event=event, payload=body)
+
+
+class TestWebhookIngestionService:
+    """Test suite for WebhookIngestionService.ingest()."""
+
+    @pytest.mark.asyncio
+    async def test_blocking_io_runs_off_the_event_loop(self, service):
+        """Persistência e enqueue devem rodar no threadpool, não na thread do loop."""
+        loop_thread = threading.get_ident()
+        enqueue_threads = []
+        service.queue_service.enqueue_message_processing_debounced.side_effect = (
+            lambda **_: enqueue_threads.append(threading.get_ident()) or "debounced:x"
+        )
+
+        with (
+            patch(f"{MODULE}.MessageFilterService"),
+            patch(f"{MODULE}.settings.WEBHOOK_LOG_WRITE_BEHIND", False),
+        ):
+            log = await service.ingest(_payload())
+
+        assert log.id == 1
+        assert service.persist_threads and service.persist_threads[0] != loop_thread
+        assert enqueue_threads and enqueue_threads[0] != loop_thread
+
+    @pytest.mark.asyncio
+    async def test_write_behind_buffers_instead_of_inserting(self, service):
+        """Com write-behind o log vai para o stream (sem id do banco ainda)."""
+        with patch(f"{MODULE}.settings.WEBHOOK_LOG_WRITE_BEHIND", True):
+            log = await service.ingest(_payload(event="message.ack"))
+
+        assert log.id is None
+        assert log.buffer_id == "1-0"
+        service.log_buffer.append.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_non_message_event_is_only_persisted(self, service):
+        """message.ack é registrado mas não enfileirado."""
+        await service.ingest(_payload(event="message.ack"))
+
+        assert len(service.persist_threads) == 1
+        service.queue_service.enqueue_message_processing_debounced.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_from_me_is_not_enqueued(self, service):
+        """Mensagens do próprio bot não são enfileiradas."""
+        await service.ingest(_payload(fromMe=True))
+
+        service.queue_service.enqueue_message_processing_debounced.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_dev_mode_rejects_unknown_sender(self, service):
+        """DEV_MODE: número fora da allow-list não é enfileirado."""
+        with patch(f"{MODULE}.settings") as mock_settings:
+            mock_settings.DEV_MODE = True
+            mock_settings.dev_phone_list = ["5511888"]
+            await service.ingest(_payload())
+
+        service.queue_service.enqueue_message_processing_debounced.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_dev_mode_accepts_lid_cached_for_allowed_number(self, service):
+        """DEV_MODE: LID mapeado (via cache async) para número permitido é aceito."""
+        service.redis.get = AsyncMock(side_effect=lambda key: b"5511888" if key.startswith("waha:dev_phone:") else None)
+
+        with (
+            patch(f"{MODULE}.settings") as mock_settings,
+            patch(f"{MODULE}.MessageFilterService"),
+            patch("robbot.services.leads.lid_resolver_service.get_lid_resolver") as mock_resolver,
+        ):
+            mock_settings.DEV_MODE = True
+            mock_settings.dev_phone_list = ["5511888"]
+            mock_resolver.return_value.try_resolve_lid = AsyncMock(return_value=None)
+            await service.ingest(_payload(**{"from": "2498833789@lid"}))
+
+        service.queue_service.enqueue_message_processing_debounced.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_message_already_claimed_by_polling_is_not_enqueued(self, service):
+        """Dedup com o polling: mensagem já reivindicada não é enfileirada de novo."""
+        with patch(f"{MODULE}.MessageFilterService") as mock_filter_cls:
+            mock_filter_cls.return_value.claim_new.return_value = []
+            await service.ingest(_payload())
+
+        service.queue_service.enqueue_message_processing_debounced.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_failed_enqueue_releases_claim(self, service):
+        """Falha ao enfileirar libera o claim para o polling recuperar a mensagem."""
+        service.queue_service.enqueue_message_processing_debounced.side_effect = RuntimeError("redis down")
+
+        with patch(f"{MODULE}.MessageFilterService") as mock_filter_cls:
+            mock_filter_cls.return_value.claim_new.return_value = [{"id": "msg_001"}]
+            with pytest.raises(RuntimeError):
+                await service.ingest(_payload())
+
+        mock_filter_cls.return_value.release.assert_called_once_with(["msg_001"])
+
+    @pytest.mark.asyncio
+    async def test_degraded_skips_ack_persistence(self, service):
+        """Com a fila atrasada (DEGRADED), message.ack não é persistido."""
+        from robbot.services.infrastructure.admission_control import DegradationLevel
+
+        log = await service.ingest(_payload(event="message.ack"), DegradationLevel.DEGRADED)
+
+        assert log.id is None and log.buffer_id is None
+        assert service.persist_threads == []
+
+    @pytest.mark.asyncio
+    async def test_degraded_skips_remote_lid_lookup(self, service):
+        """DEGRADED: LID fora do cache não é resolvido no WAHA, mas a mensagem é enfileirada."""
+        from robbot.services.infrastructure.admission_control import DegradationLevel
+
+        with (
+            patch(f"{MODULE}.MessageFilterService"),
+            patch("robbot.services.leads.lid_resolver_service.get_lid_resolver") as mock_resolver,
+        ):
+            mock_resolver.return_value.try_resolve_lid = AsyncMock(return_value="5511888")
+            await service.ingest(_payload(**{"from": "2498833789@lid"}), DegradationLevel.DEGRADED)
+
+        mock_resolver.return_value.try_resolve_lid.assert_not_called()
+        service.lid_work_set.aadd.assert_not_called()
+        service.queue_service.enqueue_message_processing_debounced.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_unknown_lid_is_queued_without_waiting_on_waha(self, service):
+        """LID desconhecido vai para o conjunto de trabalho; a mensagem não espera consulta ao WAHA."""
+        with (
+            patch(f"{MODULE}.MessageFilterService"),
+            patch("robbot.services.leads.lid_resolver_service.get_lid_resolver") as mock_resolver,
+        ):
+            mock_resolver.return_value.try_resolve_lid = AsyncMock(return_value="5511888")
+            await service.ingest(_payload(**{"from": "2498833789@lid"}))
+
+        mock_resolver.return_value.try_resolve_lid.assert_not_called()
+        service.lid_work_set.aadd.assert_awaited_once_with("2498833789")
+        service.queue_service.enqueue_message_processing_debounced.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_message_and_presence_events_promote_chat_polling(self, service):
+        """Mensagens e presença antecipam o polling do chat; acks não."""
+        with patch(f"{MODULE}.MessageFilterService"):
+            await service.ingest(_payload())
+            await service.ingest(_payload(fromMe=True, to="5511777@c.us"))
+        await service.ingest(WebhookPayload(session="default", event="presence.update", payload={"id": "123@lid"}))
+        await service.ingest(_payload(event="message.ack"))
+
+        promoted = [call.args[0] for call in service.poll_scheduler.apromote.await_args_list]
+        assert promoted == ["5511999@c.us", "5511777@c.us", "123@lid"]
+
+    @pytest.mark.asyncio
+    async def test_lid_in_directory_is_resolved_without_waha(self, service):
+        """LID presente no diretório: um HGET resolve o telefone, sem chamada ao WAHA."""
+        service.lid_directory.aphone_for_lid.return_value = "5511888"
+
+        with (
+            patch(f"{MODULE}.MessageFilterService"),
+            patch("robbot.services.leads.lid_resolver_service.get_lid_resolver") as mock_resolver,
+        ):
+            mock_resolver.return_value.try_resolve_lid = AsyncMock(return_value="5511777")
+            await service.ingest(_payload(**{"from": "2498833789@lid"}))
+
+        service.lid_directory.aphone_for_lid.assert_awaited_once_with("2498833789")
+        mock_resolver.return_value.try_resolve_lid.assert_not_called()
+        service.queue_service.enqueue_message_processing_debounced.assert_called_once()
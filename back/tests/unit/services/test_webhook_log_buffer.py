@@ -0,0 +1,195 @@
+"""
+Testes unitários para o buffer write-behind de webhook_logs (Redis stream -> INSERT em lote).
+"""
+from contextlib import contextmanager
+from unittest.mock import MagicMock, patch
+
+import fakeredis
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from robbot.config.settings import settings
+from robbot.services.infrastructure.webhook_log_buffer import WebhookLogBuffer, WebhookLogFlusher
+
+MODULE = "robbot.services.infrastructure.webhook_log_buffer"
+
+
+@pytest.fixture
+def server():
+    return fakeredis.FakeServer()
+
+
+@pytest.fixture
+def repo():
+    """WebhookLogRepository mock capturing bulk inserts."""
+    with patch(f"{MODULE}.WebhookLogRepository") as mock_repo_cls:
+        mock_repo = MagicMock()
+        mock_repo.bulk_create.side_effect = len
+        mock_repo_cls.return_value = mock_repo
+        yield mock_repo
+
+
+@contextmanager
+def fake_session():
+    yield MagicMock()
+
+
+def _flusher(server, name="wlw", batch_size=3, flush_interval_ms=60_000):
+    flusher = WebhookLogFlusher(
+        consumer_name=name,
+        redis_client=fakeredis.FakeRedis(server=server),
+        session_factory=fake_session,
+        batch_size=batch_size,
+        flush_interval_ms=flush_interval_ms,
+    )
+    flusher.ensure_group()
+    return flusher
+
+
+async def _append(server, count):
+    buffer = WebhookLogBuffer(redis_client=fakeredis.FakeAsyncRedis(server=server))
+    return [await buffer.append("default", "message.ack", {"id": f"msg_{i}"}) for i in range(count)]
+
+
+class TestWebhookLogBuffer:
+    """Test suite for WebhookLogBuffer / WebhookLogFlusher."""
+
+    @pytest.mark.asyncio
+    async def test_append_returns_buffered_log(self, server):
+        """append() devolve o id da entrada no stream, sem id de banco."""
+        logs = await _append(server, 1)
+
+        assert logs[0].id is None
+        assert logs[0].buffer_id
+        assert fakeredis.FakeRedis(server=server).xlen(settings.WEBHOOK_LOG_STREAM) == 1
+
+    @pytest.mark.asyncio
+    async def test_flushes_in_one_bulk_insert_when_batch_is_full(self, server, repo):
+        """Lote cheio -> um único bulk_create, entradas confirmadas e removidas do stream."""
+        flusher = _flusher(server, batch_size=3)
+        await _append(server, 3)
+
+        assert flusher.poll_once() == 3
+
+        repo.bulk_create.assert_called_once()
+        rows = repo.bulk_create.call_args.args[0]
+        assert [row["payload"]["id"] for row in rows] == ["msg_0", "msg_1", "msg_2"]
+        assert flusher.redis.xlen(settings.WEBHOOK_LOG_STREAM) == 0
+
+    @pytest.mark.asyncio
+    async def test_waits_for_size_or_interval(self, server, repo):
+        """Abaixo do tamanho do lote e dentro do intervalo, nada é gravado."""
+        flusher = _flusher(server, batch_size=10, flush_interval_ms=60_000)
+        await _append(server, 2)
+
+        assert flusher.poll_once() == 0
+        repo.bulk_create.assert_not_called()
+
+        flusher._first_buffered_at -= 61  # intervalo expirado
+        assert flusher.poll_once() == 2
+
+    @pytest.mark.asyncio
+    async def test_crash_before_flush_is_recovered(self, server, repo):
+        """Entradas lidas mas não gravadas (crash) são recuperadas no restart."""
+        crashed = _flusher(server, batch_size=10)
+        await _append(server, 2)
+        crashed.poll_once()  # lidas, ainda sem flush
+        repo.bulk_create.assert_not_called()
+
+        restarted = _flusher(server, batch_size=10)
+        assert restarted.recover_pending() == 2
+        assert restarted.flush() == 2
+        assert restarted.redis.xpending(settings.WEBHOOK_LOG_STREAM, "webhook-log-flusher")["pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_insert_keeps_entries_pending(self, server, repo):
+        """Falha no INSERT não confirma (XACK) as entradas."""
+        repo.bulk_create.side_effect = RuntimeError("db down")
+        flusher = _flusher(server, batch_size=2)
+        await _append(server, 2)
+
+        with pytest.raises(RuntimeError):
+            flusher.poll_once()
+
+        assert flusher.redis.xpending(settings.WEBHOOK_LOG_STREAM, "webhook-log-flusher")["pending"] == 2
+        assert len(flusher._buffer) == 2
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_does_not_grow(self, server, repo):
+        """Com o lote cheio e o INSERT falhando, nada novo é lido do stream."""
+        repo.bulk_create.side_effect = RuntimeError("db down")
+        flusher = _flusher(server, batch_size=2)
+        await _append(server, 5)
+
+        for _ in range(3):
+            with pytest.raises(RuntimeError):
+                flusher.poll_once()
+
+        assert len(flusher._buffer) == 2
+        assert all(len(call.args[0]) == 2 for call in repo.bulk_create.call_args_list)
+
+    @pytest.mark.asyncio
+    async def test_poison_row_is_dead_lettered_after_max_retries(self, server, repo, monkeypatch):
+        """Depois do limite de tentativas o lote vai linha a linha; a linha inválida vai para o dead-letter."""
+        monkeypatch.setattr(settings, "WEBHOOK_LOG_FLUSH_MAX_RETRIES", 2)
+
+        def bulk_create(rows):
+            if any(row["payload"]["id"] == "msg_1" for row in rows):
+                raise ValueError("invalid payload")
+            return len(rows)
+
+        repo.bulk_create.side_effect = bulk_create
+        flusher = _flusher(server, batch_size=3)
+        await _append(server, 4)
+
+        with pytest.raises(ValueError):
+            flusher.poll_once()
+        assert flusher.poll_once() == 2
+
+        dead = flusher.redis.xrange(settings.WEBHOOK_LOG_DEAD_LETTER_STREAM)
+        assert len(dead) == 1
+        assert b"msg_1" in dead[0][1][b"payload"] and dead[0][1][b"error"] == b"invalid payload"
+
+        assert flusher.poll_once() == 0  # lote seguinte não fica bloqueado
+        flusher._first_buffered_at -= 61
+        assert flusher.poll_once() == 1
+        assert flusher.redis.xpending(settings.WEBHOOK_LOG_STREAM, "webhook-log-flusher")["pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_connection_loss_mid_row_by_row_does_not_duplicate_rows(self, server, repo, monkeypatch):
+        """Queda do banco no meio do linha a linha: as linhas já gravadas saem do lote e não são reinseridas."""
+        monkeypatch.setattr(settings, "WEBHOOK_LOG_FLUSH_MAX_RETRIES", 1)
+        inserted = []
+        db_down = [True]
+
+        def bulk_create(rows):
+            if len(rows) > 1:
+                raise ValueError("batch rejected")
+            if rows[0]["payload"]["id"] == "msg_1" and db_down[0]:
+                raise OperationalError("INSERT", {}, Exception("connection lost"))
+            inserted.extend(row["payload"]["id"] for row in rows)
+            return len(rows)
+
+        repo.bulk_create.side_effect = bulk_create
+        flusher = _flusher(server, batch_size=3)
+        await _append(server, 3)
+
+        with pytest.raises(OperationalError):
+            flusher.poll_once()
+        assert [row["payload"]["id"] for _, row in flusher._buffer] == ["msg_1", "msg_2"]
+        assert flusher.redis.xpending(settings.WEBHOOK_LOG_STREAM, "webhook-log-flusher")["pending"] == 2
+
+        db_down[0] = False
+        assert flusher.flush() == 2
+        assert inserted == ["msg_0", "msg_1", "msg_2"]
+        assert flusher.redis.xpending(settings.WEBHOOK_LOG_STREAM, "webhook-log-flusher")["pending"] == 0
+
+    def test_unparseable_entry_is_dead_lettered(self, server, repo):
+        """Entrada corrompida no stream vai para o dead-letter em vez de travar o consumo."""
+        flusher = _flusher(server, batch_size=2)
+        flusher.redis.xadd(settings.WEBHOOK_LOG_STREAM, {"session_name": "default", "payload": "{"})
+
+        assert flusher.poll_once() == 0
+        assert flusher._buffer == []
+        assert flusher.redis.xlen(settings.WEBHOOK_LOG_DEAD_LETTER_STREAM) == 1
+        assert flusher.redis.xpending(settings.WEBHOOK_LOG_STREAM, "webhook-log-flusher")["pending"] == 0
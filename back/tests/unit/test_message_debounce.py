@@ -0,0 +1,128 @@
+"""
+Testes de concorrência do debounce atômico (DebounceBuffer + QueueService).
+Prova que webhooks simultâneos para o mesmo chat não perdem mensagens.
+"""
+import threading
+from unittest.mock import MagicMock, patch
+
+import fakeredis
+import pytest
+
+from robbot.infra.redis.debounce import DebounceBuffer
+
+CHAT_ID = "5511999999999@c.us"
+
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis(server=fakeredis.FakeServer())
+
+
+@pytest.fixture
+def queue_service(redis_client):
+    """QueueService with fake Redis and a mocked RQ queue manager."""
+    with (
+        patch("robbot.services.infrastructure.queue_service.get_queue_manager") as mock_get_manager,
+        patch("robbot.infra.redis.debounce.get_redis_client", return_value=redis_client),
+        patch("robbot.services.infrastructure.queue_service.settings") as mock_settings,
+    ):
+        mock_settings.MESSAGE_DEBOUNCE_SECONDS = 10
+        mock_get_manager.return_value = MagicMock()
+        from robbot.services.infrastructure.queue_service import QueueService
+
+        yield QueueService()
+
+
+def _run_concurrently(target, threads: int):
+    barrier = threading.Barrier(threads)
+
+    def worker(index):
+        barrier.wait()
+        target(index)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+
+
+class TestAtomicDebounce:
+    """Test suite for the Lua-backed debounce buffer."""
+
+    def test_one_round_trip_per_message(self, queue_service, redis_client):
+        """Cada mensagem custa exatamente um comando Redis (EVALSHA) após o script ser carregado."""
+        queue_service.enqueue_message_processing_debounced({"from": "warmup@c.us", "body": "x"})
+
+        with patch.object(redis_client, "execute_command", wraps=redis_client.execute_command) as spy:
+            queue_service.enqueue_message_processing_debounced({"from": CHAT_ID, "body": "oi"})
+            queue_service.enqueue_message_processing_debounced({"from": CHAT_ID, "body": "tudo bem?"})
+
+        assert [c.args[0] for c in spy.call_args_list] == ["EVALSHA", "EVALSHA"]
+
+    def test_first_message_arms_job_once(self, queue_service):
+        """Somente a primeira mensagem da janela agenda o job."""
+        first = queue_service.enqueue_message_processing_debounced({"from": CHAT_ID, "body": "a"})
+        second = queue_service.enqueue_message_processing_debounced({"from": CHAT_ID, "body": "b"})
+
+        assert first == f"debounced:{CHAT_ID}"
+        assert second == f"buffered:{CHAT_ID}"
+        queue_service.queue_manager.queue_messages.enqueue_in.assert_called_once()
+
+    def test_concurrent_webhooks_lose_no_messages(self, queue_service, redis_client):
+        """50 threads x 20 mensagens no mesmo chat: todas chegam ao drain, um único job agendado."""
+        threads, per_thread = 50, 20
+
+        def send(index):
+            for n in range(per_thread):
+                queue_service.enqueue_message_processing_debounced(
+                    {"from": CHAT_ID, "body": f"t{index}-m{n}", "session": "default"}
+                )
+
+        _run_concurrently(send, threads)
+
+        batch = DebounceBuffer(redis_client).drain(CHAT_ID)
+        assert sorted(batch.messages) == sorted(f"t{i}-m{n}" for i in range(threads) for n in range(per_thread))
+        assert batch.session == "default"
+        queue_service.queue_manager.queue_messages.enqueue_in.assert_called_once()
+
+    def test_drain_racing_with_appends_loses_nothing(self, queue_service, redis_client):
+        """Drains concorrentes com appends: nada se perde e cada janela nova reagenda o job."""
+        buffer = DebounceBuffer(redis_client)
+        drained: list[str] = []
+        lock = threading.Lock()
+
+        def act(index):
+            if index % 5 == 0:
+                batch = buffer.drain(CHAT_ID)
+                with lock:
+                    drained.extend(batch.messages)
+            else:
+                for n in range(10):
+                    queue_service.enqueue_message_processing_debounced({"from": CHAT_ID, "body": f"t{index}-m{n}"})
+
+        _run_concurrently(act, 40)
+        drained.extend(buffer.drain(CHAT_ID).messages)
+
+        expected = sorted(f"t{i}-m{n}" for i in range(40) if i % 5 != 0 for n in range(10))
+        assert sorted(drained) == expected
+
+    def test_drain_releases_job_flag(self, queue_service, redis_client):
+        """Após o drain a próxima mensagem abre nova janela (novo job)."""
+        queue_service.enqueue_message_processing_debounced({"from": CHAT_ID, "body": "a"})
+        DebounceBuffer(redis_client).drain(CHAT_ID)
+
+        result = queue_service.enqueue_message_processing_debounced({"from": CHAT_ID, "body": "b"})
+
+        assert result == f"debounced:{CHAT_ID}"
+        assert queue_service.queue_manager.queue_messages.enqueue_in.call_count == 2
+
+    def test_failed_schedule_disarms(self, queue_service, redis_client):
+        """Se o agendamento falha, o flag é liberado para a próxima mensagem reagendar."""
+        queue_service.queue_manager.queue_messages.enqueue_in.side_effect = [RuntimeError("redis down"), None]
+
+        with pytest.raises(RuntimeError):
+            queue_service.enqueue_message_processing_debounced({"from": CHAT_ID, "body": "a"})
+
+        assert queue_service.enqueue_message_processing_debounced({"from": CHAT_ID, "body": "b"}) == f"debounced:{CHAT_ID}"
+        assert DebounceBuffer(redis_client).drain(CHAT_ID).messages == ["a", "b"]
@@ -3,7 +3,7 @@ Testes unitários para MessageFilterService.
 Verifica todos os cenários de rejeição/aceitação de mensagens.
 """
 import pytest
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 
 
 class TestMessageFilterService:
@@ -11,13 +11,13 @@ class TestMessageFilterService:
 
     @pytest.fixture
     def mock_redis(self):
-        """Mock Redis client."""
-        with patch("robbot.services.communication.message_filter_service.get_redis_client") as mock_get:
-            mock_client = MagicMock()
-            mock_get.return_value = mock_client
+        """In-memory Redis (fakeredis) — the dedup index runs Lua scripts."""
+        import fakeredis
+
+        fake_client = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+        with patch("robbot.services.communication.message_filter_service.get_redis_client", return_value=fake_client):
             # Default: no messages are processed yet
-            mock_client.get.return_value = None
-            yield mock_client
+            yield fake_client
 
     @pytest.fixture
     def filter_service(self, mock_redis):
@@ -131,7 +131,7 @@ class TestMessageFilterService:
     # =========================================================================
     def test_already_processed_message_rejected(self, filter_service, mock_redis):
         """Mensagem já processada DEVE ser rejeitada (deduplicação)."""
-        mock_redis.get.return_value = b"1"  # Simula: já existe no Redis
+        filter_service.mark_as_processed("msg_010")  # Já existe no índice
         msg = {
             "id": "msg_010",
             "from": "555191628223@c.us",
@@ -149,7 +149,6 @@ class TestMessageFilterService:
 
     def test_new_message_accepted(self, filter_service, mock_redis):
         """Mensagem nova (não processada, ID válido) DEVE ser aceita."""
-        mock_redis.get.return_value = None  # Não existe no Redis
         msg = {
             "id": "msg_011",
             "from": "555191628223@c.us",
@@ -160,12 +159,94 @@ class TestMessageFilterService:
     # =========================================================================
     # mark_as_processed
     # =========================================================================
-    def test_mark_as_processed_sets_redis_key(self, filter_service, mock_redis):
-        """mark_as_processed DEVE criar chave no Redis com TTL de 24h."""
+    def test_mark_as_processed_uses_hourly_bucket(self, filter_service, mock_redis):
+        """mark_as_processed DEVE gravar no bucket horário (sem chave por mensagem), com TTL."""
         filter_service.mark_as_processed("msg_012")
-        mock_redis.set.assert_called_once_with("waha:processed:msg_012", "1", ex=86400)
+
+        assert mock_redis.keys("waha:processed:*") == []
+        (bucket,) = mock_redis.keys("waha:dedup:*")
+        assert 0 < mock_redis.ttl(bucket) <= 26 * 3600
+        assert filter_service._is_processed("msg_012") is True
 
     def test_mark_as_processed_ignores_none(self, filter_service, mock_redis):
         """mark_as_processed DEVE ignorar message_id None."""
         filter_service.mark_as_processed(None)
-        mock_redis.set.assert_not_called()
+        assert mock_redis.dbsize() == 0
+
+    def test_legacy_key_still_counts_as_processed(self, filter_service, mock_redis):
+        """Chaves antigas waha:processed:{id} continuam valendo durante a migração."""
+        mock_redis.set("waha:processed:msg_013", "1", ex=86400)
+
+        assert filter_service.claim_new([{"id": "msg_013", "from": "555191628223@c.us"}]) == []
+
+
+class TestMessageFilterClaim:
+    """Test suite for MessageFilterService.claim_new() (batch atomic claim)."""
+
+    @pytest.fixture
+    def fake_redis(self):
+        import fakeredis
+
+        return fakeredis.FakeRedis(server=fakeredis.FakeServer())
+
+    @pytest.fixture
+    def filter_service(self, fake_redis):
+        with (
+            patch("robbot.services.communication.message_filter_service.get_redis_client", return_value=fake_redis),
+            patch("robbot.services.communication.message_filter_service.settings") as mock_settings,
+        ):
+            mock_settings.DEV_MODE = False
+            from robbot.services.communication.message_filter_service import MessageFilterService
+
+            yield MessageFilterService()
+
+    def _messages(self, *ids, **extra):
+        return [{"id": mid, "from": "555191628223@c.us", "fromMe": False, **extra} for mid in ids]
+
+    def test_claims_new_and_skips_invalid(self, filter_service):
+        """Retorna somente mensagens válidas e novas, na ordem de entrada."""
+        batch = self._messages("m1", "m2") + [{"id": "m3", "fromMe": True}, {"from": "x@c.us"}]
+
+        claimed = filter_service.claim_new(batch)
+
+        assert [m["id"] for m in claimed] == ["m1", "m2"]
+
+    def test_second_claim_returns_nothing(self, filter_service):
+        """Webhook e polling vendo a mesma mensagem: só um deles a recebe."""
+        assert len(filter_service.claim_new(self._messages("m1", "m2"))) == 2
+        assert filter_service.claim_new(self._messages("m1", "m2", "m3")) == self._messages("m3")
+
+    def test_one_round_trip_per_batch(self, filter_service, fake_redis):
+        """O lote inteiro é reivindicado em uma única chamada ao script."""
+        filter_service.claim_new(self._messages("warmup"))  # carrega o script (SCRIPT LOAD)
+
+        with patch.object(fake_redis, "evalsha", wraps=fake_redis.evalsha) as spy_evalsha:
+            filter_service.claim_new(self._messages(*[f"m{i}" for i in range(50)]))
+
+        spy_evalsha.assert_called_once()
+
+    def test_duplicates_inside_batch_claimed_once(self, filter_service):
+        """IDs repetidos no mesmo lote só são retornados uma vez."""
+        assert [m["id"] for m in filter_service.claim_new(self._messages("m1", "m1"))] == ["m1"]
+
+    def test_release_allows_reclaim(self, filter_service):
+        """release() devolve a mensagem para um próximo ciclo."""
+        filter_service.claim_new(self._messages("m1"))
+        filter_service.release(["m1"])
+
+        assert [m["id"] for m in filter_service.claim_new(self._messages("m1"))] == ["m1"]
+
+    def test_claim_is_visible_to_should_process(self, filter_service):
+        """Mensagem reivindicada é considerada processada pelo fluxo antigo."""
+        filter_service.claim_new(self._messages("m1"))
+
+        assert filter_service.should_process(self._messages("m1")[0]) is False
+
+    def test_ids_expire_after_the_window(self, filter_service):
+        """IDs mais antigos que a janela de dedup podem ser reivindicados de novo."""
+        start = 1_700_000_000
+        filter_service.dedup.claim(["m1"], now=start)
+
+        assert filter_service.dedup.contains("m1", now=start + 23 * 3600)
+        assert not filter_service.dedup.contains("m1", now=start + 26 * 3600)
+        assert filter_service.dedup.claim(["m1"], now=start + 26 * 3600) == [True]
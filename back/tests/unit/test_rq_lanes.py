@@ -0,0 +1,167 @@
+"""
+Testes unitários das lanes RQ (control / interactive / batch) e do escalonamento ponderado.
+"""
+import heapq
+from collections import Counter
+
+import fakeredis
+import pytest
+from rq import Queue
+from rq.registry import StartedJobRegistry
+
+from robbot.infra.redis.lanes import Lane, LaneScheduler, LaneWorker
+
+LANES = [
+    Lane("control", ("control",), weight=2, max_concurrency=1),
+    Lane("interactive", ("messages", "ai", "escalation"), weight=6),
+    Lane("batch", ("batch",), weight=1, max_concurrency=1),
+]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct))]
+
+
+def simulate(pick_lane, workers: int = 4, duration: float = 300.0) -> dict[str, list[float]]:
+    """Simulação de eventos discretos: devolve o tempo de espera na fila de cada job, por lane.
+
+    Carga: 200 jobs batch de 5s já na fila no instante 0 (backlog), um turno de
+    conversa de 1s por segundo e um ciclo de polling de 2s a cada 10s.
+    pick_lane(queues, running) escolhe a lane do próximo job para um worker livre.
+    """
+    queues: dict[str, list[float]] = {"control": [], "interactive": [], "batch": [0.0] * 200}
+    service = {"control": 2.0, "interactive": 1.0, "batch": 5.0}
+    arrivals = [(float(t), "interactive") for t in range(int(duration))]
+    arrivals += [(float(t), "control") for t in range(0, int(duration), 10)]
+    events = [(t, 1, "arrival", lane) for t, lane in arrivals]  # chegada depois de término no mesmo instante
+    heapq.heapify(events)
+    running = Counter()
+    idle = workers
+    waits: dict[str, list[float]] = {"control": [], "interactive": [], "batch": []}
+
+    def dispatch(now: float) -> None:
+        nonlocal idle
+        while idle:
+            lane = pick_lane(queues, running)
+            if lane is None:
+                return
+            waits[lane].append(now - queues[lane].pop(0))
+            running[lane] += 1
+            idle -= 1
+            heapq.heappush(events, (now + service[lane], 0, "done", lane))
+
+    while events:
+        now, _order, kind, lane = heapq.heappop(events)
+        if now > duration:
+            break
+        if kind == "arrival":
+            queues[lane].append(now)
+        else:
+            running[lane] -= 1
+            idle += 1
+        dispatch(now)
+    return waits
+
+
+def fifo_single_queue(queues, running):
+    """Comportamento antigo: tudo na mesma fila, quem chegou primeiro roda primeiro."""
+    heads = [(jobs[0], lane) for lane, jobs in queues.items() if jobs]
+    return min(heads)[1] if heads else None
+
+
+def lane_scheduler_picker():
+    scheduler = LaneScheduler(LANES)
+
+    def pick(queues, running):
+        order = scheduler.order({lane: len(jobs) for lane, jobs in queues.items()}, running)
+        return next((lane.name for lane in order if queues[lane.name]), None)
+
+    return pick
+
+
+class TestLaneScheduler:
+    """Test suite for LaneScheduler."""
+
+    def test_backlogged_lanes_share_by_weight(self):
+        """Com todas as lanes com fila, as escolhas seguem os pesos 2:6:1."""
+        scheduler = LaneScheduler([Lane(lane.name, lane.queues, lane.weight) for lane in LANES])
+        backlog = {"control": 10, "interactive": 10, "batch": 10}
+
+        picks = Counter(scheduler.order(backlog, {})[0].name for _ in range(90))
+
+        assert picks == {"control": 20, "interactive": 60, "batch": 10}
+
+    def test_lane_at_limit_is_skipped(self):
+        """Lane com max_concurrency jobs rodando sai da lista até liberar vaga."""
+        scheduler = LaneScheduler(LANES)
+        backlog = {"control": 0, "interactive": 0, "batch": 50}
+
+        order = scheduler.order(backlog, {"batch": 1})
+
+        assert [lane.name for lane in order] == ["control", "interactive"]
+
+    def test_idle_lanes_stay_in_order_for_blocking_wait(self):
+        """Lanes sem fila continuam na lista (o worker bloqueia esperando por elas)."""
+        scheduler = LaneScheduler(LANES)
+
+        order = scheduler.order({"batch": 3}, {})
+
+        assert order[0].name == "batch"
+        assert {lane.name for lane in order} == {"control", "interactive", "batch"}
+
+
+class TestLaneSimulation:
+    """Latência de turnos de conversa com um backlog batch (simulação)."""
+
+    def test_interactive_latency_under_batch_backlog(self):
+        """Com lanes o turno espera no máximo alguns segundos; com a fila única espera o backlog inteiro."""
+        fifo = simulate(fifo_single_queue)
+        lanes = simulate(lane_scheduler_picker())
+
+        # Fila única: os turnos ficam atrás de ~250s de batch
+        assert percentile(fifo["interactive"], 0.95) > 60
+        assert percentile(fifo["control"], 0.95) > 60
+
+        # Lanes: batch limitado a 1 worker, sobram 3 para conversas e polling
+        assert percentile(lanes["interactive"], 0.95) <= 1.0
+        assert max(lanes["control"]) <= 1.0
+        # ...e o backlog batch continua andando (não é starvation)
+        assert len(lanes["batch"]) >= 50
+
+
+class TestLaneWorker:
+    """Test suite for LaneWorker over fakeredis."""
+
+    @pytest.fixture
+    def redis_client(self):
+        return fakeredis.FakeRedis(server=fakeredis.FakeServer())
+
+    @pytest.fixture
+    def queues(self, redis_client):
+        names = ["control", "messages", "ai", "escalation", "batch"]
+        return {name: Queue(name, connection=redis_client) for name in names}
+
+    def _worker(self, queues, redis_client):
+        return LaneWorker(list(queues.values()), connection=redis_client, lanes=LANES)
+
+    def test_conversation_turn_jumps_batch_backlog(self, queues, redis_client):
+        """Jobs batch enfileirados antes não atrasam o turno de conversa."""
+        batch_jobs = [queues["batch"].enqueue("time.time") for _ in range(3)]
+        turn = queues["messages"].enqueue("time.time")
+
+        self._worker(queues, redis_client).work(burst=True)
+
+        batch_ends = [job.latest_result().return_value for job in batch_jobs]
+        assert turn.latest_result().return_value < min(batch_ends)
+
+    def test_batch_lane_waits_while_at_limit(self, queues, redis_client):
+        """Com o único slot batch ocupado por outro worker, este worker só atende as outras lanes."""
+        queues["batch"].enqueue("time.time")
+        turn = queues["messages"].enqueue("time.time")
+        redis_client.zadd(StartedJobRegistry("batch", connection=redis_client).key, {"other-worker-job": "+inf"})
+
+        self._worker(queues, redis_client).work(burst=True)
+
+        assert turn.latest_result() is not None
+        assert queues["batch"].count == 1
@@ -0,0 +1,93 @@
+"""
+Testes unitários do send governor (token bucket por sessão + espaçamento por destinatário).
+"""
+from unittest.mock import AsyncMock, patch
+
+import fakeredis
+import pytest
+
+from robbot.core.custom_exceptions import WAHASendThrottledError
+from robbot.infra.redis.send_governor import SendGovernor
+
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture
+def governor_settings():
+    with patch("robbot.infra.redis.send_governor.settings") as mock_settings:
+        mock_settings.WAHA_SEND_RATE_PER_MINUTE = 6.0  # 1 envio a cada 10s
+        mock_settings.WAHA_SEND_BURST = 3
+        mock_settings.WAHA_SEND_RECIPIENT_SPACING_SECONDS = 4.0
+        mock_settings.WAHA_SEND_MAX_WAIT_SECONDS = 60.0
+        yield mock_settings
+
+
+@pytest.fixture
+def governor(governor_settings):
+    return SendGovernor(fakeredis.FakeRedis(server=fakeredis.FakeServer()), prefix="test:governor")
+
+
+class TestSendGovernor:
+    """Test suite for SendGovernor."""
+
+    def test_burst_is_free_then_sustained_rate(self, governor):
+        """Sessão ociosa envia o burst sem esperar; depois os envios saem na taxa sustentada."""
+        waits = [governor.reserve("default", f"chat{i}@c.us", now=NOW).wait_seconds for i in range(5)]
+
+        assert waits == pytest.approx([0, 0, 0, 10, 20])
+
+    def test_bucket_refills_with_time(self, governor):
+        """Depois de um período quieto o burst volta a estar disponível."""
+        for i in range(3):
+            governor.reserve("default", f"chat{i}@c.us", now=NOW)
+
+        assert governor.reserve("default", "x@c.us", now=NOW + 30).wait_seconds == 0
+        assert governor.reserve("default", "y@c.us", now=NOW + 30).wait_seconds == 0
+
+    def test_same_recipient_is_spaced(self, governor):
+        """Dois envios para o mesmo chat respeitam o espaçamento mesmo com tokens sobrando."""
+        assert governor.reserve("default", "a@c.us", now=NOW).wait_seconds == 0
+        assert governor.reserve("default", "a@c.us", now=NOW + 1).wait_seconds == pytest.approx(3)
+        assert governor.reserve("default", "b@c.us", now=NOW + 1).wait_seconds == 0
+
+    def test_sessions_are_independent(self, governor):
+        """Cada sessão WAHA tem seu próprio bucket."""
+        for i in range(3):
+            governor.reserve("default", f"chat{i}@c.us", now=NOW)
+
+        assert governor.reserve("other", "chat0@c.us", now=NOW).wait_seconds == 0
+
+    def test_slot_beyond_max_wait_is_refused_without_reserving(self, governor, governor_settings):
+        """Se o próximo slot está longe demais, nada é reservado (a fila não cresce à toa)."""
+        governor_settings.WAHA_SEND_MAX_WAIT_SECONDS = 15.0
+        for i in range(4):
+            governor.reserve("default", f"chat{i}@c.us", now=NOW)
+
+        refused = governor.reserve("default", "late@c.us", now=NOW)
+        assert not refused.reserved and refused.wait_seconds == pytest.approx(20)
+        assert governor.reserve("default", "late@c.us", now=NOW + 10).wait_seconds == pytest.approx(10)
+
+    @pytest.mark.asyncio
+    async def test_waha_sends_acquire_from_governor(self, governor, governor_settings, monkeypatch):
+        """send_text/send_image/send_file/send_voice esperam o slot; sem slot, nada é enviado."""
+        from robbot.infra.integrations.waha import waha_client as module
+
+        governor_settings.WAHA_SEND_MAX_WAIT_SECONDS = 15.0
+        monkeypatch.setattr(module.settings, "WAHA_SEND_GOVERNOR_ENABLED", True)
+        monkeypatch.setattr(module.settings, "WAHA_MOCK_REQUESTS", False)
+        monkeypatch.setattr(module, "get_send_governor", lambda: governor)
+        sleep = AsyncMock()
+        monkeypatch.setattr(module.asyncio, "sleep", sleep)
+        client = module.WAHAClient(base_url="http://waha.test")
+        client._request = AsyncMock(return_value={"id": "ok"})
+
+        with patch("robbot.infra.redis.send_governor.time.time", return_value=NOW):
+            await client.send_text("default", "a@c.us", "oi", apply_anti_ban=False)
+            await client.send_image("default", "b@c.us", "http://img", apply_anti_ban=False)
+            await client.send_file("default", "c@c.us", "http://doc")
+            await client.send_voice("default", "d@c.us", file_url="http://voz")
+            with pytest.raises(WAHASendThrottledError):
+                await client.send_text("default", "e@c.us", "oi", apply_anti_ban=False)
+
+        assert [call.args[0] for call in sleep.await_args_list] == [pytest.approx(10)]
+        assert client._request.await_count == 4
@@ -0,0 +1,230 @@
+"""
+Testes unitários do backend de ingestão em Redis Streams particionado por chat.
+"""
+import asyncio
+from collections import defaultdict
+
+import fakeredis
+import pytest
+
+from robbot.infra.redis.streams import (
+    CONSUMER_GROUP,
+    ConcurrentPartitionConsumer,
+    PartitionConsumer,
+    PartitionedStreamQueue,
+    partition_for,
+)
+
+
+@pytest.fixture
+def queue():
+    stream_queue = PartitionedStreamQueue(
+        redis_client=fakeredis.FakeRedis(server=fakeredis.FakeServer()),
+        partitions=4,
+        prefix="test:ingest",
+    )
+    stream_queue.ensure_groups()
+    return stream_queue
+
+
+def _consumer(queue, name, handler, **kwargs):
+    kwargs.setdefault("lease_seconds", 30)
+    kwargs.setdefault("reclaim_idle_ms", 0)
+    kwargs.setdefault("max_attempts", 3)
+    return PartitionConsumer(queue=queue, consumer_name=name, handler=handler, **kwargs)
+
+
+def _enqueue_conversations(queue, chats=12, per_chat=15):
+    for seq in range(per_chat):
+        for chat in range(chats):
+            queue.enqueue(f"55119{chat:04d}@c.us", {"chat": f"55119{chat:04d}@c.us", "seq": seq})
+
+
+class TestPartitionedStreams:
+    """Test suite for PartitionedStreamQueue / PartitionConsumer."""
+
+    def test_same_chat_always_same_partition(self, queue):
+        """Todas as mensagens de um chat caem na mesma partição."""
+        chat = "5511999999999@c.us"
+        partitions = {queue.enqueue(chat, {"n": n}).split(":")[0] for n in range(5)}
+
+        assert partitions == {str(partition_for(chat, 4))}
+
+    def test_consumers_split_partitions_without_overlap(self, queue):
+        """Dois consumidores dividem as partições de forma justa e disjunta."""
+        a = _consumer(queue, "a", handler=lambda _: None)
+        b = _consumer(queue, "b", handler=lambda _: None)
+
+        a.rebalance()
+        b.rebalance()
+        a.rebalance()  # a devolve o excedente ao ver b vivo
+        b.rebalance()
+
+        assert a.owned.isdisjoint(b.owned)
+        assert a.owned | b.owned == {0, 1, 2, 3}
+        assert len(a.owned) == len(b.owned) == 2
+
+    def test_per_chat_order_with_parallel_consumers(self, queue):
+        """Com vários consumidores cada chat é processado estritamente em ordem."""
+        seen = defaultdict(list)
+        handler = lambda payload: seen[payload["chat"]].append(payload["seq"])  # noqa: E731
+        consumers = [_consumer(queue, f"c{i}", handler, batch_size=3) for i in range(3)]
+        for consumer in consumers:
+            consumer.rebalance()
+        for consumer in consumers:
+            consumer.rebalance()
+
+        _enqueue_conversations(queue)
+        for _ in range(50):
+            if sum(consumer.process_once(block_ms=1) for consumer in consumers) == 0:
+                break
+
+        assert len(seen) == 12
+        assert all(seqs == list(range(15)) for seqs in seen.values())
+
+    def test_crashed_consumer_entries_are_reclaimed_first(self, queue):
+        """Entradas lidas por um consumidor que morreu são processadas antes das novas, em ordem."""
+        chat = "5511999999999@c.us"
+        partition = partition_for(chat, 4)
+        for seq in range(3):
+            queue.enqueue(chat, {"chat": chat, "seq": seq})
+
+        # Consumidor "crashed" lê as entradas e morre sem ACK (lease expira)
+        queue.redis.xreadgroup(CONSUMER_GROUP, "crashed", {queue.stream_key(partition): ">"})
+        queue.enqueue(chat, {"chat": chat, "seq": 3})
+
+        seen = []
+        survivor = _consumer(queue, "survivor", handler=lambda payload: seen.append(payload["seq"]))
+        survivor.rebalance()
+        for _ in range(5):
+            survivor.process_once(block_ms=1)
+
+        assert seen == [0, 1, 2, 3]
+        assert queue.redis.xpending(queue.stream_key(partition), CONSUMER_GROUP)["pending"] == 0
+
+    def test_fresh_pending_of_live_consumer_blocks_partition(self, queue):
+        """Pendências recentes de outro consumidor não são roubadas (ainda pode estar processando)."""
+        chat = "5511999999999@c.us"
+        partition = partition_for(chat, 4)
+        queue.enqueue(chat, {"chat": chat, "seq": 0})
+        queue.redis.xreadgroup(CONSUMER_GROUP, "busy", {queue.stream_key(partition): ">"})
+        queue.enqueue(chat, {"chat": chat, "seq": 1})
+
+        seen = []
+        other = _consumer(queue, "other", handler=lambda payload: seen.append(payload["seq"]), reclaim_idle_ms=60_000)
+        other.rebalance()
+        other.process_once(block_ms=1)
+
+        assert seen == []  # seq 1 não pode passar na frente de seq 0
+
+    def test_failing_entry_retries_then_dead_letters(self, queue):
+        """Falha repetida vai para dead-letter sem furar a ordem do chat."""
+        chat = "5511999999999@c.us"
+        queue.enqueue(chat, {"chat": chat, "seq": 0, "poison": True})
+        queue.enqueue(chat, {"chat": chat, "seq": 1})
+        seen = []
+
+        def handler(payload):
+            if payload.get("poison"):
+                raise RuntimeError("boom")
+            seen.append(payload["seq"])
+
+        consumer = _consumer(queue, "c", handler, max_attempts=2)
+        consumer.rebalance()
+        for _ in range(5):
+            consumer.process_once(block_ms=1)
+
+        assert seen == [1]
+        assert queue.redis.xlen(queue.dead_letter_key) == 1
+
+
+async def _run_concurrent(consumer, expected, timeout=10.0):
+    """Roda poll_once até o handler ter visto ``expected`` entradas."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while expected() and loop.time() < deadline:
+        await consumer.poll_once(block_ms=1)
+    await consumer.drain(timeout=timeout)
+
+
+class TestConcurrentPartitionConsumer:
+    """Test suite for ConcurrentPartitionConsumer (conversation worker asyncio)."""
+
+    @pytest.mark.asyncio
+    async def test_runs_chats_concurrently_but_each_chat_in_order(self, queue):
+        """Vários chats em paralelo (limitado), mas nunca dois turnos do mesmo chat."""
+        seen = defaultdict(list)
+        active_chats: set[str] = set()
+        stats = {"active": 0, "peak": 0, "overlaps": 0}
+
+        async def handler(payload):
+            chat = payload["chat"]
+            if chat in active_chats:
+                stats["overlaps"] += 1
+            active_chats.add(chat)
+            stats["active"] += 1
+            stats["peak"] = max(stats["peak"], stats["active"])
+            await asyncio.sleep(0.01)
+            seen[chat].append(payload["seq"])
+            stats["active"] -= 1
+            active_chats.discard(chat)
+
+        _enqueue_conversations(queue, chats=12, per_chat=5)
+        consumer = ConcurrentPartitionConsumer(
+            queue, "cwk", handler, concurrency=6, lease_seconds=30, reclaim_idle_ms=0
+        )
+
+        await _run_concurrent(consumer, lambda: sum(map(len, seen.values())) < 60)
+
+        assert all(seqs == list(range(5)) for seqs in seen.values()) and len(seen) == 12
+        assert stats["overlaps"] == 0
+        assert 1 < stats["peak"] <= 6
+        assert queue.redis.xpending(queue.stream_key(0), CONSUMER_GROUP)["pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_turn_is_retried_before_next_turn_of_chat(self, queue, monkeypatch):
+        """Turno que falha é retentado no lugar; o próximo turno do chat espera por ele."""
+        monkeypatch.setattr(ConcurrentPartitionConsumer, "RETRY_BACKOFF_SECONDS", (0,))
+        chat = "5511999999999@c.us"
+        for seq in range(3):
+            queue.enqueue(chat, {"chat": chat, "seq": seq})
+        calls = []
+
+        async def handler(payload):
+            calls.append(payload["seq"])
+            if calls.count(0) == 1 and payload["seq"] == 0:
+                raise RuntimeError("LLM timeout")
+
+        consumer = ConcurrentPartitionConsumer(
+            queue, "cwk", handler, concurrency=4, lease_seconds=30, reclaim_idle_ms=0, max_attempts=3
+        )
+        await _run_concurrent(consumer, lambda: len(calls) < 4)
+
+        assert calls == [0, 0, 1, 2]
+        assert queue.redis.xlen(queue.dead_letter_key) == 0
+
+    @pytest.mark.asyncio
+    async def test_recovery_does_not_restart_inflight_entries(self, queue):
+        """Reler pendências (ex.: partição readquirida) não duplica turnos em andamento."""
+        chat = "5511999999999@c.us"
+        partition = partition_for(chat, 4)
+        queue.enqueue(chat, {"chat": chat, "seq": 0})
+        release = asyncio.Event()
+        calls = []
+
+        async def handler(payload):
+            calls.append(payload["seq"])
+            await release.wait()
+
+        consumer = ConcurrentPartitionConsumer(
+            queue, "cwk", handler, concurrency=4, lease_seconds=30, reclaim_idle_ms=0
+        )
+        await consumer.poll_once(block_ms=1)
+        await consumer.poll_once(block_ms=1)
+        consumer._needs_recovery.add(partition)
+        await consumer.poll_once(block_ms=1)
+        await asyncio.sleep(0)
+
+        release.set()
+        await consumer.drain(timeout=5)
+        assert calls == [0]
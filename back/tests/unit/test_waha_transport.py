@@ -0,0 +1,205 @@
+"""
+Testes unitários do transporte WAHA (timeouts por classe, retries com orçamento, circuit breaker),
+contra um WAHA falso local com falhas programáveis.
+"""
+import socket
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from robbot.core import runtime_metrics
+from robbot.core.custom_exceptions import WAHACircuitOpenError, WAHAError
+from robbot.infra.integrations.waha import transport
+from robbot.infra.integrations.waha.transport import CircuitState, EndpointClass, classify
+from robbot.infra.integrations.waha.waha_client import WAHAClient, settings
+
+
+class FakeWaha:
+    """WAHA falso: cada rota responde 200, salvo as falhas roteirizadas (status ou atraso)."""
+
+    def __init__(self):
+        self.script: dict[str, list[tuple[str, float]]] = defaultdict(list)
+        self.hits: dict[str, int] = defaultdict(int)
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _handle(self):
+                path = self.path.split("?")[0]
+                fake.hits[path] += 1
+                length = int(self.headers.get("Content-Length") or 0)
+                if length:
+                    self.rfile.read(length)
+                status = 200
+                if fake.script[path]:
+                    kind, value = fake.script[path].pop(0)
+                    if kind == "delay":
+                        time.sleep(value)
+                    else:
+                        status = int(value)
+                body = b'{"id": "true_msg"}' if status == 200 else b'{"error": "fake"}'
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):  # noqa: N802 (BaseHTTPRequestHandler API)
+                self._handle()
+
+            def do_POST(self):  # noqa: N802 (BaseHTTPRequestHandler API)
+                self._handle()
+
+            def log_message(self, *_args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def fail(self, path: str, *statuses: int):
+        self.script[path].extend(("status", status) for status in statuses)
+
+    def delay(self, path: str, seconds: float, times: int = 1):
+        self.script[path].extend([("delay", seconds)] * times)
+
+
+@pytest.fixture
+def fake_waha():
+    fake = FakeWaha()
+    threading.Thread(target=fake.server.serve_forever, daemon=True).start()
+    yield fake
+    fake.server.shutdown()
+    fake.server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def transport_settings(monkeypatch):
+    runtime_metrics.reset()
+    monkeypatch.setattr(transport, "_transports", {})
+    for name, value in {
+        "WAHA_MOCK_REQUESTS": False,
+        "WAHA_SEND_GOVERNOR_ENABLED": False,
+        "WAHA_TIMEOUT_PRESENCE_SECONDS": 0.2,
+        "WAHA_TIMEOUT_SEND_SECONDS": 2.0,
+        "WAHA_TIMEOUT_MEDIA_SECONDS": 2.0,
+        "WAHA_TIMEOUT_CONTROL_SECONDS": 2.0,
+        "WAHA_CONNECT_TIMEOUT_SECONDS": 1.0,
+        "WAHA_RETRY_MAX_ATTEMPTS": 3,
+        "WAHA_RETRY_BASE_DELAY_MS": 10,
+        "WAHA_RETRY_MAX_DELAY_MS": 20,
+        "WAHA_RETRY_BUDGET_RATIO": 0.2,
+        "WAHA_RETRY_BUDGET_MIN_PER_SECOND": 1.0,
+        "WAHA_BREAKER_FAILURE_THRESHOLD": 3,
+        "WAHA_BREAKER_RESET_SECONDS": 0.3,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+
+
+def _send(client: WAHAClient, text: str = "oi"):
+    return client.send_text("default", "5511@c.us", text, apply_anti_ban=False)
+
+
+class TestWAHATransport:
+    """Test suite for WAHATransport (via WAHAClient)."""
+
+    def test_endpoint_classes(self):
+        """Cada endpoint cai na classe de timeout/retry certa."""
+        assert classify("POST", "/api/startTyping") == EndpointClass.PRESENCE
+        assert classify("POST", "/api/default/presence") == EndpointClass.PRESENCE
+        assert classify("POST", "/api/sendText") == EndpointClass.SEND
+        assert classify("POST", "/api/sendVoice") == EndpointClass.MEDIA
+        assert classify("POST", "/api/default/media/convert/voice") == EndpointClass.MEDIA
+        assert classify("GET", "/api/default/chats") == EndpointClass.CONTROL
+
+    @pytest.mark.asyncio
+    async def test_send_is_retried_only_when_not_processed(self, fake_waha, monkeypatch):
+        """503 no envio é repetido; 500 não (o WAHA pode ter enviado)."""
+        monkeypatch.setattr(settings, "WAHA_BREAKER_FAILURE_THRESHOLD", 10)
+        client = WAHAClient(base_url=fake_waha.url)
+
+        fake_waha.fail("/api/sendText", 503)
+        assert await _send(client) == {"id": "true_msg"}
+        assert fake_waha.hits["/api/sendText"] == 2
+
+        fake_waha.fail("/api/sendText", 500)
+        with pytest.raises(WAHAError) as exc:
+            await _send(client)
+        assert exc.value.status_code == 500
+        assert fake_waha.hits["/api/sendText"] == 3
+
+        fake_waha.fail("/api/sessions", 500, 504)
+        assert await client.list_sessions() == []
+        assert fake_waha.hits["/api/sessions"] == 3
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_timeouts_follow_endpoint_class(self, fake_waha):
+        """Typing estoura o timeout curto de presença; o envio lento cabe no timeout de envio."""
+        client = WAHAClient(base_url=fake_waha.url)
+        fake_waha.delay("/api/startTyping", 0.5, times=2)
+        fake_waha.delay("/api/sendText", 0.5)
+
+        started = time.monotonic()
+        with pytest.raises(WAHAError, match="presence"):
+            await client.start_typing("default", "5511@c.us")
+        assert time.monotonic() - started < 1.0
+        assert fake_waha.hits["/api/startTyping"] == 2  # presença: no máximo 1 retry
+
+        assert await _send(client) == {"id": "true_msg"}
+        assert runtime_metrics.snapshot()["waha_transport"]["timeouts_presence"] == 2
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_retry_budget_caps_retries(self, fake_waha, monkeypatch):
+        """Sem orçamento, falhas não geram retries (não multiplicam a carga sobre o WAHA)."""
+        monkeypatch.setattr(settings, "WAHA_RETRY_BUDGET_RATIO", 0.0)
+        monkeypatch.setattr(settings, "WAHA_RETRY_BUDGET_MIN_PER_SECOND", 0.0)
+        client = WAHAClient(base_url=fake_waha.url)
+        fake_waha.fail("/api/sendText", 503)
+
+        with pytest.raises(WAHAError):
+            await _send(client)
+
+        assert fake_waha.hits["/api/sendText"] == 1
+        assert runtime_metrics.snapshot()["waha_transport"]["retry_budget_exhausted"] == 1
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_breaker_fails_fast_then_probes(self, fake_waha):
+        """Após falhas seguidas o circuito abre (falha rápido, sem chamar o WAHA) e uma sonda o fecha."""
+        client = WAHAClient(base_url=fake_waha.url)
+        fake_waha.fail("/api/sendText", 502, 502, 502)
+
+        with pytest.raises(WAHAError):
+            await _send(client)
+        assert transport.breaker_status()[fake_waha.url]["state"] == CircuitState.OPEN.value
+
+        with pytest.raises(WAHACircuitOpenError):
+            await _send(client)
+        assert fake_waha.hits["/api/sendText"] == 3
+
+        time.sleep(0.35)
+        assert client.transport.breaker.state == CircuitState.HALF_OPEN
+        assert await _send(client) == {"id": "true_msg"}
+        assert client.transport.breaker.state == CircuitState.CLOSED
+        assert runtime_metrics.snapshot()["waha_transport"]["breaker_rejected"] == 1
+        await client.close()
+
+    @pytest.mark.asyncio
+    async def test_connection_refused_is_retried_and_opens_breaker(self):
+        """WAHA fora do ar: conexão recusada é repetida (nada foi enviado) e abre o circuito."""
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            url = f"http://127.0.0.1:{sock.getsockname()[1]}"
+        client = WAHAClient(base_url=url)
+
+        with pytest.raises(WAHAError):
+            await _send(client)
+
+        assert runtime_metrics.snapshot()["waha_transport"]["retries"] == 2
+        assert client.transport.breaker.state == CircuitState.OPEN
+        await client.close()